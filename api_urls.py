@@ -45,6 +45,7 @@ from views.views import (
     api_pedidos_cliente,
     api_pedido_crear_token,
     api_pedido_detalle,
+    api_reporte_costos,
 )
 from views.viewsReclamo import (
     listar_reclamos_cliente,
@@ -91,6 +92,7 @@ from views.viewsTurno import (
 from views.viewsNotificacion import (
     crear_notificacion,
     enviar_notificacion_masiva,
+    progreso_notificacion_masiva,
     listar_notificaciones_cliente,
     contar_no_leidas,
     obtener_notificacion,
@@ -193,6 +195,7 @@ urlpatterns = [
 
     # Rutas para productos
     path('productos/activos/', api_productos_activos, name='api_productos_activos'),
+    path('productos/costos/', api_reporte_costos, name='api_reporte_costos'),
     path('productos/', listar_productos, name='listar_productos'),
     path('productos/crear/', crear_producto, name='crear_producto'),
     path('productos/<int:id_producto>/', obtener_producto, name='obtener_producto'),
@@ -267,6 +270,7 @@ urlpatterns = [
     path('notificaciones/', listar_todas_notificaciones, name='listar_todas_notificaciones'),
     path('notificaciones/crear/', crear_notificacion, name='crear_notificacion'),
     path('notificaciones/masiva/', enviar_notificacion_masiva, name='enviar_notificacion_masiva'),
+    path('notificaciones/masiva/<str:id_envio>/', progreso_notificacion_masiva, name='progreso_notificacion_masiva'),
     path('notificaciones/mis-notificaciones/', listar_notificaciones_cliente, name='listar_notificaciones_cliente'),
     path('notificaciones/no-leidas/count/', contar_no_leidas, name='contar_no_leidas'),
     path('notificaciones/<int:id_notificacion>/', obtener_notificacion, name='obtener_notificacion'),
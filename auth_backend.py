@@ -0,0 +1,54 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+
+from manager.authManager import AuthManager, MENSAJE_CREDENCIALES_INVALIDAS, MENSAJE_USUARIO_INACTIVO
+
+
+class SupabaseBcryptBackend(ModelBackend):
+    """Autentica contra el hash bcrypt de la tabla `usuario` con una sola verificación.
+
+    El User de Django es solo el ancla de la sesión: se crea con contraseña inutilizable
+    y no se vuelve a hashear en cada login. El rol y el perfil leídos en la misma pasada
+    quedan en `user.login_supabase` para guardarlos en la sesión con guardar_en_sesion().
+
+    Si Supabase rechaza las credenciales de un usuario existente se corta la cadena de
+    backends (PermissionDenied): un hash viejo en auth_user no debe abrir la sesión.
+    Solo los emails que no están en Supabase (p.ej. superusuarios de Django) siguen a
+    ModelBackend.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if not username or not password:
+            return None
+        resultado = AuthManager().autenticar(username, password)
+        if not resultado.get('success'):
+            if resultado.get('message') in (MENSAJE_CREDENCIALES_INVALIDAS, MENSAJE_USUARIO_INACTIVO):
+                raise PermissionDenied(resultado['message'])
+            return None
+        usuario = resultado['data']['usuario']
+        user, creado = User.objects.get_or_create(
+            username=usuario.email or username,
+            defaults={'email': usuario.email or username, 'first_name': usuario.nombre or '',
+                      'password': make_password(None)},
+        )
+        if not creado and user.has_usable_password():
+            # Hash PBKDF2 sincronizado por el login anterior: se descarta una sola vez
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        if not self.user_can_authenticate(user):
+            return None
+        user.login_supabase = resultado['data']
+        return user
+
+
+def guardar_en_sesion(session, datos):
+    """Guarda rol, id_usuario e id de perfil (cliente/empleado) de un login en la sesión."""
+    usuario, perfil, rol = datos['usuario'], datos.get('perfil'), datos['rol']
+    session['user_rol'] = rol
+    session['id_usuario'] = usuario.id_usuario
+    if rol == 'cliente':
+        session['id_cliente'] = getattr(perfil, 'id_cliente', None)
+    elif rol == 'empleado':
+        session['id_empleado'] = getattr(perfil, 'id_empleado', None)
@@ -3,6 +3,7 @@
 
 import logging
 from config import get_supabase_client
+from utils.paginacion import paginar, TAMANIO_PAGINA
 
 logger = logging.getLogger(__name__)
 
@@ -191,6 +192,27 @@ class AsistenciaDAO:
             logger.error(f"Error al listar todas las asistencias: {str(e)}")
             raise
 
+    def listar_pagina(self, cursor=None, tamanio=TAMANIO_PAGINA, id_empleado=None, estado=None):
+        """Lista una página de asistencias con información completa, keyset sobre (fecha, id_asistencia).
+        Filtros opcionales por empleado y por estado.
+        Retorna (lista de dicts, siguiente_cursor o None si es la última página)"""
+        query = self.supabase.table('asistencia')\
+            .select('*, empleado(id_empleado, cargo, usuario(nombre, email), sede(nombre)), turno(fecha, hora_inicio, hora_fin)')
+        if id_empleado is not None:
+            query = query.eq('id_empleado', id_empleado)
+        if estado:
+            query = query.eq('estado', estado)
+        return paginar(query, cursor, tamanio, 'id_asistencia')
+
+    def listar_pagina_dia(self, fecha, cursor=None, tamanio=TAMANIO_PAGINA):
+        """Lista una página de las asistencias de un día por hora de entrada (las que no
+        registraron entrada al final), keyset sobre (hora_entrada, id_asistencia).
+        Retorna (lista de dicts, siguiente_cursor o None si es la última página)"""
+        query = self.supabase.table('asistencia')\
+            .select('*, empleado(id_empleado, cargo, usuario(nombre, email), sede(nombre))')\
+            .eq('fecha', fecha)
+        return paginar(query, cursor, tamanio, 'id_asistencia', columna_fecha='hora_entrada', descendente=False)
+
     def obtener_reporte_mensual(self, id_empleado, year, month):
         """Obtiene asistencias de un empleado en un mes específico"""
         try:
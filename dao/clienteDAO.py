@@ -1,5 +1,9 @@
 from config import get_supabase_client
 from entidades.cliente import Cliente
+from utils import identity_map
+
+# Máximo de IDs por consulta in_() al resolver clientes en lote
+LOTE_IDS_CLIENTE = 200
 
 class ClienteDAO:
     def __init__(self):
@@ -18,6 +22,7 @@ class ClienteDAO:
         resp = self.supabase.table("cliente").select("*").eq("id_usuario", id_usuario).limit(1).execute()
         return resp
     
+    @identity_map.por_id('cliente')
     def obtener_por_id(self, id_cliente):
         """
         Obtiene un cliente por su ID
@@ -31,6 +36,28 @@ class ClienteDAO:
         resp = self.supabase.table("cliente").select("*").eq("id_cliente", id_cliente).limit(1).execute()
         return resp
     
+    def resolver_ids(self, ids):
+        """
+        Resuelve en lote IDs que pueden ser id_cliente o id_usuario (igual criterio que
+        obtener_por_id seguido de obtener_por_usuario), con una consulta in_() por bloque
+        
+        Args:
+            ids: lista de enteros
+            
+        Returns:
+            dict {id_recibido: id_cliente} solo con los IDs encontrados
+        """
+        ids = list(dict.fromkeys(ids))
+        resueltos = {}
+        for columna in ('id_cliente', 'id_usuario'):
+            pendientes = [i for i in ids if i not in resueltos]
+            for inicio in range(0, len(pendientes), LOTE_IDS_CLIENTE):
+                bloque = pendientes[inicio:inicio + LOTE_IDS_CLIENTE]
+                resp = self.supabase.table("cliente").select("id_cliente, id_usuario").in_(columna, bloque).execute()
+                for fila in resp.data or []:
+                    resueltos.setdefault(fila[columna], fila['id_cliente'])
+        return resueltos
+
     def actualizar(self, id_cliente, telefono=None, direccion=None):
         """Actualiza campos básicos de un cliente."""
         update_fields = {}
@@ -41,6 +68,7 @@ class ClienteDAO:
         if not update_fields:
             return {'success': False, 'message': 'Nada para actualizar'}
         resp = self.supabase.table("cliente").update(update_fields).eq("id_cliente", id_cliente).execute()
+        identity_map.forget('cliente', id_cliente)
         # Normalizar respuesta
         if resp and getattr(resp, 'data', None):
             return {'success': True, 'data': resp.data, 'message': 'Cliente actualizado'}
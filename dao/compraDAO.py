@@ -5,6 +5,7 @@ import logging
 from supabase import create_client, Client
 import os
 from datetime import datetime
+from utils.paginacion import paginar, TAMANIO_PAGINA
 
 logger = logging.getLogger(__name__)
 
@@ -131,6 +132,30 @@ class CompraDAO:
             logger.error(f"Error al listar compras por fecha: {str(e)}")
             return []
     
+    def listar_pagina(self, cursor=None, tamanio=TAMANIO_PAGINA, estado=None, id_proveedor=None,
+                      fecha_desde=None, fecha_hasta=None):
+        """Lista una página de compras (más recientes primero) con keyset sobre (fecha, id_compra).
+        Los filtros opcionales se combinan entre sí.
+        Retorna (lista de dicts con nombre_proveedor, siguiente_cursor o None si es la última página)"""
+        query = self.supabase.table('compra').select(
+            'id_compra, id_proveedor, id_usuario, fecha, total, estado, '
+            'proveedor(nombre)'
+        )
+        if estado:
+            query = query.eq('estado', estado)
+        if id_proveedor:
+            query = query.eq('id_proveedor', id_proveedor)
+        if fecha_desde:
+            query = query.gte('fecha', fecha_desde)
+        if fecha_hasta:
+            query = query.lte('fecha', fecha_hasta)
+        filas, siguiente = paginar(query, cursor, tamanio, 'id_compra')
+        for compra in filas:
+            if compra.get('proveedor'):
+                compra['nombre_proveedor'] = compra['proveedor']['nombre']
+            compra.pop('proveedor', None)
+        return filas, siguiente
+    
     def actualizar_estado(self, id_compra, nuevo_estado):
         """Actualiza el estado de una compra"""
         try:
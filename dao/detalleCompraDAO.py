@@ -4,9 +4,14 @@
 import logging
 from supabase import create_client, Client
 import os
+from utils.catalog_cache import notify_change
+from utils.paginacion import paginar, TAMANIO_PAGINA
 
 logger = logging.getLogger(__name__)
 
+# Filas máximas por respuesta de Supabase al leer detalle_compra
+PAGINA_DETALLES_COMPRA = 1000
+
 class DetalleCompraDAO:
     def __init__(self):
         supabase_url = os.environ.get("SUPABASE_URL")
@@ -26,6 +31,7 @@ class DetalleCompraDAO:
             
             response = self.supabase.table('detalle_compra').insert(data).execute()
             if response.data and len(response.data) > 0:
+                notify_change('detalle_compra', filas=response.data)
                 return response.data[0]['id_detalle_compra']
             return None
         except Exception as e:
@@ -46,6 +52,8 @@ class DetalleCompraDAO:
                 })
             
             response = self.supabase.table('detalle_compra').insert(data).execute()
+            if response.data:
+                notify_change('detalle_compra', filas=response.data)
             return response.data if response.data else []
         except Exception as e:
             logger.error(f"Error al crear detalles múltiples: {str(e)}")
@@ -116,6 +124,38 @@ class DetalleCompraDAO:
             logger.error(f"Error al listar detalles por insumo {id_insumo}: {str(e)}")
             return []
     
+    def listar_pagina_por_insumo(self, id_insumo, cursor=None, tamanio=TAMANIO_PAGINA):
+        """Lista una página del historial de compras de un insumo (más recientes primero),
+        keyset sobre id_detalle_compra. Retorna (lista de dicts, siguiente_cursor o None)"""
+        query = self.supabase.table('detalle_compra').select(
+            'id_detalle_compra, id_compra, id_insumo, cantidad, precio_unitario, subtotal, '
+            'compra(fecha, estado, proveedor(nombre))'
+        ).eq('id_insumo', id_insumo)
+        filas, siguiente = paginar(query, cursor, tamanio, 'id_detalle_compra', columna_fecha=None)
+        for detalle in filas:
+            compra = detalle.pop('compra', None)
+            if compra:
+                detalle['fecha_compra'] = compra['fecha']
+                detalle['estado_compra'] = compra['estado']
+                if compra.get('proveedor'):
+                    detalle['nombre_proveedor'] = compra['proveedor']['nombre']
+        return filas, siguiente
+    
+    def listar_ventanas_costos(self, ids_insumo, ventana):
+        """Últimas `ventana` compras (id_insumo, cantidad, subtotal) de cada insumo, de la más vieja
+        a la más reciente, con la RPC compras_recientes_por_insumo. Los insumos se piden por tandas
+        para que ninguna respuesta supere PAGINA_DETALLES_COMPRA filas. Lanza la excepción si falla."""
+        ids = sorted({int(i) for i in ids_insumo})
+        tanda = max(1, PAGINA_DETALLES_COMPRA // max(1, int(ventana)))
+        filas = []
+        for inicio in range(0, len(ids), tanda):
+            resp = self.supabase.rpc('compras_recientes_por_insumo', {
+                'p_ids': ids[inicio:inicio + tanda],
+                'p_ventana': int(ventana),
+            }).execute()
+            filas.extend(resp.data or [])
+        return filas
+    
     def actualizar(self, id_detalle_compra, datos):
         """Actualiza un detalle de compra"""
         try:
@@ -135,6 +175,8 @@ class DetalleCompraDAO:
                 datos_actualizados
             ).eq('id_detalle_compra', id_detalle_compra).execute()
             
+            for fila in response.data or []:
+                notify_change('detalle_compra', id_insumo=fila.get('id_insumo'))
             return response.data and len(response.data) > 0
         except Exception as e:
             logger.error(f"Error al actualizar detalle {id_detalle_compra}: {str(e)}")
@@ -146,6 +188,8 @@ class DetalleCompraDAO:
             response = self.supabase.table('detalle_compra').delete().eq(
                 'id_detalle_compra', id_detalle_compra
             ).execute()
+            for fila in response.data or []:
+                notify_change('detalle_compra', id_insumo=fila.get('id_insumo'))
             return response.data and len(response.data) > 0
         except Exception as e:
             logger.error(f"Error al eliminar detalle {id_detalle_compra}: {str(e)}")
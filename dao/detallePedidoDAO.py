@@ -1,10 +1,22 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 import logging
+import time
+from datetime import date, datetime, timedelta
 from config import get_supabase_client
+from dao.inventarioDAO import CODIGOS_FUNCION_INEXISTENTE
+from utils import identity_map
+from utils.catalog_cache import get_or_cache
 
 logger = logging.getLogger(__name__)
 
+# Segundos que se reutiliza un ranking de top productos para los mismos filtros
+TTL_TOP_PRODUCTOS = 60
+# Filas por página al agregar detalle_pedido sin la función RPC
+PAGINA_AGREGACION = 1000
+# Segundos sin reintentar la RPC top_productos si no existe (funciones.sql no aplicado)
+ESPERA_REINTENTO_RPC = 600
+
 
 class DetallePedidoDAO:
     """DAO para gestionar líneas de detalle de pedidos."""
@@ -43,6 +55,7 @@ class DetallePedidoDAO:
                 'subtotal': float(precio_unitario) * int(cantidad),
             }
             resp = supabase.table('detalle_pedido').insert(row).execute()
+            identity_map.forget('pedido', id_pedido)
             return type('Resp', (), {'success': True, 'data': resp.data or []})
         except Exception as e:
             logger.exception('Error agregar_linea')
@@ -74,4 +87,139 @@ class DetallePedidoDAO:
             return type('Resp', (), {'success': True, 'data': list(agg.values())})
         except Exception as e:
             logger.exception('Error ventas_por_producto')
-            return type('Resp', (), {'success': False, 'message': str(e), 'data': []})
\ No newline at end of file
+            return type('Resp', (), {'success': False, 'message': str(e), 'data': []})
+
+    # Marca de tiempo del último fallo de la RPC top_productos (compartida por instancias)
+    _rpc_top_fallo_en = None
+
+    def top_productos(self, desde=None, hasta=None, limite=20, id_sede=None):
+        """Ranking de productos vendidos agregado en la base de datos.
+
+        Usa la función SQL `top_productos` (funciones.sql); si no está disponible
+        recorre detalle_pedido paginado y agrega en streaming. El resultado se
+        cachea TTL_TOP_PRODUCTOS segundos por combinación de filtros.
+
+        Args:
+            desde: fecha inicial inclusiva (date o 'YYYY-MM-DD'), None sin límite
+            hasta: fecha final inclusiva (date o 'YYYY-MM-DD'), None sin límite
+            limite: cantidad máxima de productos
+            id_sede: filtra por sede del pedido, None todas
+
+        Returns:
+            list de dicts {'id_producto', 'nombre', 'cantidad_total', 'subtotal_total'}
+            ordenada por cantidad_total descendente
+        """
+        desde_ts = self._inicio_dia(desde)
+        hasta_ts = self._inicio_dia(hasta, dias_extra=1)
+        limite = int(limite)
+        id_sede = int(id_sede) if id_sede not in (None, '') else None
+        clave = f'top_productos:{desde_ts}:{hasta_ts}:{id_sede}:{limite}'
+
+        def _cargar():
+            filas = self._top_productos_rpc(desde_ts, hasta_ts, limite, id_sede)
+            if filas is None:
+                filas = self._top_productos_paginado(desde_ts, hasta_ts, limite, id_sede)
+            return filas
+
+        return get_or_cache(clave, ttl=TTL_TOP_PRODUCTOS, loader=_cargar)
+
+    def ventas_hasta_pedido(self, max_pedido, limite):
+        """Ventas por producto de los pedidos con id_pedido <= max_pedido, sin caché.
+
+        La usa la reconciliación de KPIs: necesita el ranking completo y del mismo rango de
+        pedidos que los encabezados que acaba de leer, no el top cacheado del panel.
+        """
+        filas = self._top_productos_rpc(None, None, int(limite), None, max_pedido=max_pedido)
+        if filas is None:
+            filas = self._top_productos_paginado(None, None, int(limite), None, max_pedido=max_pedido)
+        return filas
+
+    @staticmethod
+    def _inicio_dia(valor, dias_extra=0):
+        """Convierte una fecha a timestamp ISO de inicio de día (None si no hay fecha)."""
+        if valor in (None, ''):
+            return None
+        if isinstance(valor, datetime):
+            valor = valor.date()
+        elif not isinstance(valor, date):
+            valor = datetime.strptime(str(valor)[:10], '%Y-%m-%d').date()
+        return (valor + timedelta(days=dias_extra)).isoformat() + 'T00:00:00'
+
+    def _top_productos_rpc(self, desde_ts, hasta_ts, limite, id_sede, max_pedido=None):
+        """Ejecuta la RPC top_productos; None si no está disponible."""
+        fallo = DetallePedidoDAO._rpc_top_fallo_en
+        if fallo is not None and time.time() - fallo < ESPERA_REINTENTO_RPC:
+            return None
+        params = {
+            'p_desde': desde_ts,
+            'p_hasta': hasta_ts,
+            'p_id_sede': id_sede,
+            'p_limite': limite,
+        }
+        if max_pedido is not None:
+            params['p_max_pedido'] = int(max_pedido)
+        try:
+            supabase = get_supabase_client()
+            resp = supabase.rpc('top_productos', params).execute()
+        except Exception as e:
+            # Solo se deja de usar la RPC si la función no existe; otro error se propaga
+            if getattr(e, 'code', None) not in CODIGOS_FUNCION_INEXISTENTE:
+                raise
+            logger.warning(f'RPC top_productos no disponible, se usa agregación paginada: {e}')
+            DetallePedidoDAO._rpc_top_fallo_en = time.time()
+            return None
+        DetallePedidoDAO._rpc_top_fallo_en = None
+        return [{
+            'id_producto': r.get('id_producto'),
+            'nombre': r.get('nombre') or f"Producto {r.get('id_producto')}",
+            'cantidad_total': int(r.get('cantidad_total') or 0),
+            'subtotal_total': float(r.get('subtotal_total') or 0.0),
+        } for r in (resp.data or [])]
+
+    def _top_productos_paginado(self, desde_ts, hasta_ts, limite, id_sede, max_pedido=None):
+        """Agrega detalle_pedido página a página sin retener las filas."""
+        supabase = get_supabase_client()
+        filtra_pedido = desde_ts or hasta_ts or id_sede is not None
+        columnas = 'id_detalle,id_producto,cantidad,subtotal'
+        if filtra_pedido:
+            columnas += ',pedido!inner(fecha,id_sede)'
+        agg = {}
+        inicio = 0
+        while True:
+            q = supabase.table('detalle_pedido').select(columnas)
+            if desde_ts:
+                q = q.gte('pedido.fecha', desde_ts)
+            if hasta_ts:
+                q = q.lt('pedido.fecha', hasta_ts)
+            if id_sede is not None:
+                q = q.eq('pedido.id_sede', id_sede)
+            if max_pedido is not None:
+                q = q.lte('id_pedido', int(max_pedido))
+            resp = q.order('id_detalle').range(inicio, inicio + PAGINA_AGREGACION - 1).execute()
+            pagina = resp.data or []
+            for d in pagina:
+                pid = d.get('id_producto')
+                if pid is None:
+                    continue
+                st = agg.setdefault(pid, [0, 0.0])
+                st[0] += int(d.get('cantidad') or 0)
+                st[1] += float(d.get('subtotal') or 0.0)
+            if len(pagina) < PAGINA_AGREGACION:
+                break
+            inicio += PAGINA_AGREGACION
+
+        top = sorted(agg.items(), key=lambda kv: (kv[1][0], kv[1][1]), reverse=True)[:limite]
+        nombres = {}
+        if top:
+            try:
+                pr = supabase.table('producto').select('id_producto,nombre')\
+                    .in_('id_producto', [pid for pid, _ in top]).execute()
+                nombres = {p.get('id_producto'): p.get('nombre') for p in (pr.data or [])}
+            except Exception:
+                logger.exception('Error obteniendo nombres de productos')
+        return [{
+            'id_producto': pid,
+            'nombre': nombres.get(pid) or f'Producto {pid}',
+            'cantidad_total': st[0],
+            'subtotal_total': st[1],
+        } for pid, st in top]
@@ -1,5 +1,6 @@
 from config import get_supabase_client
 from entidades.empleado import Empleado
+from utils.paginacion import paginar, TAMANIO_PAGINA
 
 class EmpleadoDAO:
     def __init__(self):
@@ -91,6 +92,28 @@ class EmpleadoDAO:
         resp = query.execute()
         return resp
     
+    def listar_pagina(self, cursor=None, tamanio=TAMANIO_PAGINA, id_sede=None, solo_activos=False):
+        """
+        Lista una página de empleados con información de usuario y sede, keyset sobre id_empleado
+        (más recientes primero)
+        
+        Args:
+            cursor: cursor opaco devuelto por la página anterior (None para la primera)
+            tamanio: empleados por página
+            id_sede: solo los de esa sede (opcional)
+            solo_activos: solo los empleados con usuario activo
+            
+        Returns:
+            (lista de dicts, siguiente_cursor o None si es la última página)
+        """
+        usuario = "usuario!inner(nombre, email, activo)" if solo_activos else "usuario(nombre, email, activo)"
+        query = self.supabase.table("empleado").select(f"*, {usuario}, sede(nombre, direccion)")
+        if id_sede is not None:
+            query = query.eq("id_sede", id_sede)
+        if solo_activos:
+            query = query.eq("usuario.activo", True)
+        return paginar(query, cursor, tamanio, 'id_empleado', columna_fecha=None)
+    
     def modificar(self, id_empleado, datos):
         """
         Modifica datos de un empleado
@@ -3,6 +3,8 @@
 
 from config import get_supabase_client, TABLA_INSUMO
 from entidades.insumo import Insumo
+from utils.catalog_cache import notify_change
+from utils import identity_map
 
 
 class InsumoDAO:
@@ -41,6 +43,7 @@ class InsumoDAO:
                 .execute()
             
             if response.data:
+                notify_change('insumo', id_insumo=response.data[0].get('id_insumo'))
                 return Insumo.from_dict(response.data[0])
             return None
             
@@ -48,6 +51,7 @@ class InsumoDAO:
             print(f"Error al insertar insumo: {e}")
             return None
     
+    @identity_map.por_id('insumo')
     def obtener_por_id(self, id_insumo):
         """
         Obtiene un insumo por su ID
@@ -144,8 +148,10 @@ class InsumoDAO:
                 .update(datos)\
                 .eq('id_insumo', id_insumo)\
                 .execute()
+            identity_map.forget('insumo', id_insumo)
             
             if response.data:
+                notify_change('insumo', id_insumo=id_insumo)
                 return Insumo.from_dict(response.data[0])
             return None
             
@@ -1,8 +1,20 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import logging
+import time
+
 from config import get_supabase_client, TABLA_INVENTARIO
 from entidades.inventario import Inventario
+from entidades.movimientoInventario import MovimientoInventario
+from utils.catalog_cache import notify_change
+
+logger = logging.getLogger(__name__)
+
+# Segundos sin reintentar la RPC ajustar_stock cuando no está instalada (funciones.sql no aplicado)
+ESPERA_REINTENTO_RPC = 600
+# Códigos de PostgREST/Postgres para "la función no existe"
+CODIGOS_FUNCION_INEXISTENTE = ('PGRST202', '42883')
 
 
 class InventarioDAO:
@@ -192,7 +204,9 @@ class InventarioDAO:
                 .execute()
             
             if response.data:
-                return Inventario.from_dict(response.data[0])
+                inventario_creado = Inventario.from_dict(response.data[0])
+                self._notificar_cambio(inventario_creado)
+                return inventario_creado
             
             return None
             
@@ -218,7 +232,9 @@ class InventarioDAO:
                 .execute()
             
             if response.data:
-                return Inventario.from_dict(response.data[0])
+                inventario_actualizado = Inventario.from_dict(response.data[0])
+                self._notificar_cambio(inventario_actualizado)
+                return inventario_actualizado
             
             return None
             
@@ -258,6 +274,162 @@ class InventarioDAO:
             print(f"Error al ajustar cantidad: {e}")
             return None
     
+    # RPC -> marca de tiempo de la última vez que no existía (compartida por instancias)
+    _rpc_ausente_en = {}
+
+    def _ejecutar_rpc(self, nombre, params):
+        """
+        Ejecuta una RPC de stock de funciones.sql
+        
+        Returns:
+            dict devuelto por la función, {'estado': 'error', 'mensaje'} si falló, o None si la
+            función no está instalada y el llamador debe usar el camino de lectura + escritura
+        """
+        ausente = InventarioDAO._rpc_ausente_en.get(nombre)
+        if ausente is not None and time.time() - ausente < ESPERA_REINTENTO_RPC:
+            return None
+        try:
+            response = self.supabase.rpc(nombre, params).execute()
+        except Exception as e:
+            # Solo se recurre al camino anterior si la función no existe; ante cualquier otro
+            # error el ajuste pudo haberse aplicado y no debe repetirse
+            if getattr(e, 'code', None) in CODIGOS_FUNCION_INEXISTENTE:
+                logger.warning(f"RPC {nombre} no disponible, se usa lectura + escritura: {e}")
+                InventarioDAO._rpc_ausente_en[nombre] = time.time()
+                return None
+            print(f"Error al ajustar stock ({nombre}): {e}")
+            return {'estado': 'error', 'mensaje': str(e)}
+        
+        InventarioDAO._rpc_ausente_en.pop(nombre, None)
+        return response.data or {'estado': 'error', 'mensaje': 'Respuesta vacía'}
+
+    def ajustar_y_registrar(self, id_insumo, id_sede, delta, tipo, motivo, id_usuario=None, crear_si_falta=False):
+        """
+        Aplica un delta de stock y registra el movimiento en una sola llamada atómica
+        (RPC ajustar_stock de funciones.sql)
+        
+        Args:
+            id_insumo: ID del insumo
+            id_sede: ID de la sede
+            delta: cantidad a sumar (positiva) o restar (negativa)
+            tipo: tipo del movimiento ('entrada', 'salida', ...)
+            motivo: motivo del movimiento
+            id_usuario: ID del usuario que registra (opcional)
+            crear_si_falta: crea el registro de inventario si no existe y el delta es positivo
+            
+        Returns:
+            dict {'estado', 'inventario', 'movimiento', 'disponible'} con estado 'ok',
+            'insuficiente', 'no_existe' o 'error' (más 'mensaje'); None si la RPC no está
+            instalada y el llamador debe usar el camino de lectura + escritura
+        """
+        datos = self._ejecutar_rpc('ajustar_stock', {
+            'p_id_insumo': id_insumo,
+            'p_id_sede': id_sede,
+            'p_delta': delta,
+            'p_tipo': tipo,
+            'p_motivo': motivo,
+            'p_id_usuario': id_usuario,
+            'p_crear': crear_si_falta,
+        })
+        if datos is None:
+            return None
+        resultado = {
+            'estado': datos.get('estado', 'error'),
+            'mensaje': datos.get('mensaje'),
+            'inventario': Inventario.from_dict(datos['inventario']) if datos.get('inventario') else None,
+            'movimiento': MovimientoInventario.from_dict(datos['movimiento']) if datos.get('movimiento') else None,
+            'disponible': datos.get('disponible'),
+        }
+        if resultado['inventario']:
+            self._notificar_cambio(resultado['inventario'])
+        return resultado
+    
+    def ajustar_lote(self, movimientos, id_usuario=None):
+        """
+        Aplica varios movimientos de stock (una o más sedes) en una sola llamada atómica
+        (RPC ajustar_stock_lote de funciones.sql)
+        
+        Args:
+            movimientos: list de dicts {'id_insumo', 'id_sede', 'delta', 'tipo', 'motivo'}
+            id_usuario: ID del usuario que registra (opcional)
+            
+        Returns:
+            dict {'estado', 'inventarios', 'movimientos'}; si el estado es 'insuficiente' o
+            'no_existe' incluye 'id_insumo', 'id_sede' y 'disponible'. None si la RPC no está
+            instalada
+        """
+        datos = self._ejecutar_rpc('ajustar_stock_lote', {'p_movimientos': movimientos, 'p_id_usuario': id_usuario})
+        if datos is None:
+            return None
+        resultado = dict(datos)
+        resultado['inventarios'] = [Inventario.from_dict(f) for f in datos.get('inventarios') or []]
+        resultado['movimientos'] = [MovimientoInventario.from_dict(f) for f in datos.get('movimientos') or []]
+        for inventario in resultado['inventarios']:
+            self._notificar_cambio(inventario)
+        return resultado
+    
+    def listar_por_claves(self, claves):
+        """
+        Obtiene en una consulta el inventario de varios pares (insumo, sede)
+        
+        Args:
+            claves: iterable de tuplas (id_insumo, id_sede)
+            
+        Returns:
+            dict {(id_insumo, id_sede): Inventario} con los registros existentes
+        """
+        claves = set(claves)
+        if not claves:
+            return {}
+        response = self.supabase.table(self.tabla)\
+            .select("*")\
+            .in_('id_insumo', sorted({c[0] for c in claves}))\
+            .in_('id_sede', sorted({c[1] for c in claves}))\
+            .execute()
+        
+        inventarios = {}
+        for fila in response.data or []:
+            inventario = Inventario.from_dict(fila)
+            if (inventario.id_insumo, inventario.id_sede) in claves:
+                inventarios[(inventario.id_insumo, inventario.id_sede)] = inventario
+        return inventarios
+    
+    def guardar_cantidades(self, existentes, nuevos):
+        """
+        Escribe cantidades en lote: un upsert para los registros existentes y un insert
+        para los nuevos
+        
+        Args:
+            existentes: list de Inventario (con id_inventario) con la cantidad final
+            nuevos: list de Inventario sin id_inventario
+            
+        Returns:
+            list de Inventario guardados
+        """
+        guardados = []
+        if existentes:
+            response = self.supabase.table(self.tabla)\
+                .upsert([{
+                    'id_inventario': inv.id_inventario,
+                    'id_insumo': inv.id_insumo,
+                    'id_sede': inv.id_sede,
+                    'cantidad': float(inv.cantidad),
+                } for inv in existentes], on_conflict='id_inventario')\
+                .execute()
+            guardados += [Inventario.from_dict(f) for f in response.data or []]
+        if nuevos:
+            response = self.supabase.table(self.tabla)\
+                .insert([{
+                    'id_insumo': inv.id_insumo,
+                    'id_sede': inv.id_sede,
+                    'cantidad': float(inv.cantidad),
+                } for inv in nuevos])\
+                .execute()
+            guardados += [Inventario.from_dict(f) for f in response.data or []]
+        for inventario in guardados:
+            self._notificar_cambio(inventario)
+        return guardados
+    
     def eliminar(self, id_inventario):
         """
         Elimina un registro de inventario
@@ -278,4 +450,10 @@ class InventarioDAO:
             
         except Exception as e:
             print(f"Error al eliminar inventario: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    @staticmethod
+    def _notificar_cambio(inventario):
+        """Publica el nuevo stock de un insumo/sede (invalida las claves de catálogo que dependen de inventario)"""
+        notify_change('inventario', id_insumo=inventario.id_insumo, id_sede=inventario.id_sede,
+                      cantidad=inventario.cantidad)
@@ -0,0 +1,108 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import logging
+from config import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+TABLA_KPI = 'kpi_contador'
+TABLA_KPI_DELTA = 'kpi_delta'
+
+
+class KpiDAO:
+    """
+    DAO del snapshot de KPIs (tabla kpi_contador y RPCs de funciones.sql)
+    """
+
+    def __init__(self):
+        self.supabase = get_supabase_client()
+
+    def leer_snapshot(self, desde_fecha, metricas_fijas, metrica_top, metrica_top_detalle, limite_top):
+        """
+        Lee el snapshot sin traer todas las filas de ventas (PostgREST corta en 1000 filas)
+
+        Args:
+            desde_fecha: fecha ISO; las filas con fecha anterior (ingresos por día) se omiten
+            metricas_fijas: métricas de tamaño acotado que se leen completas
+            metrica_top: métrica por producto de la que se leen solo las limite_top de mayor valor
+            metrica_top_detalle: métrica complementaria leída solo para esos productos
+            limite_top: cantidad de productos
+
+        Returns:
+            list de filas o None si el snapshot no está disponible
+        """
+        try:
+            filas = self.supabase.table(TABLA_KPI)\
+                .select('metrica,dimension,fecha,valor,datos,actualizado')\
+                .in_('metrica', list(metricas_fijas))\
+                .or_(f'fecha.is.null,fecha.gte.{desde_fecha}')\
+                .execute().data or []
+            top = self.supabase.table(TABLA_KPI)\
+                .select('metrica,dimension,fecha,valor,datos,actualizado')\
+                .eq('metrica', metrica_top)\
+                .order('valor', desc=True)\
+                .limit(limite_top)\
+                .execute().data or []
+            if top:
+                filas += top
+                filas += self.supabase.table(TABLA_KPI)\
+                    .select('metrica,dimension,fecha,valor,datos,actualizado')\
+                    .eq('metrica', metrica_top_detalle)\
+                    .in_('dimension', [f['dimension'] for f in top])\
+                    .execute().data or []
+            return filas
+        except Exception as e:
+            logger.warning(f"Snapshot de KPIs no disponible: {str(e)}")
+            return None
+
+    def incrementar(self, filas, id_pedido=None):
+        """
+        Suma deltas a los contadores (RPC kpi_incrementar)
+
+        Args:
+            filas: list de dicts {'metrica', 'dimension', 'fecha', 'valor', 'datos'}
+            id_pedido: pedido nuevo que origina los deltas (la reconciliación no lo cuenta dos veces)
+
+        Returns:
+            bool: True si se aplicó
+        """
+        if not filas:
+            return True
+        try:
+            self.supabase.rpc('kpi_incrementar', {'p_filas': filas, 'p_id_pedido': id_pedido}).execute()
+            return True
+        except Exception as e:
+            logger.warning(f"No se pudieron incrementar KPIs: {str(e)}")
+            return False
+
+    def ultimo_delta(self):
+        """Id del último delta anotado por kpi_incrementar (0 si no hay), o None si no se pudo leer"""
+        try:
+            resp = self.supabase.table(TABLA_KPI_DELTA)\
+                .select('id')\
+                .order('id', desc=True)\
+                .limit(1)\
+                .execute()
+            return int(resp.data[0]['id']) if resp.data else 0
+        except Exception as e:
+            logger.warning(f"No se pudo leer el último delta de KPIs: {str(e)}")
+            return None
+
+    def reemplazar(self, filas, desde_delta=None, max_pedido=None):
+        """
+        Reemplaza el snapshot completo en una transacción (RPC kpi_reemplazar)
+
+        Args:
+            filas: snapshot recalculado (sin insumos críticos: la RPC los toma de inventario)
+            desde_delta: resultado de ultimo_delta() antes de leer las tablas base; los deltas
+                posteriores se vuelven a aplicar sobre el snapshot nuevo
+            max_pedido: mayor id_pedido leído (sus altas ya están en `filas`)
+        """
+        try:
+            self.supabase.rpc('kpi_reemplazar', {'p_filas': filas, 'p_desde_delta': desde_delta,
+                                                 'p_max_pedido': max_pedido}).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error al reemplazar snapshot de KPIs: {str(e)}")
+            return False
@@ -4,6 +4,7 @@
 from config import get_supabase_client, TABLA_MOVIMIENTO_INVENTARIO
 from entidades.movimientoInventario import MovimientoInventario
 from datetime import datetime
+from utils.paginacion import paginar, TAMANIO_PAGINA
 
 
 class MovimientoInventarioDAO:
@@ -49,6 +50,38 @@ class MovimientoInventarioDAO:
             print(f"Error al crear movimiento: {e}")
             return None
     
+    def crear_multiple(self, movimientos):
+        """
+        Registra varios movimientos de inventario en una sola operación
+        
+        Args:
+            movimientos: lista de objetos MovimientoInventario
+            
+        Returns:
+            Lista de objetos MovimientoInventario creados
+        """
+        if not movimientos:
+            return []
+        try:
+            datos = [{
+                'id_inventario': movimiento.id_inventario,
+                'tipo': movimiento.tipo,
+                'cantidad': float(movimiento.cantidad),
+                'motivo': movimiento.motivo,
+                'fecha': movimiento.fecha.isoformat() if isinstance(movimiento.fecha, datetime) else movimiento.fecha,
+                'id_usuario': movimiento.id_usuario
+            } for movimiento in movimientos]
+            
+            response = self.supabase.table(self.tabla)\
+                .insert(datos)\
+                .execute()
+            
+            return [MovimientoInventario.from_dict(fila) for fila in response.data or []]
+            
+        except Exception as e:
+            print(f"Error al crear movimientos: {e}")
+            return []
+    
     def obtener_por_id(self, id_movimiento):
         """
         Obtiene un movimiento por ID
@@ -215,4 +248,40 @@ class MovimientoInventarioDAO:
             
         except Exception as e:
             print(f"Error al listar todos los movimientos: {e}")
-            return []
\ No newline at end of file
+            return []
+    
+    def listar_pagina(self, cursor=None, tamanio=TAMANIO_PAGINA, id_sede=None, tipo=None):
+        """
+        Lista una página de movimientos (más recientes primero) con keyset sobre (fecha, id_movimiento)
+        
+        Args:
+            cursor: cursor opaco devuelto por la página anterior (None para la primera)
+            tamanio: movimientos por página
+            id_sede: ID de la sede (opcional)
+            tipo: 'entrada' o 'salida' (opcional)
+            
+        Returns:
+            (lista de objetos MovimientoInventario, siguiente_cursor o None si es la última página)
+        """
+        if id_sede:
+            # JOIN obligatorio con inventario para filtrar por sede
+            query = self.supabase.table(self.tabla)\
+                .select("*, inventario!inner(id_sede, id_insumo, insumo(nombre), sede(nombre))")\
+                .eq('inventario.id_sede', id_sede)
+        else:
+            query = self.supabase.table(self.tabla)\
+                .select("*, inventario(id_sede, id_insumo, insumo(nombre), sede(nombre))")
+        if tipo:
+            query = query.eq('tipo', tipo)
+        filas, siguiente = paginar(query, cursor, tamanio, 'id_movimiento')
+        
+        movimientos = []
+        for mov_data in filas:
+            movimiento = MovimientoInventario.from_dict(mov_data)
+            inventario = mov_data.get('inventario') or {}
+            if inventario.get('insumo'):
+                movimiento.nombre_insumo = inventario['insumo'].get('nombre')
+            if inventario.get('sede'):
+                movimiento.nombre_sede = inventario['sede'].get('nombre')
+            movimientos.append(movimiento)
+        return movimientos, siguiente
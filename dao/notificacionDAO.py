@@ -3,9 +3,21 @@
 
 import logging
 from config import get_supabase_client
+from utils import catalog_cache
+from utils.paginacion import paginar, TAMANIO_PAGINA
 
 logger = logging.getLogger(__name__)
 
+# Segundos que se reutiliza el conteo de no leídas de un cliente (se invalida en cada escritura)
+TTL_CONTEO_NO_LEIDAS = 60
+# Clientes con conteo guardado en este proceso
+MAX_CONTEOS_NO_LEIDAS = 2048
+
+# Los conteos son por cliente: van en un caché propio y no ocupan el LRU de catálogos. Con el
+# backend compartido cada escritura sube la versión del cliente y los demás workers recargan
+_conteos_no_leidas = catalog_cache.TTLCache(TTL_CONTEO_NO_LEIDAS, max_entries=MAX_CONTEOS_NO_LEIDAS,
+                                            version_prefix='notificaciones_no_leidas:')
+
 
 class NotificacionDAO:
     """
@@ -22,11 +34,29 @@ class NotificacionDAO:
             if 'id_notificacion' in datos and datos['id_notificacion'] is None:
                 datos.pop('id_notificacion')
             
-            return self.supabase.table('notificacion').insert(datos).execute()
+            resp = self.supabase.table('notificacion').insert(datos).execute()
+            self._invalidar_conteos(resp, datos.get('id_cliente'))
+            return resp
         except Exception as e:
             logger.error(f"Error al crear notificación: {str(e)}")
             raise
 
+    def crear_multiple(self, notificaciones):
+        """Inserta varias notificaciones en una sola sentencia (multi-row INSERT)"""
+        try:
+            filas = []
+            for notificacion in notificaciones:
+                datos = notificacion.to_dict()
+                if 'id_notificacion' in datos and datos['id_notificacion'] is None:
+                    datos.pop('id_notificacion')
+                filas.append(datos)
+            resp = self.supabase.table('notificacion').insert(filas).execute()
+            self._invalidar_conteos(resp)
+            return resp
+        except Exception as e:
+            logger.error(f"Error al crear notificaciones en lote: {str(e)}")
+            raise
+
     def obtener_por_id(self, id_notificacion):
         """Obtiene una notificación por ID con datos del cliente"""
         try:
@@ -54,25 +84,46 @@ class NotificacionDAO:
             raise
 
     def contar_no_leidas(self, id_cliente):
-        """Cuenta notificaciones no leídas de un cliente"""
+        """Cuenta notificaciones no leídas de un cliente (conteo en el servidor)"""
         try:
+            # count='exact' devuelve el total en la cabecera; limit(1) evita descargar
+            # las filas (esta versión del cliente no expone head=True)
             resp = self.supabase.table('notificacion')\
-                .select('id_notificacion')\
+                .select('id_notificacion', count='exact')\
                 .eq('id_cliente', id_cliente)\
                 .eq('leida', False)\
+                .limit(1)\
                 .execute()
+            if getattr(resp, 'count', None) is not None:
+                return resp.count
             return len(resp.data) if resp.data else 0
         except Exception as e:
             logger.error(f"Error al contar notificaciones no leídas: {str(e)}")
             raise
 
+    def contar_no_leidas_cacheado(self, id_cliente):
+        """Conteo de no leídas reutilizado entre requests hasta que cambien las notificaciones del cliente"""
+        return _conteos_no_leidas.get_or_load(str(id_cliente), lambda: self.contar_no_leidas(id_cliente))
+
+    @staticmethod
+    def _invalidar_conteos(resp, id_cliente=None):
+        """Descarta el conteo cacheado de los clientes afectados por una escritura"""
+        clientes = {id_cliente} if id_cliente else set()
+        for fila in (getattr(resp, 'data', None) or []):
+            if isinstance(fila, dict) and fila.get('id_cliente'):
+                clientes.add(fila['id_cliente'])
+        for cliente in clientes:
+            _conteos_no_leidas.invalidate(str(cliente))
+
     def marcar_como_leida(self, id_notificacion):
         """Marca una notificación como leída"""
         try:
-            return self.supabase.table('notificacion')\
+            resp = self.supabase.table('notificacion')\
                 .update({"leida": True})\
                 .eq('id_notificacion', id_notificacion)\
                 .execute()
+            self._invalidar_conteos(resp)
+            return resp
         except Exception as e:
             logger.error(f"Error al marcar notificación como leída: {str(e)}")
             raise
@@ -80,11 +131,13 @@ class NotificacionDAO:
     def marcar_todas_leidas(self, id_cliente):
         """Marca todas las notificaciones de un cliente como leídas"""
         try:
-            return self.supabase.table('notificacion')\
+            resp = self.supabase.table('notificacion')\
                 .update({"leida": True})\
                 .eq('id_cliente', id_cliente)\
                 .eq('leida', False)\
                 .execute()
+            self._invalidar_conteos(resp, id_cliente)
+            return resp
         except Exception as e:
             logger.error(f"Error al marcar todas como leídas: {str(e)}")
             raise
@@ -92,10 +145,12 @@ class NotificacionDAO:
     def eliminar(self, id_notificacion):
         """Elimina una notificación"""
         try:
-            return self.supabase.table('notificacion')\
+            resp = self.supabase.table('notificacion')\
                 .delete()\
                 .eq('id_notificacion', id_notificacion)\
                 .execute()
+            self._invalidar_conteos(resp)
+            return resp
         except Exception as e:
             logger.error(f"Error al eliminar notificación: {str(e)}")
             raise
@@ -112,6 +167,21 @@ class NotificacionDAO:
             logger.error(f"Error al listar todas las notificaciones: {str(e)}")
             raise
 
+    def listar_pagina(self, cursor=None, tamanio=TAMANIO_PAGINA, id_cliente=None, solo_no_leidas=False):
+        """Lista una página de notificaciones (más recientes primero), keyset sobre (fecha, id_notificacion).
+        Con id_cliente solo las de ese cliente; sin él, todas con los datos del cliente (administradores).
+        Retorna (lista de dicts, siguiente_cursor o None si es la última página)"""
+        if id_cliente is None:
+            query = self.supabase.table('notificacion')\
+                .select('*, cliente(id_cliente, usuario(nombre, email))')
+        else:
+            query = self.supabase.table('notificacion')\
+                .select('*')\
+                .eq('id_cliente', id_cliente)
+            if solo_no_leidas:
+                query = query.eq('leida', False)
+        return paginar(query, cursor, tamanio, 'id_notificacion')
+
     # NUEVO: listado filtrado y paginado para panel admin
     def listar_admin_filtrado(self, sede=None, rol=None, leidas=None, page=1, page_size=25):
         """Lista notificaciones con filtros opcionales.
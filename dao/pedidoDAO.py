@@ -6,7 +6,21 @@ from entidades.pedido import Pedido
 from entidades.detallePedido import DetallePedido
 from dao.productoDAO import ProductoDAO
 from dao.sedeDAO import SedeDAO
-from datetime import datetime
+from utils.catalog_cache import get_or_cache, register_dependency, write_through_ttl
+from utils import identity_map
+from utils.paginacion import paginar, TAMANIO_PAGINA, TAMANIO_MAXIMO
+from datetime import datetime, date, timedelta
+
+# Clave de catalog_cache para la sede asignada a pedidos nuevos
+CLAVE_SEDE_POR_DEFECTO = 'sede_por_defecto'
+register_dependency('sede', CLAVE_SEDE_POR_DEFECTO)
+
+# Máximo de IDs de pedido por consulta in_() al cargar detalles en lote
+LOTE_IDS_DETALLE = 200
+# Tamaño de página al leer detalle_pedido (límite de filas por respuesta en Supabase)
+PAGINA_DETALLES = 1000
+# Columnas de la exportación CSV; detalle_pedido(count) agrega las líneas en la misma consulta
+COLUMNAS_EXPORTACION = 'id_pedido,id_cliente,id_sede,fecha,estado,total,metodo_pago,estado_pago,detalle_pedido(count)'
 
 
 class PedidoDAO:
@@ -20,6 +34,7 @@ class PedidoDAO:
         self.tabla_pedido = TABLA_PEDIDO
         self.tabla_detalle = TABLA_DETALLE_PEDIDO
     
+    @identity_map.por_id('pedido')
     def obtener_por_id(self, id_pedido):
         """
         Obtiene un pedido por su ID incluyendo sus detalles
@@ -50,11 +65,7 @@ class PedidoDAO:
             
             if detalles_response.data:
                 for detalle_data in detalles_response.data:
-                    detalle = DetallePedido.from_dict(detalle_data)
-                    # Agregar nombre del producto si existe
-                    if 'producto' in detalle_data and detalle_data['producto']:
-                        detalle.nombre_producto = detalle_data['producto'].get('nombre')
-                    pedido.detalles.append(detalle)
+                    pedido.detalles.append(self._detalle_desde_fila(detalle_data))
             
             return pedido
             
@@ -62,12 +73,13 @@ class PedidoDAO:
             print(f"Error al obtener pedido: {e}")
             return None
     
-    def listar_por_cliente(self, id_cliente):
+    def listar_por_cliente(self, id_cliente, cargar_detalles=True):
         """
         Lista todos los pedidos de un cliente específico
         
         Args:
             id_cliente: ID del cliente
+            cargar_detalles: Si es False solo se retornan los encabezados
             
         Returns:
             Lista de objetos Pedido
@@ -79,26 +91,19 @@ class PedidoDAO:
                 .order('fecha', desc=True)\
                 .execute()
             
-            pedidos = []
-            if response.data:
-                for pedido_data in response.data:
-                    pedido = Pedido.from_dict(pedido_data)
-                    # Obtener detalles
-                    pedido = self._cargar_detalles(pedido)
-                    pedidos.append(pedido)
-            
-            return pedidos
+            return self._construir_pedidos(response.data, cargar_detalles)
             
         except Exception as e:
             print(f"Error al listar pedidos del cliente: {e}")
             return []
     
-    def listar_por_estado(self, estado):
+    def listar_por_estado(self, estado, cargar_detalles=True):
         """
         Lista todos los pedidos con un estado específico
         
         Args:
             estado: Estado del pedido (pendiente, en_proceso, completado, cancelado)
+            cargar_detalles: Si es False solo se retornan los encabezados
             
         Returns:
             Lista de objetos Pedido
@@ -110,26 +115,20 @@ class PedidoDAO:
                 .order('fecha', desc=True)\
                 .execute()
             
-            pedidos = []
-            if response.data:
-                for pedido_data in response.data:
-                    pedido = Pedido.from_dict(pedido_data)
-                    pedido = self._cargar_detalles(pedido)
-                    pedidos.append(pedido)
-            
-            return pedidos
+            return self._construir_pedidos(response.data, cargar_detalles)
             
         except Exception as e:
             print(f"Error al listar pedidos por estado: {e}")
             return []
     
-    def listar_por_fecha(self, fecha_inicio, fecha_fin):
+    def listar_por_fecha(self, fecha_inicio, fecha_fin, cargar_detalles=True):
         """
         Lista pedidos en un rango de fechas
         
         Args:
             fecha_inicio: Fecha de inicio (formato: YYYY-MM-DD)
             fecha_fin: Fecha de fin (formato: YYYY-MM-DD)
+            cargar_detalles: Si es False solo se retornan los encabezados
             
         Returns:
             Lista de objetos Pedido
@@ -142,25 +141,19 @@ class PedidoDAO:
                 .order('fecha', desc=True)\
                 .execute()
             
-            pedidos = []
-            if response.data:
-                for pedido_data in response.data:
-                    pedido = Pedido.from_dict(pedido_data)
-                    pedido = self._cargar_detalles(pedido)
-                    pedidos.append(pedido)
-            
-            return pedidos
+            return self._construir_pedidos(response.data, cargar_detalles)
             
         except Exception as e:
             print(f"Error al listar pedidos por fecha: {e}")
             return []
     
-    def listar_todos(self, limite=100):
+    def listar_todos(self, limite=100, cargar_detalles=True):
         """
         Lista todos los pedidos con límite opcional
         
         Args:
             limite: Número máximo de pedidos a retornar
+            cargar_detalles: Si es False solo se retornan los encabezados
             
         Returns:
             Lista de objetos Pedido
@@ -172,22 +165,112 @@ class PedidoDAO:
                 .limit(limite)\
                 .execute()
             
-            pedidos = []
-            if response.data:
-                for pedido_data in response.data:
-                    pedido = Pedido.from_dict(pedido_data)
-                    pedido = self._cargar_detalles(pedido)
-                    pedidos.append(pedido)
-            
-            return pedidos
+            return self._construir_pedidos(response.data, cargar_detalles)
             
         except Exception as e:
             print(f"Error al listar todos los pedidos: {e}")
             return []
 
+    def consulta(self):
+        """
+        Crea una consulta de pedidos componible cuyos filtros se aplican en la base
+        
+        Ejemplo:
+            consulta = dao.consulta().del_cliente(4).con_estado('completado').desde('2026-01-01')
+            pedidos, siguiente = consulta.pagina(cursor, 20).ejecutar()
+        
+        Returns:
+            ConsultaPedidos
+        """
+        return ConsultaPedidos(self)
+
+    def listar_pagina(self, cursor=None, tamanio=TAMANIO_PAGINA, cargar_detalles=True):
+        """
+        Lista una página de pedidos (más recientes primero) con keyset sobre (fecha, id_pedido)
+        
+        Args:
+            cursor: cursor opaco devuelto por la página anterior (None para la primera)
+            tamanio: pedidos por página
+            cargar_detalles: Si es False solo se retornan los encabezados
+            
+        Returns:
+            (lista de objetos Pedido, siguiente_cursor o None si es la última página)
+            
+        Raises:
+            CursorInvalido si el cursor no es válido; los errores de Supabase se propagan
+        """
+        query = self.supabase.table(self.tabla_pedido).select("*")
+        filas, siguiente = paginar(query, cursor, tamanio, 'id_pedido')
+        return self._construir_pedidos(filas, cargar_detalles), siguiente
+
+    def iterar_encabezados(self, columnas='id_pedido,id_cliente,id_sede,fecha,estado,total', pagina=PAGINA_DETALLES):
+        """
+        Recorre todos los pedidos (sin detalles) por páginas con keyset sobre id_pedido
+        
+        Args:
+            columnas: columnas a leer (debe incluir id_pedido)
+            pagina: filas por consulta
+            
+        Yields:
+            dict con las columnas de cada pedido, en orden de id_pedido
+        """
+        ultimo = None
+        while True:
+            query = self.supabase.table(self.tabla_pedido).select(columnas)
+            if ultimo is not None:
+                query = query.gt('id_pedido', ultimo)
+            filas = query.order('id_pedido').limit(pagina).execute().data or []
+            for fila in filas:
+                yield fila
+            if len(filas) < pagina:
+                break
+            ultimo = filas[-1]['id_pedido']
+
+    def iterar_por_fecha(self, estado=None, desde=None, hasta=None, pagina=PAGINA_DETALLES):
+        """
+        Recorre los pedidos en orden (fecha, id_pedido) por páginas con keyset, para exportar
+        sin tope de filas ni cargar todo en memoria
+        
+        Args:
+            estado: filtra por estado (opcional)
+            desde: fecha mínima inclusive, YYYY-MM-DD (opcional)
+            hasta: fecha máxima, mismo criterio lte que listar_por_fecha (opcional)
+            pagina: filas por consulta
+            
+        Yields:
+            dict con las columnas de COLUMNAS_EXPORTACION y 'detalles_count'
+        """
+        ultima_fecha, ultimo_id = None, None
+        while True:
+            query = self.supabase.table(self.tabla_pedido).select(COLUMNAS_EXPORTACION)
+            if estado:
+                query = query.eq('estado', estado)
+            if desde:
+                query = query.gte('fecha', desde)
+            if hasta:
+                query = query.lte('fecha', hasta)
+            if ultimo_id is not None:
+                if ultima_fecha is None:
+                    # Los pedidos sin fecha van al final (nulls last); solo queda avanzar por id
+                    query = query.is_('fecha', 'null').gt('id_pedido', ultimo_id)
+                else:
+                    query = query.or_(f'fecha.gt."{ultima_fecha}",'
+                                      f'and(fecha.eq."{ultima_fecha}",id_pedido.gt.{ultimo_id}),'
+                                      f'fecha.is.null')
+            filas = query.order('fecha').order('id_pedido').limit(pagina).execute().data or []
+            for fila in filas:
+                conteo = fila.pop('detalle_pedido', None) or [{}]
+                fila['detalles_count'] = conteo[0].get('count', 0)
+                yield fila
+            if len(filas) < pagina:
+                break
+            ultima_fecha, ultimo_id = filas[-1].get('fecha'), filas[-1]['id_pedido']
+
     def crear_pedido(self, id_cliente, detalles):
         """
         Crea un pedido y sus detalles calculando totales a partir del precio del producto.
+        Los precios se consultan en una sola llamada y el pedido retornado se arma
+        con las filas insertadas, sin releerlo de la base.
         Args:
             id_cliente: ID del cliente
             detalles: lista de dicts {'id_producto': int, 'cantidad': int}
@@ -195,17 +278,26 @@ class PedidoDAO:
             Objeto Pedido creado o None si hay error
         """
         try:
-            producto_dao = ProductoDAO()
-            total = 0.0
-            detalles_rows = []
-            # Calcular totales y preparar filas de detalle
+            lineas = []
             for item in detalles:
                 id_producto = int(item.get('id_producto'))
                 cantidad = int(item.get('cantidad', 0))
                 if cantidad <= 0:
                     continue
-                prod = producto_dao.obtener_por_id(id_producto)
-                precio = float(prod.precio) if prod else 0.0
+                lineas.append((id_producto, cantidad))
+            if not lineas:
+                return None
+            # Precios de todos los productos del carrito en una consulta
+            productos = ProductoDAO().obtener_por_ids(id_producto for id_producto, _ in lineas)
+            # obtener_por_ids retorna {} ante un error: sin precio no se crea el pedido (no a 0)
+            faltantes = sorted({id_producto for id_producto, _ in lineas if id_producto not in productos})
+            if faltantes:
+                print(f"Error al crear pedido: no se pudo obtener el precio de los productos {faltantes}")
+                return None
+            total = 0.0
+            detalles_rows = []
+            for id_producto, cantidad in lineas:
+                precio = float(productos[id_producto].precio)
                 subtotal = precio * cantidad
                 total += subtotal
                 detalles_rows.append({
@@ -214,20 +306,9 @@ class PedidoDAO:
                     'precio_unitario': precio,
                     'subtotal': subtotal
                 })
-            if not detalles_rows:
-                return None
-            # Insertar pedido
-            # Seleccionar sede por defecto (primera activa)
-            id_sede = None
-            try:
-                sedes_resp = SedeDAO().listar(solo_activos=True)
-                if getattr(sedes_resp, 'data', None):
-                    id_sede = sedes_resp.data[0].get('id_sede')
-            except Exception:
-                id_sede = None
             pedido_data = {
                 'id_cliente': id_cliente,
-                'id_sede': id_sede,
+                'id_sede': self._sede_por_defecto(),
                 'estado': 'pendiente',
                 'total': total,
                 'fecha': datetime.now().isoformat()
@@ -235,33 +316,62 @@ class PedidoDAO:
             pedido_resp = self.supabase.table(self.tabla_pedido).insert(pedido_data).execute()
             if not pedido_resp.data:
                 return None
-            pedido_id = pedido_resp.data[0].get('id_pedido')
+            pedido = Pedido.from_dict(pedido_resp.data[0])
             # Insertar detalles con id_pedido
             for row in detalles_rows:
-                row['id_pedido'] = pedido_id
-            _ = self.supabase.table(self.tabla_detalle).insert(detalles_rows).execute()
-            # Retornar pedido completo
-            return self.obtener_por_id(pedido_id)
+                row['id_pedido'] = pedido.id_pedido
+            detalles_resp = self.supabase.table(self.tabla_detalle).insert(detalles_rows).execute()
+            # Armar el pedido con las filas ya insertadas
+            for detalle_data in (detalles_resp.data or detalles_rows):
+                detalle = DetallePedido.from_dict(detalle_data)
+                prod = productos.get(detalle.id_producto)
+                if prod:
+                    detalle.nombre_producto = prod.nombre
+                pedido.detalles.append(detalle)
+            return pedido
         except Exception as e:
             print(f"Error al crear pedido: {e}")
             return None
     
-    def actualizar_estado(self, id_pedido, nuevo_estado):
+    def _sede_por_defecto(self):
+        """
+        Retorna el ID de la sede por defecto (primera activa), cacheado (método privado)
+        
+        Returns:
+            ID de la sede o None si no hay sedes activas
+        """
+        def _cargar():
+            sedes_resp = SedeDAO().listar(solo_activos=True)
+            id_sede = sedes_resp.data[0].get('id_sede') if getattr(sedes_resp, 'data', None) else None
+            if id_sede is None:
+                # Un error del loader no se guarda: la próxima llamada vuelve a consultar
+                raise LookupError('No hay sedes activas')
+            return id_sede
+        try:
+            return get_or_cache(CLAVE_SEDE_POR_DEFECTO, ttl=write_through_ttl(1800, 300), loader=_cargar)
+        except Exception:
+            return None
+    
+    def actualizar_estado(self, id_pedido, nuevo_estado, estado_anterior=None):
         """
         Actualiza el estado de un pedido
         
         Args:
             id_pedido: ID del pedido a actualizar
             nuevo_estado: Nuevo estado del pedido (pendiente, en_proceso, completado, cancelado)
+            estado_anterior: si se indica, solo actualiza si el pedido sigue en ese estado
             
         Returns:
-            Objeto Pedido actualizado o None si hay error
+            Objeto Pedido actualizado o None si hay error o el estado ya no era estado_anterior
         """
         try:
-            response = self.supabase.table(self.tabla_pedido)\
+            query = self.supabase.table(self.tabla_pedido)\
                 .update({'estado': nuevo_estado})\
-                .eq('id_pedido', id_pedido)\
-                .execute()
+                .eq('id_pedido', id_pedido)
+            if estado_anterior is not None:
+                query = query.eq('estado', estado_anterior)
+            response = query.execute()
+            identity_map.forget('pedido', id_pedido)
             
             if response.data:
                 return Pedido.from_dict(response.data[0])
@@ -304,6 +414,7 @@ class PedidoDAO:
                 .update(datos_actualizacion)\
                 .eq('id_pedido', id_pedido)\
                 .execute()
+            identity_map.forget('pedido', id_pedido)
             
             if response.data:
                 return Pedido.from_dict(response.data[0])
@@ -333,13 +444,163 @@ class PedidoDAO:
             
             if response.data:
                 for detalle_data in response.data:
-                    detalle = DetallePedido.from_dict(detalle_data)
-                    if 'producto' in detalle_data and detalle_data['producto']:
-                        detalle.nombre_producto = detalle_data['producto'].get('nombre')
-                    pedido.detalles.append(detalle)
+                    pedido.detalles.append(self._detalle_desde_fila(detalle_data))
             
             return pedido
             
         except Exception as e:
             print(f"Error al cargar detalles del pedido: {e}")
-            return pedido
\ No newline at end of file
+            return pedido
+    
+    def _construir_pedidos(self, filas, cargar_detalles=True):
+        """
+        Convierte filas de pedido en objetos Pedido (método privado)
+        
+        Args:
+            filas: Lista de diccionarios devueltos por Supabase
+            cargar_detalles: Si es True carga los detalles de todos en lote
+            
+        Returns:
+            Lista de objetos Pedido
+        """
+        pedidos = [Pedido.from_dict(fila) for fila in (filas or [])]
+        if cargar_detalles:
+            self._cargar_detalles_lote(pedidos)
+        return pedidos
+    
+    def _cargar_detalles_lote(self, pedidos):
+        """
+        Carga los detalles de varios pedidos con una consulta in_() por bloque
+        de IDs en lugar de una consulta por pedido (método privado)
+        
+        Args:
+            pedidos: Lista de objetos Pedido
+            
+        Returns:
+            La misma lista con los detalles de cada pedido cargados
+        """
+        ids = [p.id_pedido for p in pedidos if p.id_pedido is not None]
+        if not ids:
+            return pedidos
+        
+        detalles_por_pedido = {}
+        try:
+            for inicio in range(0, len(ids), LOTE_IDS_DETALLE):
+                bloque = ids[inicio:inicio + LOTE_IDS_DETALLE]
+                desde = 0
+                while True:
+                    response = self.supabase.table(self.tabla_detalle)\
+                        .select("*, producto(nombre)")\
+                        .in_('id_pedido', bloque)\
+                        .order('id_detalle')\
+                        .range(desde, desde + PAGINA_DETALLES - 1)\
+                        .execute()
+                    filas = response.data or []
+                    for detalle_data in filas:
+                        detalle = self._detalle_desde_fila(detalle_data)
+                        detalles_por_pedido.setdefault(detalle.id_pedido, []).append(detalle)
+                    if len(filas) < PAGINA_DETALLES:
+                        break
+                    desde += PAGINA_DETALLES
+        except Exception as e:
+            print(f"Error al cargar detalles de pedidos en lote: {e}")
+        
+        for pedido in pedidos:
+            pedido.detalles.extend(detalles_por_pedido.get(pedido.id_pedido, []))
+        return pedidos
+    
+    @staticmethod
+    def _detalle_desde_fila(detalle_data):
+        """
+        Construye un DetallePedido desde una fila con join a producto (método privado)
+        
+        Args:
+            detalle_data: diccionario con los datos del detalle
+            
+        Returns:
+            Objeto DetallePedido
+        """
+        detalle = DetallePedido.from_dict(detalle_data)
+        if 'producto' in detalle_data and detalle_data['producto']:
+            detalle.nombre_producto = detalle_data['producto'].get('nombre')
+        return detalle
+
+
+class ConsultaPedidos:
+    """
+    Consulta encadenable sobre pedidos: cada método agrega un filtro que se aplica en
+    Supabase y ejecutar() trae solo la página pedida (más recientes primero), cargando
+    los detalles únicamente de esos pedidos
+    """
+    
+    def __init__(self, dao):
+        self._dao = dao
+        self._filtros = []
+        self._cursor = None
+        self._tamanio = None
+        self._cargar_detalles = True
+    
+    def _filtrar(self, metodo, columna, valor):
+        if valor not in (None, ''):
+            self._filtros.append((metodo, columna, valor))
+        return self
+    
+    def del_cliente(self, id_cliente):
+        return self._filtrar('eq', 'id_cliente', id_cliente)
+    
+    def en_sede(self, id_sede):
+        return self._filtrar('eq', 'id_sede', id_sede)
+    
+    def con_estado(self, estado):
+        return self._filtrar('eq', 'estado', estado)
+    
+    def desde(self, fecha_inicio):
+        """Pedidos desde el inicio del día fecha_inicio (YYYY-MM-DD), inclusive"""
+        if fecha_inicio:
+            self._filtrar('gte', 'fecha', date.fromisoformat(str(fecha_inicio)[:10]).isoformat())
+        return self
+    
+    def hasta(self, fecha_fin):
+        """Pedidos hasta el final del día fecha_fin (YYYY-MM-DD), inclusive"""
+        if fecha_fin:
+            siguiente_dia = date.fromisoformat(str(fecha_fin)[:10]) + timedelta(days=1)
+            self._filtrar('lt', 'fecha', siguiente_dia.isoformat())
+        return self
+    
+    def pagina(self, cursor=None, tamanio=TAMANIO_PAGINA):
+        """Limita el resultado a una página; sin pagina() se traen todos los pedidos que cumplan"""
+        self._cursor = cursor
+        self._tamanio = tamanio
+        return self
+    
+    def sin_detalles(self):
+        self._cargar_detalles = False
+        return self
+    
+    def _query(self):
+        query = self._dao.supabase.table(self._dao.tabla_pedido).select("*")
+        for metodo, columna, valor in self._filtros:
+            query = getattr(query, metodo)(columna, valor)
+        return query
+    
+    def ejecutar(self):
+        """
+        Ejecuta la consulta
+        
+        Returns:
+            (lista de objetos Pedido, siguiente_cursor o None si es la última página)
+            
+        Raises:
+            CursorInvalido si el cursor no es válido; los errores de Supabase se propagan
+        """
+        if self._tamanio is not None:
+            filas, siguiente = paginar(self._query(), self._cursor, self._tamanio, 'id_pedido')
+        else:
+            # Sin página se recorre todo por bloques (Supabase corta cada respuesta en 1000 filas)
+            filas, siguiente = [], self._cursor
+            while True:
+                bloque, siguiente = paginar(self._query(), siguiente, TAMANIO_MAXIMO, 'id_pedido')
+                filas.extend(bloque)
+                if siguiente is None:
+                    break
+        return self._dao._construir_pedidos(filas, self._cargar_detalles), siguiente
@@ -3,6 +3,11 @@
 
 from config import get_supabase_client, TABLA_PRODUCTO
 from entidades.producto import Producto
+from utils.catalog_cache import notify_change
+from utils import identity_map
+
+# Filas por consulta al recorrer el catálogo completo (límite por respuesta en Supabase)
+PAGINA_PRODUCTOS = 1000
 
 
 class ProductoDAO:
@@ -42,6 +47,7 @@ class ProductoDAO:
                 .execute()
             
             if response.data:
+                notify_change('producto', id_producto=response.data[0].get('id_producto'))
                 return Producto.from_dict(response.data[0])
             
             return None
@@ -50,6 +56,7 @@ class ProductoDAO:
             print(f"Error al insertar producto: {e}")
             return None
     
+    @identity_map.por_id('producto')
     def obtener_por_id(self, id_producto):
         """
         Obtiene un producto por su ID
@@ -80,6 +87,35 @@ class ProductoDAO:
             print(f"Error al obtener producto: {e}")
             return None
     
+    def obtener_por_ids(self, ids_producto):
+        """
+        Obtiene varios productos en una sola consulta in_()
+        
+        Args:
+            ids_producto: Iterable con los IDs de producto
+            
+        Returns:
+            dict {id_producto: Producto} (vacío si hay error)
+        """
+        ids = sorted({int(i) for i in ids_producto if i is not None})
+        if not ids:
+            return {}
+        try:
+            response = self.supabase.table(self.tabla)\
+                .select("*")\
+                .in_('id_producto', ids)\
+                .execute()
+            
+            productos = {}
+            for producto_data in (response.data or []):
+                producto = Producto.from_dict(producto_data)
+                productos[producto.id_producto] = producto
+            return productos
+            
+        except Exception as e:
+            print(f"Error al obtener productos por IDs: {e}")
+            return {}
+    
     def obtener_por_codigo(self, codigo):
         """
         Obtiene un producto por su código
@@ -166,6 +202,29 @@ class ProductoDAO:
             print(f"Error al listar productos activos: {e}")
             return []
     
+    def iterar_activos(self, columnas='id_producto,codigo,nombre,precio,stock,activo', pagina=PAGINA_PRODUCTOS):
+        """
+        Recorre los productos activos por páginas con keyset sobre id_producto
+        
+        Args:
+            columnas: columnas a leer (debe incluir id_producto)
+            pagina: filas por consulta
+            
+        Yields:
+            dict con las columnas de cada producto, en orden de id_producto
+        """
+        ultimo = None
+        while True:
+            query = self.supabase.table(self.tabla).select(columnas).eq('activo', True)
+            if ultimo is not None:
+                query = query.gt('id_producto', ultimo)
+            filas = query.order('id_producto').limit(pagina).execute().data or []
+            for fila in filas:
+                yield fila
+            if len(filas) < pagina:
+                break
+            ultimo = filas[-1]['id_producto']
+    
     def buscar_por_nombre(self, termino):
         """
         Busca productos por nombre (búsqueda parcial)
@@ -221,8 +280,10 @@ class ProductoDAO:
                 .update(datos_actualizacion)\
                 .eq('id_producto', id_producto)\
                 .execute()
+            identity_map.forget('producto', id_producto)
             
             if response.data:
+                notify_change('producto', id_producto=id_producto)
                 return Producto.from_dict(response.data[0])
             
             return None
@@ -247,8 +308,10 @@ class ProductoDAO:
                 .update({'activo': activo})\
                 .eq('id_producto', id_producto)\
                 .execute()
+            identity_map.forget('producto', id_producto)
             
             if response.data:
+                notify_change('producto', id_producto=id_producto)
                 return Producto.from_dict(response.data[0])
             
             return None
@@ -287,8 +350,10 @@ class ProductoDAO:
                 .update({'stock': nuevo_stock})\
                 .eq('id_producto', id_producto)\
                 .execute()
+            identity_map.forget('producto', id_producto)
             
             if response.data:
+                notify_change('producto', id_producto=id_producto)
                 return Producto.from_dict(response.data[0])
             
             return None
@@ -3,6 +3,10 @@
 
 from config import get_supabase_client, TABLA_PRODUCTO_INSUMO
 from entidades.productoInsumo import ProductoInsumo
+from utils.catalog_cache import notify_change
+
+# Filas por página al leer recetas de varios productos (límite por respuesta en Supabase)
+PAGINA_RECETAS = 1000
 
 
 class ProductoInsumoDAO:
@@ -28,6 +32,7 @@ class ProductoInsumoDAO:
                 data.pop('id_producto_insumo', None)
             resp = self.supabase.table(self.tabla).insert(data).execute()
             if resp.data:
+                notify_change('receta', id_producto=resp.data[0].get('id_producto'))
                 return ProductoInsumo.from_dict(resp.data[0])
             return None
         except Exception as e:
@@ -53,6 +58,37 @@ class ProductoInsumoDAO:
             print(f"Error listar insumos de producto: {e}")
             return []
 
+    def listar_por_productos(self, ids_producto):
+        """Lista las recetas de varios productos en una consulta (paginada si supera PAGINA_RECETAS).
+
+        Args:
+            ids_producto: iterable de IDs de producto
+        Returns:
+            list[ProductoInsumo]
+        Raises:
+            Exception de Supabase: no se traduce a [] porque significaría "sin receta"
+        """
+        ids = sorted({int(i) for i in ids_producto})
+        if not ids:
+            return []
+        return self._listar_paginado(lambda q: q.in_('id_producto', ids))
+
+    def listar_todos(self):
+        """Lista todas las filas de producto_insumo (paginado). Lanza la excepción si falla."""
+        return self._listar_paginado(lambda q: q)
+
+    def _listar_paginado(self, filtrar):
+        filas, desde = [], 0
+        while True:
+            query = self.supabase.table(self.tabla).select('id_producto_insumo,id_producto,id_insumo,cantidad_necesaria')
+            resp = filtrar(query).order('id_producto_insumo').range(desde, desde + PAGINA_RECETAS - 1).execute()
+            pagina = resp.data or []
+            filas.extend(pagina)
+            if len(pagina) < PAGINA_RECETAS:
+                break
+            desde += PAGINA_RECETAS
+        return [ProductoInsumo.from_dict(r) for r in filas]
+
     def listar_por_insumo(self, id_insumo):
         """Lista todos los productos que utilizan un insumo."""
         try:
@@ -71,6 +107,8 @@ class ProductoInsumoDAO:
                 update_data['cantidad_necesaria'] = float(update_data['cantidad_necesaria'])
             resp = self.supabase.table(self.tabla).update(update_data).eq('id_producto_insumo', id_producto_insumo).execute()
             if resp.data:
+                # Si cambió de producto también queda desactualizada la receta anterior
+                notify_change('receta', id_producto=None)
                 return ProductoInsumo.from_dict(resp.data[0])
             return None
         except Exception as e:
@@ -80,6 +118,8 @@ class ProductoInsumoDAO:
     def eliminar(self, id_producto_insumo):
         try:
             resp = self.supabase.table(self.tabla).delete().eq('id_producto_insumo', id_producto_insumo).execute()
+            for fila in resp.data or []:
+                notify_change('receta', id_producto=fila.get('id_producto'))
             return bool(resp.data)
         except Exception as e:
             print(f"Error eliminar producto_insumo: {e}")
@@ -123,9 +163,12 @@ class ProductoInsumoDAO:
                     'cantidad_necesaria': cant_f
                 })
             if not bulk:
+                notify_change('receta', id_producto=id_producto, filas=[])
                 return []
             resp = self.supabase.table(self.tabla).insert(bulk).execute()
-            return [ProductoInsumo.from_dict(r) for r in resp.data] if resp.data else []
+            nuevas = [ProductoInsumo.from_dict(r) for r in resp.data] if resp.data else []
+            notify_change('receta', id_producto=id_producto, filas=nuevas)
+            return nuevas
         except Exception as e:
             print(f"Error reemplazar insumos del producto: {e}")
             return []
@@ -3,6 +3,7 @@
 
 from config import get_supabase_client, TABLA_RECLAMO
 from entidades.reclamo import Reclamo
+from utils.paginacion import paginar, TAMANIO_PAGINA
 
 class ReclamoDAO:
     """
@@ -160,6 +161,21 @@ class ReclamoDAO:
             print(f"Error al listar todos los reclamos: {e}")
             return []
     
+    def listar_pagina(self, cursor=None, tamanio=TAMANIO_PAGINA):
+        """
+        Lista una página de reclamos (más recientes primero) con keyset sobre (fecha, id_reclamo)
+        
+        Args:
+            cursor: cursor opaco devuelto por la página anterior (None para la primera)
+            tamanio: reclamos por página
+            
+        Returns:
+            (lista de objetos Reclamo, siguiente_cursor o None si es la última página)
+        """
+        query = self.supabase.table(self.tabla).select("*")
+        filas, siguiente = paginar(query, cursor, tamanio, 'id_reclamo')
+        return [Reclamo.from_dict(r) for r in filas], siguiente
+    
     def actualizar(self, id_reclamo, datos):
         """
         Actualiza un reclamo existente
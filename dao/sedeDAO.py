@@ -3,6 +3,8 @@
 
 from config import get_supabase_client
 from entidades.sede import Sede
+from utils.catalog_cache import notify_change
+from utils import identity_map
 
 class SedeDAO:
     def __init__(self):
@@ -18,8 +20,10 @@ class SedeDAO:
         }
         # id_sede se autogenera en la BD
         resp = self.supabase.table(self.tabla).insert(data).execute()
+        self._notificar_cambio(resp)
         return resp
 
+    @identity_map.por_id("sede")
     def obtener(self, id_sede: int):
         return self.supabase.table(self.tabla).select("*").eq("id_sede", id_sede).execute()
 
@@ -34,11 +38,26 @@ class SedeDAO:
         return self.supabase.table(self.tabla).select("*").eq("nombre", nombre).execute()
 
     def modificar(self, id_sede: int, cambios: dict):
-        return self.supabase.table(self.tabla).update(cambios).eq("id_sede", id_sede).execute()
+        resp = self.supabase.table(self.tabla).update(cambios).eq("id_sede", id_sede).execute()
+        identity_map.forget("sede", id_sede)
+        self._notificar_cambio(resp)
+        return resp
 
     def desactivar(self, id_sede: int):
-        return self.supabase.table(self.tabla).update({"activo": False}).eq("id_sede", id_sede).execute()
+        resp = self.supabase.table(self.tabla).update({"activo": False}).eq("id_sede", id_sede).execute()
+        identity_map.forget("sede", id_sede)
+        self._notificar_cambio(resp)
+        return resp
     
     def cambiar_estado(self, id_sede: int, activo: bool):
         """Cambia el estado activo/inactivo de una sede"""
-        return self.supabase.table(self.tabla).update({"activo": activo}).eq("id_sede", id_sede).execute()
+        resp = self.supabase.table(self.tabla).update({"activo": activo}).eq("id_sede", id_sede).execute()
+        identity_map.forget("sede", id_sede)
+        self._notificar_cambio(resp)
+        return resp
+
+    @staticmethod
+    def _notificar_cambio(resp):
+        """Invalida los catálogos de sedes cacheados si la escritura afectó filas."""
+        if getattr(resp, "data", None):
+            notify_change("sede", id_sede=resp.data[0].get("id_sede"))
@@ -3,6 +3,7 @@
 
 from config import get_supabase_client
 from entidades.turno import Turno
+from utils.paginacion import paginar, TAMANIO_PAGINA
 
 class TurnoDAO:
     def __init__(self):
@@ -43,6 +44,49 @@ class TurnoDAO:
         resp = query.execute()
         return resp
     
+    def listar_pagina(self, cursor=None, tamanio=TAMANIO_PAGINA, id_empleado=None):
+        """
+        Lista una página de turnos con información del empleado, keyset sobre (fecha, id_turno)
+        
+        Args:
+            cursor: cursor opaco devuelto por la página anterior (None para la primera)
+            tamanio: turnos por página
+            id_empleado: solo los turnos de ese empleado (opcional)
+            
+        Returns:
+            (lista de dicts, siguiente_cursor o None si es la última página)
+        """
+        query = self.supabase.table("turno").select(
+            "*, empleado(cargo, usuario(nombre, email), sede(nombre))"
+        )
+        if id_empleado is not None:
+            query = query.eq("id_empleado", id_empleado)
+        return paginar(query, cursor, tamanio, 'id_turno')
+    
+    def listar_pagina_dia(self, fecha, cursor=None, tamanio=TAMANIO_PAGINA, id_sede=None):
+        """
+        Lista una página de los turnos de un día por hora de inicio, keyset sobre (hora_inicio, id_turno)
+        
+        Args:
+            fecha: Fecha a consultar (formato YYYY-MM-DD)
+            cursor: cursor opaco devuelto por la página anterior (None para la primera)
+            tamanio: turnos por página
+            id_sede: solo los turnos de empleados de esa sede (opcional)
+            
+        Returns:
+            (lista de dicts, siguiente_cursor o None si es la última página)
+        """
+        if id_sede is None:
+            query = self.supabase.table("turno").select(
+                "*, empleado(cargo, usuario(nombre, email), sede(nombre))"
+            )
+        else:
+            query = self.supabase.table("turno").select(
+                "*, empleado!inner(id_sede, cargo, usuario(nombre, email))"
+            ).eq("empleado.id_sede", id_sede)
+        query = query.eq("fecha", fecha)
+        return paginar(query, cursor, tamanio, 'id_turno', columna_fecha='hora_inicio', descendente=False)
+    
     def listar_por_empleado(self, id_empleado, limite=None):
         """
         Lista turnos de un empleado específico
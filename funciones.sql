@@ -0,0 +1,364 @@
+-- Funciones (RPC) e índices de apoyo; ejecutar después de modelo.sql.
+-- Los DAO las invocan con supabase.rpc(...) y, si no existen, recurren a
+-- consultas paginadas equivalentes.
+
+-- Índices para filtrar ventas por fecha/sede y agrupar por producto
+CREATE INDEX IF NOT EXISTS idx_pedido_fecha ON "pedido" ("fecha");
+CREATE INDEX IF NOT EXISTS idx_pedido_sede_fecha ON "pedido" ("id_sede", "fecha");
+CREATE INDEX IF NOT EXISTS idx_detalle_pedido_pedido ON "detalle_pedido" ("id_pedido");
+CREATE INDEX IF NOT EXISTS idx_detalle_pedido_producto ON "detalle_pedido" ("id_producto");
+
+-- Índices para la paginación por cursor de los listados (utils/paginacion.py: fecha desc, id desc,
+-- con el filtro de cada listado adelante)
+CREATE INDEX IF NOT EXISTS idx_pedido_fecha_id ON "pedido" ("fecha" DESC, "id_pedido" DESC);
+CREATE INDEX IF NOT EXISTS idx_movimiento_fecha_id ON "movimiento_inventario" ("fecha" DESC, "id_movimiento" DESC);
+CREATE INDEX IF NOT EXISTS idx_reclamo_fecha_id ON "reclamo" ("fecha" DESC, "id_reclamo" DESC);
+CREATE INDEX IF NOT EXISTS idx_turno_fecha_id ON "turno" ("fecha" DESC, "id_turno" DESC);
+CREATE INDEX IF NOT EXISTS idx_asistencia_fecha_id ON "asistencia" ("fecha" DESC, "id_asistencia" DESC);
+CREATE INDEX IF NOT EXISTS idx_compra_fecha_id ON "compra" ("fecha" DESC, "id_compra" DESC);
+CREATE INDEX IF NOT EXISTS idx_compra_proveedor_fecha_id ON "compra" ("id_proveedor", "fecha" DESC, "id_compra" DESC);
+CREATE INDEX IF NOT EXISTS idx_compra_estado_fecha_id ON "compra" ("estado", "fecha" DESC, "id_compra" DESC);
+CREATE INDEX IF NOT EXISTS idx_detalle_compra_insumo_id ON "detalle_compra" ("id_insumo", "id_detalle_compra" DESC);
+CREATE INDEX IF NOT EXISTS idx_notificacion_fecha_id ON "notificacion" ("fecha" DESC, "id_notificacion" DESC);
+CREATE INDEX IF NOT EXISTS idx_notificacion_cliente_fecha_id ON "notificacion" ("id_cliente", "fecha" DESC, "id_notificacion" DESC);
+CREATE INDEX IF NOT EXISTS idx_turno_empleado_fecha_id ON "turno" ("id_empleado", "fecha" DESC, "id_turno" DESC);
+-- Listados de un día: hora ascendente
+CREATE INDEX IF NOT EXISTS idx_turno_dia_hora_id ON "turno" ("fecha", "hora_inicio", "id_turno");
+CREATE INDEX IF NOT EXISTS idx_asistencia_empleado_fecha_id ON "asistencia" ("id_empleado", "fecha" DESC, "id_asistencia" DESC);
+CREATE INDEX IF NOT EXISTS idx_asistencia_estado_fecha_id ON "asistencia" ("estado", "fecha" DESC, "id_asistencia" DESC);
+CREATE INDEX IF NOT EXISTS idx_asistencia_dia_hora_id ON "asistencia" ("fecha", "hora_entrada", "id_asistencia");
+CREATE INDEX IF NOT EXISTS idx_empleado_sede_id ON "empleado" ("id_sede", "id_empleado" DESC);
+
+-- Top de productos vendidos (DetallePedidoDAO.top_productos)
+-- p_desde inclusivo, p_hasta exclusivo; NULL = sin límite. p_id_sede NULL = todas las sedes.
+-- p_max_pedido: solo pedidos con id_pedido <= p_max_pedido (reconciliación de KPIs); NULL = todos.
+DROP FUNCTION IF EXISTS top_productos(timestamp, timestamp, int, int);
+CREATE OR REPLACE FUNCTION top_productos(
+  p_desde timestamp DEFAULT NULL,
+  p_hasta timestamp DEFAULT NULL,
+  p_id_sede int DEFAULT NULL,
+  p_limite int DEFAULT 20,
+  p_max_pedido int DEFAULT NULL
+)
+RETURNS TABLE (
+  id_producto int,
+  nombre varchar,
+  cantidad_total bigint,
+  subtotal_total numeric
+)
+LANGUAGE sql STABLE
+AS $$
+  SELECT d.id_producto,
+         pr.nombre,
+         SUM(d.cantidad)::bigint AS cantidad_total,
+         SUM(d.subtotal) AS subtotal_total
+  FROM "detalle_pedido" d
+  JOIN "pedido" p ON p.id_pedido = d.id_pedido
+  LEFT JOIN "producto" pr ON pr.id_producto = d.id_producto
+  WHERE (p_desde IS NULL OR p.fecha >= p_desde)
+    AND (p_hasta IS NULL OR p.fecha < p_hasta)
+    AND (p_id_sede IS NULL OR p.id_sede = p_id_sede)
+    AND (p_max_pedido IS NULL OR d.id_pedido <= p_max_pedido)
+  GROUP BY d.id_producto, pr.nombre
+  ORDER BY cantidad_total DESC, subtotal_total DESC
+  LIMIT COALESCE(p_limite, 20);
+$$;
+
+-- Últimas p_ventana compras de cada insumo de p_ids (RecetaManager: costo unitario por promedio
+-- ponderado). Usa idx_detalle_compra_insumo_id, así que lee solo la ventana de cada insumo y no
+-- todo detalle_compra. Filas de la más vieja a la más reciente dentro de cada insumo.
+CREATE OR REPLACE FUNCTION compras_recientes_por_insumo(p_ids int[], p_ventana int DEFAULT 50)
+RETURNS TABLE (
+  id_insumo int,
+  id_detalle_compra int,
+  cantidad numeric,
+  subtotal numeric
+)
+LANGUAGE sql STABLE
+AS $$
+  SELECT i.id_insumo, d.id_detalle_compra, d.cantidad, d.subtotal
+  FROM unnest(p_ids) AS i(id_insumo)
+  CROSS JOIN LATERAL (
+    SELECT dc.id_detalle_compra, dc.cantidad, dc.subtotal
+    FROM "detalle_compra" dc
+    WHERE dc.id_insumo = i.id_insumo
+    ORDER BY dc.id_detalle_compra DESC
+    LIMIT COALESCE(p_ventana, 50)
+  ) d
+  ORDER BY i.id_insumo, d.id_detalle_compra;
+$$;
+
+-- Snapshot de KPIs del panel admin (KpiManager). Una fila por (métrica, dimensión):
+--   pedidos_estado            dimension = estado
+--   ingresos_dia_sede         dimension = 'AAAA-MM-DD|id_sede', fecha = día
+--   ventas_producto_cantidad  dimension = id_producto, datos = {"nombre": ...}
+--   ventas_producto_subtotal  dimension = id_producto
+--   insumo_critico            dimension = 'id_insumo|id_sede', datos = detalle de la alerta
+--   meta                      dimension = 'reconciliado' (actualizado = última reconciliación)
+CREATE TABLE IF NOT EXISTS "kpi_contador" (
+  "metrica" varchar(50) NOT NULL,
+  "dimension" varchar(100) NOT NULL,
+  "fecha" date,
+  "valor" numeric(14,2) NOT NULL DEFAULT 0,
+  "datos" jsonb,
+  "actualizado" timestamp DEFAULT (now()),
+  PRIMARY KEY ("metrica", "dimension")
+);
+CREATE INDEX IF NOT EXISTS idx_kpi_contador_fecha ON "kpi_contador" ("fecha");
+
+-- Deltas aplicados por kpi_incrementar desde la última reconciliación. kpi_reemplazar los vuelve
+-- a aplicar sobre el snapshot recalculado, así no se pierden los eventos que llegan mientras
+-- la reconciliación lee las tablas base. id_pedido solo se informa al crear un pedido.
+CREATE TABLE IF NOT EXISTS "kpi_delta" (
+  "id" bigserial PRIMARY KEY,
+  "metrica" varchar(50) NOT NULL,
+  "dimension" varchar(100) NOT NULL,
+  "fecha" date,
+  "valor" numeric(14,2) NOT NULL,
+  "datos" jsonb,
+  "id_pedido" int,
+  "creado" timestamp DEFAULT (now())
+);
+
+-- Suma deltas a los contadores (crea la fila si no existe) y los anota en kpi_delta.
+-- p_filas: [{"metrica", "dimension", "fecha", "valor", "datos"}, ...]
+DROP FUNCTION IF EXISTS kpi_incrementar(jsonb);
+CREATE OR REPLACE FUNCTION kpi_incrementar(p_filas jsonb, p_id_pedido int DEFAULT NULL)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO "kpi_delta" (metrica, dimension, fecha, valor, datos, id_pedido)
+  SELECT f->>'metrica', f->>'dimension', (f->>'fecha')::date, (f->>'valor')::numeric, f->'datos', p_id_pedido
+  FROM jsonb_array_elements(p_filas) f;
+
+  -- Espera aquí si kpi_reemplazar tiene el bloqueo: se aplica sobre el snapshot nuevo
+  INSERT INTO "kpi_contador" (metrica, dimension, fecha, valor, datos, actualizado)
+  SELECT f->>'metrica', f->>'dimension', (f->>'fecha')::date,
+         SUM((f->>'valor')::numeric), (array_agg(f->'datos'))[1], now()
+  FROM jsonb_array_elements(p_filas) f
+  GROUP BY f->>'metrica', f->>'dimension', (f->>'fecha')::date
+  ON CONFLICT (metrica, dimension) DO UPDATE
+    SET valor = "kpi_contador".valor + EXCLUDED.valor,
+        datos = COALESCE(EXCLUDED.datos, "kpi_contador".datos),
+        actualizado = now();
+END;
+$$;
+
+-- Reemplaza el snapshot completo en una transacción (reconciliación periódica).
+-- p_desde_delta: último id de kpi_delta antes de empezar a leer las tablas base; los deltas
+--   posteriores se vuelven a aplicar, salvo las altas de pedidos con id <= p_max_pedido (ya
+--   leídas). Un cambio de estado simultáneo con la lectura puede quedar desfasado en 1 hasta
+--   la próxima reconciliación.
+-- Los insumos críticos se calculan aquí desde inventario, bajo el mismo bloqueo que usa
+-- kpi_insumo_critico, en lugar de venir en p_filas.
+DROP FUNCTION IF EXISTS kpi_reemplazar(jsonb);
+CREATE OR REPLACE FUNCTION kpi_reemplazar(p_filas jsonb, p_desde_delta bigint DEFAULT NULL, p_max_pedido int DEFAULT NULL)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- Bloquea kpi_incrementar y el trigger de inventario hasta el commit
+  LOCK TABLE "kpi_contador" IN EXCLUSIVE MODE;
+  DELETE FROM "kpi_contador" WHERE true;
+  INSERT INTO "kpi_contador" (metrica, dimension, fecha, valor, datos, actualizado)
+  SELECT f->>'metrica', f->>'dimension', (f->>'fecha')::date,
+         COALESCE((f->>'valor')::numeric, 0), f->'datos', now()
+  FROM jsonb_array_elements(p_filas) f;
+
+  INSERT INTO "kpi_contador" (metrica, dimension, valor, datos, actualizado)
+  SELECT 'insumo_critico', i.id_insumo || '|' || i.id_sede, i.cantidad, kpi_alerta_critica(i), now()
+  FROM "inventario" i
+  WHERE i.cantidad < 5;
+
+  IF p_desde_delta IS NOT NULL THEN
+    INSERT INTO "kpi_contador" (metrica, dimension, fecha, valor, datos, actualizado)
+    SELECT d.metrica, d.dimension, max(d.fecha), SUM(d.valor), (array_agg(d.datos))[1], now()
+    FROM "kpi_delta" d
+    WHERE d.id > p_desde_delta
+      AND (d.id_pedido IS NULL OR p_max_pedido IS NULL OR d.id_pedido > p_max_pedido)
+    GROUP BY d.metrica, d.dimension
+    ON CONFLICT (metrica, dimension) DO UPDATE
+      SET valor = "kpi_contador".valor + EXCLUDED.valor,
+          datos = COALESCE(EXCLUDED.datos, "kpi_contador".datos),
+          actualizado = now();
+    DELETE FROM "kpi_delta" WHERE id <= p_desde_delta;
+  END IF;
+END;
+$$;
+
+-- Detalle de la alerta de un insumo crítico (mismo formato que InventarioManager.verificarAlertasReposicion)
+CREATE OR REPLACE FUNCTION kpi_alerta_critica(i "inventario")
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT jsonb_build_object(
+    'id_inventario', i.id_inventario,
+    'id_insumo', i.id_insumo,
+    'id_sede', i.id_sede,
+    'cantidad_actual', i.cantidad,
+    'nivel', 'critico',
+    'mensaje', 'Stock bajo: ' || i.cantidad || ' unidades',
+    'nombre_insumo', (SELECT nombre FROM "insumo" WHERE id_insumo = i.id_insumo)
+  );
+$$;
+
+-- Mantiene los insumos críticos del snapshot en la misma transacción que cada cambio de stock
+-- (ajustar_stock, ajustar_stock_lote o escrituras directas), sin llamadas extra desde la app.
+CREATE OR REPLACE FUNCTION kpi_insumo_critico()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP <> 'INSERT' THEN
+    DELETE FROM "kpi_contador"
+     WHERE metrica = 'insumo_critico' AND dimension = OLD.id_insumo || '|' || OLD.id_sede;
+  END IF;
+  IF TG_OP <> 'DELETE' AND NEW.cantidad < 5 THEN
+    INSERT INTO "kpi_contador" (metrica, dimension, valor, datos, actualizado)
+    VALUES ('insumo_critico', NEW.id_insumo || '|' || NEW.id_sede, NEW.cantidad, kpi_alerta_critica(NEW), now())
+    ON CONFLICT (metrica, dimension) DO UPDATE
+      SET valor = EXCLUDED.valor, datos = EXCLUDED.datos, actualizado = now();
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_kpi_insumo_critico ON "inventario";
+CREATE TRIGGER trg_kpi_insumo_critico
+AFTER INSERT OR UPDATE OF cantidad, id_insumo, id_sede OR DELETE ON "inventario"
+FOR EACH ROW EXECUTE FUNCTION kpi_insumo_critico();
+
+-- Ajuste de stock y registro del movimiento en una sola llamada (InventarioDAO.ajustar_y_registrar).
+-- El UPDATE aplica el delta con la condición de no quedar en negativo, así dos salidas
+-- simultáneas no pueden pisarse. Con p_crear y delta positivo crea la fila si no existe.
+-- Devuelve {"estado": "ok"|"insuficiente"|"no_existe", "inventario", "movimiento", "disponible"}.
+CREATE OR REPLACE FUNCTION ajustar_stock(
+  p_id_insumo int,
+  p_id_sede int,
+  p_delta numeric,
+  p_tipo varchar,
+  p_motivo varchar,
+  p_id_usuario int DEFAULT NULL,
+  p_crear boolean DEFAULT false
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_inv "inventario";
+  v_mov "movimiento_inventario";
+  v_disponible numeric;
+BEGIN
+  UPDATE "inventario"
+     SET cantidad = cantidad + p_delta, updated_at = now()
+   WHERE id_insumo = p_id_insumo AND id_sede = p_id_sede AND cantidad + p_delta >= 0
+  RETURNING * INTO v_inv;
+
+  IF NOT FOUND THEN
+    SELECT cantidad INTO v_disponible FROM "inventario"
+     WHERE id_insumo = p_id_insumo AND id_sede = p_id_sede;
+    IF FOUND THEN
+      RETURN jsonb_build_object('estado', 'insuficiente', 'disponible', v_disponible);
+    END IF;
+    IF NOT p_crear OR p_delta < 0 THEN
+      RETURN jsonb_build_object('estado', 'no_existe', 'disponible', 0);
+    END IF;
+    INSERT INTO "inventario" (id_insumo, id_sede, cantidad)
+    VALUES (p_id_insumo, p_id_sede, p_delta)
+    RETURNING * INTO v_inv;
+  END IF;
+
+  INSERT INTO "movimiento_inventario" (id_inventario, tipo, cantidad, motivo, id_usuario)
+  VALUES (v_inv.id_inventario, p_tipo, abs(p_delta), p_motivo, p_id_usuario)
+  RETURNING * INTO v_mov;
+
+  RETURN jsonb_build_object(
+    'estado', 'ok',
+    'inventario', to_jsonb(v_inv),
+    'movimiento', to_jsonb(v_mov),
+    'disponible', v_inv.cantidad
+  );
+END;
+$$;
+
+-- Movimientos de stock en lote (InventarioManager.registrarMovimientosLote): compras de varias
+-- líneas y transferencias entre sedes. Todo o nada en una transacción.
+-- p_movimientos: [{"id_insumo", "id_sede", "delta", "tipo", "motivo"}, ...]; delta negativo = salida.
+-- Los deltas se netean por (insumo, sede); si alguno dejaría stock negativo no se escribe nada y
+-- se devuelve {"estado": "insuficiente"|"no_existe", "id_insumo", "id_sede", "disponible"}.
+CREATE OR REPLACE FUNCTION ajustar_stock_lote(p_movimientos jsonb, p_id_usuario int DEFAULT NULL)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_falla record;
+  v_inventarios jsonb;
+  v_movimientos jsonb;
+BEGIN
+  -- Bloquea las filas afectadas en orden fijo para no cruzarse con otro lote
+  PERFORM 1
+     FROM "inventario" i
+     JOIN (SELECT DISTINCT (m->>'id_insumo')::int AS id_insumo, (m->>'id_sede')::int AS id_sede
+             FROM jsonb_array_elements(p_movimientos) m) k
+       ON i.id_insumo = k.id_insumo AND i.id_sede = k.id_sede
+    ORDER BY i.id_inventario
+      FOR UPDATE OF i;
+
+  SELECT g.id_insumo, g.id_sede, i.id_inventario, i.cantidad AS disponible INTO v_falla
+    FROM (SELECT (m->>'id_insumo')::int AS id_insumo, (m->>'id_sede')::int AS id_sede,
+                 SUM((m->>'delta')::numeric) AS delta
+            FROM jsonb_array_elements(p_movimientos) m
+           GROUP BY 1, 2) g
+    LEFT JOIN "inventario" i ON i.id_insumo = g.id_insumo AND i.id_sede = g.id_sede
+   WHERE (i.id_inventario IS NULL AND g.delta < 0)
+      OR (i.id_inventario IS NOT NULL AND i.cantidad + g.delta < 0)
+   LIMIT 1;
+  IF FOUND THEN
+    RETURN jsonb_build_object(
+      'estado', CASE WHEN v_falla.id_inventario IS NULL THEN 'no_existe' ELSE 'insuficiente' END,
+      'id_insumo', v_falla.id_insumo,
+      'id_sede', v_falla.id_sede,
+      'disponible', COALESCE(v_falla.disponible, 0)
+    );
+  END IF;
+
+  WITH g AS (
+    SELECT (m->>'id_insumo')::int AS id_insumo, (m->>'id_sede')::int AS id_sede,
+           SUM((m->>'delta')::numeric) AS delta
+      FROM jsonb_array_elements(p_movimientos) m
+     GROUP BY 1, 2
+  ), upd AS (
+    UPDATE "inventario" i
+       SET cantidad = i.cantidad + g.delta, updated_at = now()
+      FROM g
+     WHERE i.id_insumo = g.id_insumo AND i.id_sede = g.id_sede
+    RETURNING i.*
+  ), ins AS (
+    INSERT INTO "inventario" (id_insumo, id_sede, cantidad)
+    SELECT g.id_insumo, g.id_sede, g.delta
+      FROM g
+     WHERE NOT EXISTS (SELECT 1 FROM "inventario" i WHERE i.id_insumo = g.id_insumo AND i.id_sede = g.id_sede)
+    RETURNING *
+  )
+  SELECT jsonb_agg(to_jsonb(t)) INTO v_inventarios
+    FROM (SELECT * FROM upd UNION ALL SELECT * FROM ins) t;
+
+  WITH mov AS (
+    INSERT INTO "movimiento_inventario" (id_inventario, tipo, cantidad, motivo, id_usuario)
+    SELECT i.id_inventario, e.m->>'tipo', abs((e.m->>'delta')::numeric), e.m->>'motivo', p_id_usuario
+      FROM jsonb_array_elements(p_movimientos) WITH ORDINALITY AS e(m, n)
+      JOIN "inventario" i ON i.id_insumo = (e.m->>'id_insumo')::int AND i.id_sede = (e.m->>'id_sede')::int
+     ORDER BY e.n
+    RETURNING *
+  )
+  SELECT jsonb_agg(to_jsonb(mov)) INTO v_movimientos FROM mov;
+
+  RETURN jsonb_build_object(
+    'estado', 'ok',
+    'inventarios', COALESCE(v_inventarios, '[]'::jsonb),
+    'movimientos', COALESCE(v_movimientos, '[]'::jsonb)
+  );
+END;
+$$;
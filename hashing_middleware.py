@@ -0,0 +1,19 @@
+from django.http import HttpResponse, JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from utils.password_hashing import HashingSaturado, RETRY_AFTER
+
+
+class HashingSaturadoMiddleware(MiddlewareMixin):
+    """Convierte HashingSaturado (pool de bcrypt lleno) en 503 con Retry-After."""
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingSaturado):
+            return None
+        mensaje = 'Hay demasiados inicios de sesión en este momento. Intente de nuevo en unos segundos.'
+        if request.path.startswith('/api/'):
+            response = JsonResponse({'success': False, 'message': mensaje, 'data': None}, status=503)
+        else:
+            response = HttpResponse(mensaje, status=503, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(RETRY_AFTER)
+        return response
@@ -0,0 +1,17 @@
+from utils import identity_map
+
+class IdentityMapMiddleware:
+    """Activa un identity map por request para las lecturas por ID de los DAO.
+
+    Dentro del request, PedidoDAO/ProductoDAO/ClienteDAO/SedeDAO/InsumoDAO reutilizan el
+    registro ya leído en vez de volver a consultarlo; sus escrituras lo descartan.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tokens = identity_map.activate()
+        try:
+            return self.get_response(request)
+        finally:
+            identity_map.deactivate(tokens)
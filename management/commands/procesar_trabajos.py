@@ -0,0 +1,38 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+
+import manager.trabajoManager  # noqa: F401  (registra los handlers de cada tipo de trabajo)
+from utils import job_queue
+
+
+def _ejecutar_worker(hilos, intervalo, hasta_vaciar):
+    worker = job_queue.Worker(hilos=hilos, intervalo=intervalo)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    return worker.run(hasta_vaciar=hasta_vaciar)
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos en segundo plano encolados desde el panel admin (cola SQLite, sin broker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=2, help='Trabajos simultáneos por proceso')
+        parser.add_argument('--procesos', type=int, default=1, help='Procesos worker (cada uno con --hilos hilos)')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos entre consultas si la cola está vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Termina cuando no quedan trabajos pendientes')
+
+    def handle(self, *args, **options):
+        hilos, procesos = options['hilos'], max(1, options['procesos'])
+        intervalo, hasta_vaciar = options['intervalo'], options['una_vez']
+        self.stdout.write(f'Worker de trabajos: {procesos} proceso(s) x {hilos} hilo(s), cola {job_queue.DB_PATH}')
+        try:
+            if procesos == 1:
+                ejecutados = _ejecutar_worker(hilos, intervalo, hasta_vaciar)
+            else:
+                with multiprocessing.Pool(procesos) as pool:
+                    ejecutados = sum(pool.starmap(_ejecutar_worker, [(hilos, intervalo, hasta_vaciar)] * procesos))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Worker detenido'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'{ejecutados} trabajos ejecutados'))
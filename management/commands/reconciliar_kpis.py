@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from manager.kpiManager import KpiManager
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el snapshot de KPIs del panel admin desde pedidos, detalles e inventario'
+
+    def handle(self, *args, **options):
+        resultado = KpiManager().reconciliar()
+        if resultado.get('success'):
+            self.stdout.write(self.style.SUCCESS(resultado.get('message')))
+        else:
+            self.stdout.write(self.style.ERROR(resultado.get('message')))
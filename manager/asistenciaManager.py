@@ -253,6 +253,40 @@ class AsistenciaManager:
             logger.error(f"Error al listar todas las asistencias: {str(e)}")
             return {"success": False, "message": f"Error al listar asistencias: {str(e)}", "data": None}
 
+    def listarPagina(self, cursor=None, tamanio=100, id_empleado=None, estado=None):
+        """Lista una página de asistencias (filtros opcionales por empleado y estado) con paginación
+        por cursor (incluye 'next_cursor')"""
+        try:
+            estados_validos = ['pendiente', 'asistio', 'falta', 'tardanza', 'justificado']
+            if estado and estado not in estados_validos:
+                return {"success": False, "message": f"Estado inválido. Valores permitidos: {', '.join(estados_validos)}",
+                        "data": None, "next_cursor": None}
+            
+            asistencias, siguiente = self.asistenciaDAO.listar_pagina(cursor, tamanio, id_empleado=id_empleado,
+                                                                      estado=estado)
+            
+            if not asistencias:
+                return {"success": True, "message": "No hay asistencias registradas", "data": [], "next_cursor": None}
+            
+            return {"success": True, "message": "Asistencias encontradas", "data": asistencias, "next_cursor": siguiente}
+        except Exception as e:
+            logger.error(f"Error al listar todas las asistencias: {str(e)}")
+            return {"success": False, "message": f"Error al listar asistencias: {str(e)}", "data": None, "next_cursor": None}
+
+    def listarPaginaDia(self, fecha, cursor=None, tamanio=100):
+        """Lista una página de las asistencias de un día por hora de entrada (incluye 'next_cursor')"""
+        try:
+            asistencias, siguiente = self.asistenciaDAO.listar_pagina_dia(fecha, cursor, tamanio)
+            
+            if not asistencias:
+                return {"success": True, "message": f"No hay asistencias para {fecha}", "data": [], "next_cursor": None}
+            
+            return {"success": True, "message": f"Asistencias del {fecha} encontradas", "data": asistencias,
+                    "next_cursor": siguiente}
+        except Exception as e:
+            logger.error(f"Error al listar asistencias por fecha: {str(e)}")
+            return {"success": False, "message": f"Error al listar asistencias: {str(e)}", "data": None, "next_cursor": None}
+
     def obtenerReporteMensual(self, id_empleado, year, month):
         """Obtiene reporte mensual de asistencias de un empleado"""
         try:
@@ -1,4 +1,3 @@
-import bcrypt
 import re
 import logging
 from datetime import date
@@ -10,9 +9,16 @@ from dao.usuarioDAO import UsuarioDAO
 from dao.clienteDAO import ClienteDAO
 from dao.empleadoDAO import EmpleadoDAO
 from dao.administradorDAO import AdministradorDAO
+from utils.password_hashing import (
+    HashingSaturado, hash_password, needs_rehash, rehash_en_segundo_plano, verify_password,
+)
 
 logger = logging.getLogger(__name__)
 
+# Rechazos definitivos del login (el usuario existe en Supabase)
+MENSAJE_USUARIO_INACTIVO = "Usuario inactivo. Contacte al administrador"
+MENSAJE_CREDENCIALES_INVALIDAS = "Credenciales inválidas"
+
 
 class AuthManager:
     """
@@ -46,12 +52,12 @@ class AuthManager:
         return True, ""
     
     def _hash_password(self, password):
-        """Genera hash bcrypt de la contraseña"""
-        return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+        """Genera hash bcrypt de la contraseña (en el pool de hashing; puede lanzar HashingSaturado)"""
+        return hash_password(password)
     
     def _verificar_password(self, password, hashed):
-        """Verifica contraseña contra hash"""
-        return bcrypt.checkpw(password.encode(), hashed.encode())
+        """Verifica contraseña contra hash (en el pool de hashing; puede lanzar HashingSaturado)"""
+        return verify_password(password, hashed)
 
     # ------------------------------------------------------------------
     # LOGIN
@@ -66,6 +72,21 @@ class AuthManager:
             - message: str
             - data: dict con usuario y perfil según rol
         """
+        resultado = self.autenticar(email, password)
+        if resultado["success"]:
+            AuthManager.usuario_actual = resultado["data"]["usuario"]
+        return resultado
+
+    def autenticar(self, email, password):
+        """
+        Valida credenciales con una sola verificación bcrypt y carga el perfil del rol.
+
+        Es el paso compartido por login() y el backend de Django (auth_backend), para que
+        cada inicio de sesión haga un único hash lento.
+
+        Returns:
+            dict con success, message y data {usuario, perfil, rol}
+        """
         try:
             resp = self.usuarioDAO.obtener_por_email(email)
 
@@ -77,42 +98,80 @@ class AuthManager:
 
             # Verificar si está activo
             if not usuario.activo:
-                return {"success": False, "message": "Usuario inactivo. Contacte al administrador", "data": None}
+                return {"success": False, "message": MENSAJE_USUARIO_INACTIVO, "data": None}
 
             # Validar contraseña
-            if not self._verificar_password(password, usuario.password):
-                return {"success": False, "message": "Credenciales inválidas", "data": None}
-
-            # Obtener perfil según rol
-            perfil = None
-            if usuario.rol == 'cliente':
-                resp_cliente = self.clienteDAO.obtener_por_usuario(usuario.id_usuario)
-                if resp_cliente.data:
-                    perfil = Cliente(**resp_cliente.data[0])
-            elif usuario.rol == 'empleado':
-                resp_empleado = self.empleadoDAO.obtener_por_usuario(usuario.id_usuario)
-                if resp_empleado.data:
-                    perfil = Empleado(**resp_empleado.data[0])
-            elif usuario.rol == 'administrador':
-                resp_admin = self.adminDAO.obtener_por_usuario(usuario.id_usuario)
-                if resp_admin.data:
-                    perfil = Administrador(**resp_admin.data[0])
-
-            AuthManager.usuario_actual = usuario
-            
+            if not usuario.password or not self._verificar_password(password, usuario.password):
+                return {"success": False, "message": MENSAJE_CREDENCIALES_INVALIDAS, "data": None}
+
+            # Hash con un costo distinto del configurado: se rehace sin demorar el login
+            if needs_rehash(usuario.password):
+                rehash_en_segundo_plano(password, lambda nuevo: self._guardarRehash(usuario.id_usuario, nuevo))
+
             return {
                 "success": True,
                 "message": "Inicio de sesión exitoso",
                 "data": {
                     "usuario": usuario,
-                    "perfil": perfil,
+                    "perfil": self._obtener_perfil(usuario),
                     "rol": usuario.rol
                 }
             }
+        except HashingSaturado:
+            raise
         except Exception as e:
             logger.error(f"Error en login: {str(e)}")
             return {"success": False, "message": f"Error en autenticación: {str(e)}", "data": None}
 
+    def _guardarRehash(self, id_usuario, nuevo_hash):
+        try:
+            self.usuarioDAO.modificar(id_usuario, {"password": nuevo_hash})
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar el hash del usuario {id_usuario}: {str(e)}")
+
+    def _obtener_perfil(self, usuario):
+        """Cliente, Empleado o Administrador asociado al usuario según su rol (None si no tiene)"""
+        if usuario.rol == 'cliente':
+            resp_cliente = self.clienteDAO.obtener_por_usuario(usuario.id_usuario)
+            if resp_cliente.data:
+                return Cliente(**resp_cliente.data[0])
+        elif usuario.rol == 'empleado':
+            resp_empleado = self.empleadoDAO.obtener_por_usuario(usuario.id_usuario)
+            if resp_empleado.data:
+                return Empleado(**resp_empleado.data[0])
+        elif usuario.rol == 'administrador':
+            resp_admin = self.adminDAO.obtener_por_usuario(usuario.id_usuario)
+            if resp_admin.data:
+                return Administrador(**resp_admin.data[0])
+        return None
+
+    def cambiarPassword(self, email, password_actual, password_nueva):
+        """
+        Cambia la contraseña en la tabla usuario tras verificar la actual
+
+        Returns:
+            dict con success, message, data
+        """
+        try:
+            es_valida, mensaje = self._validar_password(password_nueva or '')
+            if not es_valida:
+                return {"success": False, "message": mensaje, "data": None}
+
+            resp = self.usuarioDAO.obtener_por_email(email)
+            if not resp.data:
+                return {"success": False, "message": "Usuario no encontrado", "data": None}
+            row = resp.data[0]
+            if not row.get('password') or not self._verificar_password(password_actual, row['password']):
+                return {"success": False, "message": "La contraseña actual es incorrecta", "data": None}
+
+            self.usuarioDAO.modificar(row['id_usuario'], {"password": self._hash_password(password_nueva)})
+            return {"success": True, "message": "Contraseña actualizada", "data": None}
+        except HashingSaturado:
+            raise
+        except Exception as e:
+            logger.error(f"Error al cambiar contraseña: {str(e)}")
+            return {"success": False, "message": f"Error al cambiar contraseña: {str(e)}", "data": None}
+
     # ------------------------------------------------------------------
     # REGISTRO DE CLIENTE
     # ------------------------------------------------------------------
@@ -182,6 +241,8 @@ class AuthManager:
                     "cliente": Cliente(**resp_cli.data[0])
                 }
             }
+        except HashingSaturado:
+            raise
         except Exception as e:
             logger.error(f"Error al registrar cliente: {str(e)}")
             return {"success": False, "message": f"Error al registrar cliente: {str(e)}", "data": None}
@@ -257,6 +318,8 @@ class AuthManager:
                     "empleado": Empleado(**resp_emp.data[0])
                 }
             }
+        except HashingSaturado:
+            raise
         except Exception as e:
             logger.error(f"Error al registrar empleado: {str(e)}")
             return {"success": False, "message": f"Error al registrar empleado: {str(e)}", "data": None}
@@ -332,6 +395,8 @@ class AuthManager:
                     "administrador": Administrador(**resp_admin.data[0])
                 }
             }
+        except HashingSaturado:
+            raise
         except Exception as e:
             logger.error(f"Error al registrar administrador: {str(e)}")
             return {"success": False, "message": f"Error al registrar administrador: {str(e)}", "data": None}
@@ -134,53 +134,60 @@ class CompraManager:
                     'message': 'Error al crear la compra en la base de datos'
                 }
             
-            # Crear los detalles
-            detalles_creados = []
-            for det in detalles_validados:
-                detalle_obj = DetalleCompra(
+            # Crear los detalles en una sola inserción
+            filas_detalle = self.detalle_dao.crear_multiple([
+                DetalleCompra(
                     id_compra=id_compra,
                     id_insumo=det['id_insumo'],
                     cantidad=det['cantidad'],
                     precio_unitario=det['precio_unitario'],
                     subtotal=det['subtotal']
                 )
-                
-                id_detalle = self.detalle_dao.crear(detalle_obj)
-                if id_detalle:
-                    detalles_creados.append({
-                        'id_detalle_compra': id_detalle,
+                for det in detalles_validados
+            ])
+            if len(filas_detalle) != len(detalles_validados):
+                # Sin detalles persistidos no se toca el inventario; la cabecera queda anulada
+                logger.error(f"Compra {id_compra}: se guardaron {len(filas_detalle)} de "
+                             f"{len(detalles_validados)} detalles, se cancela sin registrar inventario")
+                self.compra_dao.actualizar_estado(id_compra, 'cancelada')
+                return {
+                    'success': False,
+                    'message': 'Error al guardar los detalles de la compra; no se registró inventario',
+                    'data': {'id_compra': id_compra, 'estado': 'cancelada'}
+                }
+            detalles_creados = [{
+                'id_detalle_compra': fila.get('id_detalle_compra'),
+                'id_insumo': fila.get('id_insumo'),
+                'cantidad': fila.get('cantidad'),
+                'precio_unitario': fila.get('precio_unitario'),
+                'subtotal': fila.get('subtotal')
+            } for fila in filas_detalle]
+            
+            # Registrar entradas en inventario en lote si se solicita
+            inventario_registrado = []
+            if registrar_en_inventario:
+                motivo = f"Compra #{id_compra} - Proveedor: {proveedor.get('nombre')}"
+                resultado = self.inventario_manager.registrarMovimientosLote(
+                    [{'id_insumo': det['id_insumo'], 'cantidad': det['cantidad'], 'tipo': 'entrada', 'motivo': motivo}
+                     for det in detalles_validados],
+                    id_sede,
+                    id_usuario
+                )
+                if resultado.get('exito'):
+                    inventarios = {inv.id_insumo: inv for inv in resultado.get('inventarios', [])}
+                    inventario_registrado = [{
                         'id_insumo': det['id_insumo'],
                         'cantidad': det['cantidad'],
-                        'precio_unitario': det['precio_unitario'],
-                        'subtotal': det['subtotal']
-                    })
+                        'inventario': inventarios.get(int(det['id_insumo']))
+                    } for det in detalles_validados]
+                else:
+                    logger.warning(f"Compra {id_compra} sin registrar en inventario: {resultado.get('mensaje')}")
             
-            # Registrar entradas en inventario si se solicita
-            inventario_registrado = []
-            if registrar_en_inventario:
-                for det in detalles_validados:
-                    resultado = self.inventario_manager.registrarEntradaStock(
-                        id_insumo=det['id_insumo'],
-                        id_sede=id_sede,
-                        cantidad=det['cantidad'],
-                        motivo=f"Compra #{id_compra} - Proveedor: {proveedor.get('nombre')}",
-                        id_usuario=id_usuario
-                    )
-                    # Compatibilidad: InventarioManager retorna claves 'exito' y 'inventario' al nivel raíz
-                    ok = (resultado.get('success') is True) or (resultado.get('exito') is True)
-                    if ok:
-                        inv_obj = resultado.get('inventario')
-                        if inv_obj is None:
-                            inv_obj = resultado.get('data', {}).get('inventario')
-                        inventario_registrado.append({
-                            'id_insumo': det['id_insumo'],
-                            'cantidad': det['cantidad'],
-                            'inventario': inv_obj
-                        })
-            
-            # Actualizar estado si todo fue exitoso
+            # Actualizar estado si todo fue exitoso; se informa el estado realmente guardado
+            estado = 'pendiente'
             if registrar_en_inventario and len(inventario_registrado) == len(detalles_validados):
-                self.compra_dao.actualizar_estado(id_compra, 'recibida')
+                if self.compra_dao.actualizar_estado(id_compra, 'recibida'):
+                    estado = 'recibida'
             
             return {
                 'success': True,
@@ -190,7 +197,7 @@ class CompraManager:
                     'id_proveedor': id_proveedor,
                     'nombre_proveedor': proveedor.get('nombre'),
                     'total': total,
-                    'estado': 'recibida' if registrar_en_inventario else 'pendiente',
+                    'estado': estado,
                     'detalles': detalles_creados,
                     'inventario_actualizado': len(inventario_registrado) > 0,
                     'items_en_inventario': len(inventario_registrado)
@@ -278,6 +285,40 @@ class CompraManager:
                 'data': []
             }
     
+    def listarPaginaCompras(self, cursor=None, tamanio=100, estado=None, id_proveedor=None,
+                            fecha_desde=None, fecha_hasta=None):
+        """
+        Lista una página de compras (más recientes primero) con paginación por cursor
+        
+        Args:
+            cursor: cursor devuelto por la página anterior (None para la primera)
+            tamanio: compras por página
+            estado, id_proveedor, fecha_desde, fecha_hasta: filtros opcionales (se combinan)
+            
+        Returns:
+            dict: {'success': bool, 'message': str, 'data': [...], 'next_cursor': str o None}
+        """
+        try:
+            compras, siguiente = self.compra_dao.listar_pagina(
+                cursor, tamanio, estado=estado, id_proveedor=id_proveedor,
+                fecha_desde=fecha_desde, fecha_hasta=fecha_hasta)
+            
+            return {
+                'success': True,
+                'message': f'Se encontraron {len(compras)} compras',
+                'data': compras,
+                'next_cursor': siguiente
+            }
+            
+        except Exception as e:
+            logger.error(f"Error al listar compras: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Error al listar compras: {str(e)}',
+                'data': [],
+                'next_cursor': None
+            }
+    
     def cambiarEstadoCompra(self, id_compra, nuevo_estado):
         """
         Cambia el estado de una compra
@@ -431,3 +472,34 @@ class CompraManager:
                 'message': f'Error al obtener historial: {str(e)}',
                 'data': []
             }
+    
+    def obtenerPaginaHistorialInsumo(self, id_insumo, cursor=None, tamanio=50):
+        """
+        Obtiene una página del historial de compras de un insumo (más recientes primero)
+        
+        Args:
+            id_insumo: ID del insumo
+            cursor: cursor devuelto por la página anterior (None para la primera)
+            tamanio: registros por página
+            
+        Returns:
+            dict: {'success': bool, 'message': str, 'data': [...], 'next_cursor': str o None}
+        """
+        try:
+            historial, siguiente = self.detalle_dao.listar_pagina_por_insumo(id_insumo, cursor, tamanio)
+            
+            return {
+                'success': True,
+                'message': f'Se encontraron {len(historial)} compras del insumo',
+                'data': historial,
+                'next_cursor': siguiente
+            }
+            
+        except Exception as e:
+            logger.error(f"Error al obtener historial de insumo {id_insumo}: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Error al obtener historial: {str(e)}',
+                'data': [],
+                'next_cursor': None
+            }
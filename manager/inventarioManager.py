@@ -3,9 +3,12 @@
 
 from dao.inventarioDAO import InventarioDAO
 from dao.movimientoInventarioDAO import MovimientoInventarioDAO
+from dao.productoInsumoDAO import ProductoInsumoDAO
+from dao.pedidoDAO import PedidoDAO
 from entidades.inventario import Inventario
 from entidades.movimientoInventario import MovimientoInventario
 from datetime import datetime
+import math
 
 
 class InventarioManager:
@@ -17,6 +20,7 @@ class InventarioManager:
         """Constructor que inicializa los DAOs"""
         self.inventario_dao = InventarioDAO()
         self.movimiento_dao = MovimientoInventarioDAO()
+        self.producto_insumo_dao = ProductoInsumoDAO()
     
     def obtenerInventarioPorSede(self, id_sede):
         """
@@ -135,6 +139,13 @@ class InventarioManager:
             }
         
         try:
+            # Ajuste atómico (una llamada); None si la RPC no está instalada
+            ajuste = self.inventario_dao.ajustar_y_registrar(
+                id_insumo, id_sede, cantidad_int, 'entrada', motivo.strip(), id_usuario, crear_si_falta=True
+            )
+            if ajuste is not None:
+                return self._resultado_ajuste(ajuste, f'Entrada registrada: {cantidad_int} unidades agregadas', cantidad_int)
+            
             # Buscar o crear registro de inventario
             inventario = self.inventario_dao.obtener_por_insumo_y_sede(id_insumo, id_sede)
             
@@ -230,6 +241,13 @@ class InventarioManager:
             }
         
         try:
+            # Ajuste atómico con control de stock no negativo; None si la RPC no está instalada
+            ajuste = self.inventario_dao.ajustar_y_registrar(
+                id_insumo, id_sede, -cantidad_int, 'salida', motivo.strip(), id_usuario
+            )
+            if ajuste is not None:
+                return self._resultado_ajuste(ajuste, f'Salida registrada: {cantidad_int} unidades restadas', cantidad_int)
+            
             # Verificar que existe inventario
             inventario = self.inventario_dao.obtener_por_insumo_y_sede(id_insumo, id_sede)
             
@@ -292,6 +310,144 @@ class InventarioManager:
                 'movimiento': None
             }
     
+    def registrarMovimientosLote(self, lista, id_sede, id_usuario=None):
+        """
+        Registra varias entradas/salidas de stock en un número fijo de llamadas
+        (compras de varias líneas, transferencias)
+        
+        Args:
+            lista: Lista de dict [{'id_insumo': int, 'cantidad': num, 'tipo': 'entrada'|'salida',
+                   'motivo': str, 'id_sede': int (opcional, por defecto id_sede)}]
+            id_sede: ID de la sede por defecto de cada movimiento
+            id_usuario: ID del usuario que registra (opcional)
+            
+        Returns:
+            dict: {'exito': bool, 'mensaje': str, 'inventarios': list, 'movimientos': list}; con
+            'incierto': True si falló sin un rechazo definitivo y el lote pudo haberse aplicado
+        """
+        if not lista:
+            return {'exito': False, 'mensaje': 'Debe incluir al menos un movimiento', 'inventarios': [], 'movimientos': []}
+        
+        lineas = []
+        for item in lista:
+            try:
+                # inventario.cantidad es decimal(10,2): se admiten fracciones (recetas, compras a granel)
+                cantidad = round(float(item.get('cantidad')), 2)
+            except (ValueError, TypeError):
+                return {'exito': False, 'mensaje': 'La cantidad debe ser un número válido', 'inventarios': [], 'movimientos': []}
+            if cantidad <= 0:
+                return {'exito': False, 'mensaje': 'La cantidad debe ser mayor a 0', 'inventarios': [], 'movimientos': []}
+            tipo = item.get('tipo', 'entrada')
+            if tipo not in ('entrada', 'salida'):
+                return {'exito': False, 'mensaje': f'Tipo de movimiento inválido: {tipo}', 'inventarios': [], 'movimientos': []}
+            motivo = (item.get('motivo') or '').strip()
+            if not motivo:
+                return {'exito': False, 'mensaje': 'El motivo es requerido', 'inventarios': [], 'movimientos': []}
+            sede = item.get('id_sede') or id_sede
+            if not sede:
+                return {'exito': False, 'mensaje': 'Debe especificar la sede de cada movimiento', 'inventarios': [], 'movimientos': []}
+            lineas.append({
+                'id_insumo': int(item['id_insumo']),
+                'id_sede': int(sede),
+                'delta': cantidad if tipo == 'entrada' else -cantidad,
+                'tipo': tipo,
+                'motivo': motivo,
+            })
+        
+        try:
+            # Una llamada atómica; None si la RPC no está instalada
+            ajuste = self.inventario_dao.ajustar_lote(lineas, id_usuario)
+            if ajuste is None:
+                ajuste = self._ajustarLoteDirecto(lineas, id_usuario)
+        except Exception as e:
+            # Pudo fallar después de escribir: el resultado es incierto, no un rechazo
+            return {'exito': False, 'mensaje': f'Error al registrar movimientos: {str(e)}', 'inventarios': [],
+                    'movimientos': [], 'incierto': True}
+        
+        estado = ajuste.get('estado')
+        if estado == 'ok':
+            return {
+                'exito': True,
+                'mensaje': f'{len(lineas)} movimientos registrados',
+                'inventarios': ajuste['inventarios'],
+                'movimientos': ajuste['movimientos']
+            }
+        if estado == 'insuficiente':
+            mensaje = (f"Stock insuficiente del insumo {ajuste.get('id_insumo')} en sede {ajuste.get('id_sede')}. "
+                       f"Disponible: {float(ajuste.get('disponible') or 0):g}")
+        elif estado == 'no_existe':
+            mensaje = f"No existe inventario del insumo {ajuste.get('id_insumo')} en sede {ajuste.get('id_sede')}"
+        else:
+            # Error de la RPC (timeout, conexión): el lote pudo haberse confirmado
+            mensaje = f"Error al actualizar inventario: {ajuste.get('mensaje', '')}".rstrip(': ')
+            return {'exito': False, 'mensaje': mensaje, 'inventarios': [], 'movimientos': [], 'incierto': True}
+        return {'exito': False, 'mensaje': mensaje, 'inventarios': [], 'movimientos': []}
+    
+    def _ajustarLoteDirecto(self, lineas, id_usuario):
+        """
+        Camino sin RPC de registrarMovimientosLote: una lectura, un upsert, un insert de
+        inventarios nuevos y un insert de movimientos, sin importar la cantidad de líneas
+        """
+        netos = {}
+        for linea in lineas:
+            clave = (linea['id_insumo'], linea['id_sede'])
+            netos[clave] = round(netos.get(clave, 0) + linea['delta'], 2)
+        
+        existentes = self.inventario_dao.listar_por_claves(netos.keys())
+        actualizar, crear = [], []
+        for (id_insumo, sede), delta in netos.items():
+            inventario = existentes.get((id_insumo, sede))
+            if inventario is None:
+                if delta < 0:
+                    return {'estado': 'no_existe', 'id_insumo': id_insumo, 'id_sede': sede, 'disponible': 0}
+                crear.append(Inventario(id_insumo=id_insumo, id_sede=sede, cantidad=delta))
+            elif float(inventario.cantidad) + delta < 0:
+                return {'estado': 'insuficiente', 'id_insumo': id_insumo, 'id_sede': sede,
+                        'disponible': inventario.cantidad}
+            else:
+                inventario.cantidad = round(float(inventario.cantidad) + delta, 2)
+                actualizar.append(inventario)
+        
+        guardados = self.inventario_dao.guardar_cantidades(actualizar, crear)
+        por_clave = {(inv.id_insumo, inv.id_sede): inv for inv in guardados}
+        movimientos = self.movimiento_dao.crear_multiple([
+            MovimientoInventario(
+                id_inventario=por_clave[(linea['id_insumo'], linea['id_sede'])].id_inventario,
+                tipo=linea['tipo'],
+                cantidad=abs(linea['delta']),
+                motivo=linea['motivo'],
+                fecha=datetime.now(),
+                id_usuario=id_usuario
+            )
+            for linea in lineas if (linea['id_insumo'], linea['id_sede']) in por_clave
+        ])
+        return {'estado': 'ok', 'inventarios': guardados, 'movimientos': movimientos}
+    
+    @staticmethod
+    def _resultado_ajuste(ajuste, mensaje_ok, cantidad_solicitada):
+        """Traduce el resultado de InventarioDAO.ajustar_y_registrar al formato del manager"""
+        estado = ajuste.get('estado')
+        if estado == 'ok':
+            return {
+                'exito': True,
+                'mensaje': mensaje_ok,
+                'inventario': ajuste['inventario'],
+                'movimiento': ajuste['movimiento']
+            }
+        if estado == 'insuficiente':
+            disponible = ajuste.get('disponible')
+            mensaje = f'Stock insuficiente. Disponible: {int(float(disponible or 0))}, Solicitado: {cantidad_solicitada}'
+        elif estado == 'no_existe':
+            mensaje = 'No existe inventario para este insumo en la sede'
+        else:
+            mensaje = f"Error al actualizar inventario: {ajuste.get('mensaje', '')}".rstrip(': ')
+        return {
+            'exito': False,
+            'mensaje': mensaje,
+            'inventario': None,
+            'movimiento': None
+        }
+    
     def transferirInsumoEntreSedes(self, id_sede_origen, id_sede_destino, id_insumo, cantidad, id_usuario=None):
         """
         Transfiere insumo de una sede a otra
@@ -326,44 +482,18 @@ class InventarioManager:
                 'mensaje': 'La cantidad debe ser un número válido'
             }
         
-        # Registrar salida en sede origen
-        motivo_salida = f'Transferencia a sede {id_sede_destino}'
-        resultado_salida = self.registrarSalidaStock(
-            id_insumo, 
-            id_sede_origen, 
-            cantidad_int, 
-            motivo_salida, 
-            id_usuario
-        )
+        # Salida en origen y entrada en destino en un solo lote (todo o nada con la RPC)
+        resultado = self.registrarMovimientosLote([
+            {'id_insumo': id_insumo, 'id_sede': id_sede_origen, 'cantidad': cantidad_int, 'tipo': 'salida',
+             'motivo': f'Transferencia a sede {id_sede_destino}'},
+            {'id_insumo': id_insumo, 'id_sede': id_sede_destino, 'cantidad': cantidad_int, 'tipo': 'entrada',
+             'motivo': f'Transferencia desde sede {id_sede_origen}'},
+        ], id_sede_origen, id_usuario)
         
-        if not resultado_salida['exito']:
+        if not resultado['exito']:
             return {
                 'exito': False,
-                'mensaje': f'Error en sede origen: {resultado_salida["mensaje"]}'
-            }
-        
-        # Registrar entrada en sede destino
-        motivo_entrada = f'Transferencia desde sede {id_sede_origen}'
-        resultado_entrada = self.registrarEntradaStock(
-            id_insumo, 
-            id_sede_destino, 
-            cantidad_int, 
-            motivo_entrada, 
-            id_usuario
-        )
-        
-        if not resultado_entrada['exito']:
-            # Rollback: devolver a sede origen
-            self.registrarEntradaStock(
-                id_insumo, 
-                id_sede_origen, 
-                cantidad_int, 
-                'Reversión por error en transferencia', 
-                id_usuario
-            )
-            return {
-                'exito': False,
-                'mensaje': f'Error en sede destino: {resultado_entrada["mensaje"]}'
+                'mensaje': f'Error en la transferencia: {resultado["mensaje"]}'
             }
         
         return {
@@ -403,6 +533,36 @@ class InventarioManager:
                 'movimientos': []
             }
     
+    def obtenerPaginaMovimientos(self, cursor=None, tamanio=100, id_sede=None, tipo=None):
+        """
+        Obtiene una página del historial de movimientos con paginación por cursor
+        
+        Args:
+            cursor: cursor devuelto por la página anterior (None para la primera)
+            tamanio: movimientos por página
+            id_sede: ID de la sede (opcional)
+            tipo: 'entrada' o 'salida' (opcional)
+            
+        Returns:
+            dict: {'exito': bool, 'mensaje': str, 'movimientos': list, 'next_cursor': str o None}
+        """
+        try:
+            movimientos, siguiente = self.movimiento_dao.listar_pagina(cursor, tamanio, id_sede=id_sede, tipo=tipo)
+            
+            return {
+                'exito': True,
+                'mensaje': f'Se encontraron {len(movimientos)} movimientos',
+                'movimientos': movimientos,
+                'next_cursor': siguiente
+            }
+        except Exception as e:
+            return {
+                'exito': False,
+                'mensaje': f'Error al obtener movimientos: {str(e)}',
+                'movimientos': [],
+                'next_cursor': None
+            }
+    
     def verificarAlertasReposicion(self, id_sede=None):
         """
         Verifica alertas de reposición (stock bajo)
@@ -472,19 +632,105 @@ class InventarioManager:
         except Exception:
             return False
     
-    def descontarStockPorPedido(self, id_pedido):
+    def calcularRequerimientos(self, detalles):
+        """
+        Explota las recetas de un conjunto de líneas de pedido: suma
+        cantidad * cantidad_necesaria por insumo con una sola consulta a producto_insumo
+        
+        Args:
+            detalles: iterable de objetos o dicts con id_producto y cantidad
+            
+        Returns:
+            dict {id_insumo: cantidad requerida}, redondeada hacia arriba a 2 decimales
+        """
+        unidades = {}
+        for d in detalles:
+            id_producto = d.get('id_producto') if isinstance(d, dict) else d.id_producto
+            cantidad = d.get('cantidad') if isinstance(d, dict) else d.cantidad
+            if id_producto is None or not cantidad:
+                continue
+            unidades[int(id_producto)] = unidades.get(int(id_producto), 0) + float(cantidad)
+        
+        requerimientos = {}
+        for item in self.producto_insumo_dao.listar_por_productos(unidades.keys()):
+            requerido = unidades[int(item.id_producto)] * float(item.cantidad_necesaria or 0)
+            requerimientos[int(item.id_insumo)] = requerimientos.get(int(item.id_insumo), 0) + requerido
+        # Redondeo hacia arriba a la precisión de inventario.cantidad para no descontar de menos
+        return {i: math.ceil(round(c * 100, 6)) / 100 for i, c in requerimientos.items() if c > 0}
+    
+    def descontarStockPorPedido(self, id_pedido, pedido=None, id_usuario=None):
         """
         Descuenta stock de insumos según los productos de un pedido
-        (Requiere consulta a detalle_pedido y producto_insumo)
+        
+        Carga todas las recetas del pedido en una consulta, agrega los requerimientos
+        por insumo y los descuenta de la sede del pedido en un único lote (todo o nada).
         
         Args:
             id_pedido: ID del pedido
+            pedido: Pedido con detalles ya cargado (opcional, evita releerlo)
+            id_usuario: ID del usuario que registra (opcional)
             
         Returns:
-            dict: {'exito': bool, 'mensaje': str}
+            dict: {'exito': bool, 'mensaje': str, 'requerimientos': dict, 'faltantes': list}; con
+            'incierto': True si no se sabe si el descuento se aplicó
         """
-        # TODO: Implementar cuando se tengan las relaciones producto-insumo
-        return {
-            'exito': False,
-            'mensaje': 'Funcionalidad pendiente de implementación'
-        }
+        try:
+            if pedido is None:
+                pedido = PedidoDAO().obtener_por_id(id_pedido)
+            if not pedido:
+                return {'exito': False, 'mensaje': 'Pedido no encontrado', 'requerimientos': {}, 'faltantes': []}
+            
+            requerimientos = self.calcularRequerimientos(pedido.detalles or [])
+            if not requerimientos:
+                return {
+                    'exito': True,
+                    'mensaje': 'Los productos del pedido no tienen receta; no se descontaron insumos',
+                    'requerimientos': {},
+                    'faltantes': []
+                }
+            
+            motivo = f'Pedido #{id_pedido}'
+            resultado = self.registrarMovimientosLote(
+                [{'id_insumo': i, 'cantidad': c, 'tipo': 'salida', 'motivo': motivo} for i, c in requerimientos.items()],
+                pedido.id_sede,
+                id_usuario
+            )
+            if resultado['exito']:
+                return {
+                    'exito': True,
+                    'mensaje': f'Stock descontado: {len(requerimientos)} insumo(s) del pedido {id_pedido}',
+                    'requerimientos': requerimientos,
+                    'faltantes': []
+                }
+            if resultado.get('incierto'):
+                return {
+                    'exito': False,
+                    'mensaje': resultado['mensaje'],
+                    'requerimientos': requerimientos,
+                    'faltantes': [],
+                    'incierto': True
+                }
+            
+            # El lote se rechaza en la primera falta; se listan todas con una sola lectura
+            existentes = self.inventario_dao.listar_por_claves((i, pedido.id_sede) for i in requerimientos)
+            faltantes = []
+            for id_insumo, requerido in requerimientos.items():
+                inventario = existentes.get((id_insumo, pedido.id_sede))
+                disponible = float(inventario.cantidad) if inventario else 0.0
+                if disponible < requerido:
+                    faltantes.append({'id_insumo': id_insumo, 'requerido': requerido, 'disponible': disponible})
+            return {
+                'exito': False,
+                'mensaje': resultado['mensaje'] if not faltantes else
+                    f'Stock insuficiente para {len(faltantes)} insumo(s) en la sede {pedido.id_sede}',
+                'requerimientos': requerimientos,
+                'faltantes': faltantes
+            }
+            
+        except Exception as e:
+            return {
+                'exito': False,
+                'mensaje': f'Error al descontar stock del pedido: {str(e)}',
+                'requerimientos': {},
+                'faltantes': []
+            }
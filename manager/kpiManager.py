@@ -0,0 +1,221 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+from dao.kpiDAO import KpiDAO
+from dao.pedidoDAO import PedidoDAO
+from dao.detallePedidoDAO import DetallePedidoDAO
+from manager import trabajoManager  # noqa: F401 registra el handler reconciliar_kpis
+from utils import job_queue
+
+logger = logging.getLogger(__name__)
+
+METRICA_PEDIDOS_ESTADO = 'pedidos_estado'
+METRICA_INGRESOS = 'ingresos_dia_sede'
+METRICA_VENTAS_CANTIDAD = 'ventas_producto_cantidad'
+METRICA_VENTAS_SUBTOTAL = 'ventas_producto_subtotal'
+METRICA_INSUMO_CRITICO = 'insumo_critico'
+METRICA_META = 'meta'
+DIMENSION_RECONCILIADO = 'reconciliado'
+
+# Días de ingresos que muestra el panel
+DIAS_INGRESOS = 14
+# Productos que muestra el panel
+LIMITE_TOP = 10
+# Antigüedad máxima del snapshot antes de reconciliar contra las tablas base
+RECONCILIAR_CADA = timedelta(hours=1)
+# Tope de productos al reconstruir ventas (ranking completo, no solo el top del panel)
+MAX_PRODUCTOS_RECONCILIACION = 100000
+
+
+def _dia(fecha):
+    if isinstance(fecha, datetime):
+        return fecha.date().isoformat()
+    if isinstance(fecha, date):
+        return fecha.isoformat()
+    return str(fecha)[:10] if fecha else date.today().isoformat()
+
+
+def _parse_ts(valor):
+    if isinstance(valor, datetime):
+        return valor
+    try:
+        ts = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+        return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+    except (TypeError, ValueError):
+        return None
+
+
+class KpiManager:
+    """
+    Snapshot materializado de KPIs del panel admin.
+
+    Los contadores se actualizan de forma incremental con los eventos de pedidos
+    (creación, cambio de estado); los insumos críticos los mantiene el trigger
+    kpi_insumo_critico sobre inventario. Todo se reconstruye por completo
+    desde las tablas base con el trabajo reconciliar_kpis, que se encola cada
+    RECONCILIAR_CADA (o con `manage.py reconciliar_kpis`), para corregir cualquier deriva.
+    """
+
+    def __init__(self):
+        self.dao = KpiDAO()
+
+    # ------------------------------------------------------------------ lectura
+    def obtenerSnapshot(self):
+        """
+        Lee el snapshot (métricas fijas y solo el top de productos) y lo arma para el panel
+
+        Returns:
+            dict con 'success', 'message' y 'data' (pedidos_por_estado, total_pedidos,
+            ingresos, top_productos, insumos_criticos, actualizado). success=False si el
+            snapshot no existe o aún no se reconcilió (el panel calcula en vivo).
+        """
+        filas = self.dao.leer_snapshot(
+            (date.today() - timedelta(days=DIAS_INGRESOS - 1)).isoformat(),
+            (METRICA_PEDIDOS_ESTADO, METRICA_INGRESOS, METRICA_INSUMO_CRITICO, METRICA_META),
+            METRICA_VENTAS_CANTIDAD, METRICA_VENTAS_SUBTOTAL, LIMITE_TOP,
+        )
+        if filas is None:
+            return {'success': False, 'message': 'Snapshot de KPIs no disponible', 'data': None}
+
+        pedidos_por_estado = {}
+        ingresos = []
+        ventas = {}
+        insumos_criticos = []
+        reconciliado = None
+        for f in filas:
+            metrica, dimension = f.get('metrica'), f.get('dimension')
+            valor = float(f.get('valor') or 0)
+            if metrica == METRICA_PEDIDOS_ESTADO:
+                if valor:
+                    pedidos_por_estado[dimension] = int(valor)
+            elif metrica == METRICA_INGRESOS:
+                dia, _, id_sede = dimension.partition('|')
+                ingresos.append({'fecha': dia, 'id_sede': int(id_sede) if id_sede.isdigit() else None, 'total': valor})
+            elif metrica in (METRICA_VENTAS_CANTIDAD, METRICA_VENTAS_SUBTOTAL):
+                venta = ventas.setdefault(dimension, {'id_producto': int(dimension), 'nombre': None,
+                                                      'cantidad_total': 0, 'subtotal_total': 0.0})
+                if metrica == METRICA_VENTAS_CANTIDAD:
+                    venta['cantidad_total'] = int(valor)
+                    venta['nombre'] = (f.get('datos') or {}).get('nombre')
+                else:
+                    venta['subtotal_total'] = valor
+            elif metrica == METRICA_INSUMO_CRITICO:
+                insumos_criticos.append(f.get('datos') or {})
+            elif metrica == METRICA_META and dimension == DIMENSION_RECONCILIADO:
+                reconciliado = _parse_ts(f.get('actualizado'))
+
+        if reconciliado is None:
+            self.reconciliarEnSegundoPlano()
+            return {'success': False, 'message': 'Snapshot de KPIs pendiente de reconciliación', 'data': None}
+        # actualizado lo fija now() de la base (UTC)
+        if datetime.now(timezone.utc).replace(tzinfo=None) - reconciliado > RECONCILIAR_CADA:
+            self.reconciliarEnSegundoPlano()
+
+        for venta in ventas.values():
+            venta['nombre'] = venta['nombre'] or f"Producto {venta['id_producto']}"
+        top = sorted(ventas.values(), key=lambda v: (v['cantidad_total'], v['subtotal_total']), reverse=True)
+        ingresos.sort(key=lambda r: (r['fecha'], r['id_sede'] or 0), reverse=True)
+        insumos_criticos.sort(key=lambda a: a.get('cantidad_actual') or 0)
+        return {
+            'success': True,
+            'message': 'Snapshot de KPIs',
+            'data': {
+                'pedidos_por_estado': pedidos_por_estado,
+                'total_pedidos': sum(pedidos_por_estado.values()),
+                'ingresos': ingresos,
+                'top_productos': top[:LIMITE_TOP],
+                'insumos_criticos': insumos_criticos,
+                'actualizado': reconciliado,
+            }
+        }
+
+    # ------------------------------------------------------------------ eventos
+    def registrarPedidoCreado(self, pedido):
+        """Suma un pedido nuevo (estado, ingresos del día/sede y ventas por producto)"""
+        try:
+            dia = _dia(pedido.fecha)
+            filas = [
+                {'metrica': METRICA_PEDIDOS_ESTADO, 'dimension': pedido.estado or 'pendiente', 'valor': 1},
+                {'metrica': METRICA_INGRESOS, 'dimension': f'{dia}|{pedido.id_sede}', 'fecha': dia,
+                 'valor': float(pedido.total or 0)},
+            ]
+            for d in (pedido.detalles or []):
+                nombre = getattr(d, 'nombre_producto', None)
+                filas.append({'metrica': METRICA_VENTAS_CANTIDAD, 'dimension': str(d.id_producto),
+                              'valor': int(d.cantidad or 0), 'datos': {'nombre': nombre} if nombre else None})
+                filas.append({'metrica': METRICA_VENTAS_SUBTOTAL, 'dimension': str(d.id_producto),
+                              'valor': float(d.subtotal or 0)})
+            return self.dao.incrementar(filas, id_pedido=pedido.id_pedido)
+        except Exception as e:
+            logger.warning(f"No se pudo registrar pedido en KPIs: {str(e)}")
+            return False
+
+    def registrarCambioEstado(self, estado_anterior, estado_nuevo):
+        """Mueve un pedido de un estado a otro en los contadores"""
+        if estado_anterior == estado_nuevo:
+            return True
+        return self.dao.incrementar([
+            {'metrica': METRICA_PEDIDOS_ESTADO, 'dimension': estado_anterior, 'valor': -1},
+            {'metrica': METRICA_PEDIDOS_ESTADO, 'dimension': estado_nuevo, 'valor': 1},
+        ])
+
+    # ------------------------------------------------------------ reconciliación
+    def reconciliar(self):
+        """
+        Recalcula todo el snapshot desde pedido, detalle_pedido e inventario
+
+        Returns:
+            dict con 'success', 'message' y 'data' (cantidad de filas escritas)
+        """
+        try:
+            # Los eventos que lleguen mientras se lee se vuelven a aplicar en kpi_reemplazar
+            desde_delta = self.dao.ultimo_delta()
+            estados = {}
+            ingresos = {}
+            max_pedido = None
+            for p in PedidoDAO().iterar_encabezados('id_pedido,estado,total,fecha,id_sede'):
+                max_pedido = max(max_pedido or 0, p['id_pedido'])
+                estado = p.get('estado') or 'pendiente'
+                estados[estado] = estados.get(estado, 0) + 1
+                dia = _dia(p.get('fecha'))
+                clave = f"{dia}|{p.get('id_sede')}"
+                ingresos[clave] = ingresos.get(clave, 0.0) + float(p.get('total') or 0)
+
+            filas = [{'metrica': METRICA_PEDIDOS_ESTADO, 'dimension': e, 'valor': n} for e, n in estados.items()]
+            filas += [{'metrica': METRICA_INGRESOS, 'dimension': k, 'fecha': k.split('|')[0], 'valor': round(v, 2)}
+                      for k, v in ingresos.items()]
+
+            # Sin caché y del mismo rango de pedidos que los encabezados leídos
+            ventas = DetallePedidoDAO().ventas_hasta_pedido(max_pedido, MAX_PRODUCTOS_RECONCILIACION) \
+                if max_pedido is not None else []
+            for v in ventas:
+                filas.append({'metrica': METRICA_VENTAS_CANTIDAD, 'dimension': str(v['id_producto']),
+                              'valor': v['cantidad_total'], 'datos': {'nombre': v['nombre']}})
+                filas.append({'metrica': METRICA_VENTAS_SUBTOTAL, 'dimension': str(v['id_producto']),
+                              'valor': round(v['subtotal_total'], 2)})
+
+            # Los insumos críticos los recalcula kpi_reemplazar desde inventario
+            filas.append({'metrica': METRICA_META, 'dimension': DIMENSION_RECONCILIADO, 'valor': 0})
+            if not self.dao.reemplazar(filas, desde_delta=desde_delta, max_pedido=max_pedido):
+                return {'success': False, 'message': 'No se pudo guardar el snapshot', 'data': None}
+            return {'success': True, 'message': f'Snapshot reconciliado ({len(filas)} filas)', 'data': {'filas': len(filas)}}
+        except Exception as e:
+            logger.error(f"Error al reconciliar KPIs: {str(e)}")
+            return {'success': False, 'message': f'Error al reconciliar KPIs: {str(e)}', 'data': None}
+
+    def reconciliarEnSegundoPlano(self):
+        """Encola el trabajo reconciliar_kpis si no hay otro pendiente o en curso
+
+        Corre en `procesar_trabajos`: el latido de la cola mantiene el lease mientras dure la
+        reconciliación, así dos workers nunca ejecutan kpi_reemplazar a la vez.
+        """
+        try:
+            job_queue.enqueue('reconciliar_kpis', unico=True)
+            return True
+        except Exception as e:
+            logger.warning(f"No se pudo encolar la reconciliación de KPIs: {str(e)}")
+            return False
+
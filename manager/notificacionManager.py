@@ -2,13 +2,30 @@
 # -*- coding: utf-8 -*-
 
 import logging
+from postgrest.exceptions import APIError
 from dao.notificacionDAO import NotificacionDAO
 from dao.clienteDAO import ClienteDAO
 from entidades.notificacion import Notificacion
 from entidades.cliente import Cliente
+from utils import job_queue
 
 logger = logging.getLogger(__name__)
 
+# Notificaciones por INSERT en los envíos masivos
+TAMANIO_LOTE_NOTIFICACIONES = 500
+# Estados de la cola de trabajos tal como los informa obtenerProgresoEnvio
+ESTADOS_ENVIO = {job_queue.PENDIENTE: 'pendiente', job_queue.EN_CURSO: 'en_curso',
+                 job_queue.COMPLETADO: 'completado', job_queue.ERROR: 'error', job_queue.CANCELADO: 'error'}
+# Prefijos de código de un rechazo seguro del INSERT (nada quedó guardado): datos inválidos (22),
+# restricciones (23) y errores de la petición en PostgREST (PGRST)
+PREFIJOS_RECHAZO_DEFINITIVO = ('22', '23', 'PGRST')
+
+
+def _rechazo_definitivo(error):
+    """True si la base rechazó la sentencia; False ante timeouts o cortes (pudo haberse guardado)"""
+    codigo = getattr(error, 'code', None)
+    return isinstance(error, APIError) and isinstance(codigo, str) and codigo.startswith(PREFIJOS_RECHAZO_DEFINITIVO)
+
 
 class NotificacionManager:
     """
@@ -62,36 +79,157 @@ class NotificacionManager:
             logger.error(f"Error al crear notificación: {str(e)}")
             return {"success": False, "message": f"Error al crear notificación: {str(e)}", "data": None}
 
-    def enviarNotificacionMasiva(self, lista_clientes, mensaje):
-        """Envía la misma notificación a múltiples clientes"""
+    def enviarNotificacionMasiva(self, lista_clientes, mensaje, en_segundo_plano=False, creado_por=None):
+        """
+        Envía la misma notificación a múltiples clientes
+
+        Los destinatarios (id_cliente o id_usuario) se resuelven en lote y las notificaciones
+        se insertan en bloques de TAMANIO_LOTE_NOTIFICACIONES filas. Si un bloque falla se
+        reintenta fila por fila para informar el error de cada cliente.
+
+        Args:
+            lista_clientes: lista de IDs de cliente (o de usuario)
+            mensaje: texto de la notificación
+            en_segundo_plano: si es True el envío se encola como trabajo 'notificacion_masiva'
+                (lo ejecuta `manage.py procesar_trabajos`) y se retorna enseguida el id_envio
+                para consultar el avance con obtenerProgresoEnvio
+            creado_por: usuario que pidió el envío en segundo plano (para auditoría)
+        """
         try:
             if not lista_clientes or not mensaje:
                 return {"success": False, "message": "lista_clientes y mensaje son requeridos", "data": None}
-            
-            notificaciones_creadas = []
-            errores = []
-            
-            for id_cliente in lista_clientes:
-                result = self.crearNotificacion(id_cliente, mensaje)
-                if result['success']:
-                    notificaciones_creadas.append(result['data'])
-                else:
-                    errores.append({"id_cliente": id_cliente, "error": result['message']})
-            
+
+            if not en_segundo_plano:
+                progreso = self._nuevoProgreso(lista_clientes)
+                self._procesarEnvioMasivo(lista_clientes, mensaje, progreso, guardar_creadas=True)
+                return {
+                    "success": True,
+                    "message": f"{progreso['total_exitosas']} notificaciones enviadas",
+                    "data": {
+                        "creadas": progreso['creadas'],
+                        "errores": progreso['errores'],
+                        "total_exitosas": progreso['total_exitosas'],
+                        "total_errores": len(progreso['errores'])
+                    }
+                }
+
+            # Un solo intento: reintentar volvería a insertar los bloques ya enviados
+            id_envio = job_queue.enqueue('notificacion_masiva',
+                                         {'lista_clientes': list(lista_clientes), 'mensaje': mensaje},
+                                         max_intentos=1, creado_por=creado_por)
             return {
                 "success": True,
-                "message": f"{len(notificaciones_creadas)} notificaciones enviadas",
-                "data": {
-                    "creadas": notificaciones_creadas,
-                    "errores": errores,
-                    "total_exitosas": len(notificaciones_creadas),
-                    "total_errores": len(errores)
-                }
+                "message": f"Envío de {len(lista_clientes)} notificaciones en curso",
+                "data": {"id_envio": id_envio, "total": len(lista_clientes)}
             }
         except Exception as e:
             logger.error(f"Error al enviar notificaciones masivas: {str(e)}")
             return {"success": False, "message": f"Error al enviar notificaciones: {str(e)}", "data": None}
 
+    def obtenerProgresoEnvio(self, id_envio):
+        """Avance de un envío masivo en segundo plano, leído de la fila del trabajo en la cola"""
+        trabajo = job_queue.get(id_envio)
+        if not trabajo or trabajo['tipo'] != 'notificacion_masiva':
+            return {"success": False, "message": "Envío no encontrado", "data": None}
+        total = len(trabajo['payload'].get('lista_clientes') or [])
+        resultado = trabajo.get('resultado') or {}
+        errores = resultado.get('errores') or []
+        datos = {
+            "estado": ESTADOS_ENVIO.get(trabajo['estado'], trabajo['estado']),
+            "total": total,
+            "procesados": resultado.get('procesados', int(round((trabajo.get('progreso') or 0) * total / 100))),
+            "total_exitosas": resultado.get('total_exitosas', 0),
+            "errores": errores,
+            "total_errores": len(errores),
+        }
+        if trabajo['estado'] in (job_queue.ERROR, job_queue.CANCELADO):
+            datos['mensaje'] = trabajo.get('error') or trabajo['estado']
+        return {"success": True, "message": f"Envío {datos['estado']}", "data": datos}
+
+    @staticmethod
+    def _nuevoProgreso(lista_clientes):
+        return {"estado": "pendiente", "total": len(lista_clientes), "procesados": 0,
+                "total_exitosas": 0, "errores": [], "creadas": []}
+
+    def _procesarEnvioMasivo(self, lista_clientes, mensaje, progreso, guardar_creadas=False, al_avanzar=None):
+        """
+        Valida destinatarios, resuelve clientes en lote e inserta por bloques actualizando `progreso`
+
+        `al_avanzar(progreso)` se llama después de cada bloque (el trabajo en cola lo usa para
+        guardar su avance).
+        """
+        def _avanzar(procesados=0, creadas=None, errores=None):
+            progreso['procesados'] += procesados
+            if creadas:
+                progreso['total_exitosas'] += len(creadas)
+                if guardar_creadas:
+                    progreso['creadas'].extend(creadas)
+            progreso['errores'].extend(errores or [])
+            if al_avanzar:
+                al_avanzar(progreso)
+
+        try:
+            progreso['estado'] = 'en_curso'
+            validos, errores = [], []
+            for id_cliente in lista_clientes:
+                try:
+                    validos.append((id_cliente, int(id_cliente)))
+                except (TypeError, ValueError):
+                    errores.append({"id_cliente": id_cliente, "error": "id_cliente inválido"})
+            resueltos = self.clienteDAO.resolver_ids([i for _, i in validos]) if validos else {}
+
+            destinos = {}
+            for original, id_recibido in validos:
+                id_real = resueltos.get(id_recibido)
+                if id_real is None:
+                    errores.append({"id_cliente": original, "error": "Cliente no encontrado"})
+                else:
+                    # Un mismo cliente (por id_cliente y por id_usuario) recibe una sola notificación
+                    destinos.setdefault(id_real, original)
+            _avanzar(procesados=len(lista_clientes) - len(destinos), errores=errores)
+
+            pendientes = list(destinos.items())
+            for inicio in range(0, len(pendientes), TAMANIO_LOTE_NOTIFICACIONES):
+                bloque = pendientes[inicio:inicio + TAMANIO_LOTE_NOTIFICACIONES]
+                creadas, errores = self._insertarBloque(bloque, mensaje)
+                _avanzar(procesados=len(bloque), creadas=creadas, errores=errores)
+            progreso['estado'] = 'completado'
+        except Exception as e:
+            logger.error(f"Error en envío masivo de notificaciones: {str(e)}")
+            progreso['estado'] = 'error'
+            progreso['mensaje'] = str(e)
+            raise
+
+    def _insertarBloque(self, bloque, mensaje):
+        """
+        Inserta un bloque [(id_cliente, id_recibido)]
+
+        Si la base rechazó el INSERT múltiple (restricción o dato inválido) se reintenta fila por
+        fila para aislar al culpable. Ante un error de transporte el bloque pudo haberse guardado,
+        así que no se reintenta (duplicaría notificaciones) y se informa como fallido.
+        """
+        try:
+            resp = self.notificacionDAO.crear_multiple(
+                [Notificacion(id_cliente=id_real, mensaje=mensaje) for id_real, _ in bloque])
+            return resp.data or [], []
+        except Exception as e:
+            if not _rechazo_definitivo(e):
+                logger.error(f"Resultado incierto del INSERT de {len(bloque)} notificaciones, no se reintenta: {str(e)}")
+                error = f"Resultado incierto, revisar antes de reenviar: {str(e)}"
+                return [], [{"id_cliente": original, "error": error} for _, original in bloque]
+            logger.warning(f"Falló el INSERT de {len(bloque)} notificaciones, se reintenta una a una: {str(e)}")
+        creadas, errores = [], []
+        for id_real, original in bloque:
+            try:
+                resp = self.notificacionDAO.crear(Notificacion(id_cliente=id_real, mensaje=mensaje))
+                if resp.data:
+                    creadas.append(resp.data[0])
+                else:
+                    errores.append({"id_cliente": original, "error": "Error al crear notificación"})
+            except Exception as e:
+                errores.append({"id_cliente": original, "error": str(e)})
+        return creadas, errores
+
     def listarPorCliente(self, id_cliente, solo_no_leidas=False, limite=50):
         """Lista notificaciones de un cliente"""
         try:
@@ -106,6 +244,23 @@ class NotificacionManager:
             logger.error(f"Error al listar notificaciones: {str(e)}")
             return {"success": False, "message": f"Error al listar notificaciones: {str(e)}", "data": None}
 
+    def listarPaginaPorCliente(self, id_cliente, solo_no_leidas=False, cursor=None, tamanio=50):
+        """Lista una página de notificaciones de un cliente con paginación por cursor (incluye 'next_cursor')"""
+        try:
+            notificaciones, siguiente = self.notificacionDAO.listar_pagina(
+                cursor, tamanio, id_cliente=id_cliente, solo_no_leidas=solo_no_leidas)
+            
+            if not notificaciones:
+                mensaje = "No hay notificaciones no leídas" if solo_no_leidas else "No hay notificaciones"
+                return {"success": True, "message": mensaje, "data": [], "next_cursor": None}
+            
+            return {"success": True, "message": "Notificaciones encontradas", "data": notificaciones,
+                    "next_cursor": siguiente}
+        except Exception as e:
+            logger.error(f"Error al listar notificaciones: {str(e)}")
+            return {"success": False, "message": f"Error al listar notificaciones: {str(e)}", "data": None,
+                    "next_cursor": None}
+
     def obtenerNotificacion(self, id_notificacion):
         """Obtiene una notificación específica"""
         try:
@@ -207,6 +362,21 @@ class NotificacionManager:
             logger.error(f"Error al listar todas las notificaciones: {str(e)}")
             return {"success": False, "message": f"Error al listar notificaciones: {str(e)}", "data": None}
 
+    def listarPagina(self, cursor=None, tamanio=100):
+        """Lista una página de todas las notificaciones (solo para administradores), incluye 'next_cursor'"""
+        try:
+            notificaciones, siguiente = self.notificacionDAO.listar_pagina(cursor, tamanio)
+            
+            if not notificaciones:
+                return {"success": True, "message": "No hay notificaciones registradas", "data": [], "next_cursor": None}
+            
+            return {"success": True, "message": "Notificaciones encontradas", "data": notificaciones,
+                    "next_cursor": siguiente}
+        except Exception as e:
+            logger.error(f"Error al listar todas las notificaciones: {str(e)}")
+            return {"success": False, "message": f"Error al listar notificaciones: {str(e)}", "data": None,
+                    "next_cursor": None}
+
     def notificar_cambio_estado_pedido(self, id_cliente, id_pedido, estado_nuevo):
         """Crea una notificación por cambio de estado de un pedido.
         Devuelve directamente el dict de la notificación creada (no el wrapper),
@@ -1,9 +1,16 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import logging
+
 from dao.pedidoDAO import PedidoDAO
+from dao.empleadoDAO import EmpleadoDAO
+from manager.kpiManager import KpiManager
+from manager.inventarioManager import InventarioManager
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 class PedidoManager:
     """
@@ -12,10 +19,14 @@ class PedidoManager:
     
     def __init__(self):
         self.dao = PedidoDAO()
+        self.kpi = KpiManager()
+        self.inventario = InventarioManager()
+        self.empleado_dao = EmpleadoDAO()
 
-    def obtenerHistorialCliente(self, id_cliente, filtros=None):
+    def obtenerHistorialCliente(self, id_cliente, filtros=None, cursor=None, tamanio=None):
         """
-        Obtiene el historial completo de pedidos de un cliente
+        Obtiene el historial de pedidos de un cliente; los filtros se aplican en la base
+        y solo se cargan los detalles de los pedidos devueltos
         
         Args:
             id_cliente: ID del cliente
@@ -23,38 +34,37 @@ class PedidoManager:
                 - estado: filtrar por estado específico
                 - fecha_inicio: fecha de inicio (YYYY-MM-DD)
                 - fecha_fin: fecha de fin (YYYY-MM-DD)
+                - id_sede: filtrar por sede
+            cursor: cursor de la página anterior (solo con tamanio)
+            tamanio: pedidos por página; None trae todo el historial
                 
         Returns:
-            dict con 'success', 'message' y 'data' (lista de pedidos)
+            dict con 'success', 'message', 'data' (lista de pedidos) y 'next_cursor'
         """
         try:
-            # Obtener pedidos del cliente
-            pedidos = self.dao.listar_por_cliente(id_cliente)
-            
-            # Aplicar filtros si existen
-            if filtros:
-                if 'estado' in filtros and filtros['estado']:
-                    pedidos = [p for p in pedidos if p.estado == filtros['estado']]
-                
-                if 'fecha_inicio' in filtros and filtros['fecha_inicio']:
-                    # Extraer solo la parte de fecha para comparar (YYYY-MM-DD)
-                    pedidos = [p for p in pedidos if p.fecha and str(p.fecha)[:10] >= filtros['fecha_inicio']]
-                
-                if 'fecha_fin' in filtros and filtros['fecha_fin']:
-                    # Extraer solo la parte de fecha para comparar (YYYY-MM-DD)
-                    pedidos = [p for p in pedidos if p.fecha and str(p.fecha)[:10] <= filtros['fecha_fin']]
+            filtros = filtros or {}
+            consulta = self.dao.consulta().del_cliente(id_cliente)\
+                .con_estado(filtros.get('estado'))\
+                .en_sede(filtros.get('id_sede'))\
+                .desde(filtros.get('fecha_inicio'))\
+                .hasta(filtros.get('fecha_fin'))
+            if tamanio is not None:
+                consulta = consulta.pagina(cursor, tamanio)
+            pedidos, siguiente = consulta.ejecutar()
             
             return {
                 'success': True,
                 'message': f'Se encontraron {len(pedidos)} pedidos',
-                'data': pedidos
+                'data': pedidos,
+                'next_cursor': siguiente
             }
             
         except Exception as e:
             return {
                 'success': False,
                 'message': f'Error al obtener historial: {str(e)}',
-                'data': []
+                'data': [],
+                'next_cursor': None
             }
     
     def obtenerDetallePedido(self, id_pedido):
@@ -90,18 +100,19 @@ class PedidoManager:
                 'data': None
             }
     
-    def listarPedidosPorEstado(self, estado):
+    def listarPedidosPorEstado(self, estado, cargar_detalles=True):
         """
         Lista todos los pedidos con un estado específico
         
         Args:
             estado: Estado del pedido (pendiente, en_proceso, completado, cancelado)
+            cargar_detalles: Si es False no se consultan las líneas de detalle
             
         Returns:
             dict con 'success', 'message' y 'data' (lista de pedidos)
         """
         try:
-            pedidos = self.dao.listar_por_estado(estado)
+            pedidos = self.dao.listar_por_estado(estado, cargar_detalles=cargar_detalles)
             
             return {
                 'success': True,
@@ -116,13 +127,14 @@ class PedidoManager:
                 'data': []
             }
     
-    def listarPedidosPorFecha(self, fecha_inicio, fecha_fin):
+    def listarPedidosPorFecha(self, fecha_inicio, fecha_fin, cargar_detalles=True):
         """
         Lista pedidos en un rango de fechas
         
         Args:
             fecha_inicio: Fecha de inicio (YYYY-MM-DD)
             fecha_fin: Fecha de fin (YYYY-MM-DD)
+            cargar_detalles: Si es False no se consultan las líneas de detalle
             
         Returns:
             dict con 'success', 'message' y 'data' (lista de pedidos)
@@ -139,7 +151,7 @@ class PedidoManager:
                     'data': []
                 }
             
-            pedidos = self.dao.listar_por_fecha(fecha_inicio, fecha_fin)
+            pedidos = self.dao.listar_por_fecha(fecha_inicio, fecha_fin, cargar_detalles=cargar_detalles)
             
             return {
                 'success': True,
@@ -154,18 +166,19 @@ class PedidoManager:
                 'data': []
             }
     
-    def listarTodosPedidos(self, limite=100):
+    def listarTodosPedidos(self, limite=100, cargar_detalles=True):
         """
         Lista todos los pedidos con límite opcional
         
         Args:
             limite: Número máximo de pedidos a retornar
+            cargar_detalles: Si es False no se consultan las líneas de detalle
             
         Returns:
             dict con 'success', 'message' y 'data' (lista de pedidos)
         """
         try:
-            pedidos = self.dao.listar_todos(limite)
+            pedidos = self.dao.listar_todos(limite, cargar_detalles=cargar_detalles)
             
             return {
                 'success': True,
@@ -180,6 +193,36 @@ class PedidoManager:
                 'data': []
             }
     
+    def listarPaginaPedidos(self, cursor=None, tamanio=100, cargar_detalles=True):
+        """
+        Lista una página de pedidos (más recientes primero) con paginación por cursor
+        
+        Args:
+            cursor: cursor devuelto por la página anterior (None para la primera)
+            tamanio: pedidos por página
+            cargar_detalles: Si es False no se consultan las líneas de detalle
+            
+        Returns:
+            dict con 'success', 'message', 'data' (lista de pedidos) y 'next_cursor'
+        """
+        try:
+            pedidos, siguiente = self.dao.listar_pagina(cursor, tamanio, cargar_detalles=cargar_detalles)
+            
+            return {
+                'success': True,
+                'message': f'Se encontraron {len(pedidos)} pedidos',
+                'data': pedidos,
+                'next_cursor': siguiente
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error al listar pedidos: {str(e)}',
+                'data': [],
+                'next_cursor': None
+            }
+    
     # Métodos pendientes de implementación (para otras HUs)
     def obtenerPersonalizacion(self):
         """
@@ -201,11 +244,12 @@ class PedidoManager:
             pedido = self.dao.crear_pedido(id_cliente, detalles)
             if not pedido:
                 return {'success': False, 'message': 'No fue posible crear el pedido', 'data': None}
+            self.kpi.registrarPedidoCreado(pedido)
             return {'success': True, 'message': 'Pedido creado correctamente', 'data': pedido}
         except Exception as e:
             return {'success': False, 'message': f'Error al crear pedido: {str(e)}', 'data': None}
 
-    def actualizarEstado(self, id_pedido, nuevo_estado, id_empleado=None):
+    def actualizarEstado(self, id_pedido, nuevo_estado, id_empleado=None, id_usuario=None):
         """
         Actualiza el estado de un pedido con validaciones (HU20)
         
@@ -213,6 +257,8 @@ class PedidoManager:
             id_pedido: ID del pedido a actualizar
             nuevo_estado: Nuevo estado del pedido
             id_empleado: ID del empleado que realiza el cambio (opcional)
+            id_usuario: ID del usuario que realiza el cambio (opcional; si falta se toma el
+                del empleado). Completar un pedido lo requiere para registrar los movimientos
             
         Returns:
             dict con 'success', 'message' y 'data' (pedido actualizado)
@@ -252,19 +298,50 @@ class PedidoManager:
                     'data': None
                 }
             
-            # Actualizar el estado
-            pedido_actualizado = self.dao.actualizar_estado(id_pedido, nuevo_estado)
+            if nuevo_estado == 'completado':
+                if id_usuario is None:
+                    id_usuario = self._usuarioDeEmpleado(id_empleado)
+                if id_usuario is None:
+                    return {
+                        'success': False,
+                        'message': 'Para completar un pedido se requiere el empleado que lo registra (id_empleado)',
+                        'data': None
+                    }
+            
+            # Solo cambia si sigue en el estado leído: dos solicitudes simultáneas no pueden
+            # completar (y descontar stock) el mismo pedido dos veces
+            pedido_actualizado = self.dao.actualizar_estado(id_pedido, nuevo_estado, estado_anterior=estado_actual)
             
             if not pedido_actualizado:
                 return {
                     'success': False,
-                    'message': 'Error al actualizar el estado del pedido',
+                    'message': f'No se pudo actualizar el estado: el pedido ya no está en "{estado_actual}" o hubo un error',
                     'data': None
                 }
             
+            # Al completar se consumen los insumos de las recetas; sin stock vuelve al estado anterior
+            mensaje = f'Estado del pedido actualizado de "{estado_actual}" a "{nuevo_estado}"'
+            if nuevo_estado == 'completado':
+                descuento = self.inventario.descontarStockPorPedido(id_pedido, pedido=pedido_actual, id_usuario=id_usuario)
+                if descuento.get('incierto'):
+                    # El descuento pudo haberse confirmado: revertir dejaría el stock descontado
+                    # con el pedido sin completar, así que queda completado para revisar a mano
+                    logger.error(f"Pedido {id_pedido} completado con descuento de stock incierto, "
+                                 f"revisar movimientos 'Pedido #{id_pedido}': {descuento['mensaje']}")
+                    mensaje += f'. No se pudo confirmar el descuento de stock: {descuento["mensaje"]}'
+                elif not descuento['exito']:
+                    self.dao.actualizar_estado(id_pedido, estado_actual, estado_anterior=nuevo_estado)
+                    return {
+                        'success': False,
+                        'message': f'No se pudo completar el pedido: {descuento["mensaje"]}',
+                        'data': {'faltantes': descuento.get('faltantes', [])}
+                    }
+            
+            self.kpi.registrarCambioEstado(estado_actual, nuevo_estado)
+            
             return {
                 'success': True,
-                'message': f'Estado del pedido actualizado de "{estado_actual}" a "{nuevo_estado}"',
+                'message': mensaje,
                 'data': pedido_actualizado
             }
             
@@ -275,6 +352,16 @@ class PedidoManager:
                 'data': None
             }
 
+    def _usuarioDeEmpleado(self, id_empleado):
+        """id_usuario del empleado o None si no se indicó o no existe"""
+        if id_empleado is None:
+            return None
+        try:
+            resp = self.empleado_dao.obtener_por_id(int(id_empleado))
+            return resp.data[0].get('id_usuario') if resp.data else None
+        except (TypeError, ValueError):
+            return None
+
     def procesarPago(self, id_pedido, metodo_pago, transaccion_id=None):
         """
         Procesa el pago de un pedido (HU15 - Pago en Línea)
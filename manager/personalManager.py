@@ -134,6 +134,48 @@ class PersonalManager:
                 "data": None
             }
 
+    def listarPagina(self, cursor=None, tamanio=100, id_sede=None, solo_activos=False):
+        """
+        Lista una página de empleados (más recientes primero) con paginación por cursor
+        
+        Args:
+            cursor: cursor devuelto por la página anterior (None para la primera)
+            tamanio: empleados por página
+            id_sede: solo los de esa sede (opcional; debe existir)
+            solo_activos: solo empleados con usuario activo
+            
+        Returns:
+            dict con success, message, data, next_cursor
+        """
+        try:
+            if id_sede is not None:
+                resp_sede = self.sedeDAO.obtener(id_sede)
+                if not resp_sede.data:
+                    return {
+                        "success": False,
+                        "message": "Sede no encontrada",
+                        "data": None,
+                        "next_cursor": None
+                    }
+            
+            empleados, siguiente = self.empleadoDAO.listar_pagina(cursor, tamanio, id_sede=id_sede,
+                                                                  solo_activos=solo_activos)
+            
+            return {
+                "success": True,
+                "message": f"Se encontraron {len(empleados)} empleados" if empleados else "No hay empleados registrados",
+                "data": empleados,
+                "next_cursor": siguiente
+            }
+        except Exception as e:
+            logger.error(f"Error al listar empleados: {str(e)}")
+            return {
+                "success": False,
+                "message": f"Error al listar empleados: {str(e)}",
+                "data": None,
+                "next_cursor": None
+            }
+
     def obtenerEmpleado(self, id_empleado):
         """
         Obtiene detalle de un empleado con información de usuario y sede
@@ -0,0 +1,336 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from dao.productoInsumoDAO import ProductoInsumoDAO
+from dao.detalleCompraDAO import DetalleCompraDAO
+from dao.productoDAO import ProductoDAO
+from entidades.productoInsumo import ProductoInsumo
+from utils import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+# Compras más recientes por insumo que entran al promedio ponderado del costo unitario
+VENTANA_COMPRAS = 50
+# Segundos antes de recargar el índice completo (recoge cambios hechos por otros procesos)
+TTL_INDICE = 600
+# Reporte de costos y márgenes de todos los productos activos (se invalida con cada cambio)
+CLAVE_REPORTE_COSTOS = 'reporte_costos_productos'
+# Insumos que más pesan en el costo que se informan por producto
+INSUMOS_PRINCIPALES = 3
+
+for _entidad in ('receta', 'detalle_compra', 'producto'):
+    catalog_cache.register_dependency(_entidad, CLAVE_REPORTE_COSTOS)
+
+
+class _IndiceRecetas:
+    """Estado compartido del índice (uno por proceso)."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.cargado_en = None
+        self.por_producto = {}    # id_producto -> {id_insumo: cantidad_necesaria}
+        self.por_insumo = {}      # id_insumo -> set(id_producto)
+        self.compras = {}         # id_insumo -> deque[(cantidad, subtotal)] (últimas VENTANA_COMPRAS)
+        self.sumas = {}           # id_insumo -> [cantidad_total, subtotal_total] de la ventana
+        self.insumos_cargados = set()  # insumos cuya ventana de compras está en memoria
+        self.productos_sucios = set()
+        self.insumos_sucios = set()
+
+    # -- recetas
+    def fijar_receta(self, id_producto, lineas):
+        for id_insumo in self.por_producto.pop(id_producto, {}):
+            productos = self.por_insumo.get(id_insumo)
+            if productos:
+                productos.discard(id_producto)
+        receta = {}
+        for linea in lineas:
+            if linea.id_insumo is None or linea.cantidad_necesaria is None:
+                continue
+            receta[int(linea.id_insumo)] = receta.get(int(linea.id_insumo), 0.0) + float(linea.cantidad_necesaria)
+        if receta:
+            self.por_producto[id_producto] = receta
+            for id_insumo in receta:
+                self.por_insumo.setdefault(id_insumo, set()).add(id_producto)
+
+    # -- costos
+    def agregar_compra(self, id_insumo, cantidad, subtotal):
+        ventana = self.compras.setdefault(id_insumo, deque())
+        suma = self.sumas.setdefault(id_insumo, [0.0, 0.0])
+        ventana.append((cantidad, subtotal))
+        suma[0] += cantidad
+        suma[1] += subtotal
+        if len(ventana) > VENTANA_COMPRAS:
+            viejo_cant, viejo_sub = ventana.popleft()
+            suma[0] -= viejo_cant
+            suma[1] -= viejo_sub
+
+    def fijar_compras(self, id_insumo, filas):
+        self.compras.pop(id_insumo, None)
+        self.sumas.pop(id_insumo, None)
+        self.insumos_cargados.add(id_insumo)
+        for fila in filas:
+            self._agregar_fila(fila)
+
+    def _agregar_fila(self, fila):
+        if fila.get('id_insumo') is None:
+            return
+        try:
+            cantidad = float(fila.get('cantidad') or 0)
+            subtotal = float(fila.get('subtotal') or 0)
+        except (TypeError, ValueError):
+            return
+        self.agregar_compra(int(fila['id_insumo']), cantidad, subtotal)
+
+
+_indice = _IndiceRecetas()
+
+
+class RecetaManager:
+    """
+    Índice en memoria de recetas (producto_insumo por producto y por insumo) y del costo
+    unitario de cada insumo como promedio ponderado de sus últimas VENTANA_COMPRAS compras.
+
+    Se carga una vez por proceso (y cada TTL_INDICE) con todas las recetas y solo la ventana de
+    compras de los insumos que las usan; la ventana de otro insumo se lee la primera vez que
+    se consulta. Después se mantiene con los eventos de catalog_cache que emiten
+    ProductoInsumoDAO ('receta') y DetalleCompraDAO ('detalle_compra'), de modo que costo y
+    margen de un producto se calculan en memoria en O(tamaño de la receta).
+    """
+
+    def __init__(self):
+        self.producto_insumo_dao = ProductoInsumoDAO()
+        self.detalle_compra_dao = DetalleCompraDAO()
+        self.producto_dao = ProductoDAO()
+
+    # ------------------------------------------------------------------ carga
+    def refrescar(self):
+        """Recarga las recetas y la ventana de compras de cada insumo usado en ellas"""
+        recetas = self.producto_insumo_dao.listar_todos()
+        insumos = {int(linea.id_insumo) for linea in recetas if linea.id_insumo is not None}
+        compras = self.detalle_compra_dao.listar_ventanas_costos(insumos, VENTANA_COMPRAS) if insumos else []
+        with _indice.lock:
+            _indice.por_producto, _indice.por_insumo = {}, {}
+            agrupadas = {}
+            for linea in recetas:
+                agrupadas.setdefault(int(linea.id_producto), []).append(linea)
+            for id_producto, lineas in agrupadas.items():
+                _indice.fijar_receta(id_producto, lineas)
+            _indice.compras, _indice.sumas = {}, {}
+            _indice.insumos_cargados = insumos
+            for fila in compras:
+                _indice._agregar_fila(fila)
+            _indice.productos_sucios.clear()
+            _indice.insumos_sucios.clear()
+            _indice.cargado_en = time.time()
+
+    def _asegurar(self):
+        """Carga el índice si hace falta y recarga lo marcado como desactualizado"""
+        if _indice.cargado_en is None or time.time() - _indice.cargado_en > TTL_INDICE:
+            self.refrescar()
+            return
+        with _indice.lock:
+            productos = list(_indice.productos_sucios)
+            insumos = list(_indice.insumos_sucios)
+            _indice.productos_sucios.clear()
+            _indice.insumos_sucios.clear()
+        for id_producto in productos:
+            lineas = self.producto_insumo_dao.listar_por_productos([id_producto])
+            with _indice.lock:
+                _indice.fijar_receta(id_producto, lineas)
+        for id_insumo in insumos:
+            self._cargar_compras(id_insumo)
+        with _indice.lock:
+            # Insumos que entraron a una receta después de la carga
+            faltantes = set(_indice.por_insumo) - _indice.insumos_cargados
+        if faltantes:
+            filas = self.detalle_compra_dao.listar_ventanas_costos(faltantes, VENTANA_COMPRAS)
+            with _indice.lock:
+                for id_insumo in faltantes:
+                    _indice.fijar_compras(id_insumo, [f for f in filas if int(f['id_insumo']) == id_insumo])
+
+    def _cargar_compras(self, id_insumo):
+        """Lee la ventana de compras de un insumo y la reemplaza en el índice"""
+        filas = self.detalle_compra_dao.listar_por_insumo(id_insumo, limite=VENTANA_COMPRAS)
+        with _indice.lock:
+            # listar_por_insumo devuelve de la más reciente a la más antigua
+            _indice.fijar_compras(id_insumo, reversed(filas))
+
+    # ---------------------------------------------------------------- consultas
+    def receta(self, id_producto):
+        """Receta del producto como lista de ProductoInsumo (sin consultar la base)"""
+        self._asegurar()
+        with _indice.lock:
+            receta = dict(_indice.por_producto.get(int(id_producto), {}))
+        return [ProductoInsumo(id_producto=int(id_producto), id_insumo=i, cantidad_necesaria=c)
+                for i, c in sorted(receta.items())]
+
+    def productosConInsumo(self, id_insumo):
+        """IDs de los productos cuya receta usa el insumo"""
+        self._asegurar()
+        with _indice.lock:
+            return set(_indice.por_insumo.get(int(id_insumo), ()))
+
+    def costoUnitario(self, id_insumo):
+        """Costo unitario promedio ponderado (subtotal / cantidad) o None sin compras"""
+        self._asegurar()
+        id_insumo = int(id_insumo)
+        with _indice.lock:
+            cargado = id_insumo in _indice.insumos_cargados
+        if not cargado:
+            self._cargar_compras(id_insumo)
+        with _indice.lock:
+            return self._costo_unitario(id_insumo)
+
+    @staticmethod
+    def _costo_unitario(id_insumo):
+        suma = _indice.sumas.get(id_insumo)
+        if not suma or suma[0] <= 0:
+            return None
+        return suma[1] / suma[0]
+
+    def desgloseCosto(self, id_producto):
+        """
+        Costo de la receta de un producto con su desglose por línea
+
+        Returns:
+            (costo_total, lineas): costo_total es None si el producto no tiene receta;
+            cada línea es {'id_insumo', 'cantidad', 'costo_unitario', 'costo_linea'}
+        """
+        self._asegurar()
+        with _indice.lock:
+            receta = dict(_indice.por_producto.get(int(id_producto), {}))
+            lineas = []
+            for id_insumo, cantidad in sorted(receta.items()):
+                unitario = self._costo_unitario(id_insumo)
+                lineas.append({
+                    'id_insumo': id_insumo,
+                    'cantidad': cantidad,
+                    'costo_unitario': unitario,
+                    'costo_linea': unitario * cantidad if unitario is not None else None,
+                })
+        if not lineas:
+            return None, []
+        return sum(l['costo_linea'] for l in lineas if l['costo_linea'] is not None), lineas
+
+    def costoProducto(self, id_producto):
+        """Costo estimado de una unidad del producto (None sin receta)"""
+        return self.desgloseCosto(id_producto)[0]
+
+    def margenProducto(self, id_producto, precio):
+        """
+        Margen de un producto a un precio dado
+
+        Returns:
+            dict {'costo', 'margen', 'margen_pct', 'completo'}; 'completo' es False si algún
+            insumo de la receta no tiene compras registradas (costo subestimado)
+        """
+        costo, lineas = self.desgloseCosto(id_producto)
+        precio = float(precio or 0)
+        if costo is None:
+            return {'costo': None, 'margen': None, 'margen_pct': None, 'completo': False}
+        margen = precio - costo
+        return {
+            'costo': costo,
+            'margen': margen,
+            'margen_pct': (margen / precio * 100) if precio else None,
+            'completo': all(l['costo_unitario'] is not None for l in lineas),
+        }
+
+    # ----------------------------------------------------------------- reporte
+    def reporteCostos(self):
+        """
+        Costo de receta, precio y margen de todos los productos activos
+
+        Se arma con las recetas, la ventana de compras recientes de sus insumos (no todo
+        detalle_compra) y los productos activos, y queda en catalog_cache hasta que cambie
+        una receta, una compra o un producto.
+
+        Returns:
+            dict con success, message y data {'filas': [...], 'generado': iso}; cada fila trae
+            id_producto, codigo, nombre, precio, costo, margen, margen_pct, completo e
+            insumos_principales [{'id_insumo', 'costo_linea', 'participacion'}]
+        """
+        try:
+            data = catalog_cache.get_or_cache(CLAVE_REPORTE_COSTOS, ttl=TTL_INDICE, loader=self._armarReporteCostos)
+            return {'success': True, 'message': f"{len(data['filas'])} productos", 'data': data}
+        except Exception as e:
+            logger.error(f"Error al armar el reporte de costos: {e}")
+            return {'success': False, 'message': f'Error al armar el reporte de costos: {str(e)}', 'data': None}
+
+    def _armarReporteCostos(self):
+        # Recarga recetas y ventanas de compras para no depender de eventos de otros workers
+        self.refrescar()
+        productos = list(self.producto_dao.iterar_activos(columnas='id_producto,codigo,nombre,precio'))
+        with _indice.lock:
+            unitarios = {i: self._costo_unitario(i) for i in _indice.sumas}
+            recetas = {p: dict(r) for p, r in _indice.por_producto.items()}
+
+        filas = []
+        for producto in productos:
+            id_producto = int(producto['id_producto'])
+            precio = float(producto.get('precio') or 0)
+            lineas = []
+            completo = True
+            for id_insumo, cantidad in recetas.get(id_producto, {}).items():
+                unitario = unitarios.get(id_insumo)
+                if unitario is None:
+                    completo = False
+                    continue
+                lineas.append((unitario * cantidad, id_insumo))
+            receta = id_producto in recetas
+            costo = sum(c for c, _ in lineas) if receta else None
+            margen = precio - costo if costo is not None else None
+            lineas.sort(reverse=True)
+            filas.append({
+                'id_producto': id_producto,
+                'codigo': producto.get('codigo'),
+                'nombre': producto.get('nombre'),
+                'precio': precio,
+                'costo': costo,
+                'margen': margen,
+                'margen_pct': (margen / precio * 100) if margen is not None and precio else None,
+                'completo': receta and completo,
+                'insumos_principales': [
+                    {'id_insumo': i, 'costo_linea': c, 'participacion': (c / costo * 100) if costo else None}
+                    for c, i in lineas[:INSUMOS_PRINCIPALES]
+                ],
+            })
+        # Primero los márgenes más bajos; al final los productos sin receta o sin precio
+        filas.sort(key=lambda f: (f['margen_pct'] is None, f['margen_pct'] or 0, f['id_producto']))
+        return {'filas': filas, 'generado': datetime.now().isoformat(timespec='seconds')}
+
+
+def _al_cambiar_receta(entidad, id_producto=None, filas=None, **info):
+    with _indice.lock:
+        if _indice.cargado_en is None:
+            return
+        if id_producto is None:
+            # No se sabe qué recetas cambiaron: recarga completa en la próxima consulta
+            _indice.cargado_en = None
+        elif filas is not None:
+            _indice.fijar_receta(int(id_producto), filas)
+            _indice.productos_sucios.discard(int(id_producto))
+        else:
+            _indice.productos_sucios.add(int(id_producto))
+
+
+def _al_cambiar_compra(entidad, filas=None, id_insumo=None, **info):
+    with _indice.lock:
+        if _indice.cargado_en is None:
+            return
+        for fila in filas or []:
+            # Un insumo sin ventana cargada la lee completa cuando se lo consulte
+            if fila.get('id_insumo') is not None and int(fila['id_insumo']) in _indice.insumos_cargados:
+                _indice._agregar_fila(fila)
+        if id_insumo is not None:
+            _indice.insumos_sucios.add(int(id_insumo))
+
+
+catalog_cache.subscribe('receta', _al_cambiar_receta)
+catalog_cache.subscribe('detalle_compra', _al_cambiar_compra)
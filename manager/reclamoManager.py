@@ -216,6 +216,35 @@ class ReclamoManager:
                 'data': []
             }
     
+    def listarPaginaReclamos(self, cursor=None, tamanio=100):
+        """
+        Lista una página de reclamos (más recientes primero) con paginación por cursor
+        
+        Args:
+            cursor: cursor devuelto por la página anterior (None para la primera)
+            tamanio: reclamos por página
+            
+        Returns:
+            dict con 'success', 'message', 'data' y 'next_cursor'
+        """
+        try:
+            reclamos, siguiente = self.dao.listar_pagina(cursor, tamanio)
+            
+            return {
+                'success': True,
+                'message': f'Se encontraron {len(reclamos)} reclamos',
+                'data': reclamos,
+                'next_cursor': siguiente
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error al listar reclamos: {str(e)}',
+                'data': [],
+                'next_cursor': None
+            }
+    
     def cambiarEstadoReclamo(self, id_reclamo, nuevo_estado):
         """
         Cambia el estado de un reclamo
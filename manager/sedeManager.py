@@ -1,5 +1,6 @@
 from dao.sedeDAO import SedeDAO
 from entidades.sede import Sede
+from utils.concurrencia import en_paralelo
 
 class SedeManager:
     def __init__(self):
@@ -245,22 +246,18 @@ class SedeManager:
     def vistaConsolidada(self, id_sede, filtro=None):
         """
         Vista consolidada con personal, inventario y pedidos.
+        Las secciones pedidas se consultan en paralelo.
         Retorna dict.
         """
 
-        data = {}
-
-        if filtro in (None, "personal"):
-            empleados = self.dao.supabase.table("empleado").select("*").eq("id_sede", id_sede).execute()
-            data["personal"] = empleados.data
-
-        if filtro in (None, "inventario"):
-            inventario = self.dao.supabase.table("inventario").select("*").execute()
-            data["inventario"] = inventario.data
-
-        if filtro in (None, "pedidos"):
-            pedidos = self.dao.supabase.table("pedido").select("*").eq("id_sede", id_sede).execute()
-            data["pedidos"] = pedidos.data
+        supabase = self.dao.supabase
+        consultas = {
+            "personal": lambda: supabase.table("empleado").select("*").eq("id_sede", id_sede).execute().data,
+            "inventario": lambda: supabase.table("inventario").select("*").execute().data,
+            "pedidos": lambda: supabase.table("pedido").select("*").eq("id_sede", id_sede).execute().data,
+        }
+        data = en_paralelo({seccion: consulta for seccion, consulta in consultas.items()
+                            if filtro in (None, seccion)})
 
         return {
             "success": True,
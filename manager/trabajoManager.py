@@ -0,0 +1,153 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import csv
+import logging
+
+from dao.pedidoDAO import PedidoDAO
+from dao.productoDAO import ProductoDAO
+from utils import job_queue
+
+logger = logging.getLogger(__name__)
+
+ENCABEZADO_PEDIDOS_CSV = ['id_pedido', 'id_cliente', 'id_sede', 'fecha', 'estado', 'total', 'metodo_pago',
+                          'estado_pago', 'detalles_count']
+ENCABEZADO_PRODUCTOS_CSV = ['id_producto', 'codigo', 'nombre', 'precio', 'stock', 'activo']
+# Cada cuántas filas escritas se informa el avance de una exportación
+AVANCE_CADA = 1000
+
+# Tipos que un administrador puede encolar desde el panel:
+# tipo -> (descripción, max_intentos, reintentable). Los no reintentables tienen efectos que no se
+# pueden repetir sin duplicar (el envío masivo volvería a insertar las notificaciones ya enviadas)
+TIPOS_TRABAJO = {
+    'export_pedidos_csv': ('Exportar pedidos (CSV)', job_queue.MAX_INTENTOS, True),
+    'export_productos_csv': ('Exportar productos activos (CSV)', job_queue.MAX_INTENTOS, True),
+    'reconciliar_kpis': ('Reconciliar KPIs del panel', job_queue.MAX_INTENTOS, True),
+    'notificacion_masiva': ('Envío masivo de notificaciones', 1, False),
+}
+
+
+def _reintentable(tipo):
+    return TIPOS_TRABAJO.get(tipo, (None, None, True))[2]
+
+
+def _escribir_csv(ctx, nombre, encabezado, registros):
+    escritas = 0
+    with open(ctx.result_path(nombre), 'w', newline='', encoding='utf-8') as archivo:
+        writer = csv.writer(archivo)
+        writer.writerow(encabezado)
+        for registro in registros:
+            writer.writerow([registro.get(col) for col in encabezado])
+            escritas += 1
+            if escritas % AVANCE_CADA == 0:
+                ctx.progress(escritas, mensaje=f'{escritas} filas')
+    return {'filas': escritas, 'archivo': nombre}
+
+
+@job_queue.register('export_pedidos_csv')
+def _export_pedidos_csv(payload, ctx):
+    pedidos = PedidoDAO().iterar_por_fecha(estado=payload.get('estado') or None,
+                                           desde=payload.get('desde') or None,
+                                           hasta=payload.get('hasta') or None)
+    return _escribir_csv(ctx, 'pedidos.csv', ENCABEZADO_PEDIDOS_CSV, pedidos)
+
+
+@job_queue.register('export_productos_csv')
+def _export_productos_csv(payload, ctx):
+    return _escribir_csv(ctx, 'productos.csv', ENCABEZADO_PRODUCTOS_CSV, ProductoDAO().iterar_activos())
+
+
+@job_queue.register('reconciliar_kpis')
+def _reconciliar_kpis(payload, ctx):
+    from manager.kpiManager import KpiManager
+    resultado = KpiManager().reconciliar()
+    if not resultado.get('success'):
+        # Se lanza para que la cola lo reintente con espera
+        raise RuntimeError(resultado.get('message'))
+    return resultado.get('data')
+
+
+@job_queue.register('notificacion_masiva')
+def _notificacion_masiva(payload, ctx):
+    from manager.notificacionManager import NotificacionManager
+    lista, mensaje = payload.get('lista_clientes') or [], payload.get('mensaje')
+    if not lista or not mensaje:
+        raise ValueError('lista_clientes y mensaje son requeridos')
+    manager = NotificacionManager()
+    progreso = manager._nuevoProgreso(lista)
+    manager._procesarEnvioMasivo(lista, mensaje, progreso, al_avanzar=lambda p: ctx.progress(
+        p['procesados'], p['total'], f"{p['procesados']} de {p['total']} procesados"))
+    return {'total': progreso['total'], 'procesados': progreso['procesados'],
+            'total_exitosas': progreso['total_exitosas'], 'errores': progreso['errores']}
+
+
+class TrabajoManager:
+    """
+    Trabajos administrativos lentos ejecutados por `manage.py procesar_trabajos`
+    """
+
+    def encolar(self, tipo, payload=None, creado_por=None):
+        """
+        Encola un trabajo de uno de los TIPOS_TRABAJO
+
+        Args:
+            tipo: clave de TIPOS_TRABAJO
+            payload: parámetros del trabajo (serializables a JSON)
+            creado_por: id del usuario que lo pidió (para auditoría)
+        """
+        try:
+            payload = payload or {}
+            if tipo not in TIPOS_TRABAJO:
+                return {"success": False, "message": f"Tipo de trabajo no permitido: {tipo}", "data": None}
+            if tipo == 'notificacion_masiva' and not (payload.get('lista_clientes') and payload.get('mensaje')):
+                return {"success": False, "message": "El envío masivo requiere clientes y mensaje", "data": None}
+            _, max_intentos, _ = TIPOS_TRABAJO[tipo]
+            id_trabajo = job_queue.enqueue(tipo, payload, max_intentos=max_intentos, creado_por=creado_por)
+            return {"success": True, "message": "Trabajo encolado", "data": {"id": id_trabajo}}
+        except Exception as e:
+            logger.exception("Error al encolar trabajo %s", tipo)
+            return {"success": False, "message": f"Error al encolar trabajo: {str(e)}", "data": None}
+
+    def obtenerTrabajo(self, id_trabajo):
+        """Estado, progreso y resultado de un trabajo"""
+        try:
+            trabajo = job_queue.get(id_trabajo)
+            if not trabajo:
+                return {"success": False, "message": "Trabajo no encontrado", "data": None}
+            return {"success": True, "message": "Trabajo encontrado", "data": trabajo}
+        except Exception as e:
+            return {"success": False, "message": f"Error al obtener trabajo: {str(e)}", "data": None}
+
+    def listarTrabajos(self, limite=50, estado=None):
+        """Trabajos más recientes primero, opcionalmente filtrados por estado"""
+        try:
+            trabajos = job_queue.list_jobs(limit=limite, estado=estado or None)
+            for trabajo in trabajos:
+                trabajo['reintentable'] = _reintentable(trabajo.get('tipo'))
+            return {"success": True, "message": f"{len(trabajos)} trabajos", "data": trabajos}
+        except Exception as e:
+            return {"success": False, "message": f"Error al listar trabajos: {str(e)}", "data": []}
+
+    def reintentar(self, id_trabajo):
+        """Vuelve a encolar un trabajo que terminó en error o fue cancelado (si su tipo lo permite)"""
+        try:
+            trabajo = job_queue.get(id_trabajo)
+            if not trabajo:
+                return {"success": False, "message": "Trabajo no encontrado", "data": None}
+            if not _reintentable(trabajo.get('tipo')):
+                return {"success": False, "message": "Este tipo de trabajo no se puede reintentar: "
+                        "repetirlo duplicaría lo que ya se procesó", "data": None}
+            if job_queue.retry(id_trabajo):
+                return {"success": True, "message": "Trabajo reencolado", "data": {"id": id_trabajo}}
+            return {"success": False, "message": "Solo se reintentan trabajos con error o cancelados", "data": None}
+        except Exception as e:
+            return {"success": False, "message": f"Error al reintentar trabajo: {str(e)}", "data": None}
+
+    def cancelar(self, id_trabajo):
+        """Cancela un trabajo pendiente o en curso"""
+        try:
+            if job_queue.cancel(id_trabajo):
+                return {"success": True, "message": "Trabajo cancelado", "data": {"id": id_trabajo}}
+            return {"success": False, "message": "El trabajo ya terminó", "data": None}
+        except Exception as e:
+            return {"success": False, "message": f"Error al cancelar trabajo: {str(e)}", "data": None}
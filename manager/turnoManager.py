@@ -87,6 +87,33 @@ class TurnoManager:
             logger.error(f"Error al listar turnos: {str(e)}")
             return {"success": False, "message": f"Error al listar turnos: {str(e)}", "data": None}
 
+    def listarPagina(self, cursor=None, tamanio=100, id_empleado=None):
+        """Lista una página de turnos (opcionalmente de un empleado) con paginación por cursor (incluye 'next_cursor')"""
+        try:
+            turnos, siguiente = self.turnoDAO.listar_pagina(cursor, tamanio, id_empleado=id_empleado)
+            if not turnos:
+                mensaje = "No hay turnos para este empleado" if id_empleado is not None else "No hay turnos registrados"
+                return {"success": True, "message": mensaje, "data": [], "next_cursor": None}
+            return {"success": True, "message": "Turnos encontrados", "data": turnos, "next_cursor": siguiente}
+        except Exception as e:
+            logger.error(f"Error al listar turnos: {str(e)}")
+            return {"success": False, "message": f"Error al listar turnos: {str(e)}", "data": None, "next_cursor": None}
+
+    def listarPaginaDia(self, fecha, cursor=None, tamanio=100, id_sede=None):
+        """Lista una página de los turnos de un día (opcionalmente de una sede) por hora de inicio (incluye 'next_cursor')"""
+        try:
+            if id_sede is not None:
+                resp_sede = self.sedeDAO.obtener(id_sede)
+                if not resp_sede.data:
+                    return {"success": False, "message": "Sede no encontrada", "data": None, "next_cursor": None}
+            turnos, siguiente = self.turnoDAO.listar_pagina_dia(fecha, cursor, tamanio, id_sede=id_sede)
+            if not turnos:
+                return {"success": True, "message": f"No hay turnos para la fecha {fecha}", "data": [], "next_cursor": None}
+            return {"success": True, "message": f"Turnos del {fecha} encontrados", "data": turnos, "next_cursor": siguiente}
+        except Exception as e:
+            logger.error(f"Error al listar turnos por fecha: {str(e)}")
+            return {"success": False, "message": f"Error al listar turnos: {str(e)}", "data": None, "next_cursor": None}
+
     def listarPorEmpleado(self, id_empleado, limite=50):
         """Lista todos los turnos de un empleado"""
         try:
@@ -113,7 +140,7 @@ class TurnoManager:
         """Lista turnos de una sede en una fecha específica"""
         try:
             # Verificar sede existe
-            resp_sede = self.sedeDAO.obtener_por_id(id_sede)
+            resp_sede = self.sedeDAO.obtener(id_sede)
             if not resp_sede.data:
                 return {"success": False, "message": "Sede no encontrada", "data": None}
             
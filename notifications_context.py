@@ -1,7 +1,14 @@
 from dao.notificacionDAO import NotificacionDAO
 
 def notifications_badge(request):
-    """Context processor que expone conteo de notificaciones no leídas como 'notif_unread'."""
+    """Context processor que expone conteo de notificaciones no leídas como 'notif_unread'.
+
+    Reutiliza el valor calculado por NotificacionesCountMiddleware; solo consulta si el
+    middleware no corrió para este request.
+    """
+    count = getattr(request, 'unread_notif_count', None)
+    if count is not None:
+        return {'notif_unread': count}
     count = 0
     try:
         if request.user.is_authenticated:
@@ -9,7 +16,7 @@ def notifications_badge(request):
             if rol == 'cliente':
                 id_cliente = request.session.get('id_cliente')
                 if id_cliente:
-                    count = NotificacionDAO().contar_no_leidas(id_cliente)
+                    count = NotificacionDAO().contar_no_leidas_cacheado(id_cliente)
     except Exception:
         count = 0
     return {'notif_unread': count}
@@ -1,7 +1,11 @@
 from dao.notificacionDAO import NotificacionDAO
 
 class NotificacionesCountMiddleware:
-    """Inyecta conteo de notificaciones no leídas en request para el template base."""
+    """Inyecta conteo de notificaciones no leídas en request para el template base.
+
+    El conteo se calcula una sola vez por request (y se reutiliza entre requests vía
+    catalog_cache); el context processor `notifications_badge` lee este mismo valor.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
         self.dao = NotificacionDAO()
@@ -14,7 +18,7 @@ class NotificacionesCountMiddleware:
                 if rol == 'cliente':
                     id_cliente = request.session.get('id_cliente')
                     if id_cliente:
-                        request.unread_notif_count = self.dao.contar_no_leidas(id_cliente)
+                        request.unread_notif_count = self.dao.contar_no_leidas_cacheado(id_cliente)
         except Exception:
             request.unread_notif_count = 0
         return self.get_response(request)
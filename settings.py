@@ -43,7 +43,9 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'security_headers.SecurityHeadersMiddleware',
+    'hashing_middleware.HashingSaturadoMiddleware',
     'notifications_middleware.NotificacionesCountMiddleware',
+    'identity_map_middleware.IdentityMapMiddleware',
 ]
 
 ROOT_URLCONF = 'urls'
@@ -76,6 +78,13 @@ DATABASES = {
     }
 }
 
+# Login contra la tabla `usuario` de Supabase (una verificación bcrypt por login);
+# ModelBackend queda para usuarios que solo existen en Django (superusuarios)
+AUTHENTICATION_BACKENDS = [
+    'auth_backend.SupabaseBcryptBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
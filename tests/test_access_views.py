@@ -149,11 +149,135 @@ class AccessViewsTests(TestCase):
         resp = self.client.get(reverse('admin_funcionalidades'))
         self.assertEqual(resp.status_code, 403)
 
+    def test_admin_access_cache_estadisticas(self):
+        self.login_with_role('adminCache@test.com', 'pass', 'administrador')
+        from utils import catalog_cache
+        catalog_cache.get_or_cache('clave_prueba_cache', ttl=60, loader=lambda: [1, 2, 3])
+        resp = self.client.get(reverse('cache_estadisticas'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'clave_prueba_cache')
+        resp = self.client.post(reverse('cache_estadisticas'), {'key': 'clave_prueba_cache'})
+        self.assertEqual(resp.status_code, 302)
+
+    def test_cliente_forbidden_cache_estadisticas(self):
+        self.login_with_role('clienteCache@test.com', 'pass', 'cliente')
+        resp = self.client.get(reverse('cache_estadisticas'))
+        self.assertEqual(resp.status_code, 403)
+
+    def test_admin_auditoria_logs_filtros(self):
+        self.login_with_role('adminAuditoria@test.com', 'pass', 'administrador')
+        import json
+        import os
+        import tempfile
+        from unittest import mock
+        with tempfile.TemporaryDirectory() as carpeta:
+            log_file = os.path.join(carpeta, 'app.jsonl')
+            with open(log_file, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'ts': '2026-10-01T10:00:00Z', 'event': 'login', 'success': False}) + '\n')
+                f.write(json.dumps({'ts': '2026-10-02T10:00:00Z', 'event': 'pedido_creado', 'success': True}) + '\n')
+                f.write(json.dumps({'ts': '2026-10-03T10:00:00Z', 'event': 'login', 'success': True}) + '\n')
+            with mock.patch.dict(os.environ, {'APP_LOG_FILE': log_file}):
+                resp = self.client.get(reverse('auditoria_logs'), {'event': 'login', 'hasta': '2026-10-02'})
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual([e['ts'] for e in resp.context['entries']], ['2026-10-01T10:00:00Z'])
+
+    def test_admin_trabajos_encolar_estado_y_descarga(self):
+        self.login_with_role('adminTrabajos@test.com', 'pass', 'administrador')
+        import tempfile
+        from unittest import mock
+        from utils import job_queue
+        with tempfile.TemporaryDirectory() as carpeta, \
+                mock.patch.object(job_queue, 'DB_PATH', f'{carpeta}/jobs.sqlite3'), \
+                mock.patch.object(job_queue, 'RESULTS_DIR', carpeta):
+            resp = self.client.post(reverse('trabajos_admin'), {'tipo': 'export_productos_csv'})
+            self.assertEqual(resp.status_code, 302)
+            trabajo = job_queue.list_jobs()[0]
+            self.assertEqual(trabajo['creado_por'], 'adminTrabajos@test.com')
+            resp = self.client.get(reverse('trabajo_estado', args=[trabajo['id']]))
+            self.assertEqual(resp.json()['data']['estado'], 'pendiente')
+            self.assertEqual(self.client.get(reverse('trabajo_descargar', args=[trabajo['id']])).status_code, 404)
+
+            ctx = job_queue.JobContext(job_queue.claim('w1'))
+            with open(ctx.result_path('productos.csv'), 'w') as archivo:
+                archivo.write('id_producto\n1\n')
+            job_queue._terminar(trabajo['id'], job_queue.COMPLETADO, archivo=ctx.archivo)
+            resp = self.client.get(reverse('trabajo_descargar', args=[trabajo['id']]))
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(b''.join(resp.streaming_content), b'id_producto\n1\n')
+            resp.close()
+            self.assertContains(self.client.get(reverse('trabajos_admin')), 'export_productos_csv')
+
+    def test_empleado_forbidden_trabajos(self):
+        self.login_with_role('empleadoTrabajos@test.com', 'pass', 'empleado')
+        resp = self.client.get(reverse('trabajos_admin'))
+        self.assertEqual(resp.status_code, 403)
+
+    def test_admin_access_top_productos_filtros(self):
+        self.login_with_role('adminTop@test.com', 'pass', 'administrador')
+        from unittest import mock
+        from views import views as v
+        fila = {'id_producto': 3, 'nombre': 'Torta Tres Leches', 'cantidad_total': 9, 'subtotal_total': 90.0}
+        with mock.patch.object(v.DetallePedidoDAO, 'top_productos', return_value=[fila]) as top:
+            resp = self.client.get(reverse('admin_top_productos'), {'desde': '2026-01-01', 'hasta': '2026-01-31', 'sede': '2'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'Torta Tres Leches')
+        top.assert_called_once_with(desde='2026-01-01', hasta='2026-01-31', limite=50, id_sede=2)
+
+    def test_admin_export_pedidos_csv_streaming(self):
+        self.login_with_role('adminCSV@test.com', 'pass', 'administrador')
+        from unittest import mock
+        from views import views as v
+        filas = iter([{'id_pedido': 1, 'id_cliente': 4, 'id_sede': 2, 'fecha': '2026-01-10T10:00:00',
+                       'estado': 'pendiente', 'total': 25.5, 'metodo_pago': None, 'estado_pago': 'pendiente',
+                       'detalles_count': 3}])
+        with mock.patch.object(v.PedidoDAO, '__init__', return_value=None), \
+                mock.patch.object(v.PedidoDAO, 'iterar_por_fecha', return_value=filas) as iterar:
+            resp = self.client.get(reverse('export_pedidos_csv'), {'estado': 'pendiente', 'desde': '2026-01-01'})
+            contenido = b''.join(resp.streaming_content).decode('utf-8')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(contenido.splitlines()[1], '1,4,2,2026-01-10T10:00:00,pendiente,25.5,,pendiente,3')
+        iterar.assert_called_once_with(estado='pendiente', desde='2026-01-01', hasta=None)
+
+    def test_admin_export_pedidos_csv_fecha_invalida(self):
+        self.login_with_role('adminCSVFecha@test.com', 'pass', 'administrador')
+        resp = self.client.get(reverse('export_pedidos_csv'), {'desde': '10/01/2026'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_cliente_forbidden_export_productos_csv(self):
+        self.login_with_role('clienteCSV@test.com', 'pass', 'cliente')
+        resp = self.client.get(reverse('export_productos_csv'))
+        self.assertEqual(resp.status_code, 403)
+
+    def test_admin_reporte_costos_json_y_csv(self):
+        self.login_with_role('adminCostos@test.com', 'pass', 'administrador')
+        from unittest import mock
+        from views import views as v
+        fila = {'id_producto': 3, 'codigo': 'P3', 'nombre': 'Torta Tres Leches', 'precio': 20.0, 'costo': 8.0,
+                'margen': 12.0, 'margen_pct': 60.0, 'completo': True,
+                'insumos_principales': [{'id_insumo': 7, 'costo_linea': 6.0, 'participacion': 75.0}]}
+        reporte = {'success': True, 'data': {'filas': [fila], 'generado': '2026-10-17T10:00:00'}}
+        with mock.patch.object(v.receta_manager, 'reporteCostos', return_value=reporte), \
+                mock.patch.object(v, '_nombres_insumos', return_value={7: 'Leche'}):
+            resp_json = self.client.get(reverse('api_reporte_costos'))
+            resp_csv = self.client.get(reverse('export_reporte_costos_csv'))
+            resp_html = self.client.get(reverse('admin_reporte_costos'))
+            contenido = b''.join(resp_csv.streaming_content).decode('utf-8')
+        self.assertContains(resp_html, 'Leche (75%)')
+        self.assertEqual(resp_json.status_code, 200)
+        self.assertEqual(resp_json.json()['data'][0]['insumos_principales'][0]['nombre'], 'Leche')
+        self.assertEqual(contenido.splitlines()[1], '3,P3,Torta Tres Leches,20.0,8.0,12.0,60.0,True,Leche (75.0%)')
+
+    def test_empleado_forbidden_reporte_costos(self):
+        self.login_with_role('empleadoCostos@test.com', 'pass', 'empleado')
+        resp = self.client.get(reverse('admin_reporte_costos'))
+        self.assertEqual(resp.status_code, 403)
+
     def test_admin_access_admin_kpis(self):
         self.login_with_role('adminKPIs@test.com', 'pass', 'administrador')
         from views import views as v
         # Mock managers to return predictable structures
-        v.pedido_manager.listarTodosPedidos = lambda limite=500: {'success': True, 'data': [type('obj', (), {'estado': 'pendiente'})(), type('obj', (), {'estado': 'pendiente'})(), type('obj', (), {'estado': 'completado'})()], 'message': 'ok'}
+        v.pedido_manager.listarTodosPedidos = lambda limite=500, cargar_detalles=True: {'success': True, 'data': [type('obj', (), {'estado': 'pendiente'})(), type('obj', (), {'estado': 'pendiente'})(), type('obj', (), {'estado': 'completado'})()], 'message': 'ok'}
         v.inventario_manager.verificarAlertasReposicion = lambda s: {'exito': True, 'alertas': [{'id_insumo': 1, 'id_sede': 2, 'cantidad_actual': 3, 'nivel': 'critico'}]}
         v.compra_manager.listarCompras = lambda limite=10: {'success': True, 'data': [{'id_compra': 10, 'id_proveedor': 5, 'total': 123.45, 'estado': 'recibida'}]}
         resp = self.client.get(reverse('admin_kpis'))
@@ -259,3 +383,63 @@ class AccessViewsTests(TestCase):
         self.login_with_role('clienteReceta@test.com', 'pass', 'cliente')
         resp = self.client.get(reverse('producto_receta_editar', args=[1]))
         self.assertEqual(resp.status_code, 403)
+
+
+class LoginBackendTests(TestCase):
+    """Login con una sola verificación bcrypt (auth_backend.SupabaseBcryptBackend)."""
+
+    def setUp(self):
+        import bcrypt
+        self.client = Client()
+        self.hash = bcrypt.hashpw(b'secreta1', bcrypt.gensalt(4)).decode()
+
+    def _daos(self, manager, activo=True):
+        from unittest import mock
+        fila = {'id_usuario': 7, 'nombre': 'Ana', 'email': 'ana@test.com', 'password': self.hash,
+                'rol': 'cliente', 'activo': activo}
+        manager.usuarioDAO = mock.Mock(obtener_por_email=mock.Mock(return_value=mock.Mock(data=[fila])))
+        manager.clienteDAO = mock.Mock(obtener_por_usuario=mock.Mock(
+            return_value=mock.Mock(data=[{'id_cliente': 21, 'id_usuario': 7}])))
+        manager.empleadoDAO = manager.adminDAO = mock.Mock()
+
+    def _login(self, password, activo=True):
+        from unittest import mock
+        from manager.authManager import AuthManager
+        with mock.patch.object(AuthManager, '__init__', lambda m: self._daos(m, activo)), \
+                mock.patch.object(AuthManager, '_verificar_password', autospec=True,
+                                  side_effect=AuthManager._verificar_password) as verificar:
+            resp = self.client.post(reverse('login'), {'email': 'ana@test.com', 'password': password})
+        return resp, verificar
+
+    def test_login_una_verificacion_y_perfil_en_sesion(self):
+        resp, verificar = self._login('secreta1')
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(verificar.call_count, 1)
+        session = self.client.session
+        self.assertEqual(session['user_rol'], 'cliente')
+        self.assertEqual(session['id_usuario'], 7)
+        self.assertEqual(session['id_cliente'], 21)
+        self.assertFalse(User.objects.get(username='ana@test.com').has_usable_password())
+
+    def test_password_incorrecta_no_usa_hash_viejo_de_django(self):
+        User.objects.create_user(username='ana@test.com', password='antigua1')
+        resp, _ = self._login('antigua1')
+        self.assertRedirects(resp, reverse('login') + '?next=' + reverse('dashboard'), fetch_redirect_response=False)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_usuario_inactivo_rechazado(self):
+        self._login('secreta1', activo=False)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_pool_de_hashing_saturado_responde_503(self):
+        from unittest import mock
+        from manager.authManager import AuthManager
+        from utils.password_hashing import HashingSaturado
+        with mock.patch.object(AuthManager, 'autenticar', side_effect=HashingSaturado('lleno')):
+            resp = self.client.post(reverse('login'), {'email': 'ana@test.com', 'password': 'secreta1'})
+            resp_api = self.client.post(reverse('api_login'), {'email': 'ana@test.com', 'password': 'secreta1'},
+                                        content_type='application/json')
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp['Retry-After'], '2')
+        self.assertEqual(resp_api.status_code, 503)
+        self.assertFalse(resp_api.json()['success'])
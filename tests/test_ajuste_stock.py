@@ -0,0 +1,242 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del ajuste atómico de stock (RPC ajustar_stock y ajustar_stock_lote)
+"""
+
+import pytest
+from postgrest.exceptions import APIError
+
+from dao import inventarioDAO, movimientoInventarioDAO
+from dao.inventarioDAO import InventarioDAO
+from manager.inventarioManager import InventarioManager
+
+
+class _FakeStock:
+    """Cliente mínimo: la RPC responde con `respuesta` (o la lanza si es una excepción)
+    y cada consulta de tabla queda registrada"""
+
+    def __init__(self, respuesta, filas=None):
+        self.respuesta = respuesta
+        self.filas = filas or []
+        self.log = []
+
+    def rpc(self, nombre, params):
+        fake = self
+
+        class _Rpc:
+            def execute(self):
+                fake.log.append(('rpc', nombre, params))
+                if isinstance(fake.respuesta, Exception):
+                    raise fake.respuesta
+                return type('Resp', (), {'data': fake.respuesta})()
+        return _Rpc()
+
+    def table(self, nombre):
+        self.log.append(('table', nombre))
+        return self
+
+    def __getattr__(self, metodo):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return type('Resp', (), {'data': [dict(f) for f in self.filas]})()
+
+
+@pytest.fixture(autouse=True)
+def rpc_disponible(monkeypatch):
+    monkeypatch.setattr(InventarioDAO, '_rpc_ausente_en', {})
+
+
+def _usar(monkeypatch, fake):
+    monkeypatch.setattr(inventarioDAO, 'get_supabase_client', lambda: fake)
+    monkeypatch.setattr(movimientoInventarioDAO, 'get_supabase_client', lambda: fake)
+    return InventarioManager()
+
+
+class TestAjusteStockAtomico:
+    """Tests para registrarEntradaStock/registrarSalidaStock sobre la RPC"""
+
+    def test_salida_en_una_llamada(self, monkeypatch):
+        """Test: La salida aplica el delta negativo y devuelve inventario y movimiento"""
+        fake = _FakeStock({
+            'estado': 'ok', 'disponible': 7,
+            'inventario': {'id_inventario': 3, 'id_insumo': 1, 'id_sede': 2, 'cantidad': 7},
+            'movimiento': {'id_movimiento': 50, 'id_inventario': 3, 'tipo': 'salida', 'cantidad': 3,
+                           'motivo': 'Venta', 'fecha': '2026-10-17T10:00:00'},
+        })
+        manager = _usar(monkeypatch, fake)
+
+        resultado = manager.registrarSalidaStock(1, 2, 3, 'Venta', id_usuario=9)
+
+        assert resultado['exito'] is True
+        assert resultado['inventario'].cantidad == 7
+        assert resultado['movimiento'].id_movimiento == 50
+        assert len(fake.log) == 1
+        params = fake.log[0][2]
+        assert (params['p_delta'], params['p_tipo'], params['p_crear']) == (-3, 'salida', False)
+
+    def test_salida_con_stock_insuficiente(self, monkeypatch):
+        """Test: El rechazo de la base se informa con la cantidad disponible"""
+        manager = _usar(monkeypatch, _FakeStock({'estado': 'insuficiente', 'disponible': '2.00'}))
+
+        resultado = manager.registrarSalidaStock(1, 2, 5, 'Venta')
+
+        assert resultado['exito'] is False
+        assert resultado['mensaje'] == 'Stock insuficiente. Disponible: 2, Solicitado: 5'
+
+    def test_sin_funcion_usa_lectura_y_escritura(self, monkeypatch):
+        """Test: Si la RPC no existe se recurre al camino anterior y no se reintenta enseguida"""
+        fake = _FakeStock(APIError({'code': 'PGRST202', 'message': 'function not found'}),
+                          filas=[{'id_inventario': 3, 'id_insumo': 1, 'id_sede': 2, 'cantidad': 10}])
+        manager = _usar(monkeypatch, fake)
+
+        assert manager.registrarEntradaStock(1, 2, 4, 'Compra')['exito'] is True
+        manager.registrarEntradaStock(1, 2, 4, 'Compra')
+
+        assert len([e for e in fake.log if e[0] == 'rpc']) == 1
+        assert ('table', 'movimiento_inventario') in fake.log
+
+    def test_otro_error_no_repite_el_ajuste(self, monkeypatch):
+        """Test: Un error distinto de 'función inexistente' no cae al camino de lectura + escritura"""
+        fake = _FakeStock(APIError({'code': '57014', 'message': 'canceling statement due to statement timeout'}))
+        manager = _usar(monkeypatch, fake)
+
+        resultado = manager.registrarEntradaStock(1, 2, 4, 'Compra')
+
+        assert resultado['exito'] is False
+        assert not [e for e in fake.log if e[0] == 'table']
+
+
+class _FakeTablas(_FakeStock):
+    """Sin RPC de lote: select devuelve `filas` e insert/upsert devuelven lo escrito con IDs asignados"""
+
+    def __init__(self, filas):
+        super().__init__(APIError({'code': '42883', 'message': 'function does not exist'}), filas)
+        self._escritura = None
+
+    def table(self, nombre):
+        self._tabla, self._escritura = nombre, None
+        return super().table(nombre)
+
+    def insert(self, filas):
+        self._escritura = [dict(f, **{'id_' + ('movimiento' if 'tipo' in f else 'inventario'): 100 + i})
+                           for i, f in enumerate(filas)]
+        return self
+
+    def upsert(self, filas, on_conflict=None):
+        self._escritura = [dict(f) for f in filas]
+        return self
+
+    def execute(self):
+        if self._escritura is not None:
+            self.log.append(('write', self._tabla, self._escritura))
+            return type('Resp', (), {'data': self._escritura})()
+        return super().execute()
+
+
+class TestMovimientosLote:
+    """Tests para registrarMovimientosLote y sus usos"""
+
+    def test_lote_en_una_llamada(self, monkeypatch):
+        """Test: Todas las líneas viajan en una sola RPC con el delta firmado por tipo"""
+        fake = _FakeStock({'estado': 'ok', 'inventarios': [{'id_inventario': 3, 'id_insumo': 1, 'id_sede': 2,
+                                                             'cantidad': 12}], 'movimientos': []})
+        manager = _usar(monkeypatch, fake)
+
+        resultado = manager.registrarMovimientosLote([
+            {'id_insumo': 1, 'cantidad': 5, 'tipo': 'entrada', 'motivo': 'Compra'},
+            {'id_insumo': 1, 'cantidad': 3, 'tipo': 'salida', 'motivo': 'Merma', 'id_sede': 4},
+        ], id_sede=2, id_usuario=9)
+
+        assert resultado['exito'] is True
+        assert len(fake.log) == 1
+        lineas = fake.log[0][2]['p_movimientos']
+        assert [(l['id_sede'], l['delta']) for l in lineas] == [(2, 5), (4, -3)]
+
+    def test_lote_sin_rpc_llamadas_constantes(self, monkeypatch):
+        """Test: Sin RPC se usan cuatro llamadas sin importar la cantidad de líneas"""
+        fake = _FakeTablas([{'id_inventario': 3, 'id_insumo': 1, 'id_sede': 2, 'cantidad': 10}])
+        manager = _usar(monkeypatch, fake)
+        lista = [{'id_insumo': 1 + i % 3, 'cantidad': 1, 'tipo': 'entrada', 'motivo': 'Compra'} for i in range(30)]
+
+        resultado = manager.registrarMovimientosLote(lista, id_sede=2)
+
+        assert resultado['exito'] is True
+        assert len(resultado['movimientos']) == 30
+        assert len([e for e in fake.log if e[0] == 'table']) == 4
+        upsert = [e for e in fake.log if e[0] == 'write' and e[1] == 'inventario'][0][2]
+        assert upsert == [{'id_inventario': 3, 'id_insumo': 1, 'id_sede': 2, 'cantidad': 20}]
+
+    def test_lote_sin_rpc_insuficiente_no_escribe(self, monkeypatch):
+        """Test: Si una línea deja stock negativo no se escribe ninguna"""
+        fake = _FakeTablas([{'id_inventario': 3, 'id_insumo': 1, 'id_sede': 2, 'cantidad': 2}])
+        manager = _usar(monkeypatch, fake)
+
+        resultado = manager.transferirInsumoEntreSedes(2, 5, 1, 4)
+
+        assert resultado['exito'] is False
+        assert 'Stock insuficiente del insumo 1 en sede 2' in resultado['mensaje']
+        assert not [e for e in fake.log if e[0] == 'write']
+
+    def test_crear_compra_inserta_detalles_y_stock_en_lote(self, monkeypatch):
+        """Test: crearCompra hace una inserción de detalles y un lote de inventario"""
+        from manager import compraManager
+        from unittest import mock
+
+        manager = compraManager.CompraManager.__new__(compraManager.CompraManager)
+        manager.proveedor_dao = mock.Mock(obtenerPorId=mock.Mock(return_value={'activo': True, 'nombre': 'Harinas'}))
+        manager.compra_dao = mock.Mock(crear=mock.Mock(return_value=77))
+        manager.detalle_dao = mock.Mock(crear_multiple=mock.Mock(side_effect=lambda ds: [
+            {'id_detalle_compra': i, 'id_insumo': d.id_insumo, 'cantidad': d.cantidad,
+             'precio_unitario': d.precio_unitario, 'subtotal': d.subtotal} for i, d in enumerate(ds)]))
+        manager.inventario_manager = mock.Mock(registrarMovimientosLote=mock.Mock(
+            return_value={'exito': True, 'inventarios': [], 'movimientos': []}))
+        detalles = [{'id_insumo': i, 'cantidad': 2, 'precio_unitario': 1.5} for i in range(1, 41)]
+
+        res = manager.crearCompra(1, 9, detalles, registrar_en_inventario=True, id_sede=2)
+
+        assert res['success'] is True
+        assert res['data']['items_en_inventario'] == 40
+        assert manager.detalle_dao.crear_multiple.call_count == 1
+        assert manager.inventario_manager.registrarMovimientosLote.call_count == 1
+        manager.compra_dao.actualizar_estado.assert_called_once_with(77, 'recibida')
+
+    def test_crear_compra_sin_detalles_no_registra_inventario(self, monkeypatch):
+        """Test: si los detalles no se guardan, crearCompra no suma stock y cancela la compra"""
+        from manager import compraManager
+        from unittest import mock
+
+        manager = compraManager.CompraManager.__new__(compraManager.CompraManager)
+        manager.proveedor_dao = mock.Mock(obtenerPorId=mock.Mock(return_value={'activo': True, 'nombre': 'Harinas'}))
+        manager.compra_dao = mock.Mock(crear=mock.Mock(return_value=77))
+        manager.detalle_dao = mock.Mock(crear_multiple=mock.Mock(return_value=[]))
+        manager.inventario_manager = mock.Mock()
+        detalles = [{'id_insumo': 1, 'cantidad': 2, 'precio_unitario': 1.5}]
+
+        res = manager.crearCompra(1, 9, detalles, registrar_en_inventario=True, id_sede=2)
+
+        assert res['success'] is False
+        assert res['data']['estado'] == 'cancelada'
+        manager.inventario_manager.registrarMovimientosLote.assert_not_called()
+        manager.compra_dao.actualizar_estado.assert_called_once_with(77, 'cancelada')
+
+    def test_crear_compra_informa_estado_guardado(self, monkeypatch):
+        """Test: si el inventario no se registra, la compra se informa como pendiente"""
+        from manager import compraManager
+        from unittest import mock
+
+        manager = compraManager.CompraManager.__new__(compraManager.CompraManager)
+        manager.proveedor_dao = mock.Mock(obtenerPorId=mock.Mock(return_value={'activo': True, 'nombre': 'Harinas'}))
+        manager.compra_dao = mock.Mock(crear=mock.Mock(return_value=77))
+        manager.detalle_dao = mock.Mock(crear_multiple=mock.Mock(return_value=[{'id_insumo': 1}]))
+        manager.inventario_manager = mock.Mock(registrarMovimientosLote=mock.Mock(
+            return_value={'exito': False, 'mensaje': 'sin conexión'}))
+        detalles = [{'id_insumo': 1, 'cantidad': 2, 'precio_unitario': 1.5}]
+
+        res = manager.crearCompra(1, 9, detalles, registrar_en_inventario=True, id_sede=2)
+
+        assert res['success'] is True
+        assert res['data']['estado'] == 'pendiente'
+        manager.compra_dao.actualizar_estado.assert_not_called()
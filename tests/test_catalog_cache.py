@@ -0,0 +1,466 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del caché de catálogo (utils.catalog_cache)
+"""
+
+import threading
+import time
+
+import pytest
+
+from utils import catalog_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_limpio(monkeypatch):
+    """Cada prueba arranca con el caché y sus contadores vacíos"""
+    catalog_cache.clear_all()
+    catalog_cache.reset_stats()
+    yield
+    catalog_cache.clear_all()
+    catalog_cache.reset_stats()
+
+
+class TestCatalogCache:
+    """Tests para get_or_cache / invalidate y contadores"""
+
+    def test_hit_no_vuelve_a_cargar(self):
+        """Test: Una clave vigente se sirve sin ejecutar el loader"""
+        llamadas = []
+        loader = lambda: llamadas.append(1) or 'dato'
+
+        assert catalog_cache.get_or_cache('k', ttl=60, loader=loader) == 'dato'
+        assert catalog_cache.get_or_cache('k', ttl=60, loader=loader) == 'dato'
+
+        assert len(llamadas) == 1
+        stats = {s['key']: s for s in catalog_cache.get_stats()['keys']}
+        assert stats['k']['hits'] == 1
+        assert stats['k']['misses'] == 1
+        assert stats['k']['loads'] == 1
+
+    def test_invalidate_fuerza_recarga(self):
+        """Test: invalidate() descarta el valor y la siguiente lectura recarga"""
+        valores = iter(['v1', 'v2'])
+        loader = lambda: next(valores)
+
+        assert catalog_cache.get_or_cache('k', ttl=60, loader=loader) == 'v1'
+        catalog_cache.invalidate('k')
+        assert catalog_cache.get_or_cache('k', ttl=60, loader=loader) == 'v2'
+
+    def test_lru_respeta_max_entries(self, monkeypatch):
+        """Test: Al superar MAX_ENTRIES se expulsa la clave menos usada"""
+        monkeypatch.setattr(catalog_cache, 'MAX_ENTRIES', 2)
+
+        catalog_cache.get_or_cache('a', ttl=60, loader=lambda: 1)
+        catalog_cache.get_or_cache('b', ttl=60, loader=lambda: 2)
+        # Usar 'a' la vuelve la más reciente; 'b' debe salir
+        catalog_cache.get_or_cache('a', ttl=60, loader=lambda: 1)
+        catalog_cache.get_or_cache('c', ttl=60, loader=lambda: 3)
+
+        stats = {s['key']: s for s in catalog_cache.get_stats()['keys']}
+        assert stats['a']['cached'] is True
+        assert stats['b']['cached'] is False
+        assert stats['b']['evictions'] == 1
+        assert stats['c']['cached'] is True
+
+    def test_presupuesto_de_bytes(self, monkeypatch):
+        """Test: Un valor mayor que MAX_BYTES no se almacena"""
+        monkeypatch.setattr(catalog_cache, 'MAX_BYTES', 100)
+
+        catalog_cache.get_or_cache('grande', ttl=60, loader=lambda: 'x' * 1000)
+
+        assert catalog_cache.get_stats()['entries'] == 0
+        assert catalog_cache.get_stats()['bytes'] == 0
+
+    def test_get_stats_no_promueve_entradas(self, monkeypatch):
+        """Test: Consultar las estadísticas no cambia el orden LRU ni deserializa valores"""
+        monkeypatch.setattr(catalog_cache, 'MAX_ENTRIES', 2)
+
+        catalog_cache.get_or_cache('b', ttl=60, loader=lambda: 2)
+        catalog_cache.get_or_cache('a', ttl=60, loader=lambda: 1)
+        catalog_cache.reset_stats()
+        assert {s['key'] for s in catalog_cache.get_stats()['keys']} == {'a', 'b'}
+        assert catalog_cache._stats == {}
+        catalog_cache.get_or_cache('c', ttl=60, loader=lambda: 3)
+
+        stats = {s['key']: s for s in catalog_cache.get_stats()['keys']}
+        assert stats['b']['cached'] is False
+        assert stats['a']['cached'] is True
+
+    def test_backend_se_lee_sin_el_lock_global(self):
+        """Test: get_or_cache no mantiene el lock global mientras lee o escribe el backend"""
+        bloqueado = []
+
+        class _Backend(catalog_cache.MemoryBackend):
+            def get(self, key):
+                bloqueado.append(catalog_cache._lock.locked())
+                return super().get(key)
+
+            def set(self, key, entry):
+                bloqueado.append(catalog_cache._lock.locked())
+                return super().set(key, entry)
+
+        anterior = catalog_cache.get_backend()
+        catalog_cache.configure_backend(_Backend())
+        try:
+            assert catalog_cache.get_or_cache('k', ttl=60, loader=lambda: 1) == 1
+            assert catalog_cache.get_or_cache('k', ttl=60, loader=lambda: 2) == 1
+        finally:
+            catalog_cache.configure_backend(anterior)
+        assert bloqueado == [False, False, False]
+
+    def test_single_flight(self):
+        """Test: Hilos concurrentes sobre una clave vacía ejecutan un solo loader"""
+        llamadas = []
+        inicio = threading.Event()
+
+        def loader():
+            llamadas.append(1)
+            inicio.wait(1)
+            return 'dato'
+
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(
+            catalog_cache.get_or_cache('k', ttl=60, loader=loader))) for _ in range(5)]
+        for h in hilos:
+            h.start()
+        time.sleep(0.1)
+        inicio.set()
+        for h in hilos:
+            h.join(2)
+
+        assert len(llamadas) == 1
+        assert resultados == ['dato'] * 5
+
+    def test_stale_while_revalidate(self):
+        """Test: Vencido el ttl se sirve el valor anterior y se recarga en segundo plano"""
+        valores = iter(['v1', 'v2'])
+        recargado = threading.Event()
+
+        def loader():
+            valor = next(valores)
+            if valor == 'v2':
+                recargado.set()
+            return valor
+
+        assert catalog_cache.get_or_cache('k', ttl=0, loader=loader, stale_ttl=60) == 'v1'
+        assert catalog_cache.get_or_cache('k', ttl=0, loader=loader, stale_ttl=60) == 'v1'
+        assert recargado.wait(2)
+        time.sleep(0.05)
+
+        stats = {s['key']: s for s in catalog_cache.get_stats()['keys']}
+        assert stats['k']['stale_hits'] >= 1
+        assert stats['k']['loads'] == 2
+
+    def test_sin_stale_ttl_no_sirve_vencidos(self):
+        """Test: Por defecto una clave vencida se recarga en el momento, sin servir el valor viejo"""
+        valores = iter(['v1', 'v2'])
+        assert catalog_cache.get_or_cache('k', ttl=0, loader=lambda: next(valores)) == 'v1'
+        assert catalog_cache.get_or_cache('k', ttl=0, loader=lambda: next(valores)) == 'v2'
+
+    def test_error_del_loader_se_propaga(self):
+        """Test: Si el loader falla la excepción llega al llamador y se cuenta"""
+        def loader():
+            raise ValueError('fallo')
+
+        with pytest.raises(ValueError):
+            catalog_cache.get_or_cache('k', ttl=60, loader=loader)
+
+        stats = {s['key']: s for s in catalog_cache.get_stats()['keys']}
+        assert stats['k']['load_errors'] == 1
+        assert stats['k']['cached'] is False
+
+
+class TestLimitesDeClavesDinamicas:
+    """Tests de los límites para claves por usuario o por combinación de filtros"""
+
+    def test_contadores_y_versiones_acotados(self, monkeypatch):
+        """Test: Muchas claves distintas no hacen crecer sin fin los contadores ni las versiones"""
+        monkeypatch.setattr(catalog_cache, 'MAX_STATS_KEYS', 10)
+        monkeypatch.setattr(catalog_cache, 'MAX_VERSIONS', 10)
+        backend = catalog_cache.MemoryBackend()
+        anterior = catalog_cache.get_backend()
+        catalog_cache.configure_backend(backend)
+        try:
+            for i in range(50):
+                catalog_cache.get_or_cache(f'filtro:{i}', ttl=60, loader=lambda: i)
+                catalog_cache.invalidate(f'filtro:{i}')
+            assert len(catalog_cache._stats) <= 10
+            assert len(backend._versions) <= 10
+            # Una carga iniciada antes de una invalidación olvidada sigue descartándose
+            assert backend.version('filtro:0') >= 40
+        finally:
+            catalog_cache.configure_backend(anterior)
+
+    def test_ttl_cache_por_usuario(self):
+        """Test: TTLCache es un LRU propio que no ocupa el caché de catálogo"""
+        cache = catalog_cache.TTLCache(ttl=60, max_entries=3)
+        for i in range(5):
+            assert cache.get_or_load(i, lambda: i * 10) == i * 10
+        assert len(cache) == 3
+        assert cache.get_or_load(4, lambda: -1) == 40
+        cache.invalidate(4)
+        assert cache.get_or_load(4, lambda: -1) == -1
+        assert catalog_cache.get_stats()['entries'] == 0
+
+        catalog_cache.clear_all()
+        assert len(cache) == 0
+
+    def test_ttl_cache_no_guarda_carga_cruzada_con_invalidacion(self):
+        """Test: Si se invalida mientras se carga, el valor leído no queda guardado"""
+        cache = catalog_cache.TTLCache(ttl=60)
+
+        def loader():
+            cache.invalidate('k')
+            return 'viejo'
+
+        assert cache.get_or_load('k', loader) == 'viejo'
+        assert cache.get_or_load('k', lambda: 'nuevo') == 'nuevo'
+
+
+class TestSQLiteBackend:
+    """Tests del backend compartido: dos instancias sobre el mismo archivo simulan dos workers"""
+
+    @pytest.fixture
+    def workers(self, tmp_path):
+        ruta = str(tmp_path / 'cache.sqlite3')
+        return catalog_cache.SQLiteBackend(ruta), catalog_cache.SQLiteBackend(ruta)
+
+    @pytest.fixture
+    def backend_compartido(self, workers):
+        anterior = catalog_cache.get_backend()
+        catalog_cache.configure_backend(workers[0])
+        yield workers
+        catalog_cache.configure_backend(anterior)
+
+    def test_valor_visible_para_otro_worker(self, backend_compartido):
+        """Test: Lo cargado por un worker se sirve en otro sin ejecutar su loader"""
+        w1, w2 = backend_compartido
+        assert catalog_cache.get_or_cache('k', ttl=60, loader=lambda: [1, 2, 3]) == [1, 2, 3]
+
+        catalog_cache.configure_backend(w2)
+        llamadas = []
+        valor = catalog_cache.get_or_cache('k', ttl=60, loader=lambda: llamadas.append(1) or [9])
+
+        assert valor == [1, 2, 3]
+        assert llamadas == []
+
+    def test_invalidacion_llega_a_todos_los_workers(self, backend_compartido):
+        """Test: invalidate() en un worker descarta la copia local del otro"""
+        w1, w2 = backend_compartido
+        catalog_cache.get_or_cache('k', ttl=60, loader=lambda: 'v1')
+        assert w2.get('k').data == 'v1'
+
+        catalog_cache.invalidate('k')
+
+        assert w2.get('k') is None
+        catalog_cache.configure_backend(w2)
+        assert catalog_cache.get_or_cache('k', ttl=60, loader=lambda: 'v2') == 'v2'
+
+    def test_version_obsoleta_no_se_guarda(self, workers):
+        """Test: Un resultado cargado antes de una invalidación se descarta"""
+        w1, w2 = workers
+        version = w1.version('k')
+        w2.invalidate('k')
+
+        guardado, _ = w1.set('k', catalog_cache._Entry('viejo', time.time(), 60, 60, None, version))
+
+        assert guardado is False
+        assert w2.get('k') is None
+
+    def test_lru_compartido(self, workers, monkeypatch):
+        """Test: Al superar MAX_ENTRIES se expulsa la entrada con acceso más antiguo"""
+        monkeypatch.setattr(catalog_cache, 'MAX_ENTRIES', 2)
+        w1, _ = workers
+        for i, key in enumerate(['a', 'b', 'c']):
+            _, expulsadas = w1.set(key, catalog_cache._Entry(i, time.time(), 60, 60, None, 0))
+            time.sleep(0.01)
+
+        assert expulsadas == ['a']
+        assert sorted(w1.keys()) == ['b', 'c']
+
+    def test_reserva_de_carga_entre_workers(self, workers):
+        """Test: Solo un worker obtiene la reserva de carga de una clave"""
+        w1, w2 = workers
+
+        assert w1.acquire_load('k') is True
+        assert w2.acquire_load('k') is False
+        w1.release_load('k')
+        assert w2.acquire_load('k') is True
+
+    def test_espera_de_otro_worker_no_sirve_la_entrada_vencida(self, backend_compartido, monkeypatch):
+        """Test: Quien pierde la reserva no devuelve la entrada vencida que provocó la carga"""
+        monkeypatch.setattr(catalog_cache, 'LOAD_WAIT_SECONDS', 0.3)
+        w1, w2 = backend_compartido
+        w1.set('k', catalog_cache._Entry('vencido', time.time() - 120, 60, 0, None, w1.version('k')))
+        assert w2.acquire_load('k') is True
+
+        assert catalog_cache.get_or_cache('k', ttl=60, loader=lambda: 'propio') == 'propio'
+
+    def test_espera_de_otro_worker_sirve_su_resultado(self, backend_compartido):
+        """Test: Si el otro worker guarda un valor nuevo durante la espera se usa ese valor"""
+        w1, w2 = backend_compartido
+        w1.set('k', catalog_cache._Entry('vencido', time.time() - 120, 60, 0, None, w1.version('k')))
+        assert w2.acquire_load('k') is True
+
+        def _otro_worker():
+            time.sleep(0.15)
+            w2.set('k', catalog_cache._Entry('nuevo', time.time(), 60, 0, None, w2.version('k')))
+            w2.release_load('k')
+
+        hilo = threading.Thread(target=_otro_worker)
+        hilo.start()
+        valor = catalog_cache.get_or_cache('k', ttl=60, loader=lambda: 'propio')
+        hilo.join()
+
+        assert valor == 'nuevo'
+
+    def test_ttl_cache_versionado_entre_workers(self, workers):
+        """Test: La invalidación de un TTLCache versionado llega al otro worker"""
+        w1, w2 = workers
+        anterior = catalog_cache.get_backend()
+        cache_w1 = catalog_cache.TTLCache(ttl=60, version_prefix='conteo:')
+        cache_w2 = catalog_cache.TTLCache(ttl=60, version_prefix='conteo:')
+        try:
+            catalog_cache.configure_backend(w2)
+            assert cache_w2.get_or_load(7, lambda: 3) == 3
+            assert cache_w2.get_or_load(7, lambda: -1) == 3
+
+            catalog_cache.configure_backend(w1)
+            cache_w1.invalidate(7)
+
+            catalog_cache.configure_backend(w2)
+            assert cache_w2.get_or_load(7, lambda: 4) == 4
+            assert w2.summary()['entries'] == 0
+        finally:
+            catalog_cache.configure_backend(anterior)
+
+
+class _FakeUpdate:
+    """Cliente mínimo: update().eq().execute() retorna la fila modificada"""
+
+    def __init__(self, fila):
+        self.fila = fila
+
+    def table(self, nombre):
+        return self
+
+    def update(self, datos):
+        self.fila.update(datos)
+        return self
+
+    def eq(self, col, valor):
+        return self
+
+    def execute(self):
+        return type('Resp', (), {'data': [dict(self.fila)]})()
+
+
+class TestInvalidacionPorCambios:
+    """Tests de notify_change y de los hooks en los DAO"""
+
+    def test_notify_change_invalida_claves_dependientes(self):
+        """Test: Un cambio de entidad descarta sus claves y no toca las demás"""
+        catalog_cache.get_or_cache('productos_activos', ttl=600, loader=lambda: ['p1'])
+        catalog_cache.get_or_cache('sedes_activas', ttl=600, loader=lambda: ['s1'])
+
+        catalog_cache.notify_change('producto', id_producto=1)
+
+        stats = {s['key']: s for s in catalog_cache.get_stats()['keys']}
+        assert stats['productos_activos']['cached'] is False
+        assert stats['sedes_activas']['cached'] is True
+
+    def test_suscriptor_recibe_cambio_y_sus_errores_no_propagan(self):
+        """Test: Los suscriptores reciben la entidad y un suscriptor que falla no corta la cadena"""
+        recibidos = []
+
+        def falla(entidad, **info):
+            raise RuntimeError('fallo')
+
+        catalog_cache.subscribe('entidad_prueba', falla)
+        catalog_cache.subscribe('entidad_prueba', lambda entidad, **info: recibidos.append((entidad, info)))
+
+        catalog_cache.notify_change('entidad_prueba', id=7)
+
+        assert recibidos == [('entidad_prueba', {'id': 7})]
+
+    def test_register_dependency(self):
+        """Test: Una clave registrada se invalida con su entidad"""
+        catalog_cache.register_dependency('entidad_dep', 'clave_dep')
+        catalog_cache.get_or_cache('clave_dep', ttl=600, loader=lambda: 1)
+
+        catalog_cache.notify_change('entidad_dep')
+
+        stats = {s['key']: s for s in catalog_cache.get_stats()['keys']}
+        assert stats['clave_dep']['cached'] is False
+
+    def test_cambiar_estado_producto_invalida_catalogo(self):
+        """Test: ProductoDAO.cambiar_estado invalida 'productos_activos'"""
+        from dao.productoDAO import ProductoDAO
+
+        catalog_cache.get_or_cache('productos_activos', ttl=600, loader=lambda: ['p1'])
+        dao = ProductoDAO()
+        dao.supabase = _FakeUpdate({'id_producto': 1, 'codigo': 'P1', 'nombre': 'Torta', 'precio': 10,
+                                    'stock': 1, 'activo': True})
+
+        assert dao.cambiar_estado(1, False) is not None
+
+        valores = catalog_cache.get_or_cache('productos_activos', ttl=600, loader=lambda: ['p2'])
+        assert valores == ['p2']
+
+    def test_actualizar_stock_invalida_catalogo(self, monkeypatch):
+        """Test: ProductoDAO.actualizar_stock invalida 'productos_activos'"""
+        from dao.productoDAO import ProductoDAO
+        from entidades.producto import Producto
+
+        catalog_cache.get_or_cache('productos_activos', ttl=600, loader=lambda: ['p1'])
+        fila = {'id_producto': 1, 'codigo': 'P1', 'nombre': 'Torta', 'precio': 10, 'stock': 1, 'activo': True}
+        dao = ProductoDAO()
+        dao.supabase = _FakeUpdate(fila)
+        monkeypatch.setattr(dao, 'obtener_por_id', lambda id_producto: Producto.from_dict(dict(fila)))
+
+        assert dao.actualizar_stock(1, 3).stock == 4
+
+        valores = catalog_cache.get_or_cache('productos_activos', ttl=600, loader=lambda: ['p2'])
+        assert valores == ['p2']
+
+    def test_ttl_largo_solo_con_backend_compartido(self, tmp_path):
+        """Test: Con el backend en memoria se usa el TTL corto; con el compartido, el largo"""
+        assert catalog_cache.write_through_ttl(1800, 300) == 300
+        anterior = catalog_cache.get_backend()
+        catalog_cache.configure_backend(catalog_cache.SQLiteBackend(str(tmp_path / 'cache.sqlite3')))
+        try:
+            assert catalog_cache.write_through_ttl(1800, 300) == 1800
+        finally:
+            catalog_cache.configure_backend(anterior)
+
+    def test_cambiar_estado_sede_invalida_sede_por_defecto(self):
+        """Test: SedeDAO.cambiar_estado invalida 'sedes_activas' y la sede por defecto de pedidos"""
+        from dao.pedidoDAO import CLAVE_SEDE_POR_DEFECTO
+        from dao.sedeDAO import SedeDAO
+
+        catalog_cache.get_or_cache('sedes_activas', ttl=600, loader=lambda: ['s1'])
+        catalog_cache.get_or_cache(CLAVE_SEDE_POR_DEFECTO, ttl=600, loader=lambda: 1)
+        dao = SedeDAO()
+        dao.supabase = _FakeUpdate({'id_sede': 1, 'nombre': 'Centro', 'activo': True})
+
+        dao.cambiar_estado(1, False)
+
+        stats = {s['key']: s for s in catalog_cache.get_stats()['keys']}
+        assert stats['sedes_activas']['cached'] is False
+        assert stats[CLAVE_SEDE_POR_DEFECTO]['cached'] is False
+
+    def test_sin_sedes_activas_no_se_cachea(self, monkeypatch):
+        """Test: Si no hay sede activa no se guarda None y la siguiente llamada vuelve a consultar"""
+        from dao import pedidoDAO
+        respuestas = iter([[], [{'id_sede': 3}]])
+        monkeypatch.setattr(pedidoDAO.SedeDAO, 'listar', lambda self, solo_activos=True: type(
+            'Resp', (), {'data': next(respuestas)})())
+        monkeypatch.setattr(pedidoDAO.SedeDAO, '__init__', lambda self: None)
+        dao = pedidoDAO.PedidoDAO.__new__(pedidoDAO.PedidoDAO)
+
+        assert dao._sede_por_defecto() is None
+        assert dao._sede_por_defecto() == 3
+        assert dao._sede_por_defecto() == 3
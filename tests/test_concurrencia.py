@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del fan-out de consultas en paralelo (utils.concurrencia)
+"""
+
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from manager.sedeManager import SedeManager
+from utils import identity_map
+from utils.concurrencia import en_paralelo
+
+
+class TestEnParalelo:
+    """Tests para en_paralelo"""
+
+    def test_latencia_es_la_maxima(self):
+        """Test: Tres consultas de 0.2s tardan cerca de 0.2s y no 0.6s"""
+        inicio = time.monotonic()
+        resultados = en_paralelo({n: (lambda n=n: time.sleep(0.2) or n * 10) for n in range(3)})
+        assert resultados == {0: 0, 1: 10, 2: 20}
+        assert time.monotonic() - inicio < 0.5
+
+    def test_relanza_el_primer_error_tras_esperar_todas(self):
+        """Test: Un error se propaga pero las demás tareas terminan"""
+        terminada = threading.Event()
+
+        def _falla():
+            raise RuntimeError('sin conexión')
+
+        def _lenta():
+            time.sleep(0.1)
+            terminada.set()
+
+        with pytest.raises(RuntimeError, match='sin conexión'):
+            en_paralelo({'falla': _falla, 'lenta': _lenta})
+        assert terminada.is_set()
+
+    def test_comparte_el_identity_map_del_request(self):
+        """Test: Las tareas ven el identity map activo del request"""
+        tokens = identity_map.activate()
+        try:
+            resultados = en_paralelo({'a': identity_map.is_active, 'b': identity_map.is_active})
+        finally:
+            identity_map.deactivate(tokens)
+        assert resultados == {'a': True, 'b': True}
+
+    def test_anidado_corre_en_serie(self):
+        """Test: Un fan-out dentro de una tarea del pool no espera hilos del mismo pool"""
+        def _externa():
+            return en_paralelo({'x': threading.current_thread, 'y': threading.current_thread})
+
+        hilos = en_paralelo({'e1': _externa, 'e2': _externa})
+        for interno in hilos.values():
+            assert interno['x'] is interno['y']
+
+
+class TestVistaConsolidada:
+    """Tests para SedeManager.vistaConsolidada"""
+
+    def _manager(self):
+        tablas = {'empleado': [{'id_empleado': 1}], 'inventario': [{'id_inventario': 2}], 'pedido': [{'id_pedido': 3}]}
+
+        def _tabla(nombre):
+            query = mock.MagicMock()
+            query.select.return_value = query
+            query.eq.return_value = query
+            query.execute.return_value = mock.Mock(data=tablas[nombre])
+            return query
+
+        manager = SedeManager.__new__(SedeManager)
+        manager.dao = mock.Mock(supabase=mock.Mock(table=mock.Mock(side_effect=_tabla)))
+        return manager
+
+    def test_todas_las_secciones(self):
+        """Test: Sin filtro se devuelven personal, inventario y pedidos"""
+        resultado = self._manager().vistaConsolidada(1)
+        assert resultado['success'] is True
+        assert resultado['data'] == {'personal': [{'id_empleado': 1}], 'inventario': [{'id_inventario': 2}],
+                                     'pedidos': [{'id_pedido': 3}]}
+
+    def test_filtro_una_seccion(self):
+        """Test: Con filtro solo se consulta esa sección"""
+        manager = self._manager()
+        resultado = manager.vistaConsolidada(1, 'pedidos')
+        assert resultado['data'] == {'pedidos': [{'id_pedido': 3}]}
+        manager.dao.supabase.table.assert_called_once_with('pedido')
+
+
+class TestPromociones:
+    """Tests para la vista pública de promociones"""
+
+    def test_productos_de_todas_las_promociones_en_dos_consultas(self):
+        """Test: Relaciones y productos se leen con una consulta cada uno y se agrupan por promoción"""
+        from views import views as v
+
+        tablas = {
+            'promocion': [{'id_promocion': 1, 'titulo': 'A'}, {'id_promocion': 2, 'titulo': 'B'},
+                          {'id_promocion': 3, 'titulo': 'C'}],
+            'promocion_producto': [{'id_promocion': 1, 'id_producto': 10}, {'id_promocion': 2, 'id_producto': 10},
+                                   {'id_promocion': 2, 'id_producto': 11}],
+            v.TABLA_PRODUCTO: [{'id_producto': 10, 'nombre': 'Torta'}, {'id_producto': 11, 'nombre': 'Merengue'}],
+        }
+        consultas = []
+
+        def _tabla(nombre):
+            consultas.append(nombre)
+            query = mock.MagicMock()
+            query.select.return_value = query
+            query.eq.return_value = query
+            query.in_.return_value = query
+            query.execute.return_value = mock.Mock(data=tablas[nombre])
+            return query
+
+        cliente = mock.Mock(table=mock.Mock(side_effect=_tabla))
+        with mock.patch.object(v, 'get_supabase_client', return_value=cliente), \
+                mock.patch.object(v, 'render', side_effect=lambda req, plantilla, ctx: ctx):
+            promos = v.promociones(mock.Mock())['promos']
+
+        assert consultas == ['promocion', 'promocion_producto', v.TABLA_PRODUCTO]
+        assert [[p['nombre'] for p in promo['productos']] for promo in promos] == [['Torta'], ['Torta', 'Merengue'], []]
@@ -0,0 +1,172 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del descuento de insumos por receta al completar pedidos
+"""
+
+from unittest import mock
+
+from entidades.detallePedido import DetallePedido
+from entidades.inventario import Inventario
+from entidades.pedido import Pedido
+from entidades.productoInsumo import ProductoInsumo
+from manager.inventarioManager import InventarioManager
+from manager.pedidoManager import PedidoManager
+
+
+def _pedido(estado='en_proceso'):
+    pedido = Pedido(id_pedido=8, id_sede=2, estado=estado, total=40.0)
+    pedido.detalles = [
+        DetallePedido(id_producto=10, cantidad=2),
+        DetallePedido(id_producto=11, cantidad=3),
+        DetallePedido(id_producto=10, cantidad=1),
+    ]
+    return pedido
+
+
+def _recetas():
+    return [
+        ProductoInsumo(id_producto=10, id_insumo=1, cantidad_necesaria=0.25),
+        ProductoInsumo(id_producto=10, id_insumo=2, cantidad_necesaria=2),
+        ProductoInsumo(id_producto=11, id_insumo=1, cantidad_necesaria=0.1),
+    ]
+
+
+def _manager(resultado_lote=None):
+    manager = InventarioManager.__new__(InventarioManager)
+    manager.producto_insumo_dao = mock.Mock(listar_por_productos=mock.Mock(return_value=_recetas()))
+    manager.inventario_dao = mock.Mock()
+    manager.registrarMovimientosLote = mock.Mock(return_value=resultado_lote or {'exito': True})
+    return manager
+
+
+class TestDescuentoPorReceta:
+    """Tests para calcularRequerimientos / descontarStockPorPedido"""
+
+    def test_requerimientos_agregados_en_una_consulta(self):
+        """Test: Se suman cantidad * cantidad_necesaria por insumo sobre todas las líneas"""
+        manager = _manager()
+
+        requerimientos = manager.calcularRequerimientos(_pedido().detalles)
+
+        # Insumo 1: 3 * 0.25 + 3 * 0.1 = 1.05; insumo 2: 3 * 2 = 6
+        assert requerimientos == {1: 1.05, 2: 6.0}
+        manager.producto_insumo_dao.listar_por_productos.assert_called_once()
+        assert sorted(manager.producto_insumo_dao.listar_por_productos.call_args[0][0]) == [10, 11]
+
+    def test_descuento_en_un_lote(self):
+        """Test: Todos los insumos se descuentan de la sede del pedido con un solo lote"""
+        manager = _manager()
+
+        resultado = manager.descontarStockPorPedido(8, pedido=_pedido(), id_usuario=5)
+
+        assert resultado['exito'] is True
+        lista, id_sede, id_usuario = manager.registrarMovimientosLote.call_args[0]
+        assert (id_sede, id_usuario) == (2, 5)
+        assert {(m['id_insumo'], m['cantidad'], m['tipo']) for m in lista} == {(1, 1.05, 'salida'), (2, 6.0, 'salida')}
+
+    def test_faltantes_informados_todos_juntos(self):
+        """Test: Si el lote se rechaza se listan todos los insumos sin stock suficiente"""
+        manager = _manager({'exito': False, 'mensaje': 'Stock insuficiente del insumo 1 en sede 2'})
+        manager.inventario_dao.listar_por_claves.return_value = {
+            (1, 2): Inventario(id_insumo=1, id_sede=2, cantidad=1),
+            (2, 2): Inventario(id_insumo=2, id_sede=2, cantidad=4),
+        }
+
+        resultado = manager.descontarStockPorPedido(8, pedido=_pedido())
+
+        assert resultado['exito'] is False
+        assert [f['id_insumo'] for f in resultado['faltantes']] == [1, 2]
+        manager.inventario_dao.listar_por_claves.assert_called_once()
+
+    def test_error_incierto_no_informa_faltantes(self):
+        """Test: Un error de la RPC sin rechazo definitivo se marca como incierto"""
+        manager = _manager({'exito': False, 'mensaje': 'Error al actualizar inventario: timeout', 'incierto': True})
+
+        resultado = manager.descontarStockPorPedido(8, pedido=_pedido())
+
+        assert resultado['exito'] is False and resultado['incierto'] is True
+        assert resultado['faltantes'] == []
+        manager.inventario_dao.listar_por_claves.assert_not_called()
+
+
+class TestCompletarPedidoDescuentaStock:
+    """Tests para el enganche en PedidoManager.actualizarEstado"""
+
+    def _pedido_manager(self, descuento, actualizado=True):
+        manager = PedidoManager.__new__(PedidoManager)
+        manager.dao = mock.Mock(obtener_por_id=mock.Mock(return_value=_pedido()),
+                                actualizar_estado=mock.Mock(return_value=_pedido('completado') if actualizado else None))
+        manager.kpi = mock.Mock()
+        manager.inventario = mock.Mock(descontarStockPorPedido=mock.Mock(return_value=descuento))
+        manager.empleado_dao = mock.Mock(obtener_por_id=mock.Mock(
+            return_value=mock.Mock(data=[{'id_empleado': 5, 'id_usuario': 17}])))
+        return manager
+
+    def test_completar_descuenta_insumos(self):
+        """Test: Completar un pedido consume sus insumos con el usuario del empleado"""
+        manager = self._pedido_manager({'exito': True, 'requerimientos': {1: 1.05}, 'faltantes': []})
+
+        resultado = manager.actualizarEstado(8, 'completado', id_empleado=5)
+
+        assert resultado['success'] is True
+        manager.dao.actualizar_estado.assert_called_once_with(8, 'completado', estado_anterior='en_proceso')
+        manager.inventario.descontarStockPorPedido.assert_called_once_with(
+            8, pedido=manager.dao.obtener_por_id.return_value, id_usuario=17)
+
+    def test_completar_sin_empleado_ni_usuario_se_rechaza(self):
+        """Test: Sin quien registre el movimiento no se cambia el estado ni se toca el stock"""
+        manager = self._pedido_manager({'exito': True, 'requerimientos': {}, 'faltantes': []})
+
+        resultado = manager.actualizarEstado(8, 'completado')
+
+        assert resultado['success'] is False
+        assert 'id_empleado' in resultado['message']
+        manager.dao.actualizar_estado.assert_not_called()
+        manager.inventario.descontarStockPorPedido.assert_not_called()
+
+    def test_completado_concurrente_no_descuenta_dos_veces(self):
+        """Test: Si otra solicitud ya cambió el estado no se descuenta stock"""
+        manager = self._pedido_manager({'exito': True, 'requerimientos': {1: 1.05}, 'faltantes': []},
+                                       actualizado=False)
+
+        resultado = manager.actualizarEstado(8, 'completado', id_usuario=3)
+
+        assert resultado['success'] is False
+        manager.inventario.descontarStockPorPedido.assert_not_called()
+        manager.kpi.registrarCambioEstado.assert_not_called()
+
+    def test_sin_stock_no_se_completa(self):
+        """Test: Si faltan insumos el pedido vuelve a en proceso"""
+        manager = self._pedido_manager({'exito': False, 'mensaje': 'Stock insuficiente', 'requerimientos': {1: 1.05},
+                                        'faltantes': [{'id_insumo': 1, 'requerido': 1.05, 'disponible': 0.5}]})
+
+        resultado = manager.actualizarEstado(8, 'completado', id_usuario=3)
+
+        assert resultado['success'] is False
+        assert resultado['data']['faltantes'][0]['id_insumo'] == 1
+        assert manager.dao.actualizar_estado.call_args_list == [
+            mock.call(8, 'completado', estado_anterior='en_proceso'),
+            mock.call(8, 'en_proceso', estado_anterior='completado'),
+        ]
+        manager.kpi.registrarCambioEstado.assert_not_called()
+
+    def test_descuento_incierto_no_revierte(self):
+        """Test: Si no se sabe si el descuento se aplicó el pedido queda completado"""
+        manager = self._pedido_manager({'exito': False, 'mensaje': 'Error al actualizar inventario: timeout',
+                                        'requerimientos': {1: 1.05}, 'faltantes': [], 'incierto': True})
+
+        resultado = manager.actualizarEstado(8, 'completado', id_usuario=3)
+
+        assert resultado['success'] is True
+        assert 'No se pudo confirmar el descuento' in resultado['message']
+        manager.dao.actualizar_estado.assert_called_once_with(8, 'completado', estado_anterior='en_proceso')
+        manager.kpi.registrarCambioEstado.assert_called_once_with('en_proceso', 'completado')
+
+    def test_cancelar_no_toca_inventario(self):
+        """Test: Otras transiciones no descuentan stock"""
+        manager = self._pedido_manager(None)
+
+        assert manager.actualizarEstado(8, 'cancelado')['success'] is True
+        manager.inventario.descontarStockPorPedido.assert_not_called()
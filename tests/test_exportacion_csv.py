@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias de los recorridos por páginas usados en la exportación CSV
+"""
+
+import pytest
+
+from dao import pedidoDAO, productoDAO
+from dao.pedidoDAO import PedidoDAO
+from dao.productoDAO import ProductoDAO
+
+
+class _FakePaginas:
+    """Cliente mínimo que devuelve páginas predefinidas y registra los filtros de cada consulta"""
+
+    def __init__(self, paginas):
+        self.paginas = list(paginas)
+        self.consultas = []
+
+    def table(self, nombre):
+        self.consultas.append([])
+        return self
+
+    def select(self, cols='*'):
+        self.consultas[-1].append(('select', cols))
+        return self
+
+    def __getattr__(self, metodo):
+        def _filtro(*args, **kwargs):
+            self.consultas[-1].append((metodo,) + args)
+            return self
+        return _filtro
+
+    def execute(self):
+        datos = self.paginas.pop(0) if self.paginas else []
+        return type('Resp', (), {'data': [dict(f) for f in datos]})()
+
+
+class TestExportacionPaginada:
+    """Tests para el keyset de pedidos y productos"""
+
+    def test_pedidos_keyset_por_fecha_e_id(self, monkeypatch):
+        """Test: Cada página continúa desde la última (fecha, id_pedido) y trae el conteo de detalles"""
+        fake = _FakePaginas([
+            [{'id_pedido': 1, 'fecha': '2026-01-10T10:00:00', 'detalle_pedido': [{'count': 3}]},
+             {'id_pedido': 7, 'fecha': '2026-01-11T08:00:00', 'detalle_pedido': [{'count': 1}]}],
+            [{'id_pedido': 4, 'fecha': '2026-01-12T09:30:00', 'detalle_pedido': []}],
+        ])
+        monkeypatch.setattr(pedidoDAO, 'get_supabase_client', lambda: fake)
+
+        filas = list(PedidoDAO().iterar_por_fecha(estado='pendiente', pagina=2))
+
+        assert [(f['id_pedido'], f['detalles_count']) for f in filas] == [(1, 3), (7, 1), (4, 0)]
+        assert 'detalle_pedido' not in filas[0]
+        assert len(fake.consultas) == 2
+        assert ('eq', 'estado', 'pendiente') in fake.consultas[1]
+        assert ('or_', 'fecha.gt."2026-01-11T08:00:00",'
+                       'and(fecha.eq."2026-01-11T08:00:00",id_pedido.gt.7),fecha.is.null') in fake.consultas[1]
+
+    def test_pedidos_sin_fecha_avanzan_por_id(self, monkeypatch):
+        """Test: Tras llegar a los pedidos sin fecha el recorrido sigue solo por id_pedido"""
+        fake = _FakePaginas([
+            [{'id_pedido': 2, 'fecha': None, 'detalle_pedido': [{'count': 1}]}],
+            [],
+        ])
+        monkeypatch.setattr(pedidoDAO, 'get_supabase_client', lambda: fake)
+
+        list(PedidoDAO().iterar_por_fecha(pagina=1))
+
+        assert ('is_', 'fecha', 'null') in fake.consultas[1]
+        assert ('gt', 'id_pedido', 2) in fake.consultas[1]
+
+    def test_productos_activos_por_paginas(self, monkeypatch):
+        """Test: Se recorren todos los productos activos sin tope de filas"""
+        fake = _FakePaginas([[{'id_producto': i} for i in range(1, 4)], [{'id_producto': 9}]])
+        monkeypatch.setattr(productoDAO, 'get_supabase_client', lambda: fake)
+
+        ids = [p['id_producto'] for p in ProductoDAO().iterar_activos(pagina=3)]
+
+        assert ids == [1, 2, 3, 9]
+        assert ('gt', 'id_producto', 3) in fake.consultas[1]
+        assert all(('eq', 'activo', True) in c for c in fake.consultas)
+
+
+class TestCsvStreaming:
+    """Tests para las fallas durante la exportación"""
+
+    @pytest.fixture
+    def v(self):
+        from views import views
+        return views
+
+    def _filas(self, n_ok):
+        for i in range(n_ok):
+            yield [i]
+        raise RuntimeError('sin conexión')
+
+    def test_falla_al_inicio_responde_503(self, v):
+        """Test: Si la primera página falla no se envía un CSV vacío con 200"""
+        resp = v._csv_streaming('x.csv', ['id'], self._filas(0))
+        assert resp.status_code == 503
+
+    def test_falla_a_mitad_marca_el_archivo(self, v):
+        """Test: Un corte a mitad del archivo agrega la fila de error al final"""
+        resp = v._csv_streaming('x.csv', ['id'], self._filas(2))
+        lineas = b''.join(resp.streaming_content).decode('utf-8').splitlines()
+
+        assert resp.status_code == 200
+        assert lineas[:3] == ['id', '0', '1']
+        assert lineas[-1] == ','.join(v.FILA_ERROR_CSV)
+
+    def test_sin_filas_solo_encabezado(self, v):
+        """Test: Una exportación vacía trae solo el encabezado"""
+        resp = v._csv_streaming('x.csv', ['id', 'nombre'], iter([]))
+        assert b''.join(resp.streaming_content).decode('utf-8').splitlines() == ['id,nombre']
@@ -0,0 +1,122 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del identity map por request (utils.identity_map)
+"""
+
+import pytest
+
+from utils import identity_map
+from identity_map_middleware import IdentityMapMiddleware
+
+
+class _FakeProductos:
+    """Cliente mínimo sobre la tabla producto; cuenta las consultas ejecutadas"""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = 0
+
+    def table(self, nombre):
+        self._filtros, self._cambios = [], None
+        return self
+
+    def select(self, cols='*'):
+        return self
+
+    def update(self, cambios):
+        self._cambios = cambios
+        return self
+
+    def eq(self, col, valor):
+        self._filtros.append((col, valor))
+        return self
+
+    def execute(self):
+        self.consultas += 1
+        filas = [f for f in self.filas if all(f.get(c) == v for c, v in self._filtros)]
+        if self._cambios is not None:
+            for f in filas:
+                f.update(self._cambios)
+        return type('Resp', (), {'data': [dict(f) for f in filas]})()
+
+
+@pytest.fixture
+def mapa_activo():
+    tokens = identity_map.activate()
+    yield
+    identity_map.deactivate(tokens)
+
+
+class TestIdentityMap:
+    """Tests para lookup / forget y el middleware"""
+
+    def test_sin_mapa_activo_siempre_carga(self):
+        """Test: Fuera de un request cada lectura ejecuta el loader"""
+        llamadas = []
+        for _ in range(2):
+            identity_map.lookup('producto', 1, lambda: llamadas.append(1) or 'p1')
+
+        assert len(llamadas) == 2
+        assert identity_map.is_active() is False
+
+    def test_reutiliza_dentro_del_request(self, mapa_activo):
+        """Test: La segunda lectura del mismo ID no vuelve a cargar"""
+        llamadas = []
+        loader = lambda: llamadas.append(1) or 'p1'
+
+        assert identity_map.lookup('producto', 1, loader) == 'p1'
+        assert identity_map.lookup('producto', '1', loader) == 'p1'
+
+        assert len(llamadas) == 1
+        assert identity_map.get_stats() == {'hits': 1, 'misses': 1}
+
+    def test_no_cachea_inexistentes(self, mapa_activo):
+        """Test: Un registro no encontrado se vuelve a consultar"""
+        llamadas = []
+        for _ in range(2):
+            identity_map.lookup('producto', 9, lambda: llamadas.append(1) or None)
+
+        assert len(llamadas) == 2
+
+    def test_forget_por_id_y_por_entidad(self, mapa_activo):
+        """Test: forget() descarta un registro o toda la entidad"""
+        identity_map.lookup('producto', 1, lambda: 'p1')
+        identity_map.lookup('producto', 2, lambda: 'p2')
+        identity_map.lookup('sede', 1, lambda: 's1')
+
+        identity_map.forget('producto', 1)
+        assert identity_map.lookup('producto', 1, lambda: 'nuevo') == 'nuevo'
+        assert identity_map.lookup('producto', 2, lambda: 'nuevo') == 'p2'
+
+        identity_map.forget('producto')
+        assert identity_map.lookup('producto', 2, lambda: 'nuevo') == 'nuevo'
+        assert identity_map.lookup('sede', 1, lambda: 'nuevo') == 's1'
+
+    def test_middleware_activa_y_cierra_el_mapa(self):
+        """Test: El mapa existe solo mientras corre el request"""
+        vistos = []
+        middleware = IdentityMapMiddleware(lambda request: vistos.append(identity_map.is_active()))
+
+        middleware(object())
+
+        assert vistos == [True]
+        assert identity_map.is_active() is False
+
+    def test_escritura_en_dao_invalida_el_registro(self, mapa_activo, monkeypatch):
+        """Test: ProductoDAO reutiliza la lectura y la descarta tras actualizar el stock"""
+        from dao import productoDAO as modulo
+
+        fake = _FakeProductos([{'id_producto': 1, 'codigo': 'P1', 'nombre': 'Torta', 'precio': 10,
+                                'stock': 5, 'activo': True}])
+        monkeypatch.setattr(modulo, 'get_supabase_client', lambda: fake)
+        dao = modulo.ProductoDAO()
+
+        assert dao.obtener_por_id(1).stock == 5
+        assert dao.obtener_por_id(1).stock == 5
+        assert fake.consultas == 1
+
+        dao.actualizar_stock(1, 2, 'restar')
+
+        assert dao.obtener_por_id(1).stock == 3
@@ -0,0 +1,203 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias de la cola de trabajos en SQLite (utils.job_queue) y TrabajoManager
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from manager import trabajoManager
+from manager.trabajoManager import TrabajoManager
+from utils import job_queue
+
+
+@pytest.fixture
+def cola(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, 'DB_PATH', str(tmp_path / 'jobs.sqlite3'))
+    monkeypatch.setattr(job_queue, 'RESULTS_DIR', str(tmp_path / 'resultados'))
+    monkeypatch.setattr(job_queue, 'RETRY_BASE_SECONDS', 0)
+    llamadas = []
+
+    @job_queue.register('prueba_ok')
+    def _ok(payload, ctx):
+        llamadas.append(payload)
+        ctx.progress(1, 2, 'mitad')
+        with open(ctx.result_path('salida.txt'), 'w') as archivo:
+            archivo.write('hecho')
+        return {'n': payload.get('n')}
+
+    @job_queue.register('prueba_falla')
+    def _falla(payload, ctx):
+        llamadas.append(payload)
+        raise RuntimeError('sin conexión')
+
+    yield llamadas
+    job_queue._handlers.pop('prueba_ok', None)
+    job_queue._handlers.pop('prueba_falla', None)
+
+
+class TestColaTrabajos:
+    """Tests para utils.job_queue"""
+
+    def test_encolar_tomar_y_completar(self, cola):
+        """Test: Un trabajo pasa de pendiente a completado con resultado y archivo"""
+        id_trabajo = job_queue.enqueue('prueba_ok', {'n': 3}, creado_por='admin@test.com')
+        assert job_queue.get(id_trabajo)['estado'] == job_queue.PENDIENTE
+
+        trabajo = job_queue.claim('w1')
+        assert trabajo['id'] == id_trabajo and trabajo['intentos'] == 1
+        assert job_queue.claim('w2') is None  # nadie más puede tomarlo
+
+        job_queue.run_job(trabajo)
+        final = job_queue.get(id_trabajo)
+        assert final['estado'] == job_queue.COMPLETADO
+        assert final['resultado'] == {'n': 3}
+        assert final['progreso'] == 100.0 and final['mensaje'] == 'mitad'
+        with open(final['archivo']) as archivo:
+            assert archivo.read() == 'hecho'
+
+    def test_reintenta_con_espera_y_termina_en_error(self, cola, monkeypatch):
+        """Test: Un fallo se reprograma con espera creciente hasta agotar max_intentos"""
+        monkeypatch.setattr(job_queue, 'RETRY_BASE_SECONDS', 60)
+        id_trabajo = job_queue.enqueue('prueba_falla', max_intentos=2)
+
+        job_queue.run_job(job_queue.claim('w1'))
+        trabajo = job_queue.get(id_trabajo)
+        assert trabajo['estado'] == job_queue.PENDIENTE
+        assert 'sin conexión' in trabajo['error']
+        assert trabajo['disponible_en'] > time.time() + 50
+        assert job_queue.claim('w1') is None  # todavía en espera
+
+        monkeypatch.setattr(job_queue, 'RETRY_BASE_SECONDS', 0)
+        job_queue._conn().execute('UPDATE job SET disponible_en = 0 WHERE id = ?', (id_trabajo,))
+        job_queue.run_job(job_queue.claim('w1'))
+        assert job_queue.get(id_trabajo)['estado'] == job_queue.ERROR
+        assert len(cola) == 2
+
+        assert job_queue.retry(id_trabajo)
+        assert job_queue.get(id_trabajo)['intentos'] == 0
+
+    def test_recupera_trabajo_abandonado(self, cola, monkeypatch):
+        """Test: Un trabajo en curso sin latido vuelve a la cola al vencer el lease"""
+        id_trabajo = job_queue.enqueue('prueba_ok', {'n': 1})
+        job_queue.claim('w_muerto')
+        monkeypatch.setattr(job_queue, 'LEASE_SECONDS', -1)
+        trabajo = job_queue.claim('w_vivo')
+        assert trabajo['id'] == id_trabajo
+        assert trabajo['worker'] == 'w_vivo' and trabajo['intentos'] == 2
+
+    def test_abandonado_sin_intentos_queda_en_error(self, cola, monkeypatch):
+        """Test: Un trabajo abandonado que ya agotó max_intentos no se vuelve a ejecutar"""
+        id_trabajo = job_queue.enqueue('prueba_ok', {'n': 1}, max_intentos=1)
+        job_queue.claim('w_muerto')
+        monkeypatch.setattr(job_queue, 'LEASE_SECONDS', -1)
+        assert job_queue.claim('w_vivo') is None
+        trabajo = job_queue.get(id_trabajo)
+        assert trabajo['estado'] == job_queue.ERROR and 'lease' in trabajo['error']
+
+    def test_latido_mantiene_el_lease(self, cola, monkeypatch):
+        """Test: Un handler largo que no informa progreso conserva el lease gracias al latido"""
+        monkeypatch.setattr(job_queue, 'LEASE_SECONDS', 0.3)
+        monkeypatch.setattr(job_queue, 'LATIDO_SECONDS', 0.05)
+
+        @job_queue.register('prueba_lenta')
+        def _lenta(payload, ctx):
+            time.sleep(0.8)
+            return {}
+
+        try:
+            id_trabajo = job_queue.enqueue('prueba_lenta')
+            hilo = threading.Thread(target=job_queue.run_job, args=(job_queue.claim('w1'),))
+            hilo.start()
+            time.sleep(0.5)
+            assert job_queue.claim('w2') is None  # el lease sigue vigente
+            hilo.join()
+            assert job_queue.get(id_trabajo)['estado'] == job_queue.COMPLETADO
+        finally:
+            job_queue._handlers.pop('prueba_lenta', None)
+
+    def test_cancelar_en_curso_detiene_en_progreso(self, cola):
+        """Test: Cancelar un trabajo en curso lo corta en su próximo progress()"""
+        id_trabajo = job_queue.enqueue('prueba_ok', {'n': 1})
+        trabajo = job_queue.claim('w1')
+        assert job_queue.cancel(id_trabajo)
+        job_queue.run_job(trabajo)
+        assert job_queue.get(id_trabajo)['estado'] == job_queue.CANCELADO
+
+    def test_worker_hasta_vaciar(self, cola):
+        """Test: El worker ejecuta los pendientes con su pool de hilos y termina"""
+        ids = [job_queue.enqueue('prueba_ok', {'n': n}) for n in range(5)]
+        ejecutados = job_queue.Worker(hilos=3, intervalo=0.01).run(hasta_vaciar=True)
+        assert ejecutados == 5
+        assert {job_queue.get(i)['estado'] for i in ids} == {job_queue.COMPLETADO}
+
+    def test_encolar_unico_reutiliza_el_activo(self, cola):
+        """Test: Con unico=True no se encola otro trabajo del mismo tipo mientras haya uno activo"""
+        primero = job_queue.enqueue('prueba_ok', unico=True)
+        assert job_queue.enqueue('prueba_ok', unico=True) == primero
+
+        job_queue.run_job(job_queue.claim('w1'))
+        segundo = job_queue.enqueue('prueba_ok', unico=True)
+        assert segundo != primero
+        assert job_queue.enqueue('prueba_ok') != segundo
+
+    def test_tipo_desconocido(self, cola):
+        """Test: No se encolan tipos sin handler"""
+        with pytest.raises(ValueError):
+            job_queue.enqueue('no_existe')
+
+
+class TestTrabajoManager:
+    """Tests para TrabajoManager"""
+
+    def test_export_productos_genera_csv(self, cola, monkeypatch):
+        """Test: La exportación de productos encolada deja un CSV descargable"""
+        productos = [{'id_producto': 1, 'codigo': 'P1', 'nombre': 'Torta', 'precio': 10.0, 'stock': 4, 'activo': True}]
+
+        class _ProductoDAO:
+            def iterar_activos(self):
+                return iter(productos)
+
+        monkeypatch.setattr(trabajoManager, 'ProductoDAO', _ProductoDAO)
+        res = TrabajoManager().encolar('export_productos_csv', creado_por='admin@test.com')
+        assert res['success']
+        job_queue.Worker(hilos=1, intervalo=0.01).run(hasta_vaciar=True)
+
+        trabajo = TrabajoManager().obtenerTrabajo(res['data']['id'])['data']
+        assert trabajo['estado'] == job_queue.COMPLETADO
+        assert trabajo['resultado'] == {'filas': 1, 'archivo': 'productos.csv'}
+        assert os.path.basename(trabajo['archivo']) == 'productos.csv'
+        with open(trabajo['archivo'], encoding='utf-8') as archivo:
+            assert archivo.read().splitlines() == ['id_producto,codigo,nombre,precio,stock,activo',
+                                                   '1,P1,Torta,10.0,4,True']
+
+    def test_tipo_no_permitido(self, cola):
+        """Test: Solo se encolan los tipos expuestos al panel"""
+        res = TrabajoManager().encolar('prueba_ok')
+        assert not res['success']
+        assert TrabajoManager().listarTrabajos()['data'] == []
+
+    def test_envio_masivo_requiere_clientes_y_mensaje(self, cola):
+        """Test: El envío masivo no se encola sin destinatarios o sin mensaje"""
+        assert not TrabajoManager().encolar('notificacion_masiva', {'mensaje': 'Hola'})['success']
+        assert not TrabajoManager().encolar('notificacion_masiva', {'lista_clientes': [1]})['success']
+        assert TrabajoManager().listarTrabajos()['data'] == []
+
+    def test_envio_masivo_no_se_reintenta(self, cola):
+        """Test: Un envío masivo con error no se reencola (duplicaría las notificaciones enviadas)"""
+        manager = TrabajoManager()
+        masivo = manager.encolar('notificacion_masiva', {'lista_clientes': [1], 'mensaje': 'Hola'})['data']['id']
+        export = manager.encolar('export_productos_csv')['data']['id']
+        for id_trabajo in (masivo, export):
+            job_queue.cancel(id_trabajo)
+
+        assert manager.reintentar(masivo)['success'] is False
+        assert job_queue.get(masivo)['estado'] == job_queue.CANCELADO
+        assert manager.reintentar(export)['success'] is True
+        reintentables = {t['id']: t['reintentable'] for t in manager.listarTrabajos()['data']}
+        assert reintentables == {masivo: False, export: True}
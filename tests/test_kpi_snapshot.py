@@ -0,0 +1,193 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del snapshot incremental de KPIs (KpiManager / KpiDAO)
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from dao import kpiDAO as modulo
+from entidades.pedido import Pedido
+from entidades.detallePedido import DetallePedido
+from manager import kpiManager
+from manager.kpiManager import KpiManager
+from utils import catalog_cache
+
+
+class _FakeKpi:
+    """Cliente mínimo sobre kpi_contador que aplica las RPC en memoria"""
+
+    def __init__(self, filas=None):
+        self.filas = {(f['metrica'], f['dimension']): dict(f) for f in (filas or [])}
+        self.rpcs = []
+        self.params = {}
+
+    def rpc(self, nombre, params):
+        fake = self
+
+        class _Rpc:
+            def execute(self):
+                fake.rpcs.append(nombre)
+                fake.params[nombre] = params
+                if nombre == 'kpi_reemplazar':
+                    fake.filas = {}
+                for f in params['p_filas']:
+                    clave = (f['metrica'], f['dimension'])
+                    previa = fake.filas.get(clave, {'valor': 0}) if nombre == 'kpi_incrementar' else {'valor': 0}
+                    fake.filas[clave] = dict(f, valor=previa['valor'] + f['valor'],
+                                             datos=f.get('datos') or previa.get('datos'),
+                                             actualizado=datetime.now(timezone.utc).isoformat())
+                return type('Resp', (), {'data': None})()
+        return _Rpc()
+
+    def table(self, nombre):
+        self._tabla, self._filtros, self._orden, self._limite = nombre, [], None, None
+        return self
+
+    def select(self, cols='*'):
+        return self
+
+    def or_(self, filtro):
+        return self
+
+    def in_(self, col, valores):
+        self._filtros.append(lambda f: f.get(col) in valores)
+        return self
+
+    def eq(self, col, valor):
+        self._filtros.append(lambda f: f.get(col) == valor)
+        return self
+
+    def order(self, col, desc=False):
+        self._orden = (col, desc)
+        return self
+
+    def limit(self, n):
+        self._limite = n
+        return self
+
+    def execute(self):
+        filas = [dict(f) for f in self.filas.values() if all(p(f) for p in self._filtros)]
+        if self._tabla == 'kpi_delta':
+            filas = [{'id': 41}]
+        if self._orden:
+            filas.sort(key=lambda f: f[self._orden[0]], reverse=self._orden[1])
+        return type('Resp', (), {'data': filas[:self._limite]})()
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    cliente = _FakeKpi()
+    monkeypatch.setattr(modulo, 'get_supabase_client', lambda: cliente)
+    return cliente
+
+
+def _pedido():
+    pedido = Pedido(id_pedido=1, id_sede=2, fecha='2026-10-17T09:00:00', estado='pendiente', total=30.0)
+    pedido.detalles = [
+        DetallePedido(id_producto=10, cantidad=2, subtotal=20.0, nombre_producto='Torta'),
+        DetallePedido(id_producto=11, cantidad=1, subtotal=10.0, nombre_producto='Merengue'),
+    ]
+    return pedido
+
+
+class TestKpiSnapshot:
+    """Tests para eventos incrementales, lectura y reconciliación"""
+
+    def test_eventos_de_pedido_actualizan_contadores(self, fake):
+        """Test: Crear y cambiar de estado un pedido mueve los contadores sin recalcular"""
+        manager = KpiManager()
+
+        manager.registrarPedidoCreado(_pedido())
+        manager.registrarPedidoCreado(_pedido())
+        manager.registrarCambioEstado('pendiente', 'completado')
+
+        assert fake.filas[('pedidos_estado', 'pendiente')]['valor'] == 1
+        assert fake.filas[('pedidos_estado', 'completado')]['valor'] == 1
+        assert fake.filas[('ingresos_dia_sede', '2026-10-17|2')]['valor'] == 60.0
+        assert fake.filas[('ventas_producto_cantidad', '10')]['valor'] == 4
+        assert fake.rpcs == ['kpi_incrementar'] * 3
+
+    def test_evento_de_inventario_no_llama_a_supabase(self, fake):
+        """Test: Los insumos críticos los mantiene el trigger de inventario, no la app"""
+        catalog_cache.notify_change('inventario', id_insumo=5, id_sede=1, cantidad=2)
+        assert fake.filas == {} and fake.rpcs == []
+
+    def test_alta_de_pedido_informa_id_pedido(self, fake):
+        """Test: El delta de un pedido nuevo lleva su id para no contarlo dos veces al reconciliar"""
+        KpiManager().registrarPedidoCreado(_pedido())
+        assert fake.params['kpi_incrementar']['p_id_pedido'] == 1
+        KpiManager().registrarCambioEstado('pendiente', 'completado')
+        assert fake.params['kpi_incrementar']['p_id_pedido'] is None
+
+    def test_snapshot_lee_solo_el_top_de_productos(self, fake, monkeypatch):
+        """Test: Con miles de productos vendidos se leen solo los del top y la fila de reconciliación"""
+        monkeypatch.setattr(KpiManager, 'reconciliarEnSegundoPlano', lambda self: None)
+        ahora = datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+        fake.filas[('meta', 'reconciliado')] = {'metrica': 'meta', 'dimension': 'reconciliado', 'valor': 0,
+                                                'actualizado': ahora}
+        for i in range(3000):
+            for metrica, valor in (('ventas_producto_cantidad', i), ('ventas_producto_subtotal', i * 2.0)):
+                fake.filas[(metrica, str(i))] = {'metrica': metrica, 'dimension': str(i), 'valor': valor}
+
+        datos = KpiManager().obtenerSnapshot()['data']
+
+        assert [p['id_producto'] for p in datos['top_productos']] == list(range(2999, 2989, -1))
+        assert datos['top_productos'][0]['subtotal_total'] == 5998.0
+
+    def test_snapshot_sin_reconciliar_no_se_usa(self, fake, monkeypatch):
+        """Test: Sin fila de reconciliación el panel calcula en vivo y se lanza la reconciliación"""
+        lanzadas = []
+        monkeypatch.setattr(KpiManager, 'reconciliarEnSegundoPlano', lambda self: lanzadas.append(1))
+        KpiManager().registrarPedidoCreado(_pedido())
+
+        assert KpiManager().obtenerSnapshot()['success'] is False
+        assert lanzadas == [1]
+
+    def test_reconciliar_y_leer_snapshot(self, fake, monkeypatch):
+        """Test: La reconciliación reescribe todo y el snapshot se arma desde esas filas"""
+        encabezados = [
+            {'id_pedido': 1, 'estado': 'completado', 'total': 30.0, 'fecha': '2026-10-17T09:00:00', 'id_sede': 1},
+            {'id_pedido': 2, 'estado': 'pendiente', 'total': 12.5, 'fecha': '2026-10-17T10:00:00', 'id_sede': 1},
+        ]
+        monkeypatch.setattr(kpiManager.PedidoDAO, '__init__', lambda self: None)
+        monkeypatch.setattr(kpiManager.PedidoDAO, 'iterar_encabezados', lambda self, cols: iter(encabezados))
+        monkeypatch.setattr(kpiManager.DetallePedidoDAO, '__init__', lambda self: None)
+        leidas = []
+
+        def _ventas(self, max_pedido, limite):
+            leidas.append(max_pedido)
+            return [{'id_producto': 10, 'nombre': 'Torta', 'cantidad_total': 7, 'subtotal_total': 70.0},
+                    {'id_producto': 11, 'nombre': 'Merengue', 'cantidad_total': 3, 'subtotal_total': 15.0}]
+        monkeypatch.setattr(kpiManager.DetallePedidoDAO, 'ventas_hasta_pedido', _ventas)
+        fake.filas[('pedidos_estado', 'cancelado')] = {'metrica': 'pedidos_estado', 'dimension': 'cancelado',
+                                                      'valor': 99}
+        manager = KpiManager()
+
+        assert manager.reconciliar()['success'] is True
+        datos = manager.obtenerSnapshot()['data']
+
+        assert datos['pedidos_por_estado'] == {'completado': 1, 'pendiente': 1}
+        assert datos['total_pedidos'] == 2
+        assert datos['ingresos'] == [{'fecha': '2026-10-17', 'id_sede': 1, 'total': 42.5}]
+        assert [p['nombre'] for p in datos['top_productos']] == ['Torta', 'Merengue']
+        assert fake.rpcs == ['kpi_reemplazar']
+        # Marca de deltas tomada antes de leer y último pedido leído, para reaplicar lo concurrente
+        assert fake.params['kpi_reemplazar']['p_desde_delta'] == 41
+        assert fake.params['kpi_reemplazar']['p_max_pedido'] == 2
+        # Las ventas se leen hasta el mismo pedido que los encabezados
+        assert leidas == [2]
+
+    def test_reconciliacion_en_segundo_plano_se_encola_una_vez(self, fake, tmp_path, monkeypatch):
+        """Test: La reconciliación se delega a la cola de trabajos sin duplicarse"""
+        from utils import job_queue
+        monkeypatch.setattr(job_queue, 'DB_PATH', str(tmp_path / 'jobs.sqlite3'))
+
+        assert KpiManager().reconciliarEnSegundoPlano() is True
+        assert KpiManager().reconciliarEnSegundoPlano() is True
+
+        trabajos = job_queue.list_jobs()
+        assert [t['tipo'] for t in trabajos] == ['reconciliar_kpis']
@@ -0,0 +1,116 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del lector indexado del log de auditoría (utils.log_reader)
+"""
+
+import json
+
+import pytest
+
+from utils import log_reader
+
+
+def _escribir(path, entradas):
+    with open(path, 'a', encoding='utf-8') as f:
+        for entrada in entradas:
+            f.write(json.dumps(entrada) + '\n')
+
+
+def _entrada(dia, hora, event, success=True, **extra):
+    return {'ts': f'2026-10-{dia:02d}T{hora:02d}:00:00.000000Z', 'event': event, 'success': success, **extra}
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_reader, 'TAMANIO_BLOQUE', 512)
+    path = str(tmp_path / 'app.jsonl')
+    entradas = []
+    for dia in range(1, 6):
+        for hora in range(10):
+            entradas.append(_entrada(dia, hora, 'login' if hora % 2 else 'pedido_creado', success=hora != 3))
+    _escribir(path, entradas)
+    return path
+
+
+class TestLogReader:
+    """Tests para el lector hacia atrás y el índice lateral"""
+
+    def test_mas_recientes_primero_con_limite(self, log):
+        """Test: Sin filtros se retornan las últimas entradas en orden inverso"""
+        entradas = log_reader.consultar(log, limite=3)
+        assert [e['ts'][:13] for e in entradas] == ['2026-10-05T09', '2026-10-05T08', '2026-10-05T07']
+
+    def test_filtros_por_evento_exito_y_fechas(self, log):
+        """Test: Los filtros combinados equivalen a recorrer todo el archivo"""
+        entradas = log_reader.consultar(log, evento='LOG', exito=False, desde='2026-10-02',
+                                        hasta='2026-10-03T23:59:59.999999', limite=100)
+        assert [e['ts'][:10] for e in entradas] == ['2026-10-03', '2026-10-02']
+        assert all(e['event'] == 'login' and e['success'] is False for e in entradas)
+
+    def test_el_indice_descarta_bloques_fuera_de_rango(self, log, monkeypatch):
+        """Test: Con filtro de fecha solo se leen los bloques que cubren esos días"""
+        indice = log_reader.actualizar_indice(log)
+        assert len(indice['bloques']) > 3
+        leidos = []
+        original = log_reader._lineas_hacia_atras
+
+        def contar(mm, inicio, fin):
+            leidos.append((inicio, fin))
+            return original(mm, inicio, fin)
+
+        monkeypatch.setattr(log_reader, '_lineas_hacia_atras', contar)
+        entradas = log_reader.consultar(log, desde='2026-10-01', hasta='2026-10-01T23:59:59.999999')
+        assert len(entradas) == 10
+        inicio_dia2, _ = indice['dias']['2026-10-02']
+        assert leidos and all(inicio < inicio_dia2 + 512 for inicio, _ in leidos)
+        assert len(leidos) < len(indice['bloques'])
+
+    def test_filtro_de_fecha_lee_solo_los_bytes_de_esos_dias(self, log, monkeypatch):
+        """Test: El rango de bytes por día recorta la lectura aun dentro de un bloque compartido"""
+        indice = log_reader.actualizar_indice(log)
+        dia3 = indice['dias']['2026-10-03']
+        leidos = []
+        original = log_reader._lineas_hacia_atras
+
+        def contar(mm, inicio, fin):
+            leidos.append((inicio, fin))
+            return original(mm, inicio, fin)
+
+        monkeypatch.setattr(log_reader, '_lineas_hacia_atras', contar)
+        entradas = log_reader.consultar(log, desde='2026-10-03', hasta='2026-10-03T23:59:59.999999')
+
+        assert [e['ts'][:13] for e in entradas] == [f'2026-10-03T{h:02d}' for h in range(9, -1, -1)]
+        assert leidos and all(dia3[0] <= inicio and fin <= dia3[1] for inicio, fin in leidos)
+        leidos.clear()
+        assert log_reader.consultar(log, desde='2026-11-01') == []
+        assert leidos == []
+
+    def test_actualizacion_incremental(self, log):
+        """Test: Lo agregado al log se indexa sin recorrer el archivo de nuevo"""
+        primero = log_reader.actualizar_indice(log)
+        _escribir(log, [_entrada(6, 1, 'reclamo_creado')])
+        segundo = log_reader.actualizar_indice(log)
+        assert segundo['tamanio'] > primero['tamanio']
+        assert '2026-10-06' in segundo['dias']
+        assert log_reader.consultar(log, evento='reclamo')[0]['ts'].startswith('2026-10-06')
+
+    def test_linea_incompleta_y_archivo_reemplazado(self, log):
+        """Test: La última línea a medio escribir se ignora y un archivo nuevo reconstruye el índice"""
+        log_reader.actualizar_indice(log)
+        with open(log, 'a', encoding='utf-8') as f:
+            f.write('{"ts": "2026-10-07T00:00:00Z", "ev')
+        assert log_reader.consultar(log, limite=1)[0]['ts'].startswith('2026-10-05')
+
+        with open(log, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(_entrada(9, 0, 'logout')) + '\n')
+        entradas = log_reader.consultar(log)
+        assert [e['event'] for e in entradas] == ['logout']
+
+    def test_archivo_vacio_o_inexistente(self, tmp_path):
+        """Test: Un log vacío o ausente no falla"""
+        vacio = tmp_path / 'vacio.jsonl'
+        vacio.write_text('')
+        assert log_reader.consultar(str(vacio)) == []
+        assert log_reader.consultar(str(tmp_path / 'no-existe.jsonl')) == []
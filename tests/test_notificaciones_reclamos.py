@@ -392,6 +392,184 @@ class TestReclamoDAO:
         assert resp.data is not None
 
 
+class _FakeNotificaciones:
+    """Cliente mínimo sobre una lista de notificaciones; cuenta las consultas ejecutadas"""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = 0
+
+    def table(self, nombre):
+        self._filtros, self._cambios, self._count = [], None, None
+        return self
+
+    def select(self, cols='*', count=None):
+        self._count = count
+        return self
+
+    def update(self, cambios):
+        self._cambios = cambios
+        return self
+
+    def eq(self, col, valor):
+        self._filtros.append((col, valor))
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execute(self):
+        self.consultas += 1
+        filas = [f for f in self.filas if all(f.get(c) == v for c, v in self._filtros)]
+        if self._cambios is not None:
+            for f in filas:
+                f.update(self._cambios)
+        datos = [dict(f) for f in (filas[:1] if self._count else filas)]
+        return type('Resp', (), {'data': datos, 'count': len(filas) if self._count else None})()
+
+
+class TestConteoNoLeidasCacheado:
+    """Tests del conteo de no leídas compartido por middleware y context processor"""
+
+    @pytest.fixture
+    def dao_fake(self, monkeypatch):
+        from utils import catalog_cache
+        from dao import notificacionDAO as modulo
+
+        catalog_cache.clear_all()
+        fake = _FakeNotificaciones([
+            {'id_notificacion': 1, 'id_cliente': 7, 'leida': False},
+            {'id_notificacion': 2, 'id_cliente': 7, 'leida': False},
+            {'id_notificacion': 3, 'id_cliente': 8, 'leida': False},
+        ])
+        monkeypatch.setattr(modulo, 'get_supabase_client', lambda: fake)
+        yield fake
+        catalog_cache.clear_all()
+
+    def _request(self):
+        from types import SimpleNamespace
+        return SimpleNamespace(
+            user=SimpleNamespace(is_authenticated=True),
+            session={'user_rol': 'cliente', 'id_cliente': 7},
+        )
+
+    def test_una_consulta_por_request(self, dao_fake):
+        """Test: Middleware y context processor comparten un único conteo"""
+        from notifications_middleware import NotificacionesCountMiddleware
+        from notifications_context import notifications_badge
+
+        contextos = []
+        middleware = NotificacionesCountMiddleware(lambda req: contextos.append(notifications_badge(req)))
+        middleware(self._request())
+        middleware(self._request())
+
+        assert contextos == [{'notif_unread': 2}, {'notif_unread': 2}]
+        assert dao_fake.consultas == 1
+
+    def test_marcar_todas_leidas_invalida_conteo(self, dao_fake):
+        """Test: Tras marcar todas como leídas el conteo cacheado se recalcula"""
+        dao = NotificacionDAO()
+        assert dao.contar_no_leidas_cacheado(7) == 2
+
+        NotificacionManager().marcarTodasLeidas(7)
+
+        assert dao.contar_no_leidas_cacheado(7) == 0
+        assert dao.contar_no_leidas_cacheado(8) == 1
+
+    def test_marcar_una_invalida_conteo_del_cliente(self, dao_fake):
+        """Test: marcar_como_leida invalida el conteo del cliente dueño de la notificación"""
+        dao = NotificacionDAO()
+        assert dao.contar_no_leidas_cacheado(7) == 2
+
+        dao.marcar_como_leida(1)
+
+        assert dao.contar_no_leidas_cacheado(7) == 1
+
+
+class TestEnvioMasivoEnLote:
+    """Tests para enviarNotificacionMasiva con inserciones por bloques"""
+
+    def _manager(self, resueltos, insert_falla=None):
+        from unittest import mock
+        manager = NotificacionManager.__new__(NotificacionManager)
+        manager.clienteDAO = mock.Mock(resolver_ids=mock.Mock(return_value=resueltos))
+
+        def _crear_multiple(notificaciones):
+            if insert_falla:
+                raise insert_falla
+            return type('Resp', (), {'data': [n.to_dict() for n in notificaciones]})()
+
+        def _crear(notificacion):
+            if notificacion.id_cliente == 13:
+                raise Exception('cliente bloqueado')
+            return type('Resp', (), {'data': [notificacion.to_dict()]})()
+
+        manager.notificacionDAO = mock.Mock(crear_multiple=mock.Mock(side_effect=_crear_multiple),
+                                            crear=mock.Mock(side_effect=_crear))
+        return manager
+
+    def test_inserciones_por_bloques(self, monkeypatch):
+        """Test: 1200 destinatarios se resuelven en lote y se insertan en 3 sentencias"""
+        from manager import notificacionManager
+        monkeypatch.setattr(notificacionManager, 'TAMANIO_LOTE_NOTIFICACIONES', 500)
+        manager = self._manager({i: i for i in range(1, 1201)})
+
+        resultado = manager.enviarNotificacionMasiva(list(range(1, 1201)), 'Promo')
+
+        assert resultado['data']['total_exitosas'] == 1200
+        assert manager.clienteDAO.resolver_ids.call_count == 1
+        assert manager.notificacionDAO.crear_multiple.call_count == 3
+        manager.notificacionDAO.crear.assert_not_called()
+
+    def test_errores_por_cliente(self):
+        """Test: IDs inválidos, inexistentes y filas rechazadas se informan por cliente"""
+        from postgrest.exceptions import APIError
+        rechazo = APIError({'code': '23503', 'message': 'violates foreign key constraint'})
+        manager = self._manager({1: 1, 2: 13}, insert_falla=rechazo)
+
+        resultado = manager.enviarNotificacionMasiva([1, 'x', 2, 99], 'Promo')
+
+        datos = resultado['data']
+        assert datos['total_exitosas'] == 1
+        assert {(e['id_cliente'], e['error']) for e in datos['errores']} == {
+            ('x', 'id_cliente inválido'), (99, 'Cliente no encontrado'), (2, 'cliente bloqueado')}
+
+    def test_error_de_transporte_no_reinserta_fila_por_fila(self):
+        """Test: Un timeout del INSERT (pudo haberse guardado) marca el bloque como fallido sin reintentar"""
+        manager = self._manager({1: 1, 2: 2}, insert_falla=TimeoutError('read timed out'))
+
+        resultado = manager.enviarNotificacionMasiva([1, 2], 'Promo')
+
+        manager.notificacionDAO.crear.assert_not_called()
+        assert resultado['data']['total_exitosas'] == 0
+        assert [e['id_cliente'] for e in resultado['data']['errores']] == [1, 2]
+
+    def test_envio_en_segundo_plano_con_progreso(self, tmp_path, monkeypatch):
+        """Test: En segundo plano se encola un trabajo y su fila informa el progreso hasta completado"""
+        from manager import notificacionManager
+        from manager.trabajoManager import TrabajoManager  # registra el handler notificacion_masiva
+        from utils import job_queue
+        monkeypatch.setattr(job_queue, 'DB_PATH', str(tmp_path / 'jobs.sqlite3'))
+        monkeypatch.setattr(job_queue, 'RESULTS_DIR', str(tmp_path / 'resultados'))
+        worker = self._manager({1: 1, 2: 2})
+        monkeypatch.setattr(notificacionManager, 'NotificacionDAO', lambda: worker.notificacionDAO)
+        monkeypatch.setattr(notificacionManager, 'ClienteDAO', lambda: worker.clienteDAO)
+        manager = NotificacionManager()
+
+        resultado = manager.enviarNotificacionMasiva([1, 2, 3], 'Promo', en_segundo_plano=True)
+        id_envio = resultado['data']['id_envio']
+        assert manager.obtenerProgresoEnvio(id_envio)['data']['estado'] == 'pendiente'
+        assert job_queue.get(id_envio)['max_intentos'] == 1
+
+        job_queue.Worker(hilos=1, intervalo=0.01).run(hasta_vaciar=True)
+
+        progreso = manager.obtenerProgresoEnvio(id_envio)['data']
+        assert (progreso['estado'], progreso['procesados'], progreso['total_exitosas']) == ('completado', 3, 2)
+        assert progreso['total_errores'] == 1
+        assert manager.obtenerProgresoEnvio('no-existe')['success'] is False
+        assert TrabajoManager().obtenerTrabajo(id_envio)['data']['mensaje'] == '3 de 3 procesados'
+
+
 class TestNotificacionEntidad:
     """Tests para la entidad Notificación"""
     
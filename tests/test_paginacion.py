@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias de la paginación por cursor (keyset sobre fecha, id)
+"""
+
+from unittest import mock
+
+import pytest
+
+from dao import reclamoDAO, turnoDAO
+from dao.reclamoDAO import ReclamoDAO
+from dao.turnoDAO import TurnoDAO
+from utils.paginacion import (CursorInvalido, codificar_cursor, decodificar_cursor, leer_parametros,
+                              paginar, TAMANIO_MAXIMO)
+
+
+class _FakeConsulta:
+    """Consulta mínima: registra los filtros y devuelve `filas` al ejecutar"""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.llamadas = []
+
+    def table(self, nombre):
+        return self
+
+    def __getattr__(self, metodo):
+        def _filtro(*args, **kwargs):
+            self.llamadas.append((metodo,) + args)
+            return self
+        return _filtro
+
+    def execute(self):
+        return type('Resp', (), {'data': [dict(f) for f in self.filas]})()
+
+
+class TestCursor:
+    """Tests para codificar/decodificar y leer_parametros"""
+
+    def test_ida_y_vuelta(self):
+        """Test: El cursor es opaco y conserva (fecha, id)"""
+        cursor = codificar_cursor('2026-01-10T10:00:00+00:00', 42)
+
+        assert '2026' not in cursor
+        assert decodificar_cursor(cursor) == ('2026-01-10T10:00:00+00:00', 42)
+        assert decodificar_cursor(codificar_cursor(None, 7)) == (None, 7)
+
+    def test_cursor_corrupto(self):
+        """Test: Un cursor inventado se rechaza"""
+        with pytest.raises(CursorInvalido):
+            decodificar_cursor('no-es-un-cursor')
+        with pytest.raises(CursorInvalido):
+            leer_parametros({'cursor': 'abc'})
+
+    def test_parametros_con_alias_y_tope(self):
+        """Test: 'limite' sirve de alias de page_size y el tamaño se acota"""
+        assert leer_parametros({}) == (None, 100)
+        assert leer_parametros({'limite': '20'}) == (None, 20)
+        assert leer_parametros({'page_size': '50000'}) == (None, TAMANIO_MAXIMO)
+        with pytest.raises(CursorInvalido):
+            leer_parametros({'page_size': '0'})
+
+
+class TestPaginar:
+    """Tests para paginar"""
+
+    def test_primera_pagina_con_siguiente(self):
+        """Test: Se pide una fila de más y el cursor apunta a la última entregada"""
+        consulta = _FakeConsulta([{'id': i, 'fecha': f'2026-01-{10 - i:02d}'} for i in range(1, 4)])
+
+        filas, siguiente = paginar(consulta, None, 2, 'id')
+
+        assert [f['id'] for f in filas] == [1, 2]
+        assert decodificar_cursor(siguiente) == ('2026-01-08', 2)
+        assert ('limit', 3) in consulta.llamadas
+        assert ('order', 'fecha') in consulta.llamadas and ('order', 'id') in consulta.llamadas
+        assert not [c for c in consulta.llamadas if c[0] == 'or_']
+
+    def test_pagina_siguiente_y_ultima(self):
+        """Test: La página siguiente continúa estrictamente después del cursor"""
+        consulta = _FakeConsulta([{'id': 1, 'fecha': '2026-01-01'}])
+
+        filas, siguiente = paginar(consulta, codificar_cursor('2026-01-08', 2), 2, 'id')
+
+        assert siguiente is None
+        assert ('or_', 'fecha.lt."2026-01-08",and(fecha.eq."2026-01-08",id.lt.2)') in consulta.llamadas
+
+    def test_cursor_en_registros_sin_fecha(self):
+        """Test: Los registros sin fecha (primeros en orden descendente) avanzan por id"""
+        consulta = _FakeConsulta([])
+
+        paginar(consulta, codificar_cursor(None, 9), 10, 'id')
+
+        assert ('or_', 'and(fecha.is.null,id.lt.9),fecha.not.is.null') in consulta.llamadas
+
+    def test_orden_ascendente(self):
+        """Test: En orden ascendente se avanza con gt y los registros sin hora quedan al final"""
+        consulta = _FakeConsulta([])
+
+        paginar(consulta, codificar_cursor('08:00:00', 3), 10, 'id', columna_fecha='hora', descendente=False)
+        paginar(consulta, codificar_cursor(None, 3), 10, 'id', columna_fecha='hora', descendente=False)
+
+        assert ('or_', 'hora.gt."08:00:00",and(hora.eq."08:00:00",id.gt.3),hora.is.null') in consulta.llamadas
+        assert ('or_', 'and(hora.is.null,id.gt.3)') in consulta.llamadas
+
+    def test_solo_por_id(self):
+        """Test: Sin columna de fecha el keyset es solo el id y el cursor no lleva fecha"""
+        consulta = _FakeConsulta([{'id': i} for i in (9, 8, 7)])
+
+        filas, siguiente = paginar(consulta, codificar_cursor(None, 10), 2, 'id', columna_fecha=None)
+
+        assert [f['id'] for f in filas] == [9, 8]
+        assert decodificar_cursor(siguiente) == (None, 8)
+        assert ('lt', 'id', 10) in consulta.llamadas
+        assert ('order', 'id') in consulta.llamadas and not [c for c in consulta.llamadas if c[0] == 'or_']
+
+
+class TestListadosPaginados:
+    """Tests para los listar_pagina de los DAO y las vistas REST"""
+
+    def test_reclamos_por_pagina(self, monkeypatch):
+        """Test: ReclamoDAO.listar_pagina devuelve entidades y el cursor siguiente"""
+        consulta = _FakeConsulta([{'id_reclamo': i, 'fecha': '2026-01-10', 'descripcion': 'x'} for i in (9, 8, 7)])
+        monkeypatch.setattr(reclamoDAO, 'get_supabase_client', lambda: consulta)
+
+        reclamos, siguiente = ReclamoDAO().listar_pagina(tamanio=2)
+
+        assert [r.id_reclamo for r in reclamos] == [9, 8]
+        assert decodificar_cursor(siguiente) == ('2026-01-10', 8)
+
+    def test_turnos_del_dia_por_hora(self, monkeypatch):
+        """Test: Los turnos de un día se paginan por hora de inicio ascendente"""
+        consulta = _FakeConsulta([{'id_turno': i, 'hora_inicio': f'0{i}:00:00'} for i in (6, 7, 8)])
+        monkeypatch.setattr(turnoDAO, 'get_supabase_client', lambda: consulta)
+
+        turnos, siguiente = TurnoDAO().listar_pagina_dia('2026-01-10', tamanio=2, id_sede=3)
+
+        assert [t['id_turno'] for t in turnos] == [6, 7]
+        assert decodificar_cursor(siguiente) == ('07:00:00', 7)
+        assert ('eq', 'fecha', '2026-01-10') in consulta.llamadas
+        assert ('eq', 'empleado.id_sede', 3) in consulta.llamadas
+
+    def test_vista_pedidos_devuelve_next_cursor(self):
+        """Test: GET /api/pedidos/ acepta cursor y page_size y responde next_cursor"""
+        from rest_framework.test import APIRequestFactory
+        from views import viewsPedidos
+
+        cursor = codificar_cursor('2026-01-10', 5)
+        resultado = {'success': True, 'message': 'ok', 'data': [], 'next_cursor': 'sig'}
+        with mock.patch.object(viewsPedidos.pedido_manager, 'listarPaginaPedidos', return_value=resultado) as listar:
+            resp = viewsPedidos.listar_todos_pedidos(
+                APIRequestFactory().get('/api/pedidos/', {'cursor': cursor, 'page_size': '25'}))
+            invalido = viewsPedidos.listar_todos_pedidos(APIRequestFactory().get('/api/pedidos/', {'cursor': 'x'}))
+
+        assert resp.status_code == 200 and resp.data['next_cursor'] == 'sig'
+        listar.assert_called_once_with(cursor, 25)
+        assert invalido.status_code == 400
+
+    def test_vista_compras_devuelve_next_cursor(self):
+        """Test: GET /api/compras/ pagina por cursor con los filtros y responde 400 ante un cursor inválido"""
+        import json
+        from rest_framework.test import APIRequestFactory
+        from views import viewsCompra
+
+        resultado = {'success': True, 'message': 'ok', 'data': [], 'next_cursor': 'sig'}
+        with mock.patch.object(viewsCompra.compra_manager, 'listarPaginaCompras', return_value=resultado) as listar:
+            resp = viewsCompra.listar_compras(
+                APIRequestFactory().get('/api/compras/', {'estado': 'pendiente', 'limite': '30'}))
+            invalido = viewsCompra.listar_compras(APIRequestFactory().get('/api/compras/', {'cursor': 'x'}))
+
+        assert resp.status_code == 200 and json.loads(resp.content)['next_cursor'] == 'sig'
+        listar.assert_called_once_with(None, 30, estado='pendiente', id_proveedor=None,
+                                       fecha_desde=None, fecha_hasta=None)
+        assert invalido.status_code == 400
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del pool acotado de bcrypt (utils.password_hashing)
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+import pytest
+
+from utils import password_hashing
+from utils.password_hashing import HashingSaturado
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Pool de 1 hilo con 1 lugar de espera y costo bajo para que los tests sean rápidos."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(password_hashing, '_executor', executor)
+    monkeypatch.setattr(password_hashing, '_cupos', threading.BoundedSemaphore(2))
+    monkeypatch.setattr(password_hashing, 'BCRYPT_ROUNDS', 4)
+    yield
+    executor.shutdown(wait=True)
+
+
+class TestPasswordHashing:
+    """Tests para el pool de hashing"""
+
+    def test_hash_y_verificacion(self, pool):
+        """Test: El hash usa el costo configurado y verifica la contraseña"""
+        hashed = password_hashing.hash_password('secreta1')
+        assert hashed.startswith('$2b$04$')
+        assert password_hashing.verify_password('secreta1', hashed)
+        assert not password_hashing.verify_password('otra', hashed)
+
+    def test_rechaza_cuando_el_pool_esta_lleno(self, pool):
+        """Test: Con el hilo ocupado y la cola llena se lanza HashingSaturado sin esperar"""
+        liberar = threading.Event()
+        ocupados = [password_hashing._enviar(liberar.wait) for _ in range(2)]
+        with pytest.raises(HashingSaturado):
+            password_hashing.hash_password('secreta1')
+        liberar.set()
+        for futuro in ocupados:
+            futuro.result(timeout=5)
+        # Al terminar se devuelven los cupos
+        assert password_hashing.verify_password('x', bcrypt.hashpw(b'x', bcrypt.gensalt(4)).decode())
+
+    def test_tiempo_de_espera_agotado(self, pool, monkeypatch):
+        """Test: Si la cola no avanza a tiempo el request se rechaza"""
+        monkeypatch.setattr(password_hashing, 'HASH_TIMEOUT', 0.05)
+        liberar = threading.Event()
+        ocupado = password_hashing._enviar(liberar.wait)
+        with pytest.raises(HashingSaturado):
+            password_hashing.hash_password('secreta1')
+        liberar.set()
+        ocupado.result(timeout=5)
+
+    def test_rehash_cuando_cambia_el_costo(self, pool):
+        """Test: Un hash con otro costo se rehace en segundo plano con el costo actual"""
+        viejo = bcrypt.hashpw(b'secreta1', bcrypt.gensalt(5)).decode()
+        assert password_hashing.needs_rehash(viejo)
+        assert not password_hashing.needs_rehash(password_hashing.hash_password('secreta1'))
+        assert not password_hashing.needs_rehash('no-es-bcrypt')
+
+        guardado = threading.Event()
+        nuevos = []
+        assert password_hashing.rehash_en_segundo_plano('secreta1', lambda h: nuevos.append(h) or guardado.set())
+        assert guardado.wait(5)
+        assert nuevos[0].startswith('$2b$04$')
+        assert bcrypt.checkpw(b'secreta1', nuevos[0].encode())
+
+    def test_rehash_se_omite_si_no_hay_cupo(self, pool):
+        """Test: El rehash oportunista no compite con los logins cuando el pool está lleno"""
+        liberar = threading.Event()
+        ocupados = [password_hashing._enviar(liberar.wait) for _ in range(2)]
+        assert password_hashing.rehash_en_segundo_plano('secreta1', lambda h: None) is False
+        liberar.set()
+        for futuro in ocupados:
+            futuro.result(timeout=5)
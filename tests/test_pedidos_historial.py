@@ -305,3 +305,92 @@ class TestPedidoEntidadAdicional:
         """Test: Validación de estados de pedido"""
         pedido = Pedido(estado='pendiente')
         assert pedido.estado in ['pendiente', 'en_proceso', 'listo', 'completado', 'cancelado']
+
+
+class _FakeTablas:
+    """Cliente mínimo: responde `filas[tabla]` y registra los filtros de cada consulta"""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = []
+
+    def table(self, nombre):
+        self.consultas.append([nombre])
+        return self
+
+    def __getattr__(self, metodo):
+        def _filtro(*args, **kwargs):
+            self.consultas[-1].append((metodo,) + args)
+            return self
+        return _filtro
+
+    def execute(self):
+        datos = self.filas.get(self.consultas[-1][0], [])
+        return type('Resp', (), {'data': [dict(f) for f in datos]})()
+
+
+class TestHistorialFiltrosEnBase:
+    """Tests para PedidoDAO.consulta y obtenerHistorialCliente"""
+
+    def _manager(self, monkeypatch, filas):
+        from dao import pedidoDAO
+        fake = _FakeTablas(filas)
+        monkeypatch.setattr(pedidoDAO, 'get_supabase_client', lambda: fake)
+        manager = PedidoManager.__new__(PedidoManager)
+        manager.dao = PedidoDAO()
+        return manager, fake
+
+    def test_filtros_aplicados_en_la_consulta(self, monkeypatch):
+        """Test: estado, sede y rango de fechas viajan como filtros de Supabase"""
+        manager, fake = self._manager(monkeypatch, {'pedido': [], 'detalle_pedido': []})
+
+        resultado = manager.obtenerHistorialCliente(4, {'estado': 'completado', 'id_sede': 2,
+                                                        'fecha_inicio': '2026-01-01', 'fecha_fin': '2026-01-31'})
+
+        assert resultado['success'] is True
+        consulta = fake.consultas[0]
+        assert consulta[0] == 'pedido'
+        for filtro in [('eq', 'id_cliente', 4), ('eq', 'estado', 'completado'), ('eq', 'id_sede', 2),
+                       ('gte', 'fecha', '2026-01-01'), ('lt', 'fecha', '2026-02-01')]:
+            assert filtro in consulta
+
+    def test_detalles_solo_de_la_pagina(self, monkeypatch):
+        """Test: Con página se cargan los detalles únicamente de los pedidos devueltos"""
+        pedidos = [{'id_pedido': i, 'id_cliente': 4, 'fecha': f'2026-01-{30 - i:02d}T10:00:00'} for i in (1, 2, 3)]
+        manager, fake = self._manager(monkeypatch, {'pedido': pedidos, 'detalle_pedido': []})
+
+        resultado = manager.obtenerHistorialCliente(4, tamanio=2)
+
+        assert [p.id_pedido for p in resultado['data']] == [1, 2]
+        assert resultado['next_cursor'] is not None
+        detalle = [c for c in fake.consultas if c[0] == 'detalle_pedido'][0]
+        assert ('in_', 'id_pedido', [1, 2]) in detalle
+
+    def test_fecha_invalida(self, monkeypatch):
+        """Test: Una fecha mal formada se informa como error sin consultar"""
+        manager, fake = self._manager(monkeypatch, {})
+
+        resultado = manager.obtenerHistorialCliente(4, {'fecha_inicio': '01/02/2026'})
+
+        assert resultado['success'] is False
+        assert not fake.consultas
+
+
+class TestCrearPedidoPrecios:
+    """Tests para los precios de PedidoDAO.crear_pedido"""
+
+    def test_producto_sin_precio_no_crea_pedido(self, monkeypatch):
+        """Test: Si falta algún producto del carrito en la consulta de precios no se inserta nada"""
+        from dao import pedidoDAO
+        from entidades.producto import Producto
+        fake = _FakeTablas({})
+        monkeypatch.setattr(pedidoDAO, 'get_supabase_client', lambda: fake)
+        precios = {10: Producto(id_producto=10, nombre='Torta', precio=20.0)}
+        monkeypatch.setattr(pedidoDAO, 'ProductoDAO', lambda: type('P', (), {
+            'obtener_por_ids': lambda self, ids: {i: precios[i] for i in ids if i in precios}})())
+
+        resultado = PedidoDAO().crear_pedido(4, [{'id_producto': 10, 'cantidad': 1},
+                                                 {'id_producto': 11, 'cantidad': 2}])
+
+        assert resultado is None
+        assert not fake.consultas
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del limitador de tasa por ventana deslizante (utils.security)
+"""
+
+from unittest import mock
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from utils import security
+from utils.security import MemoryRateLimitBackend, SQLiteRateLimitBackend, rate_limit
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = MemoryRateLimitBackend()
+    monkeypatch.setattr(security, '_backend', backend)
+    security.reset_stats()
+    yield backend
+    security.reset_stats()
+
+
+def _request(ip='10.0.0.1'):
+    request = RequestFactory().get('/', REMOTE_ADDR=ip)
+    request.user = mock.Mock(is_authenticated=False)
+    return request
+
+
+class TestVentanaDeslizante:
+    """Tests para los backends del limitador"""
+
+    def test_limite_dentro_de_la_ventana(self):
+        """Test: Se admiten `limit` solicitudes y la siguiente se rechaza hasta la próxima ventana"""
+        backend = MemoryRateLimitBackend()
+        assert [backend.hit('k', 3, 60, 120 + i)[0] for i in range(4)] == [True, True, True, False]
+        permitida, espera = backend.hit('k', 3, 60, 130)
+        assert not permitida and espera == pytest.approx(50)
+
+    def test_la_ventana_anterior_pesa_proporcionalmente(self):
+        """Test: Al empezar la ventana nueva las solicitudes previas cuentan según lo que queda"""
+        backend = MemoryRateLimitBackend()
+        for _ in range(4):
+            backend.hit('k', 4, 60, 100)
+        # En t=165 la ventana anterior [60, 120) pesa 15/60: 4 * 0.25 = 1 -> caben 3 más
+        assert [backend.hit('k', 4, 60, 165)[0] for _ in range(4)] == [True, True, True, False]
+        # Dos ventanas sin uso: el estado se descarta
+        assert backend.hit('k', 4, 60, 300)[0]
+
+    def test_estado_constante_y_expulsion(self):
+        """Test: Una clave ocupa un solo registro y las inactivas o sobrantes se expulsan"""
+        backend = MemoryRateLimitBackend(max_keys=2)
+        for i in range(50):
+            backend.hit('a', 100, 60, 10 + i * 0.01)
+        assert backend.size() == 1
+        backend.hit('b', 100, 60, 20)
+        backend.hit('c', 100, 60, 21)
+        assert backend.size() == 2
+        backend.hit('d', 100, 60, 500)
+        assert backend.size() == 1
+
+    def test_sqlite_compartido_entre_workers(self, tmp_path):
+        """Test: Dos backends sobre el mismo archivo comparten el límite"""
+        ruta = str(tmp_path / 'rate.sqlite3')
+        worker_a, worker_b = SQLiteRateLimitBackend(ruta), SQLiteRateLimitBackend(ruta)
+        assert worker_a.hit('k', 2, 60, 100)[0]
+        assert worker_b.hit('k', 2, 60, 101)[0]
+        assert not worker_a.hit('k', 2, 60, 102)[0]
+        assert worker_b.size() == 1
+
+
+class TestDecoradorRateLimit:
+    """Tests para el decorador rate_limit"""
+
+    def test_429_con_retry_after_y_contadores(self, backend):
+        """Test: Al exceder el límite se responde 429 con Retry-After y se cuentan rechazos"""
+        vista = rate_limit(limit=2, window=60)(lambda request: HttpResponse('ok'))
+        codigos = [vista(_request()).status_code for _ in range(3)]
+        assert codigos == [200, 200, 429]
+        assert int(vista(_request())['Retry-After']) >= 1
+        assert vista(_request('10.0.0.2')).status_code == 200
+        contadores = list(security.get_stats()['vistas'].values())[0]
+        assert contadores == {'permitidas': 3, 'rechazadas': 2, 'errores': 0}
+
+    def test_cada_vista_cuenta_por_separado(self, backend):
+        """Test: El límite de una vista no consume el de otra para la misma IP"""
+        def vista_a(request):
+            return HttpResponse('a')
+
+        def vista_b(request):
+            return HttpResponse('b')
+
+        vista_a, vista_b = rate_limit(limit=1)(vista_a), rate_limit(limit=1)(vista_b)
+        assert vista_a(_request()).status_code == 200
+        assert vista_b(_request()).status_code == 200
+        assert vista_a(_request()).status_code == 429
+
+    def test_falla_abierto_si_el_backend_falla(self, backend):
+        """Test: Un error del almacén no bloquea la vista"""
+        vista = rate_limit(limit=1)(lambda request: HttpResponse('ok'))
+        with mock.patch.object(backend, 'hit', side_effect=RuntimeError('database is locked')):
+            assert vista(_request()).status_code == 200
+        assert list(security.get_stats()['vistas'].values())[0]['errores'] == 1
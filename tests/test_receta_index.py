@@ -0,0 +1,184 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del índice en memoria de recetas y costos (RecetaManager)
+"""
+
+from unittest import mock
+
+import pytest
+
+from dao import detalleCompraDAO
+from entidades.productoInsumo import ProductoInsumo
+from manager import recetaManager
+from manager.recetaManager import RecetaManager
+from utils import catalog_cache
+from utils.catalog_cache import notify_change
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(recetaManager, '_indice', recetaManager._IndiceRecetas())
+    manager = RecetaManager.__new__(RecetaManager)
+    manager.producto_insumo_dao = mock.Mock(listar_todos=mock.Mock(return_value=[
+        ProductoInsumo(id_producto=10, id_insumo=1, cantidad_necesaria=0.5),
+        ProductoInsumo(id_producto=10, id_insumo=2, cantidad_necesaria=2),
+        ProductoInsumo(id_producto=11, id_insumo=1, cantidad_necesaria=1),
+    ]))
+    manager.detalle_compra_dao = mock.Mock(listar_ventanas_costos=mock.Mock(return_value=[
+        {'id_detalle_compra': 1, 'id_insumo': 1, 'cantidad': 10, 'subtotal': 20},
+        {'id_detalle_compra': 2, 'id_insumo': 1, 'cantidad': 10, 'subtotal': 40},
+        {'id_detalle_compra': 3, 'id_insumo': 2, 'cantidad': 4, 'subtotal': 2},
+    ]))
+    return manager
+
+
+class TestIndiceRecetas:
+    """Tests para RecetaManager"""
+
+    def test_costo_en_memoria_tras_una_carga(self, manager):
+        """Test: El costo sale del índice sin consultas por insumo"""
+        costo, lineas = manager.desgloseCosto(10)
+        manager.desgloseCosto(11)
+
+        # Insumo 1: 60 / 20 = 3 por unidad; insumo 2: 2 / 4 = 0.5
+        assert costo == pytest.approx(0.5 * 3 + 2 * 0.5)
+        assert [(l['id_insumo'], l['costo_unitario']) for l in lineas] == [(1, 3.0), (2, 0.5)]
+        assert manager.productosConInsumo(1) == {10, 11}
+        manager.producto_insumo_dao.listar_todos.assert_called_once()
+        manager.detalle_compra_dao.listar_ventanas_costos.assert_called_once_with({1, 2}, recetaManager.VENTANA_COMPRAS)
+        manager.detalle_compra_dao.listar_por_insumo.assert_not_called()
+
+    def test_promedio_incremental_con_ventana(self, manager):
+        """Test: Las compras nuevas entran al promedio y las más viejas salen de la ventana"""
+        manager.costoUnitario(1)
+        notify_change('detalle_compra', filas=[{'id_insumo': 1, 'cantidad': 20, 'subtotal': 100}])
+
+        assert manager.costoUnitario(1) == pytest.approx(160 / 40)
+
+        notify_change('detalle_compra', filas=[{'id_insumo': 1, 'cantidad': 1, 'subtotal': 1}]
+                      * recetaManager.VENTANA_COMPRAS)
+        assert manager.costoUnitario(1) == pytest.approx(1.0)
+
+    def test_reemplazo_de_receta_actualiza_indices(self, manager):
+        """Test: Reemplazar la receta cambia costo e índice inverso sin recargar todo"""
+        manager.costoProducto(10)
+        notify_change('receta', id_producto=10, filas=[ProductoInsumo(id_producto=10, id_insumo=2,
+                                                                     cantidad_necesaria=4)])
+
+        assert manager.costoProducto(10) == pytest.approx(2.0)
+        assert manager.productosConInsumo(1) == {11}
+        manager.producto_insumo_dao.listar_todos.assert_called_once()
+
+    def test_cambio_puntual_recarga_solo_lo_afectado(self, manager):
+        """Test: Un evento sin filas recarga únicamente el producto o insumo indicado"""
+        manager.costoProducto(10)
+        manager.producto_insumo_dao.listar_por_productos.return_value = []
+        manager.detalle_compra_dao.listar_por_insumo.return_value = [{'id_insumo': 2, 'cantidad': 1, 'subtotal': 5}]
+
+        notify_change('receta', id_producto=11)
+        notify_change('detalle_compra', id_insumo=2)
+
+        assert manager.receta(11) == []
+        assert manager.costoUnitario(2) == pytest.approx(5.0)
+        manager.producto_insumo_dao.listar_por_productos.assert_called_once_with([11])
+        manager.detalle_compra_dao.listar_por_insumo.assert_called_once_with(2, limite=recetaManager.VENTANA_COMPRAS)
+
+    def test_margen_incompleto_sin_compras(self, manager):
+        """Test: El margen se marca incompleto si un insumo no tiene compras"""
+        manager.costoProducto(10)
+        notify_change('receta', id_producto=12, filas=[
+            ProductoInsumo(id_producto=12, id_insumo=1, cantidad_necesaria=1),
+            ProductoInsumo(id_producto=12, id_insumo=99, cantidad_necesaria=1),
+        ])
+
+        margen = manager.margenProducto(12, 10)
+
+        assert margen['costo'] == pytest.approx(3.0)
+        assert margen['margen_pct'] == pytest.approx(70.0)
+        assert margen['completo'] is False
+        manager.detalle_compra_dao.listar_ventanas_costos.assert_called_with({99}, recetaManager.VENTANA_COMPRAS)
+
+    def test_insumo_fuera_de_recetas_se_lee_al_consultarlo(self, manager):
+        """Test: Solo se cargan las ventanas de insumos con receta; otro insumo se lee una vez al pedirlo"""
+        manager.detalle_compra_dao.listar_por_insumo.return_value = [
+            {'id_insumo': 7, 'cantidad': 2, 'subtotal': 8}, {'id_insumo': 7, 'cantidad': 2, 'subtotal': 4}]
+
+        assert manager.costoUnitario(7) == pytest.approx(3.0)
+        assert manager.costoUnitario(7) == pytest.approx(3.0)
+        notify_change('detalle_compra', filas=[{'id_insumo': 8, 'cantidad': 1, 'subtotal': 1}])
+
+        manager.detalle_compra_dao.listar_por_insumo.assert_called_once_with(7, limite=recetaManager.VENTANA_COMPRAS)
+        assert 8 not in recetaManager._indice.sumas
+
+
+class TestVentanasDeCompras:
+    """Tests para DetalleCompraDAO.listar_ventanas_costos"""
+
+    def test_rpc_por_tandas_de_insumos(self):
+        """Test: Los insumos se piden en tandas para que cada respuesta quepa en una página"""
+        dao = detalleCompraDAO.DetalleCompraDAO.__new__(detalleCompraDAO.DetalleCompraDAO)
+        dao.supabase = mock.Mock()
+        dao.supabase.rpc.return_value.execute.return_value = mock.Mock(data=[{'id_insumo': 1}])
+
+        filas = dao.listar_ventanas_costos(range(1, 46), 50)
+
+        llamadas = [c.args for c in dao.supabase.rpc.call_args_list]
+        assert [len(params['p_ids']) for _, params in llamadas] == [20, 20, 5]
+        assert {nombre for nombre, _ in llamadas} == {'compras_recientes_por_insumo'}
+        assert llamadas[0][1]['p_ventana'] == 50
+        assert len(filas) == 3
+
+
+class TestReporteCostos:
+    """Tests para RecetaManager.reporteCostos"""
+
+    @pytest.fixture(autouse=True)
+    def cache_limpio(self):
+        catalog_cache.clear_all()
+        yield
+        catalog_cache.clear_all()
+
+    def _productos(self, manager):
+        manager.producto_dao = mock.Mock(iterar_activos=mock.Mock(side_effect=lambda **kw: iter([
+            {'id_producto': 10, 'codigo': 'P10', 'nombre': 'Torta', 'precio': 10},
+            {'id_producto': 11, 'codigo': 'P11', 'nombre': 'Merengón', 'precio': 4},
+            {'id_producto': 12, 'codigo': 'P12', 'nombre': 'Vela', 'precio': 1},
+        ])))
+        manager.detalle_compra_dao.listar_ventanas_costos.return_value = [
+            {'id_detalle_compra': 1, 'id_insumo': 1, 'cantidad': 10, 'subtotal': 30},
+            {'id_detalle_compra': 3, 'id_insumo': 2, 'cantidad': 4, 'subtotal': 2},
+        ]
+        return manager
+
+    def test_reporte_con_tres_lecturas(self, manager):
+        """Test: Una lectura de recetas, una de las compras recientes de sus insumos y una de productos"""
+        manager = self._productos(manager)
+
+        res = manager.reporteCostos()
+
+        filas = {f['id_producto']: f for f in res['data']['filas']}
+        assert res['success'] is True
+        assert filas[10]['costo'] == pytest.approx(2.5)
+        assert filas[10]['margen_pct'] == pytest.approx(75.0)
+        assert [i['id_insumo'] for i in filas[10]['insumos_principales']] == [1, 2]
+        assert filas[10]['insumos_principales'][0]['participacion'] == pytest.approx(60.0)
+        assert filas[12]['costo'] is None and filas[12]['completo'] is False
+        # Merengón (25%) antes que Torta (75%); sin receta al final
+        assert [f['id_producto'] for f in res['data']['filas']] == [11, 10, 12]
+        manager.producto_insumo_dao.listar_todos.assert_called_once()
+        manager.detalle_compra_dao.listar_ventanas_costos.assert_called_once_with({1, 2}, recetaManager.VENTANA_COMPRAS)
+        manager.producto_dao.iterar_activos.assert_called_once()
+
+    def test_reporte_cacheado_hasta_un_cambio(self, manager):
+        """Test: El reporte se reutiliza y se recalcula tras una compra nueva"""
+        manager = self._productos(manager)
+
+        manager.reporteCostos()
+        manager.reporteCostos()
+        assert manager.producto_dao.iterar_activos.call_count == 1
+
+        notify_change('detalle_compra', filas=[{'id_insumo': 1, 'cantidad': 10, 'subtotal': 10}])
+        manager.reporteCostos()
+        assert manager.producto_dao.iterar_activos.call_count == 2
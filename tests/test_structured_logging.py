@@ -0,0 +1,149 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias del log estructurado asíncrono con rotación (utils.structured_logging)
+"""
+
+import gzip
+import json
+import logging
+import os
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+
+from utils import log_reader, structured_logging
+from utils.structured_logging import GzipRotatingFileHandler, log_event, segment_paths
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'logs' / 'app.jsonl')
+    structured_logging.flush()
+    monkeypatch.setenv('APP_LOG_FILE', path)
+    monkeypatch.setattr(structured_logging, '_stats', {'sampled_out': 0, 'dropped': 0})
+    yield path
+    structured_logging.flush()
+
+
+def _lineas(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f]
+
+
+def _lineas_segmento(segmento):
+    """El segmento más nuevo queda sin comprimir (.gz.raw) hasta la rotación siguiente"""
+    if segmento.endswith('.raw'):
+        return _lineas(segmento)
+    with gzip.open(segmento, 'rt', encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f]
+
+
+class TestStructuredLogging:
+    """Tests para el handler en cola, la rotación y el muestreo"""
+
+    def test_escribe_en_segundo_plano(self, log_file):
+        """Test: log_event solo encola y el hilo escritor deja la línea en el archivo"""
+        log_event('login', success=True, email='a@b.com')
+        structured_logging.flush()
+        [entrada] = _lineas(log_file)
+        assert entrada['event'] == 'login' and entrada['email'] == 'a@b.com'
+        assert entrada['ts'].endswith('Z')
+
+    def test_serializa_una_sola_vez(self, log_file):
+        """Test: El payload se serializa en una pasada y lo no serializable se convierte a texto"""
+        with mock.patch.object(structured_logging.json, 'dumps', wraps=json.dumps) as dumps:
+            log_event('pedido_creado', monto=Decimal('10.50'))
+        assert dumps.call_count == 1
+        structured_logging.flush()
+        assert _lineas(log_file)[0]['monto'] == '10.50'
+
+    def test_muestreo_conserva_fallos(self, log_file, monkeypatch):
+        """Test: Los eventos muestreados se descartan salvo los fallidos, que llevan sample_rate"""
+        monkeypatch.setattr(structured_logging, 'SAMPLE_RATES', {'catalog_view': 0.25})
+        with mock.patch.object(structured_logging.random, 'random', side_effect=[0.9, 0.1]):
+            log_event('catalog_view', success=True)
+            log_event('catalog_view', success=True)
+        log_event('catalog_view', success=False)
+        structured_logging.flush()
+        entradas = _lineas(log_file)
+        assert [e['success'] for e in entradas] == [True, False]
+        assert entradas[0]['sample_rate'] == 0.25 and 'sample_rate' not in entradas[1]
+        assert structured_logging.get_stats()['sampled_out'] == 1
+
+    def test_parse_sample_rates(self):
+        """Test: La configuración por variable de entorno ignora valores inválidos y acota a [0, 1]"""
+        assert structured_logging._parse_sample_rates('a=0.1, b=2,c=x,') == {'a': 0.1, 'b': 1.0}
+
+    def test_rotacion_gzip_y_visor(self, log_file, monkeypatch):
+        """Test: Al superar el tamaño se rota a .gz, se conservan backup_count segmentos y el visor los lee"""
+        monkeypatch.setattr(structured_logging, 'LOG_MAX_BYTES', 400)
+        monkeypatch.setattr(structured_logging, 'LOG_BACKUP_COUNT', 3)
+        for i in range(20):
+            log_event('login' if i % 2 else 'pedido_creado', success=True, n=i)
+        structured_logging.flush()
+
+        segmentos = segment_paths(log_file)
+        assert len(segmentos) == 3
+        assert os.path.getsize(log_file) <= 400
+        assert segmentos[0].endswith('.gz.raw') and all(s.endswith('.gz') for s in segmentos[1:])
+        with gzip.open(segmentos[1], 'rt', encoding='utf-8') as f:
+            assert json.loads(f.readline())['event'] in ('login', 'pedido_creado')
+
+        entradas = log_reader.consultar(log_file, limite=100)
+        numeros = [e['n'] for e in entradas]
+        assert numeros[0] == 19
+        assert numeros == sorted(numeros, reverse=True) and len(numeros) > len(_lineas(log_file))
+        assert [e['n'] for e in log_reader.consultar(log_file, evento='login', limite=3)] == [19, 17, 15]
+        # El resumen de cada segmento se guarda para no volver a descomprimirlo
+        assert all(os.path.exists(s + '.idx') for s in segmentos)
+
+    def test_rotacion_compartida_entre_procesos(self, tmp_path):
+        """Test: Dos handlers sobre el mismo archivo (como dos workers) rotan sin perder ni duplicar líneas"""
+        path = str(tmp_path / 'app.jsonl')
+        handlers = [GzipRotatingFileHandler(path, max_bytes=200) for _ in range(2)]
+        for handler in handlers:
+            handler.setFormatter(logging.Formatter('%(message)s'))
+        for i in range(30):
+            linea = json.dumps({'ts': '2026-10-17T10:00:00Z', 'n': i})
+            handlers[i % 2].handle(logging.makeLogRecord({'msg': linea}))
+        for handler in handlers:
+            handler.close()
+
+        numeros = [e['n'] for e in _lineas(path)]
+        for segmento in segment_paths(path):
+            numeros += [e['n'] for e in _lineas_segmento(segmento)]
+        assert sorted(numeros) == list(range(30))
+        assert len(segment_paths(path)) > 2 and os.path.getsize(path) <= 200
+
+    def test_escritura_tardia_no_se_pierde_al_comprimir(self, tmp_path):
+        """Test: Lo que otro proceso agrega al segmento recién rotado queda en el .gz final"""
+        path = str(tmp_path / 'app.jsonl')
+        handlers = [GzipRotatingFileHandler(path, max_bytes=200) for _ in range(2)]
+        for handler in handlers:
+            handler.setFormatter(logging.Formatter('%(message)s'))
+        linea = lambda n: logging.makeLogRecord({'msg': json.dumps({'ts': '2026-10-17T10:00:00Z', 'n': n})})
+        handlers[0].handle(linea(0))
+        handlers[1].handle(linea(1))
+        handlers[1].doRollover()
+        # El primer handler verificó el inodo justo antes de la rotación y escribe en el viejo
+        handlers[0].stream.write(json.dumps({'ts': '2026-10-17T10:00:00Z', 'n': 2}) + '\n')
+        handlers[0].stream.flush()
+        handlers[1].handle(linea(3))
+        handlers[1].doRollover()
+        for handler in handlers:
+            handler.close()
+
+        segmentos = segment_paths(path)
+        assert [s.endswith('.gz.raw') for s in segmentos] == [True, False]
+        assert [e['n'] for e in _lineas_segmento(segmentos[1])] == [0, 1, 2]
+
+    def test_cola_llena_descarta_sin_bloquear(self, log_file):
+        """Test: Si el hilo escritor no da abasto los registros se descartan y se cuentan"""
+        structured_logging._init_logger()
+        with mock.patch.object(structured_logging._listener.queue, 'put_nowait',
+                               side_effect=structured_logging.queue.Full):
+            log_event('login', success=True)
+        assert structured_logging.get_stats()['dropped'] == 1
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas unitarias de DetallePedidoDAO.top_productos (RPC y agregación paginada)
+"""
+
+import pytest
+from postgrest.exceptions import APIError
+
+from dao import detallePedidoDAO as modulo
+from dao.detallePedidoDAO import DetallePedidoDAO
+from utils import catalog_cache
+
+
+class _FakeVentas:
+    """Cliente mínimo con pedido/detalle_pedido/producto y una RPC opcional"""
+
+    def __init__(self, pedidos, detalles, productos, rpc=None):
+        self.pedidos = {p['id_pedido']: p for p in pedidos}
+        self.detalles = detalles
+        self.productos = productos
+        self.rpc_fn = rpc
+        self.log = []
+
+    def rpc(self, nombre, params):
+        fake = self
+
+        class _Rpc:
+            def execute(self):
+                fake.log.append(('rpc', nombre))
+                if fake.rpc_fn is None:
+                    raise APIError({'code': 'PGRST202', 'message': f'function {nombre} does not exist'})
+                return type('Resp', (), {'data': fake.rpc_fn(params)})()
+        return _Rpc()
+
+    def table(self, nombre):
+        self._tabla, self._filtros, self._rango = nombre, [], None
+        return self
+
+    def select(self, cols='*'):
+        return self
+
+    def _filtro(self, col, fn):
+        self._filtros.append((col, fn))
+        return self
+
+    def gte(self, col, v): return self._filtro(col, lambda x: x >= v)
+    def lt(self, col, v): return self._filtro(col, lambda x: x < v)
+    def lte(self, col, v): return self._filtro(col, lambda x: x <= v)
+    def eq(self, col, v): return self._filtro(col, lambda x: x == v)
+    def in_(self, col, vs): return self._filtro(col, lambda x: x in vs)
+
+    def order(self, col):
+        return self
+
+    def range(self, a, b):
+        self._rango = (a, b)
+        return self
+
+    def _valor(self, fila, col):
+        if col.startswith('pedido.'):
+            return self.pedidos[fila['id_pedido']][col.split('.', 1)[1]]
+        return fila.get(col)
+
+    def execute(self):
+        self.log.append(('select', self._tabla))
+        filas = self.detalles if self._tabla == 'detalle_pedido' else self.productos
+        filas = [f for f in filas if all(fn(self._valor(f, c)) for c, fn in self._filtros)]
+        if self._rango:
+            filas = filas[self._rango[0]:self._rango[1] + 1]
+        return type('Resp', (), {'data': [dict(f) for f in filas]})()
+
+
+@pytest.fixture(autouse=True)
+def limpiar(monkeypatch):
+    catalog_cache.clear_all()
+    monkeypatch.setattr(DetallePedidoDAO, '_rpc_top_fallo_en', None)
+    yield
+    catalog_cache.clear_all()
+
+
+def _datos():
+    pedidos = [
+        {'id_pedido': 1, 'fecha': '2026-01-10T10:00:00', 'id_sede': 1},
+        {'id_pedido': 2, 'fecha': '2026-02-10T10:00:00', 'id_sede': 2},
+    ]
+    detalles = []
+    for i in range(7):
+        detalles.append({'id_detalle': i, 'id_pedido': 1 + i % 2, 'id_producto': 10 + i % 3,
+                         'cantidad': 1, 'subtotal': 5.0})
+    productos = [{'id_producto': 10, 'nombre': 'Torta'}, {'id_producto': 11, 'nombre': 'Merengue'},
+                 {'id_producto': 12, 'nombre': 'Alfajor'}]
+    return pedidos, detalles, productos
+
+
+class TestTopProductos:
+    """Tests para el ranking de productos vendidos"""
+
+    def test_usa_rpc_cuando_existe(self, monkeypatch):
+        """Test: Con la función SQL disponible no se lee detalle_pedido"""
+        fake = _FakeVentas(*_datos(), rpc=lambda p: [
+            {'id_producto': 10, 'nombre': 'Torta', 'cantidad_total': 3, 'subtotal_total': '15.00'}])
+        monkeypatch.setattr(modulo, 'get_supabase_client', lambda: fake)
+
+        filas = DetallePedidoDAO().top_productos(limite=5)
+
+        assert filas == [{'id_producto': 10, 'nombre': 'Torta', 'cantidad_total': 3, 'subtotal_total': 15.0}]
+        assert ('select', 'detalle_pedido') not in fake.log
+
+    def test_fallback_paginado_con_filtros(self, monkeypatch):
+        """Test: Sin RPC se agrega por páginas respetando fecha y sede"""
+        fake = _FakeVentas(*_datos())
+        monkeypatch.setattr(modulo, 'get_supabase_client', lambda: fake)
+        monkeypatch.setattr(modulo, 'PAGINA_AGREGACION', 2)
+
+        filas = DetallePedidoDAO().top_productos(desde='2026-01-01', hasta='2026-01-31', id_sede=1)
+
+        # Pedido 1 (sede 1, enero) tiene los detalles 0, 2, 4, 6 -> productos 10, 12, 11, 10
+        assert [(f['id_producto'], f['cantidad_total']) for f in filas][0] == (10, 2)
+        assert sum(f['cantidad_total'] for f in filas) == 4
+        assert {f['nombre'] for f in filas} == {'Torta', 'Merengue', 'Alfajor'}
+        assert fake.log.count(('select', 'detalle_pedido')) == 3
+
+    def test_resultado_cacheado_por_filtros(self, monkeypatch):
+        """Test: La misma consulta se sirve desde caché y no reintenta la RPC fallida"""
+        fake = _FakeVentas(*_datos())
+        monkeypatch.setattr(modulo, 'get_supabase_client', lambda: fake)
+        dao = DetallePedidoDAO()
+
+        primero = dao.top_productos(limite=2)
+        llamadas = len(fake.log)
+        assert dao.top_productos(limite=2) == primero
+        assert len(fake.log) == llamadas
+
+        dao.top_productos(limite=3)
+        assert fake.log.count(('rpc', 'top_productos')) == 1
+
+    def test_ventas_hasta_pedido_sin_cache(self, monkeypatch):
+        """Test: La reconciliación lee hasta max_pedido y no guarda el ranking en caché"""
+        fake = _FakeVentas(*_datos())
+        monkeypatch.setattr(modulo, 'get_supabase_client', lambda: fake)
+
+        filas = DetallePedidoDAO().ventas_hasta_pedido(1, limite=100)
+
+        # Pedido 1 tiene los detalles 0, 2, 4, 6
+        assert sum(f['cantidad_total'] for f in filas) == 4
+        assert catalog_cache.get_stats()['entries'] == 0
+
+    def test_ventas_hasta_pedido_pasa_el_tope_a_la_rpc(self, monkeypatch):
+        """Test: Con la función SQL disponible el tope de pedido va como parámetro"""
+        params = []
+        fake = _FakeVentas(*_datos(), rpc=lambda p: params.append(p) or [])
+        monkeypatch.setattr(modulo, 'get_supabase_client', lambda: fake)
+
+        DetallePedidoDAO().ventas_hasta_pedido(2, limite=100)
+
+        assert params[0]['p_max_pedido'] == 2
+
+    def test_error_de_la_rpc_no_la_desactiva(self, monkeypatch):
+        """Test: Un error que no es función inexistente se propaga y la RPC se sigue usando"""
+        def _falla(params):
+            raise APIError({'code': '57014', 'message': 'canceling statement due to statement timeout'})
+        fake = _FakeVentas(*_datos(), rpc=_falla)
+        monkeypatch.setattr(modulo, 'get_supabase_client', lambda: fake)
+
+        with pytest.raises(APIError):
+            DetallePedidoDAO().top_productos(limite=5)
+
+        assert DetallePedidoDAO._rpc_top_fallo_en is None
+        assert ('select', 'detalle_pedido') not in fake.log
@@ -48,11 +48,18 @@ urlpatterns = [
     path('admin-panel/', views.admin_panel, name='admin_panel'),
     path('admin-panel/kpis/', views.admin_kpis, name='admin_kpis'),
     path('admin-panel/funcionalidades/', views.admin_funcionalidades, name='admin_funcionalidades'),
-        path('admin/export/pedidos.csv', views.export_pedidos_csv, name='export_pedidos_csv'),
-        path('admin/export/productos.csv', views.export_productos_csv, name='export_productos_csv'),
-    path('admin/kpis/top-productos/', views.admin_top_productos, name='admin_top_productos'),
+    path('app-admin/export/pedidos.csv', views.export_pedidos_csv, name='export_pedidos_csv'),
+    path('app-admin/export/productos.csv', views.export_productos_csv, name='export_productos_csv'),
+    path('app-admin/kpis/top-productos/', views.admin_top_productos, name='admin_top_productos'),
+    path('app-admin/reportes/costos/', views.admin_reporte_costos, name='admin_reporte_costos'),
+    path('app-admin/export/costos.csv', views.export_reporte_costos_csv, name='export_reporte_costos_csv'),
     # Auditoría
     path('app-admin/auditoria/', views.auditoria_logs, name='auditoria_logs'),
+    path('app-admin/cache/', views.cache_estadisticas, name='cache_estadisticas'),
+    # Trabajos en segundo plano (los ejecuta manage.py procesar_trabajos)
+    path('app-admin/trabajos/', views.trabajos_admin, name='trabajos_admin'),
+    path('app-admin/trabajos/<str:id_trabajo>/', views.trabajo_estado, name='trabajo_estado'),
+    path('app-admin/trabajos/<str:id_trabajo>/descargar/', views.trabajo_descargar, name='trabajo_descargar'),
     # Notificaciones
     path('notificaciones/', views.notificaciones_cliente, name='notificaciones_cliente'),
     path('notificaciones/marcar/<int:id_notificacion>/', views.notificacion_marcar_leida, name='notificacion_marcar_leida'),
@@ -1,38 +1,669 @@
+import logging
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
 import time
 import threading
-from typing import Callable, Any, Dict, Tuple
+import weakref
+from collections import OrderedDict
+from typing import Callable, Any, Dict, List, Optional, Tuple
 
-_cache_store: Dict[str, Tuple[float, Any]] = {}
+logger = logging.getLogger(__name__)
+
+# Límites del almacén (configurables por entorno)
+MAX_ENTRIES = int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', '256'))
+MAX_BYTES = int(os.getenv('CATALOG_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# Backend: 'memory' (por proceso) o 'sqlite' (compartido entre workers del mismo host)
+BACKEND = os.getenv('CATALOG_CACHE_BACKEND', 'memory').lower()
+SQLITE_PATH = os.getenv('CATALOG_CACHE_PATH') or os.path.join(tempfile.gettempdir(), 'supermerengones_catalog_cache.sqlite3')
+# Claves con contadores en _stats y versiones recordadas por MemoryBackend; las más viejas se
+# descartan para que las claves dinámicas (ej. una por combinación de filtros) no crezcan sin fin
+MAX_STATS_KEYS = int(os.getenv('CATALOG_CACHE_MAX_STATS_KEYS', '512'))
+MAX_VERSIONS = 4 * MAX_ENTRIES
+# Segundos que un worker reserva una clave mientras la carga (single-flight entre procesos)
+LOAD_LEASE_SECONDS = 30
+# Segundos máximos que otro worker espera esa carga antes de cargar por su cuenta
+LOAD_WAIT_SECONDS = 10
+
+# Claves de catálogo que dependen de cada entidad; notify_change(entidad) las invalida
+_dependencias: Dict[str, set] = {
+    'producto': {'productos_activos'},
+    'sede': {'sedes_activas'},
+    'insumo': {'insumos_lista', 'insumos_nombres'},
+}
+# Callbacks adicionales por entidad (ej. recalcular índices derivados)
+_suscriptores: Dict[str, List[Callable[..., None]]] = {}
+# Cargas en curso por clave dentro de este proceso (single-flight entre hilos)
+_inflight: Dict[str, '_Carga'] = {}
+# Contadores por clave de este proceso
+_stats: Dict[str, Dict[str, Any]] = {}
+# TTLCache creados, para que clear_all() también los vacíe
+_ttl_caches: 'weakref.WeakSet[TTLCache]' = weakref.WeakSet()
 _lock = threading.Lock()
 
 
-def get_or_cache(key: str, ttl: int, loader: Callable[[], Any]) -> Any:
+class _Entry:
+    __slots__ = ('data', 'stored_at', 'ttl', 'stale_ttl', 'size', 'version')
+
+    def __init__(self, data, stored_at, ttl, stale_ttl, size, version):
+        self.data = data
+        self.stored_at = stored_at
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.size = size
+        self.version = version
+
+
+class _Carga:
+    """Carga en curso de una clave; los demás hilos esperan su resultado."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.data = None
+        self.error = None
+
+
+def _estimar_bytes(data: Any) -> int:
+    try:
+        return len(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(data)
+
+
+class CacheBackend:
+    """Interfaz de almacenamiento del caché de catálogo.
+
+    Las implementaciones guardan entradas con versión por clave: set() solo almacena
+    si la versión de la entrada coincide con la actual, e invalidate() la incrementa.
+    Deben ser seguras entre hilos: get_or_cache las llama sin tomar el lock global.
+    """
+
+    # True si todos los workers ven el mismo almacén (y por lo tanto cada invalidación)
+    shared = False
+
+    def get(self, key: str) -> Optional[_Entry]:
+        raise NotImplementedError
+
+    def peek(self, key: str) -> Optional[_Entry]:
+        """Metadatos de la entrada (data=None), sin marcarla como usada ni deserializarla."""
+        raise NotImplementedError
+
+    def set(self, key: str, entry: _Entry) -> Tuple[bool, List[str]]:
+        """Guarda la entrada; retorna (almacenada, claves expulsadas)."""
+        raise NotImplementedError
+
+    def invalidate(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def version(self, key: str) -> int:
+        raise NotImplementedError
+
+    def keys(self) -> List[str]:
+        raise NotImplementedError
+
+    def summary(self) -> Dict[str, int]:
+        """dict con 'entries' y 'bytes' almacenados."""
+        raise NotImplementedError
+
+    def acquire_load(self, key: str) -> bool:
+        """Reserva la carga de una clave; False si otro proceso ya la está cargando."""
+        return True
+
+    def release_load(self, key: str) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """Almacén LRU en memoria del proceso (no se comparte entre workers), con lock propio."""
+
+    def __init__(self):
+        # key -> _Entry, en orden LRU (el más reciente al final)
+        self._store: 'OrderedDict[str, _Entry]' = OrderedDict()
+        # key -> versión, de un contador global; al pasar MAX_VERSIONS se olvidan las más
+        # viejas y su máximo queda como piso (una carga iniciada antes se descarta igual)
+        self._versions: 'OrderedDict[str, int]' = OrderedDict()
+        self._ultima_version = 0
+        self._piso_version = 0
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    def _remove(self, key):
+        entry = self._store.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is not None:
+                self._store.move_to_end(key)
+            return entry
+
+    def peek(self, key):
+        with self._lock:
+            entry = self._store.get(key)
+        if entry is None:
+            return None
+        return _Entry(None, entry.stored_at, entry.ttl, entry.stale_ttl, entry.size, entry.version)
+
+    def set(self, key, entry):
+        if entry.size is None:
+            entry.size = _estimar_bytes(entry.data)
+        with self._lock:
+            if self.version(key) != entry.version:
+                return False, []
+            self._remove(key)
+            if entry.size > MAX_BYTES:
+                # Un valor más grande que el presupuesto completo no se cachea
+                return False, []
+            self._store[key] = entry
+            self._total_bytes += entry.size
+            evicted = []
+            while len(self._store) > MAX_ENTRIES or self._total_bytes > MAX_BYTES:
+                old_key = next(iter(self._store))
+                self._remove(old_key)
+                evicted.append(old_key)
+            return True, evicted
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+            self._ultima_version += 1
+            self._versions[key] = self._ultima_version
+            self._versions.move_to_end(key)
+            while len(self._versions) > MAX_VERSIONS:
+                _, vieja = self._versions.popitem(last=False)
+                self._piso_version = max(self._piso_version, vieja)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._store):
+                self.invalidate(key)
+
+    def version(self, key):
+        with self._lock:
+            return self._versions.get(key, self._piso_version)
+
+    def keys(self):
+        with self._lock:
+            return list(self._store)
+
+    def summary(self):
+        with self._lock:
+            return {'entries': len(self._store), 'bytes': self._total_bytes}
+
+
+class SQLiteBackend(CacheBackend):
+    """Almacén compartido en un archivo SQLite local, visible para todos los workers del host.
+
+    Cada proceso guarda además una copia deserializada de las entradas que leyó y solo
+    vuelve a leer el blob cuando cambia su stored_at/version, de modo que un acierto
+    cuesta una consulta pequeña. invalidate() borra la fila e incrementa la versión en
+    el archivo, por lo que la invalidación llega a todos los workers.
+    """
+
+    shared = True
+
+    # Cada cuántos segundos se actualiza last_access en un acierto (LRU aproximado)
+    TOUCH_INTERVAL = 30
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        # key -> (stored_at, version, data) deserializado en este proceso
+        self._decoded: Dict[str, Tuple[float, int, Any]] = {}
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS cache_entry ('
+                     'key TEXT PRIMARY KEY, data BLOB NOT NULL, stored_at REAL NOT NULL, '
+                     'ttl REAL NOT NULL, stale_ttl REAL NOT NULL, size INTEGER NOT NULL, '
+                     'version INTEGER NOT NULL, last_access REAL NOT NULL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS cache_version (key TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS cache_lease (key TEXT PRIMARY KEY, expires REAL NOT NULL)')
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _version(self, conn, key):
+        row = conn.execute('SELECT version FROM cache_version WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute('SELECT stored_at, ttl, stale_ttl, size, version, last_access '
+                           'FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self._decoded.pop(key, None)
+            return None
+        stored_at, ttl, stale_ttl, size, version, last_access = row
+        local = self._decoded.get(key)
+        if local and local[0] == stored_at and local[1] == version:
+            data = local[2]
+        else:
+            blob = conn.execute('SELECT data FROM cache_entry WHERE key = ?', (key,)).fetchone()
+            if blob is None:
+                return None
+            data = pickle.loads(blob[0])
+            self._decoded[key] = (stored_at, version, data)
+        now = time.time()
+        if now - last_access > self.TOUCH_INTERVAL:
+            conn.execute('UPDATE cache_entry SET last_access = ? WHERE key = ?', (now, key))
+        return _Entry(data, stored_at, ttl, stale_ttl, size, version)
+
+    def peek(self, key):
+        row = self._conn().execute('SELECT stored_at, ttl, stale_ttl, size, version '
+                                   'FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        return _Entry(None, *row) if row else None
+
+    def set(self, key, entry):
+        try:
+            blob = pickle.dumps(entry.data, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False, []
+        entry.size = len(blob)
+        if entry.size > MAX_BYTES:
+            return False, []
+        conn = self._conn()
+        evicted = []
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if self._version(conn, key) != entry.version:
+                conn.execute('ROLLBACK')
+                return False, []
+            conn.execute('INSERT OR REPLACE INTO cache_entry '
+                         '(key, data, stored_at, ttl, stale_ttl, size, version, last_access) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         (key, sqlite3.Binary(blob), entry.stored_at, entry.ttl, entry.stale_ttl,
+                          entry.size, entry.version, time.time()))
+            count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entry').fetchone()
+            if count > MAX_ENTRIES or total > MAX_BYTES:
+                for old_key, old_size in conn.execute(
+                        'SELECT key, size FROM cache_entry WHERE key != ? ORDER BY last_access', (key,)).fetchall():
+                    if count <= MAX_ENTRIES and total <= MAX_BYTES:
+                        break
+                    conn.execute('DELETE FROM cache_entry WHERE key = ?', (old_key,))
+                    evicted.append(old_key)
+                    count -= 1
+                    total -= old_size
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._decoded[key] = (entry.stored_at, entry.version, entry.data)
+        for old_key in evicted:
+            self._decoded.pop(old_key, None)
+        return True, evicted
+
+    def invalidate(self, key):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+            conn.execute('INSERT INTO cache_version (key, version) VALUES (?, 1) '
+                         'ON CONFLICT(key) DO UPDATE SET version = version + 1', (key,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._decoded.pop(key, None)
+
+    def clear(self):
+        for key in self.keys():
+            self.invalidate(key)
+
+    def version(self, key):
+        return self._version(self._conn(), key)
+
+    def keys(self):
+        return [r[0] for r in self._conn().execute('SELECT key FROM cache_entry').fetchall()]
+
+    def summary(self):
+        count, total = self._conn().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entry').fetchone()
+        return {'entries': count, 'bytes': total}
+
+    def acquire_load(self, key):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM cache_lease WHERE key = ? AND expires < ?', (key, now))
+            cur = conn.execute('INSERT OR IGNORE INTO cache_lease (key, expires) VALUES (?, ?)',
+                               (key, now + LOAD_LEASE_SECONDS))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            return True
+        return cur.rowcount == 1
+
+    def release_load(self, key):
+        try:
+            self._conn().execute('DELETE FROM cache_lease WHERE key = ?', (key,))
+        except Exception:
+            pass
+
+
+def _crear_backend() -> CacheBackend:
+    if BACKEND == 'sqlite':
+        try:
+            return SQLiteBackend(SQLITE_PATH)
+        except Exception as e:
+            logger.warning(f"Error al abrir caché compartido en {SQLITE_PATH}, se usa memoria: {e}")
+    return MemoryBackend()
+
+
+_backend: CacheBackend = _crear_backend()
+
+
+def configure_backend(backend: CacheBackend) -> None:
+    """Reemplaza el backend del caché (ej. SQLiteBackend para compartir entre workers)."""
+    global _backend
+    with _lock:
+        _backend = backend
+        _inflight.clear()
+
+
+def get_backend() -> CacheBackend:
+    return _backend
+
+
+def write_through_ttl(shared_ttl: int, local_ttl: int) -> int:
+    """TTL para claves que se invalidan con notify_change.
+
+    Con un backend compartido la invalidación llega a todos los workers y se puede usar
+    el TTL largo; con el de memoria solo la ve el proceso que hizo la escritura, así que
+    los demás dependen del TTL corto para enterarse del cambio.
+    """
+    return shared_ttl if _backend.shared else local_ttl
+
+
+class TTLCache:
+    """Caché chico en memoria del proceso para valores por usuario (ej. contadores de un cliente).
+
+    Va aparte del caché de catálogo para que miles de claves por cliente no expulsen los
+    catálogos ni llenen sus contadores: LRU de max_entries claves, sin estadísticas por
+    clave ni single-flight (son valores baratos de recalcular). Una carga que se cruzó con
+    un invalidate() no se guarda.
+
+    Con version_prefix y un backend compartido, invalidate() incrementa la versión de
+    version_prefix + key en el backend y cada lectura la compara con la del valor guardado,
+    así la invalidación llega a los demás workers sin guardar los valores en el backend.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024, version_prefix: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_prefix = version_prefix
+        # key -> (vence, valor, versión), en orden LRU
+        self._datos: 'OrderedDict[Any, Tuple[float, Any, Any]]' = OrderedDict()
+        self._invalidaciones = 0
+        self._lock = threading.Lock()
+        _ttl_caches.add(self)
+
+    def _version(self, key: Any) -> Any:
+        """Versión compartida de la clave; None si no se comparte entre workers."""
+        if self.version_prefix is None or not _backend.shared:
+            return None
+        try:
+            return _backend.version(f'{self.version_prefix}{key}')
+        except Exception:
+            # Sin versión no se puede saber si otro worker invalidó: se recarga
+            return object()
+
+    def get_or_load(self, key: Any, loader: Callable[[], Any]) -> Any:
+        version = self._version(key)
+        with self._lock:
+            guardado = self._datos.get(key)
+            if guardado is not None and guardado[0] > time.time() and guardado[2] == version:
+                self._datos.move_to_end(key)
+                return guardado[1]
+            invalidaciones = self._invalidaciones
+        valor = loader()
+        with self._lock:
+            if invalidaciones == self._invalidaciones:
+                self._datos[key] = (time.time() + self.ttl, valor, version)
+                self._datos.move_to_end(key)
+                while len(self._datos) > self.max_entries:
+                    self._datos.popitem(last=False)
+        return valor
+
+    def invalidate(self, key: Any) -> None:
+        with self._lock:
+            self._datos.pop(key, None)
+            self._invalidaciones += 1
+        if self.version_prefix is not None and _backend.shared:
+            try:
+                _backend.invalidate(f'{self.version_prefix}{key}')
+            except Exception as e:
+                # Los demás workers ven el valor anterior hasta que venza el ttl
+                logger.warning(f"Error al invalidar {self.version_prefix}{key}: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._datos.clear()
+            self._invalidaciones += 1
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+
+def _stats_vacias() -> Dict[str, Any]:
+    return {'hits': 0, 'stale_hits': 0, 'misses': 0, 'loads': 0, 'load_errors': 0,
+            'load_time_total': 0.0, 'last_load_ms': None, 'evictions': 0}
+
+
+def _key_stats(key: str) -> Dict[str, Any]:
+    st = _stats.get(key)
+    if st is None:
+        if len(_stats) >= MAX_STATS_KEYS:
+            _stats.pop(next(iter(_stats)))
+        st = _stats_vacias()
+        _stats[key] = st
+    return st
+
+
+def _load(key: str, ttl: int, stale_ttl: int, loader: Callable[[], Any], carga: _Carga, version: int) -> None:
+    """Ejecuta loader fuera del lock y publica el resultado a los hilos en espera."""
+    backend = _backend
+    owner = backend.acquire_load(key)
+    if not owner:
+        # Otro worker está cargando la misma clave: esperar su resultado compartido. Solo
+        # sirve una entrada guardada después de empezar a esperar y todavía vigente (la
+        # vencida que provocó esta carga tiene la misma versión y no debe devolverse)
+        start_wait = time.time()
+        deadline = start_wait + LOAD_WAIT_SECONDS
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = backend.get(key)
+            now = time.time()
+            if (entry is not None and entry.version == version and entry.stored_at >= start_wait
+                    and now - entry.stored_at < entry.ttl):
+                with _lock:
+                    _inflight.pop(key, None)
+                carga.data = entry.data
+                carga.event.set()
+                return
+    start = time.time()
+    try:
+        data = loader()
+    except Exception as e:
+        with _lock:
+            _key_stats(key)['load_errors'] += 1
+            _inflight.pop(key, None)
+        if owner:
+            backend.release_load(key)
+        carga.error = e
+        carga.event.set()
+        return
+    elapsed = time.time() - start
+    # Si se invalidó durante la carga, el backend descarta el resultado
+    try:
+        _, evicted = backend.set(key, _Entry(data, time.time(), ttl, stale_ttl, None, version))
+    except Exception as e:
+        logger.exception(f"Error al guardar {key} en caché: {e}")
+        evicted = []
+    with _lock:
+        st = _key_stats(key)
+        st['loads'] += 1
+        st['load_time_total'] += elapsed
+        st['last_load_ms'] = round(elapsed * 1000, 2)
+        for old_key in evicted:
+            _key_stats(old_key)['evictions'] += 1
+        _inflight.pop(key, None)
+    if owner:
+        backend.release_load(key)
+    carga.data = data
+    carga.event.set()
+
+
+def get_or_cache(key: str, ttl: int, loader: Callable[[], Any], stale_ttl: int = 0) -> Any:
     """Retorna dato cacheado si vigente; de lo contrario ejecuta loader y almacena.
 
+    - Una sola carga por clave a la vez: los hilos concurrentes esperan su resultado
+      (y, con el backend compartido, también los demás workers).
+    - Vencido el ttl, durante stale_ttl segundos adicionales se sirve el valor anterior
+      mientras un hilo de fondo lo recarga (stale-while-revalidate). Es opcional por
+      clave: solo para datos donde servir un valor vencido unos segundos es aceptable.
+
     Params:
         key: identificador único del recurso (ej. 'productos_activos').
         ttl: segundos de vida antes de recargar.
         loader: función sin argumentos que retorna el dato fresco.
+        stale_ttl: segundos extra en que se sirve el valor vencido (por defecto 0, desactivado).
     """
     now = time.time()
+    backend = _backend
+    # El backend se lee fuera del lock global (puede ser E/S); el lock solo cubre
+    # _inflight y los contadores. La versión se lee antes de cargar, solo si hace falta
+    try:
+        entry = backend.get(key)
+        version = backend.version(key) if entry is None or now - entry.stored_at >= entry.ttl else None
+    except Exception as e:
+        logger.exception(f"Error al leer {key} del caché: {e}")
+        # Sin versión conocida el resultado de la carga no se guarda
+        entry, version = None, None
     with _lock:
-        entry = _cache_store.get(key)
-        if entry:
-            ts, data = entry
-            if now - ts < ttl:
-                return data
-        # cargar fresco fuera del lock para minimizar tiempo bloqueado
-    data = loader()
-    with _lock:
-        _cache_store[key] = (now, data)
-    return data
+        st = _key_stats(key)
+        if entry is not None:
+            age = now - entry.stored_at
+            if age < entry.ttl:
+                st['hits'] += 1
+                return entry.data
+            if age < entry.ttl + entry.stale_ttl:
+                st['stale_hits'] += 1
+                if key not in _inflight:
+                    carga = _Carga()
+                    _inflight[key] = carga
+                    threading.Thread(
+                        target=_load,
+                        args=(key, ttl, stale_ttl, loader, carga, entry.version),
+                        daemon=True,
+                    ).start()
+                return entry.data
+        st['misses'] += 1
+        carga = _inflight.get(key)
+        owner = carga is None
+        if owner:
+            carga = _Carga()
+            _inflight[key] = carga
+    if owner:
+        _load(key, ttl, stale_ttl, loader, carga, version)
+    else:
+        carga.event.wait()
+    if carga.error is not None:
+        raise carga.error
+    return carga.data
 
 
 def invalidate(key: str) -> None:
-    with _lock:
-        _cache_store.pop(key, None)
+    """Descarta la clave; con el backend compartido la invalidación llega a todos los workers."""
+    _backend.invalidate(key)
 
 
 def clear_all() -> None:
+    _backend.clear()
+    with _lock:
+        caches = list(_ttl_caches)
+    for cache in caches:
+        cache.clear()
+
+
+def register_dependency(entidad: str, key: str) -> None:
+    """Declara que la clave `key` se arma con datos de `entidad` ('producto', 'sede', 'insumo')."""
+    with _lock:
+        _dependencias.setdefault(entidad, set()).add(key)
+
+
+def subscribe(entidad: str, callback: Callable[..., None]) -> None:
+    """Registra un callback(entidad, **info) que se ejecuta tras cada cambio de la entidad."""
+    with _lock:
+        _suscriptores.setdefault(entidad, []).append(callback)
+
+
+def notify_change(entidad: str, **info) -> None:
+    """Invalida las claves que dependen de la entidad y avisa a los suscriptores.
+
+    La llaman los DAO después de cada escritura exitosa (write-through), de modo que los
+    catálogos pueden usar TTL largos sin servir datos viejos. Un error aquí nunca debe
+    romper la escritura que ya se hizo.
+    """
+    with _lock:
+        keys = sorted(_dependencias.get(entidad, ()))
+        callbacks = list(_suscriptores.get(entidad, ()))
+    for key in keys:
+        try:
+            invalidate(key)
+        except Exception as e:
+            logger.warning(f"Error al invalidar {key} tras cambio de {entidad}: {e}")
+    for callback in callbacks:
+        try:
+            callback(entidad, **info)
+        except Exception as e:
+            logger.exception(f"Error en suscriptor de cambios de {entidad}: {e}")
+
+
+def get_stats() -> Dict[str, Any]:
+    """Resumen del caché y contadores por clave de este proceso (para vistas de administración)."""
+    now = time.time()
+    backend = _backend
+    with _lock:
+        contadores = {key: dict(st) for key, st in _stats.items()}
+    # Solo metadatos: no promueve entradas en el LRU ni deserializa valores, y las claves
+    # que solo están en el backend no ocupan lugar en _stats
+    keys = []
+    for key in sorted(set(contadores) | set(backend.keys())):
+        st = contadores.get(key) or _stats_vacias()
+        entry = backend.peek(key)
+        st['key'] = key
+        st['cached'] = entry is not None
+        st['size'] = entry.size if entry else 0
+        st['age'] = round(now - entry.stored_at, 1) if entry else None
+        st['ttl'] = entry.ttl if entry else None
+        st['version'] = backend.version(key)
+        st['avg_load_ms'] = round(st['load_time_total'] * 1000 / st['loads'], 2) if st['loads'] else None
+        lookups = st['hits'] + st['stale_hits'] + st['misses']
+        st['hit_ratio'] = round((st['hits'] + st['stale_hits']) / lookups, 3) if lookups else None
+        keys.append(st)
+    summary = backend.summary()
+    return {
+        'backend': type(backend).__name__,
+        'entries': summary['entries'],
+        'bytes': summary['bytes'],
+        'max_entries': MAX_ENTRIES,
+        'max_bytes': MAX_BYTES,
+        'keys': keys,
+    }
+
+
+def reset_stats() -> None:
     with _lock:
-        _cache_store.clear()
+        _stats.clear()
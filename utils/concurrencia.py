@@ -0,0 +1,52 @@
+"""Fan-out de consultas independientes a Supabase sobre un pool de hilos compartido.
+
+El cliente de supabase-py es síncrono: una vista que necesita pedidos, alertas y compras
+los leía uno tras otro y su latencia era la suma. Con en_paralelo() cada consulta corre
+en un hilo del pool y la vista espera solo a la más lenta.
+
+Cada tarea se ejecuta con una copia del contexto del request (contextvars), así el identity
+map de IdentityMapMiddleware sigue activo dentro de los hilos. Si en_paralelo() se llama
+desde una tarea que ya corre en el pool, las tareas se ejecutan en serie para no agotar
+los hilos esperando a otras del mismo pool.
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# Consultas simultáneas como máximo en todo el proceso
+HILOS_CONSULTAS = int(os.getenv('HILOS_CONSULTAS', '8'))
+
+_local = threading.local()
+
+
+def _marcar_hilo_del_pool():
+    _local.en_pool = True
+
+
+_executor = ThreadPoolExecutor(max_workers=HILOS_CONSULTAS, thread_name_prefix='consulta',
+                               initializer=_marcar_hilo_del_pool)
+
+
+def en_paralelo(tareas: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+    """Ejecuta las funciones sin argumentos de `tareas` en paralelo y retorna {nombre: resultado}.
+
+    Se espera a que terminen todas; si alguna lanzó, se relanza la primera excepción
+    (en el orden de `tareas`). Para degradar por partes, cada tarea debe capturar sus
+    propios errores y retornar su valor por defecto.
+    """
+    if len(tareas) <= 1 or getattr(_local, 'en_pool', False):
+        return {nombre: tarea() for nombre, tarea in tareas.items()}
+    futuros = {nombre: _executor.submit(contextvars.copy_context().run, tarea)
+               for nombre, tarea in tareas.items()}
+    resultados, error = {}, None
+    for nombre, futuro in futuros.items():
+        try:
+            resultados[nombre] = futuro.result()
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+    return resultados
@@ -0,0 +1,92 @@
+"""Identity map por request para las lecturas por ID de los DAO.
+
+Mientras un request está activo (IdentityMapMiddleware), cada lectura tipo
+obtener_por_id se guarda por (entidad, id) y las siguientes lecturas del mismo
+registro en ese request reutilizan el objeto sin volver a Supabase. Las
+escrituras de los DAO llaman a forget() para que la siguiente lectura vaya a
+la base. Fuera de un request (scripts, hilos de fondo, tests) no hay mapa
+activo y lookup() simplemente ejecuta el loader.
+"""
+
+import contextvars
+import functools
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_mapa: contextvars.ContextVar[Optional[Dict[Tuple[str, str], Any]]] = contextvars.ContextVar(
+    'identity_map', default=None
+)
+# Contadores del request actual (útiles para depurar round-trips evitados)
+_stats: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar(
+    'identity_map_stats', default=None
+)
+
+
+def activate() -> Tuple[contextvars.Token, contextvars.Token]:
+    """Abre un mapa vacío para el contexto actual; retorna tokens para deactivate()."""
+    return _mapa.set({}), _stats.set({'hits': 0, 'misses': 0})
+
+
+def deactivate(tokens: Tuple[contextvars.Token, contextvars.Token]) -> None:
+    token_mapa, token_stats = tokens
+    _mapa.reset(token_mapa)
+    _stats.reset(token_stats)
+
+
+def is_active() -> bool:
+    return _mapa.get() is not None
+
+
+def _encontrado(valor: Any) -> bool:
+    # Algunos DAO retornan el Response de Supabase en lugar de la entidad
+    if hasattr(valor, 'data'):
+        return bool(valor.data)
+    return valor is not None
+
+
+def lookup(entidad: str, id_registro: Any, loader: Callable[[], Any]) -> Any:
+    """Retorna el registro del mapa o lo carga con loader y lo registra.
+
+    Solo se guardan resultados encontrados: un "no existe" no se cachea para no
+    ocultar un registro creado más adelante en el mismo request.
+    """
+    mapa = _mapa.get()
+    if mapa is None or id_registro is None:
+        return loader()
+    clave = (entidad, str(id_registro))
+    stats = _stats.get()
+    if clave in mapa:
+        stats['hits'] += 1
+        return mapa[clave]
+    stats['misses'] += 1
+    valor = loader()
+    if _encontrado(valor):
+        mapa[clave] = valor
+    return valor
+
+
+def por_id(entidad: str):
+    """Decorador para métodos `obtener_por_id(self, id)` de los DAO."""
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltura(self, id_registro):
+            return lookup(entidad, id_registro, lambda: metodo(self, id_registro))
+        return envoltura
+    return decorador
+
+
+def forget(entidad: str, id_registro: Any = None) -> None:
+    """Descarta un registro (o todos los de la entidad si id_registro es None)."""
+    mapa = _mapa.get()
+    if mapa is None:
+        return
+    if id_registro is None:
+        for clave in [c for c in mapa if c[0] == entidad]:
+            del mapa[clave]
+    else:
+        mapa.pop((entidad, str(id_registro)), None)
+
+
+def get_stats() -> Dict[str, int]:
+    """Aciertos/fallos del request actual ({} si no hay mapa activo)."""
+    stats = _stats.get()
+    return dict(stats) if stats is not None else {}
@@ -0,0 +1,284 @@
+"""Cola de trabajos en segundo plano persistida en SQLite, sin broker externo.
+
+Las vistas encolan un trabajo (tipo + payload JSON) y responden enseguida; el comando
+`python manage.py procesar_trabajos` toma los trabajos pendientes con un pool de hilos
+(y opcionalmente varios procesos) y ejecuta el handler registrado para su tipo.
+
+- Tomar un trabajo es atómico (BEGIN IMMEDIATE), así varios workers comparten el archivo.
+- Un fallo se reintenta con espera exponencial hasta max_intentos; después queda en 'error'.
+- Mientras un trabajo corre, un hilo de latido renueva su lease. Si el worker muere, al
+  vencer el lease el trabajo vuelve a 'pendiente' si le quedan intentos, o queda en 'error'.
+- Los handlers informan progreso y pueden dejar un archivo de resultado para descargar.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+DB_PATH = os.getenv('JOB_QUEUE_PATH') or os.path.join(tempfile.gettempdir(), 'supermerengones_jobs.sqlite3')
+RESULTS_DIR = os.getenv('JOB_RESULTS_DIR') or os.path.join(tempfile.gettempdir(), 'supermerengones_job_results')
+# Segundos sin latido tras los cuales un trabajo 'en_curso' se considera abandonado
+LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+# El latido se renueva varias veces por lease para tolerar pausas del proceso
+LATIDO_SECONDS = max(1.0, LEASE_SECONDS / 5)
+# Espera base antes de reintentar (se duplica en cada intento)
+RETRY_BASE_SECONDS = 10
+MAX_INTENTOS = 3
+
+PENDIENTE, EN_CURSO, COMPLETADO, ERROR, CANCELADO = 'pendiente', 'en_curso', 'completado', 'error', 'cancelado'
+
+# tipo -> handler(payload, ctx) que retorna un resultado serializable a JSON
+_handlers: Dict[str, Callable[[Dict[str, Any], 'JobContext'], Any]] = {}
+_local = threading.local()
+
+
+class JobCancelado(Exception):
+    """La lanza JobContext.progress cuando un admin canceló el trabajo en curso."""
+
+
+def register(tipo: str):
+    """Decorador que registra el handler de un tipo de trabajo."""
+    def decorador(funcion):
+        _handlers[tipo] = funcion
+        return funcion
+    return decorador
+
+
+def handlers() -> List[str]:
+    return sorted(_handlers)
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, 'conn', None)
+    # Un proceso hijo (worker con --procesos) no reutiliza la conexión heredada del padre
+    if conn is None or getattr(_local, 'path', None) != DB_PATH or getattr(_local, 'pid', None) != os.getpid():
+        conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS job ('
+                     'id TEXT PRIMARY KEY, tipo TEXT NOT NULL, payload TEXT NOT NULL, '
+                     'estado TEXT NOT NULL, intentos INTEGER NOT NULL DEFAULT 0, '
+                     'max_intentos INTEGER NOT NULL, progreso REAL, mensaje TEXT, '
+                     'resultado TEXT, archivo TEXT, error TEXT, creado_por TEXT, '
+                     'creado_en REAL NOT NULL, disponible_en REAL NOT NULL, '
+                     'iniciado_en REAL, terminado_en REAL, latido REAL, worker TEXT)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_job_estado ON job (estado, disponible_en)')
+        _local.conn, _local.path, _local.pid = conn, DB_PATH, os.getpid()
+    return conn
+
+
+def _fila(row) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    job = dict(row)
+    for campo in ('payload', 'resultado'):
+        job[campo] = json.loads(job[campo]) if job[campo] else None
+    return job
+
+
+def enqueue(tipo: str, payload: Optional[Dict[str, Any]] = None, max_intentos: int = MAX_INTENTOS,
+            creado_por: Optional[str] = None, unico: bool = False) -> str:
+    """Encola un trabajo y retorna su id.
+
+    Con unico=True, si ya hay un trabajo del mismo tipo pendiente o en curso se retorna su id
+    sin encolar otro (la verificación y el alta son atómicas entre procesos).
+    """
+    if tipo not in _handlers:
+        raise ValueError(f'Tipo de trabajo desconocido: {tipo}')
+    conn = _conn()
+    job_id = uuid.uuid4().hex
+    ahora = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if unico:
+            row = conn.execute('SELECT id FROM job WHERE tipo = ? AND estado IN (?, ?) LIMIT 1',
+                               (tipo, PENDIENTE, EN_CURSO)).fetchone()
+            if row is not None:
+                conn.execute('COMMIT')
+                return row['id']
+        conn.execute('INSERT INTO job (id, tipo, payload, estado, max_intentos, creado_por, creado_en, disponible_en) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                     (job_id, tipo, json.dumps(payload or {}, default=str), PENDIENTE, max_intentos,
+                      None if creado_por is None else str(creado_por), ahora, ahora))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return job_id
+
+
+def get(job_id: str) -> Optional[Dict[str, Any]]:
+    return _fila(_conn().execute('SELECT * FROM job WHERE id = ?', (job_id,)).fetchone())
+
+
+def list_jobs(limit: int = 50, estado: Optional[str] = None) -> List[Dict[str, Any]]:
+    if estado:
+        rows = _conn().execute('SELECT * FROM job WHERE estado = ? ORDER BY creado_en DESC LIMIT ?', (estado, limit))
+    else:
+        rows = _conn().execute('SELECT * FROM job ORDER BY creado_en DESC LIMIT ?', (limit,))
+    return [_fila(r) for r in rows.fetchall()]
+
+
+def retry(job_id: str) -> bool:
+    """Vuelve a poner en cola un trabajo terminado en error o cancelado."""
+    cur = _conn().execute('UPDATE job SET estado = ?, intentos = 0, error = NULL, disponible_en = ? '
+                          'WHERE id = ? AND estado IN (?, ?)', (PENDIENTE, time.time(), job_id, ERROR, CANCELADO))
+    return cur.rowcount == 1
+
+
+def cancel(job_id: str) -> bool:
+    """Cancela un trabajo pendiente; uno en curso se detiene en su próximo progress()."""
+    cur = _conn().execute('UPDATE job SET estado = ?, terminado_en = ? WHERE id = ? AND estado IN (?, ?)',
+                          (CANCELADO, time.time(), job_id, PENDIENTE, EN_CURSO))
+    return cur.rowcount == 1
+
+
+def claim(worker: str) -> Optional[Dict[str, Any]]:
+    """Toma el trabajo pendiente más antiguo disponible (y recupera los abandonados)."""
+    conn = _conn()
+    ahora = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        vencido = ahora - LEASE_SECONDS
+        # Abandonados: sin intentos restantes quedan en error (no se vuelven a ejecutar)
+        conn.execute('UPDATE job SET estado = ?, terminado_en = ?, worker = NULL, error = ? '
+                     'WHERE estado = ? AND latido < ? AND intentos >= max_intentos',
+                     (ERROR, ahora, 'El worker dejó de responder con el trabajo en curso (lease vencido)',
+                      EN_CURSO, vencido))
+        conn.execute('UPDATE job SET estado = ?, worker = NULL WHERE estado = ? AND latido < ?',
+                     (PENDIENTE, EN_CURSO, vencido))
+        row = conn.execute('SELECT id FROM job WHERE estado = ? AND disponible_en <= ? '
+                           'ORDER BY disponible_en, creado_en LIMIT 1', (PENDIENTE, ahora)).fetchone()
+        if row is None:
+            conn.execute('COMMIT')
+            return None
+        conn.execute('UPDATE job SET estado = ?, intentos = intentos + 1, iniciado_en = ?, latido = ?, '
+                     'worker = ?, progreso = NULL, mensaje = NULL WHERE id = ?',
+                     (EN_CURSO, ahora, ahora, worker, row['id']))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return get(row['id'])
+
+
+def _terminar(job_id: str, estado: str, **campos) -> None:
+    asignaciones = ', '.join(f'{c} = ?' for c in campos)
+    # Un trabajo cancelado mientras corría conserva el estado 'cancelado'
+    _conn().execute(f'UPDATE job SET estado = ?, terminado_en = ?, {asignaciones} WHERE id = ? AND estado = ?',
+                    (estado, time.time(), *campos.values(), job_id, EN_CURSO))
+
+
+class JobContext:
+    """Lo recibe cada handler: progreso, latido y ruta para el archivo de resultado."""
+
+    def __init__(self, job: Dict[str, Any]):
+        self.job = job
+        self.id = job['id']
+        self.archivo: Optional[str] = None
+
+    def progress(self, hechos: float, total: Optional[float] = None, mensaje: Optional[str] = None) -> None:
+        """Guarda el avance (0-100 si se da total) y renueva el lease del trabajo."""
+        valor = (100.0 * hechos / total) if total else None
+        cur = _conn().execute('UPDATE job SET progreso = COALESCE(?, progreso), mensaje = COALESCE(?, mensaje), '
+                              'latido = ? WHERE id = ? AND estado = ?',
+                              (valor, mensaje, time.time(), self.id, EN_CURSO))
+        if cur.rowcount == 0:
+            raise JobCancelado(self.id)
+
+    def result_path(self, nombre: str) -> str:
+        """Ruta donde el handler escribe su archivo descargable (una carpeta por trabajo)."""
+        carpeta = os.path.join(RESULTS_DIR, self.id)
+        os.makedirs(carpeta, exist_ok=True)
+        self.archivo = os.path.join(carpeta, os.path.basename(nombre))
+        return self.archivo
+
+
+def _latir(job_id: str, detener: threading.Event) -> None:
+    """Renueva el lease del trabajo hasta que termine (aunque el handler no llame a progress)."""
+    while not detener.wait(LATIDO_SECONDS):
+        try:
+            _conn().execute('UPDATE job SET latido = ? WHERE id = ? AND estado = ?', (time.time(), job_id, EN_CURSO))
+        except sqlite3.Error:
+            # Base ocupada: se reintenta en el próximo latido, antes de que venza el lease
+            pass
+
+
+def run_job(job: Dict[str, Any]) -> None:
+    """Ejecuta un trabajo ya tomado y registra el resultado, el reintento o el error."""
+    ctx = JobContext(job)
+    detener = threading.Event()
+    latido = threading.Thread(target=_latir, args=(job['id'], detener), name=f"latido-{job['id'][:8]}", daemon=True)
+    latido.start()
+    try:
+        handler = _handlers.get(job['tipo'])
+        if handler is None:
+            raise LookupError(f"Sin handler para el tipo {job['tipo']}")
+        resultado = handler(job['payload'] or {}, ctx)
+        _terminar(job['id'], COMPLETADO, progreso=100.0, resultado=json.dumps(resultado, default=str),
+                  archivo=ctx.archivo, error=None)
+    except JobCancelado:
+        pass
+    except Exception as e:
+        detalle = f'{e.__class__.__name__}: {e}\n{traceback.format_exc(limit=5)}'
+        if job['intentos'] < job['max_intentos']:
+            espera = RETRY_BASE_SECONDS * (2 ** (job['intentos'] - 1))
+            _conn().execute('UPDATE job SET estado = ?, error = ?, disponible_en = ?, worker = NULL '
+                            'WHERE id = ? AND estado = ?',
+                            (PENDIENTE, detalle, time.time() + espera, job['id'], EN_CURSO))
+        else:
+            _terminar(job['id'], ERROR, error=detalle)
+    finally:
+        detener.set()
+        latido.join()
+
+
+class Worker:
+    """Bucle que toma trabajos y los ejecuta en un pool de `hilos` hilos."""
+
+    def __init__(self, hilos: int = 2, intervalo: float = 2.0, nombre: Optional[str] = None):
+        self.hilos = max(1, int(hilos))
+        self.intervalo = intervalo
+        self.nombre = nombre or f'{socket.gethostname()}:{os.getpid()}'
+        self._detener = threading.Event()
+
+    def stop(self) -> None:
+        self._detener.set()
+
+    def run(self, hasta_vaciar: bool = False) -> int:
+        """Procesa trabajos hasta stop() (o hasta que no queden pendientes). Retorna cuántos ejecutó."""
+        ejecutados = 0
+        en_curso = set()
+        lock = threading.Lock()
+
+        def _terminado(futuro):
+            with lock:
+                en_curso.discard(futuro)
+
+        with ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='job-worker') as pool:
+            while not self._detener.is_set():
+                with lock:
+                    libres = self.hilos - len(en_curso)
+                job = claim(self.nombre) if libres > 0 else None
+                if job is not None:
+                    futuro = pool.submit(run_job, job)
+                    with lock:
+                        en_curso.add(futuro)
+                    futuro.add_done_callback(_terminado)
+                    ejecutados += 1
+                    continue
+                with lock:
+                    ocupado = bool(en_curso)
+                if hasta_vaciar and not ocupado:
+                    break
+                self._detener.wait(self.intervalo if libres > 0 else 0.1)
+        return ejecutados
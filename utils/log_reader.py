@@ -0,0 +1,298 @@
+"""Lectura indexada del log estructurado (JSONL) para el visor de auditoría.
+
+El log solo crece por el final y cada línea empieza con {"ts": ..., "event": ...} en orden
+cronológico, así que:
+
+- Las consultas "más recientes primero" leen el archivo hacia atrás (lector sobre mmap):
+  con un límite de 200 entradas se tocan solo las últimas páginas, no cientos de MB.
+- Un índice lateral (<log>.idx) guarda por bloque de ~TAMANIO_BLOQUE bytes su rango de
+  offsets, los días que cubre y los eventos que contiene, más el rango de bytes de cada
+  día. Un filtro por fecha acota la lectura a los bytes de los días pedidos y, dentro de
+  eso, los filtros por evento saltan los bloques que no pueden coincidir.
+- El índice se actualiza de forma incremental: solo se escanea lo agregado desde la última
+  vez. Si el archivo se truncó o fue reemplazado (rotación), se reconstruye.
+- Los segmentos rotados (<log>.<fecha>.gz) se leen después del archivo actual, del más
+  nuevo al más viejo; un resumen por segmento (días y eventos) permite saltarlos sin
+  descomprimir. El más nuevo sigue sin comprimir (.gz.raw) hasta la rotación siguiente.
+"""
+
+import gzip
+import json
+import mmap
+import os
+import re
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.structured_logging import segment_paths
+
+# Bytes de log por bloque del índice
+TAMANIO_BLOQUE = 256 * 1024
+# Bytes del inicio del archivo que identifican al archivo indexado (detecta reemplazo)
+BYTES_FIRMA = 256
+VERSION_INDICE = 1
+
+_RE_TS = re.compile(rb'"ts":\s*"([^"]+)"')
+_RE_EVENTO = re.compile(rb'"event":\s*"((?:[^"\\]|\\.)*)"')
+
+
+def ruta_indice(path: str) -> str:
+    return path + '.idx'
+
+
+def _firma(mm) -> str:
+    return mm[:BYTES_FIRMA].hex()
+
+
+def _campos(linea: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """(día 'YYYY-MM-DD', evento) de una línea sin parsear el JSON completo."""
+    ts = _RE_TS.search(linea, 0, 200)
+    evento = _RE_EVENTO.search(linea, 0, 400)
+    if ts is None or evento is None:
+        try:
+            obj = json.loads(linea)
+            return (str(obj.get('ts') or '')[:10] or None), (str(obj.get('event') or '') or None)
+        except Exception:
+            return None, None
+    return ts.group(1)[:10].decode('ascii', 'replace'), json.loads(b'"' + evento.group(1) + b'"')
+
+
+def _abrir_mmap(f):
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Archivo vacío: no se puede mapear
+        return None
+
+
+def _lineas_hacia_atras(mm, inicio: int, fin: int) -> Iterator[Tuple[int, bytes]]:
+    """(offset, línea) desde `fin` hacia `inicio`, leyendo el mmap de atrás hacia adelante."""
+    pos = fin
+    while pos > inicio:
+        corte = mm.rfind(b'\n', inicio, pos - 1) if pos - 1 > inicio else -1
+        comienzo = corte + 1 if corte >= 0 else inicio
+        linea = mm[comienzo:pos].rstrip(b'\r\n')
+        if linea:
+            yield comienzo, linea
+        pos = comienzo
+
+
+def _indice_vacio(firma: str) -> Dict[str, Any]:
+    return {'version': VERSION_INDICE, 'firma': firma, 'tamanio': 0, 'bloques': [], 'dias': {}}
+
+
+def _leer_indice(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(ruta_indice(path), 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+        return indice if indice.get('version') == VERSION_INDICE else None
+    except (OSError, ValueError):
+        return None
+
+
+def _guardar_indice(path: str, indice: Dict[str, Any]) -> None:
+    _guardar_json(ruta_indice(path), indice)
+
+
+def _guardar_json(destino: str, datos: Dict[str, Any]) -> None:
+    try:
+        fd, tmp = tempfile.mkstemp(prefix='.idx-', dir=os.path.dirname(destino) or '.')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, separators=(',', ':'))
+        os.replace(tmp, destino)
+    except OSError:
+        # Sin permiso de escritura: el índice se recalcula en memoria en cada consulta
+        pass
+
+
+def actualizar_indice(path: str, mm=None) -> Dict[str, Any]:
+    """Extiende el índice lateral con lo agregado al log desde la última actualización.
+
+    Returns:
+        el índice: {'tamanio', 'bloques': [[inicio, fin, dia_min, dia_max, [eventos]]], 'dias': {dia: [inicio, fin]}}
+    """
+    if mm is None:
+        with open(path, 'rb') as f:
+            mm = _abrir_mmap(f)
+            if mm is None:
+                return _indice_vacio('')
+            with mm:
+                return actualizar_indice(path, mm)
+
+    firma = _firma(mm)
+    indice = _leer_indice(path)
+    if indice is None or indice['firma'] != firma[:len(indice['firma'])] or indice['tamanio'] > len(mm):
+        indice = _indice_vacio(firma)
+    # Solo líneas completas: la última puede estar a medio escribir
+    fin = mm.rfind(b'\n') + 1
+    if fin <= indice['tamanio']:
+        return indice
+
+    bloques, dias = indice['bloques'], indice['dias']
+    # El último bloque se reabre si no llegó a su tamaño
+    if bloques and bloques[-1][1] - bloques[-1][0] < TAMANIO_BLOQUE:
+        bloque = bloques.pop()
+        bloque[4] = set(bloque[4])
+    else:
+        bloque = None
+    pos = indice['tamanio']
+    while pos < fin:
+        siguiente = mm.find(b'\n', pos, fin) + 1
+        dia, evento = _campos(mm[pos:siguiente])
+        if bloque is None:
+            bloque = [pos, siguiente, dia, dia, set()]
+        bloque[1] = siguiente
+        if dia:
+            bloque[2] = min(bloque[2] or dia, dia)
+            bloque[3] = max(bloque[3] or dia, dia)
+            rango = dias.setdefault(dia, [pos, siguiente])
+            rango[0], rango[1] = min(rango[0], pos), siguiente
+        if evento:
+            bloque[4].add(evento)
+        if bloque[1] - bloque[0] >= TAMANIO_BLOQUE:
+            bloques.append(bloque[:4] + [sorted(bloque[4])])
+            bloque = None
+        pos = siguiente
+    if bloque is not None:
+        bloques.append(bloque[:4] + [sorted(bloque[4])])
+    indice.update(firma=firma, tamanio=fin)
+    _guardar_indice(path, indice)
+    return indice
+
+
+def _bloque_coincide(bloque, evento: Optional[str], desde: Optional[str], hasta: Optional[str]) -> bool:
+    _, _, dia_min, dia_max, eventos = bloque
+    if desde and dia_max and dia_max < desde[:10]:
+        return False
+    if hasta and dia_min and dia_min > hasta[:10]:
+        return False
+    if evento and not any(evento in e.lower() for e in eventos):
+        return False
+    return True
+
+
+def _rango_dias(indice: Dict[str, Any], desde: Optional[str], hasta: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Offsets [inicio, fin) que contienen todas las líneas de los días entre desde y hasta.
+
+    Returns:
+        None si ningún día indexado cae en el rango (no hay nada que leer en el archivo)
+    """
+    if not desde and not hasta:
+        return 0, indice['tamanio']
+    rangos = [r for dia, r in indice['dias'].items()
+              if (not desde or dia >= desde[:10]) and (not hasta or dia <= hasta[:10])]
+    if not rangos:
+        return None
+    return min(r[0] for r in rangos), max(r[1] for r in rangos)
+
+
+def _resumen_segmento(segmento: str) -> Dict[str, Any]:
+    """Días y eventos de un segmento rotado. Los segmentos no cambian: se calcula una vez."""
+    try:
+        with open(segmento + '.idx', 'r', encoding='utf-8') as f:
+            resumen = json.load(f)
+        if resumen.get('version') == VERSION_INDICE:
+            return resumen
+    except (OSError, ValueError):
+        pass
+    datos = _leer_segmento(segmento)
+    dias, eventos = set(), set()
+    for _, linea in _lineas_hacia_atras(datos, 0, len(datos)):
+        dia, evento = _campos(linea)
+        if dia:
+            dias.add(dia)
+        if evento:
+            eventos.add(evento)
+    resumen = {'version': VERSION_INDICE, 'dia_min': min(dias, default=None),
+               'dia_max': max(dias, default=None), 'eventos': sorted(eventos)}
+    _guardar_json(segmento + '.idx', resumen)
+    return resumen
+
+
+def _leer_segmento(segmento: str) -> bytes:
+    try:
+        with (open if segmento.endswith('.raw') else gzip.open)(segmento, 'rb') as f:
+            return f.read()
+    except (OSError, EOFError):
+        return b''
+
+
+def _lineas_candidatas(path: str, evento, desde, hasta) -> Iterator[bytes]:
+    """Líneas más recientes primero: archivo actual y luego segmentos rotados, saltando lo que el índice descarta."""
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        f = None
+    if f is not None:
+        with f:
+            mm = _abrir_mmap(f)
+            if mm is not None:
+                with mm:
+                    indice = actualizar_indice(path, mm)
+                    rango = _rango_dias(indice, desde, hasta)
+                    for bloque in reversed(indice['bloques'] if rango else []):
+                        if bloque[1] <= rango[0]:
+                            # Los bloques anteriores terminan antes del primer día pedido
+                            break
+                        if bloque[0] < rango[1] and _bloque_coincide(bloque, evento, desde, hasta):
+                            inicio, fin = max(bloque[0], rango[0]), min(bloque[1], rango[1])
+                            for _, linea in _lineas_hacia_atras(mm, inicio, fin):
+                                yield linea
+    for segmento in segment_paths(path):
+        resumen = _resumen_segmento(segmento)
+        if resumen['dia_max'] and desde and resumen['dia_max'] < desde[:10]:
+            # Los segmentos anteriores son todavía más viejos
+            break
+        if not _bloque_coincide([0, 0, resumen['dia_min'], resumen['dia_max'], resumen['eventos']], evento, desde, hasta):
+            continue
+        datos = _leer_segmento(segmento)
+        for _, linea in _lineas_hacia_atras(datos, 0, len(datos)):
+            yield linea
+
+
+def consultar(path: str, evento: Optional[str] = None, exito: Optional[bool] = None,
+              desde: Optional[str] = None, hasta: Optional[str] = None, limite: int = 200) -> List[Dict[str, Any]]:
+    """Entradas más recientes primero que cumplen los filtros (incluye los segmentos rotados .gz).
+
+    Args:
+        evento: substring del nombre del evento (sin distinguir mayúsculas)
+        exito: True/False para filtrar por el campo success
+        desde/hasta: límites ISO inclusivos comparados contra 'ts' (p.ej. '2026-10-01' o
+            '2026-10-01T23:59:59.999999')
+        limite: máximo de entradas a retornar
+    """
+    evento = evento.lower() if evento else None
+    resultados: List[Dict[str, Any]] = []
+    lineas = _lineas_candidatas(path, evento, desde, hasta)
+    try:
+        for linea in lineas:
+            obj = _filtrar(linea, evento, exito, desde, hasta)
+            if obj is not None:
+                resultados.append(obj)
+                if len(resultados) >= limite:
+                    break
+    finally:
+        # Cierra el mmap aunque se corte antes de recorrer todo
+        lineas.close()
+    return resultados
+
+
+def _filtrar(linea: bytes, evento, exito, desde, hasta) -> Optional[Dict[str, Any]]:
+    try:
+        obj = json.loads(linea)
+    except ValueError:
+        return None
+    if not isinstance(obj, dict):
+        return None
+    if evento and evento not in str(obj.get('event') or '').lower():
+        return None
+    if exito is not None and obj.get('success') is not exito:
+        return None
+    if desde or hasta:
+        ts = str(obj.get('ts') or '').rstrip('Z')
+        # Mismo formato ISO: la comparación de texto equivale a la cronológica
+        if ts and desde and ts < desde:
+            return None
+        if ts and hasta and ts > hasta:
+            return None
+    return obj
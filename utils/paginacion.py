@@ -0,0 +1,91 @@
+"""Paginación por cursor (keyset) sobre (fecha, id) para los listados de la API.
+
+Los listados se ordenan por fecha descendente y, a igual fecha, por id descendente.
+Como en Postgres un orden descendente pone los NULL primero, los registros sin fecha
+salen al principio. El cursor es opaco para el cliente: codifica la (fecha, id) del
+último registro entregado y la página siguiente continúa estrictamente después, así
+cada página cuesta lo mismo sin importar cuán atrás esté.
+"""
+
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+
+# Tamaño de página por defecto y máximo (Supabase no devuelve más de 1000 filas por respuesta)
+TAMANIO_PAGINA = 100
+TAMANIO_MAXIMO = 1000
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no fue generado por esta API o está corrupto."""
+
+
+def codificar_cursor(fecha: Any, id_registro: Any) -> str:
+    crudo = json.dumps([fecha, id_registro], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor: str) -> Tuple[Any, int]:
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        fecha, id_registro = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if fecha is not None and not isinstance(fecha, str):
+            raise ValueError(fecha)
+        return fecha, int(id_registro)
+    except Exception:
+        raise CursorInvalido('Cursor de paginación inválido')
+
+
+def leer_parametros(params) -> Tuple[Optional[str], int]:
+    """Lee ?cursor= y ?page_size= (o el antiguo ?limite=) de request.GET / query_params.
+
+    Raises:
+        CursorInvalido: si page_size no es un entero positivo o el cursor está corrupto
+    """
+    cursor = params.get('cursor') or None
+    crudo = params.get('page_size') or params.get('limite') or TAMANIO_PAGINA
+    try:
+        tamanio = int(crudo)
+    except (TypeError, ValueError):
+        raise CursorInvalido('page_size debe ser un entero')
+    if tamanio < 1:
+        raise CursorInvalido('page_size debe ser mayor que cero')
+    if cursor is not None:
+        decodificar_cursor(cursor)
+    return cursor, min(tamanio, TAMANIO_MAXIMO)
+
+
+def paginar(query, cursor: Optional[str], tamanio: int, columna_id: str,
+            columna_fecha: Optional[str] = 'fecha', descendente: bool = True) -> Tuple[List[dict], Optional[str]]:
+    """Aplica el keyset, el orden y el límite a `query` (un select de postgrest) y la ejecuta.
+
+    Se pide una fila de más para saber si hay otra página sin un conteo aparte.
+
+    Args:
+        columna_fecha: columna principal del orden (fecha u hora); None ordena solo por id
+        descendente: False para orden ascendente (ahí Postgres pone los NULL al final)
+
+    Returns:
+        (filas, siguiente_cursor); siguiente_cursor es None en la última página
+    """
+    op = 'lt' if descendente else 'gt'
+    if cursor:
+        fecha, ultimo_id = decodificar_cursor(cursor)
+        if columna_fecha is None:
+            query = getattr(query, op)(columna_id, ultimo_id)
+        elif fecha is None:
+            # Seguimos dentro del bloque sin fecha (primero si es descendente, último si no)
+            filtro = f'and({columna_fecha}.is.null,{columna_id}.{op}.{ultimo_id})'
+            query = query.or_(filtro + f',{columna_fecha}.not.is.null' if descendente else filtro)
+        else:
+            filtro = (f'{columna_fecha}.{op}."{fecha}",'
+                      f'and({columna_fecha}.eq."{fecha}",{columna_id}.{op}.{ultimo_id})')
+            query = query.or_(filtro if descendente else filtro + f',{columna_fecha}.is.null')
+    if columna_fecha is not None:
+        query = query.order(columna_fecha, desc=descendente)
+    filas = query.order(columna_id, desc=descendente).limit(tamanio + 1).execute().data or []
+    if len(filas) <= tamanio:
+        return filas, None
+    filas = filas[:tamanio]
+    ultima = filas[-1]
+    return filas, codificar_cursor(ultima.get(columna_fecha) if columna_fecha else None, ultima[columna_id])
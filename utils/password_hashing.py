@@ -0,0 +1,104 @@
+"""Pool acotado para bcrypt: los hashes lentos no corren en los hilos de los requests.
+
+bcrypt es deliberadamente costoso (decenas a cientos de ms de CPU). Con muchos logins a la
+vez ocupaba todos los hilos del servidor y las páginas baratas (catálogo) quedaban en cola.
+Aquí cada hash/verificación se ejecuta en un pool de HASH_WORKERS hilos (bcrypt libera el
+GIL, así que el pool limita también los núcleos que consume). Como mucho HASH_QUEUE_LIMIT
+operaciones esperan turno; si el pool está lleno, o la espera supera HASH_TIMEOUT, se lanza
+HashingSaturado y la vista responde 503 con Retry-After en lugar de acumular requests.
+
+Cómo dimensionarlo (por proceso):
+- HASH_WORKERS: núcleos que se dedican a bcrypt; no más que los núcleos libres del host.
+- HASH_QUEUE_LIMIT: cada operación en espera retiene un hilo del servidor, así que debe
+  quedar muy por debajo de los hilos de request del proceso (ej. --threads de gunicorn);
+  como referencia, a lo sumo una cuarta parte, para que el resto siga atendiendo páginas.
+- HASH_TIMEOUT: apenas más que lo que tarda la cola completa en vaciarse,
+  (HASH_QUEUE_LIMIT / HASH_WORKERS + 1) * costo de un hash (~0,25 s con 12 rondas).
+  Un valor largo solo hace que los hilos esperen más antes de responder 503.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoTimeout
+
+import bcrypt
+
+# Costo de bcrypt para hashes nuevos; los hashes con otro costo se rehacen en el próximo login
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', '2'))
+HASH_QUEUE_LIMIT = int(os.getenv('HASH_QUEUE_LIMIT', '4'))
+# Segundos máximos que un request espera su hash (cola + cómputo)
+HASH_TIMEOUT = float(os.getenv('HASH_TIMEOUT', '2'))
+# Segundos sugeridos al cliente en Retry-After cuando se rechaza por saturación
+RETRY_AFTER = 2
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='bcrypt')
+# Cupos: operaciones en curso + en espera
+_cupos = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_LIMIT)
+
+
+class HashingSaturado(Exception):
+    """El pool de hashing está lleno: el request debe rechazarse (503) y reintentarse después."""
+
+
+def _enviar(funcion, *args):
+    if not _cupos.acquire(blocking=False):
+        raise HashingSaturado('Demasiados inicios de sesión simultáneos')
+    try:
+        futuro = _executor.submit(funcion, *args)
+    except BaseException:
+        _cupos.release()
+        raise
+    futuro.add_done_callback(lambda _: _cupos.release())
+    return futuro
+
+
+def _esperar(futuro):
+    try:
+        return futuro.result(timeout=HASH_TIMEOUT)
+    except FuturoTimeout:
+        # Si aún no empezó no hace falta calcularlo; si ya corre, su cupo se libera al terminar
+        futuro.cancel()
+        raise HashingSaturado('Tiempo de espera agotado para verificar la contraseña')
+
+
+def hash_password(password: str) -> str:
+    """Hash bcrypt con BCRYPT_ROUNDS calculado en el pool."""
+    return _esperar(_enviar(_hashpw, password))
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Verifica la contraseña contra el hash bcrypt en el pool."""
+    return _esperar(_enviar(_checkpw, password, hashed))
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True si el hash se generó con un costo distinto de BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+
+def rehash_en_segundo_plano(password: str, guardar) -> bool:
+    """Recalcula el hash con el costo actual y llama a guardar(nuevo_hash) sin esperar.
+
+    Es oportunista: si el pool no tiene cupo simplemente no se hace (se reintentará en otro
+    login). Retorna True si quedó encolado.
+    """
+    def _rehash():
+        guardar(_hashpw(password))
+
+    try:
+        _enviar(_rehash)
+        return True
+    except HashingSaturado:
+        return False
+
+
+def _hashpw(password):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password.encode(), hashed.encode())
@@ -1,9 +1,24 @@
+import logging
+import math
+import os
 import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from time import time
+from typing import Any, Dict, Optional, Tuple
+
 from django.http import HttpResponse
 
-_rate_memory = {}
+logger = logging.getLogger(__name__)
+
+# Backend del limitador: 'memory' (por proceso) o 'sqlite' (compartido entre workers del mismo host)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory').lower()
+RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH') or os.path.join(tempfile.gettempdir(), 'supermerengones_rate_limit.sqlite3')
+# Claves (vista + IP/usuario) como máximo en memoria; al superarlo se expulsa la menos reciente
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '10000'))
 
 SANITIZE_PATTERN = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F]')
 TAG_PATTERN = re.compile(r'<\s*script[^>]*>|<\s*/\s*script\s*>', re.IGNORECASE)
@@ -24,28 +39,205 @@ def sanitize_input(value):
     return v
 
 
+class RateLimitBackend:
+    """Almacén del limitador de ventana deslizante (contador de dos ventanas fijas).
+
+    Por clave se guarda un estado de tamaño constante: (inicio de la ventana actual,
+    solicitudes en la actual, solicitudes en la anterior, vencimiento). La estimación es
+    anterior * fracción restante de la ventana anterior + actual, así el costo por
+    request es O(1) sin importar el límite. Una clave vence tras dos ventanas sin uso.
+    """
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        """Registra una solicitud; retorna (permitida, segundos hasta poder reintentar)."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+
+def _deslizar(estado, limit, window, now):
+    """Avanza el estado (inicio, actual, anterior) a `now` y decide si se admite una solicitud más.
+
+    Returns:
+        (permitida, espera, inicio, actual, anterior) ya con la solicitud sumada si se admitió
+    """
+    inicio = math.floor(now / window) * window
+    actual = anterior = 0
+    if estado is not None:
+        inicio_guardado, actual_guardado, anterior_guardado = estado
+        if inicio_guardado == inicio:
+            actual, anterior = actual_guardado, anterior_guardado
+        elif inicio_guardado == inicio - window:
+            anterior = actual_guardado
+    peso_anterior = 1 - (now - inicio) / window
+    if anterior * peso_anterior + actual < limit:
+        return True, 0.0, inicio, actual + 1, anterior
+    if actual >= limit or anterior == 0:
+        espera = inicio + window - now
+    else:
+        # Momento en que lo que queda de la ventana anterior deja lugar a una solicitud más
+        espera = inicio + window * (1 - (limit - actual) / anterior) - now
+    return False, max(espera, 0.0), inicio, actual, anterior
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Estado en memoria del proceso, en orden LRU; las claves vencidas se expulsan al pasar."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        # key -> (inicio, actual, anterior, vence)
+        self._estado: 'OrderedDict[str, Tuple[float, int, int, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window, now):
+        with self._lock:
+            guardado = self._estado.pop(key, None)
+            permitida, espera, inicio, actual, anterior = _deslizar(
+                guardado[:3] if guardado else None, limit, window, now)
+            self._estado[key] = (inicio, actual, anterior, inicio + 2 * window)
+            # La clave menos reciente va primero: se expulsan las vencidas y el exceso
+            while self._estado:
+                primera, estado = next(iter(self._estado.items()))
+                if estado[3] > now and len(self._estado) <= self.max_keys:
+                    break
+                del self._estado[primera]
+            return permitida, espera
+
+    def clear(self):
+        with self._lock:
+            self._estado.clear()
+
+    def size(self):
+        return len(self._estado)
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """Estado compartido en un archivo SQLite local: el límite se cumple entre todos los workers."""
+
+    # Cada cuántos segundos se borran las claves vencidas
+    PURGE_INTERVAL = 60
+
+    def __init__(self, path: str = RATE_LIMIT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._ultima_purga = 0.0
+        self._conn().execute('CREATE TABLE IF NOT EXISTS rate_limit ('
+                             'key TEXT PRIMARY KEY, inicio REAL NOT NULL, actual INTEGER NOT NULL, '
+                             'anterior INTEGER NOT NULL, vence REAL NOT NULL)')
+        self._conn().execute('CREATE INDEX IF NOT EXISTS idx_rate_limit_vence ON rate_limit (vence)')
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=2, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, limit, window, now):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT inicio, actual, anterior FROM rate_limit WHERE key = ?', (key,)).fetchone()
+            permitida, espera, inicio, actual, anterior = _deslizar(row, limit, window, now)
+            conn.execute('INSERT OR REPLACE INTO rate_limit (key, inicio, actual, anterior, vence) '
+                         'VALUES (?, ?, ?, ?, ?)', (key, inicio, actual, anterior, inicio + 2 * window))
+            if now - self._ultima_purga > self.PURGE_INTERVAL:
+                conn.execute('DELETE FROM rate_limit WHERE vence < ?', (now,))
+                self._ultima_purga = now
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return permitida, espera
+
+    def clear(self):
+        self._conn().execute('DELETE FROM rate_limit')
+
+    def size(self):
+        return self._conn().execute('SELECT COUNT(*) FROM rate_limit').fetchone()[0]
+
+
+def _crear_backend() -> RateLimitBackend:
+    if RATE_LIMIT_BACKEND == 'sqlite':
+        try:
+            return SQLiteRateLimitBackend(RATE_LIMIT_PATH)
+        except Exception as e:
+            logger.warning(f"Error al abrir el limitador compartido en {RATE_LIMIT_PATH}, se usa memoria: {e}")
+    return MemoryRateLimitBackend()
+
+
+_backend: RateLimitBackend = _crear_backend()
+# Contadores de este proceso por vista limitada
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def configure_backend(backend: RateLimitBackend) -> None:
+    """Reemplaza el backend del limitador (ej. SQLiteRateLimitBackend para compartir entre workers)."""
+    global _backend
+    _backend = backend
+
+
+def get_backend() -> RateLimitBackend:
+    return _backend
+
+
+def _contar(scope: str, campo: str) -> None:
+    with _stats_lock:
+        contadores = _stats.setdefault(scope, {'permitidas': 0, 'rechazadas': 0, 'errores': 0})
+        contadores[campo] += 1
+
+
+def get_stats() -> Dict[str, Any]:
+    """Solicitudes permitidas/rechazadas por vista limitada (en este proceso) y claves activas."""
+    with _stats_lock:
+        vistas = {scope: dict(c) for scope, c in sorted(_stats.items())}
+    try:
+        claves = _backend.size()
+    except Exception:
+        claves = None
+    return {'backend': type(_backend).__name__, 'claves': claves, 'vistas': vistas}
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
 def rate_limit(limit=10, window=60, key='ip'):
-    """Simple in-memory rate limit decorator (development stub).
+    """Limita solicitudes por ventana deslizante (429 con Retry-After al excederse).
+
     limit: max requests per window seconds.
-    key: 'ip' or 'user'.
+    key: 'ip' or 'user'. Cada vista decorada cuenta por separado.
+    Si el backend falla se deja pasar la solicitud (y se cuenta como error).
     """
     def decorator(func):
+        scope = f'{func.__module__}.{func.__name__}'
+
         @wraps(func)
         def wrapper(request, *args, **kwargs):
-            identifier = None
             if key == 'user' and request.user.is_authenticated:
                 identifier = f'user:{request.user.id}'
             else:
                 # Fallback to IP
                 identifier = request.META.get('REMOTE_ADDR', 'unknown')
-            now = time()
-            bucket = _rate_memory.setdefault(identifier, [])
-            # Purge old timestamps
-            bucket = [t for t in bucket if now - t < window]
-            _rate_memory[identifier] = bucket
-            if len(bucket) >= limit:
-                return HttpResponse('Rate limit exceeded', status=429)
-            bucket.append(now)
+            try:
+                permitida, espera = _backend.hit(f'{scope}|{identifier}', limit, window, time.time())
+            except Exception:
+                _contar(scope, 'errores')
+                return func(request, *args, **kwargs)
+            if not permitida:
+                _contar(scope, 'rechazadas')
+                response = HttpResponse('Rate limit exceeded', status=429)
+                response['Retry-After'] = str(max(1, math.ceil(espera)))
+                return response
+            _contar(scope, 'permitidas')
             return func(request, *args, **kwargs)
         return wrapper
     return decorator
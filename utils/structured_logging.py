@@ -1,21 +1,192 @@
-import logging, json, os, datetime
+import logging, logging.handlers, json, os, datetime, glob, gzip, queue, random, shutil, threading, time, atexit
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, each process rotates on its own
+    fcntl = None
+
+# Rotation of APP_LOG_FILE: by size (bytes) and/or by age (hours, 0 disables)
+LOG_MAX_BYTES = int(os.getenv('APP_LOG_MAX_BYTES', str(50 * 1024 * 1024)))
+LOG_ROTATE_HOURS = float(os.getenv('APP_LOG_ROTATE_HOURS', '0'))
+LOG_BACKUP_COUNT = int(os.getenv('APP_LOG_BACKUP_COUNT', '14'))
+# Records waiting for the writer thread; beyond this they are dropped instead of blocking the request
+LOG_QUEUE_SIZE = int(os.getenv('APP_LOG_QUEUE_SIZE', '10000'))
+
+
+def _parse_sample_rates(raw):
+    """'catalog_view=0.1,cache_hit=0.01' -> {'catalog_view': 0.1, 'cache_hit': 0.01}"""
+    rates = {}
+    for item in (raw or '').split(','):
+        name, _, rate = item.partition('=')
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+# Fraction of events kept per event type (high-volume events); failures are always kept
+SAMPLE_RATES = _parse_sample_rates(os.getenv('APP_LOG_SAMPLE_RATES'))
 
 _logger = None
+_listener = None
+_lock = threading.Lock()
+_stats = {'sampled_out': 0, 'dropped': 0}
+# Counters are bumped from request threads; a separate lock keeps them off the init/flush path
+_stats_lock = threading.Lock()
+
+
+def segment_paths(log_file):
+    """Rotated segments of log_file, newest first.
+
+    All are gzip (<file>.<stamp>.gz) except the newest, which stays uncompressed
+    (<file>.<stamp>.gz.raw) until the next rotation compresses it.
+    """
+    base = glob.escape(log_file)
+    compressed = set(glob.glob(base + '.*.gz'))
+    # A .raw whose .gz already exists was compressed but not yet removed (interrupted rotation)
+    pending = [p for p in glob.glob(base + '.*.gz.raw') if p[:-len('.raw')] not in compressed]
+    return sorted(compressed.union(pending), reverse=True)
+
+
+class GzipRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """File handler that rotates by size and/or age and gzips the rotated segment.
+
+    Segments are named <file>.<UTC timestamp>.gz so names never shift between rotations
+    (the audit viewer caches per-segment summaries by name). Only the newest backup_count
+    segments are kept. Rotation runs in the writer thread, never in a request.
+
+    A rotated segment is compressed at the following rotation, not right away: a process
+    that checked the inode just before the rename may still append one record to it, and
+    by the next rotation every process has reopened the base file.
+
+    Several worker processes may share the file: rotation is serialized with a lock
+    file (<file>.lock), and before each write a process reopens the base file if its
+    inode changed (the WatchedFileHandler check), so it follows a rotation done by another.
+    """
+
+    def __init__(self, filename, max_bytes=0, rotate_seconds=0, backup_count=0, encoding='utf-8'):
+        super().__init__(filename, mode='a', encoding=encoding, delay=False)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self._opened_at = self._first_record_time()
+
+    def _first_record_time(self):
+        # Age counts from the first line of the current file, so restarts don't postpone rotation
+        try:
+            with open(self.baseFilename, 'rb') as f:
+                ts = json.loads(f.readline())['ts'].rstrip('Z')
+            return datetime.datetime.fromisoformat(ts).replace(tzinfo=datetime.timezone.utc).timestamp()
+        except Exception:
+            return time.time()
+
+    def _reopen_if_rotated(self):
+        """Reopen the base file if it was rotated (renamed or removed) by another process."""
+        try:
+            st = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            st = None
+        if self.stream is not None:
+            current = os.fstat(self.stream.fileno())
+            if st is not None and (st.st_dev, st.st_ino) == (current.st_dev, current.st_ino):
+                return False
+            self.stream.close()
+        self.stream = self._open()
+        self._opened_at = self._first_record_time()
+        return True
+
+    @contextlib.contextmanager
+    def _rotation_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.baseFilename + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def shouldRollover(self, record):
+        self._reopen_if_rotated()
+        # fstat instead of tell(): the size includes what other processes appended
+        size = os.fstat(self.stream.fileno()).st_size
+        if self.max_bytes > 0 and size + len(self.format(record)) + 1 > self.max_bytes:
+            return size > 0
+        if self.rotate_seconds > 0 and time.time() - self._opened_at >= self.rotate_seconds:
+            return size > 0
+        return False
+
+    def doRollover(self):
+        with self._rotation_lock():
+            # Another process rotated while we waited for the lock: just follow it
+            if self._reopen_if_rotated():
+                return
+            self.stream.close()
+            self.stream = None
+            stamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+            segment = '%s.%s.gz' % (self.baseFilename, stamp)
+            # Rename first: a process still holding the old inode appends to the renamed
+            # segment (not to a deleted one) until its next write reopens the base file
+            os.rename(self.baseFilename, segment + '.raw')
+            self.stream = self._open()
+            self._opened_at = time.time()
+            # Only segments from earlier rotations: nobody can still be appending to them
+            for raw in glob.glob(glob.escape(self.baseFilename) + '.*.gz.raw'):
+                if raw != segment + '.raw':
+                    self._compress(raw)
+            if self.backup_count > 0:
+                for old in segment_paths(self.baseFilename)[self.backup_count:]:
+                    for path in (old, old + '.idx'):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+
+
+    @staticmethod
+    def _compress(raw):
+        """<segment>.gz.raw -> <segment>.gz (the viewer's summary of the raw one is dropped)."""
+        segment = raw[:-len('.raw')]
+        with open(raw, 'rb') as src, gzip.open(segment + '.tmp', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(segment + '.tmp', segment)
+        for path in (raw, raw + '.idx'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops the record when the queue is full instead of raising."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _stats_lock:
+                _stats['dropped'] += 1
+
 
 def _init_logger():
-    global _logger
+    global _logger, _listener
     if _logger is not None:
         return _logger
-    logger = logging.getLogger('structured')
-    if not logger.handlers:
+    with _lock:
+        if _logger is not None:
+            return _logger
+        logger = logging.getLogger('structured')
         level = os.getenv('APP_LOG_LEVEL', 'INFO').upper()
         logger.setLevel(getattr(logging, level, logging.INFO))
-        stream_handler = logging.StreamHandler()
         # Simple formatter outputs message only; we already build JSON string
         formatter = logging.Formatter('%(message)s')
+        stream_handler = logging.StreamHandler()
         stream_handler.setFormatter(formatter)
-        logger.addHandler(stream_handler)
-        # Optional file handler when APP_LOG_FILE is set
+        handlers = [stream_handler]
+        # Optional rotating file handler when APP_LOG_FILE is set
         log_file = os.getenv('APP_LOG_FILE')
         if log_file:
             try:
@@ -24,35 +195,84 @@ def _init_logger():
             except Exception:
                 pass
             try:
-                file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
+                file_handler = GzipRotatingFileHandler(
+                    log_file,
+                    max_bytes=LOG_MAX_BYTES,
+                    rotate_seconds=LOG_ROTATE_HOURS * 3600,
+                    backup_count=LOG_BACKUP_COUNT,
+                )
                 file_handler.setFormatter(formatter)
-                logger.addHandler(file_handler)
+                handlers.append(file_handler)
             except Exception:
                 # If file handler fails, continue with stream only
                 pass
+        # Requests only enqueue; a background thread formats, writes and rotates
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(_NonBlockingQueueHandler(log_queue))
         logger.propagate = False
-    _logger = logger
+        _listener = logging.handlers.QueueListener(log_queue, *handlers)
+        _listener.start()
+        _logger = logger
     return _logger
 
+
+def flush():
+    """Stop the writer thread after writing everything queued (next log_event restarts it)."""
+    global _logger, _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        _logger = None
+        _listener = None
+
+
+def _reset_after_fork():
+    # The writer thread does not survive fork: the child starts its own on first use
+    global _logger, _listener, _lock, _stats_lock
+    _lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _logger = None
+    _listener = None
+
+
+atexit.register(flush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_stats():
+    """Events discarded by sampling and records dropped because the queue was full."""
+    with _stats_lock:
+        return dict(_stats)
+
+
 def log_event(event_type: str, **fields):
     """Log a structured JSON line with an event_type and arbitrary key/values.
 
-    Adds timestamp automatically. Values must be JSON serializable.
-    Silently ignores serialization errors by coercing to string.
+    Adds timestamp automatically. Non JSON serializable values are coerced to string.
+    Events listed in APP_LOG_SAMPLE_RATES are kept with that probability (except failures,
+    success=False) and carry a sample_rate field so counts can be re-weighted.
     """
+    rate = SAMPLE_RATES.get(event_type)
+    if rate is not None and rate < 1.0 and fields.get('success') is not False:
+        if random.random() >= rate:
+            with _stats_lock:
+                _stats['sampled_out'] += 1
+            return
+        fields['sample_rate'] = rate
     logger = _init_logger()
     payload = {
         'ts': datetime.datetime.utcnow().isoformat() + 'Z',
         'event': event_type,
     }
-    for k, v in fields.items():
-        try:
-            json.dumps(v)  # test serializable
-            payload[k] = v
-        except Exception:
-            payload[k] = str(v)
+    payload.update(fields)
     try:
-        line = json.dumps(payload, ensure_ascii=False)
+        # Single serialization pass: default=str stringifies what json can't encode
+        line = json.dumps(payload, ensure_ascii=False, default=str)
     except Exception:
         # Fallback: stringify payload
         line = '{"event":"serialization_error","original_event":"%s"}' % event_type
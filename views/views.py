@@ -7,12 +7,15 @@ from config import get_supabase_client, TABLA_PRODUCTO
 from manager.sedeManager import SedeManager
 from django.contrib.auth.decorators import login_required
 from manager.authManager import AuthManager
+from auth_backend import guardar_en_sesion
+from utils.password_hashing import HashingSaturado
 import bcrypt
 from dao.usuarioDAO import UsuarioDAO
 from django.http import HttpResponseForbidden
 from django.http import JsonResponse
 from django.http import HttpResponseRedirect
 from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from datetime import datetime
 from manager.reclamoManager import ReclamoManager
 from manager.pedidoManager import PedidoManager
@@ -29,7 +32,11 @@ from manager.insumoManager import InsumoManager
 from manager.sedeManager import SedeManager
 from dao.detalleCompraDAO import DetalleCompraDAO
 from dao.detallePedidoDAO import DetallePedidoDAO
+from dao.pedidoDAO import PedidoDAO
 from manager.asistenciaManager import AsistenciaManager
+from manager.kpiManager import KpiManager
+from manager.recetaManager import RecetaManager
+from manager.trabajoManager import TrabajoManager, TIPOS_TRABAJO, ENCABEZADO_PEDIDOS_CSV, ENCABEZADO_PRODUCTOS_CSV
 from utils.validation import (
     validate_reclamo,
     validate_pedido,
@@ -42,9 +49,12 @@ from utils.validation import (
     validate_promocion,
 )
 from utils.structured_logging import log_event
-from utils.security import rate_limit
+from utils.security import rate_limit, get_stats as rate_limit_stats
 from utils.user_helpers import get_usuario_cliente
-from utils.catalog_cache import get_or_cache
+from utils.catalog_cache import get_or_cache, write_through_ttl
+from utils.concurrencia import en_paralelo
+from utils import log_reader
+from utils import catalog_cache
 
 reclamo_manager = ReclamoManager()
 pedido_manager = PedidoManager()
@@ -63,6 +73,8 @@ turno_manager = TurnoManager()
 detalle_compra_dao = DetalleCompraDAO()
 asistencia_manager = AsistenciaManager()
 detalle_pedido_dao = DetallePedidoDAO()
+kpi_manager = KpiManager()
+receta_manager = RecetaManager()
 
 # Datos de ejemplo de productos (temporal, hasta integrar DB)
 SAMPLE_PRODUCTS = [
@@ -112,7 +124,8 @@ def productos(request):
             productos_norm = SAMPLE_PRODUCTS
         return productos_norm
 
-    products = get_or_cache('productos_activos', ttl=120, loader=_load_productos)
+    products = get_or_cache('productos_activos', ttl=write_through_ttl(900, 120), loader=_load_productos,
+                            stale_ttl=60)
 
     context = {'products': products}
     return render(request, 'supermerengones/productos.html', context)
@@ -286,10 +299,10 @@ def promociones(request):
         supabase = get_supabase_client()
         resp = supabase.table('promocion').select('*').eq('activo', True).execute()
         data = resp.data if resp and getattr(resp, 'data', None) is not None else []
-        
+
         for row in data:
             pid = row.get('id_promocion') or row.get('id')
-            promo_data = {
+            promos.append({
                 'id': pid,
                 'titulo': row.get('titulo') or row.get('name') or 'Promoción',
                 'descripcion': row.get('descripcion') or row.get('descripcion_corta') or '',
@@ -300,20 +313,30 @@ def promociones(request):
                 'fecha_fin': row.get('fecha_fin'),
                 'activo': row.get('activo', True),
                 'productos': [],
-            }
-            
-            # Obtener productos asociados (opcional, requiere tabla promocion_producto)
+            })
+
+        # Productos asociados (opcional, requiere tabla promocion_producto): una consulta para
+        # todas las relaciones y otra para todos los productos, y se agrupan acá
+        ids_promos = [p['id'] for p in promos if p['id'] is not None]
+        if ids_promos:
             try:
-                rel = supabase.table('promocion_producto').select('id_producto').eq('id_promocion', pid).execute()
-                producto_ids = [r['id_producto'] for r in (rel.data or [])]
+                rel = supabase.table('promocion_producto').select('id_promocion,id_producto')\
+                    .in_('id_promocion', ids_promos).execute()
+                relaciones = rel.data or []
+                producto_ids = list({r['id_producto'] for r in relaciones})
+                productos = {}
                 if producto_ids:
                     prod_resp = supabase.table(TABLA_PRODUCTO).select('*').in_('id_producto', producto_ids).execute()
-                    promo_data['productos'] = prod_resp.data or []
+                    productos = {pr['id_producto']: pr for pr in (prod_resp.data or [])}
+                por_promo = {}
+                for r in relaciones:
+                    if r['id_producto'] in productos:
+                        por_promo.setdefault(r['id_promocion'], []).append(productos[r['id_producto']])
+                for promo in promos:
+                    promo['productos'] = por_promo.get(promo['id'], [])
             except Exception:
-                promo_data['productos'] = []
-            
-            promos.append(promo_data)
-    
+                pass
+
     except Exception:
         # fallback: mostrar empty
         promos = []
@@ -329,13 +352,19 @@ def promociones_admin_list(request):
         supabase = get_supabase_client()
         resp = supabase.table('promocion').select('*').order('id_promocion', desc=True).execute()
         promos = resp.data or []
-        # contar productos asociados
-        for p in promos:
+        # contar productos asociados (una sola consulta para todas las promociones)
+        totales = {}
+        ids_promos = [p.get('id_promocion') for p in promos]
+        if ids_promos:
             try:
-                rel = supabase.table('promocion_producto').select('id_producto').eq('id_promocion', p.get('id_promocion')).execute()
-                p['total_productos'] = len(rel.data or [])
+                rel = supabase.table('promocion_producto').select('id_promocion')\
+                    .in_('id_promocion', ids_promos).execute()
+                for r in (rel.data or []):
+                    totales[r['id_promocion']] = totales.get(r['id_promocion'], 0) + 1
             except Exception:
-                p['total_productos'] = 0
+                totales = {}
+        for p in promos:
+            p['total_productos'] = totales.get(p.get('id_promocion'), 0)
     except Exception:
         promos = []
     return render(request, 'supermerengones/promociones_admin_list.html', {'promos': promos})
@@ -488,7 +517,7 @@ def sedes(request):
         except Exception:
             _sedes = []
         return _sedes
-    sedes = get_or_cache('sedes_activas', ttl=300, loader=_load_sedes)
+    sedes = get_or_cache('sedes_activas', ttl=write_through_ttl(1800, 300), loader=_load_sedes, stale_ttl=60)
 
     return render(request, 'supermerengones/sedes.html', {'sedes': sedes})
 
@@ -730,7 +759,7 @@ def add_to_cart(request, product_id):
 def login_view(request):
     """Maneja el inicio de sesión validando directamente contra la tabla `usuario` en Supabase.
     
-    Usa bcrypt para validar contraseña.
+    Usa bcrypt para validar contraseña (auth_backend.SupabaseBcryptBackend).
     """
     if request.method == 'POST':
         email = request.POST.get('email', '').strip()
@@ -743,81 +772,25 @@ def login_view(request):
             messages.error(request, 'Email y contraseña requeridos.')
             return redirect(reverse('login') + f'?next={next_url}')
 
-        # Obtener usuario directamente de Supabase
+        # Una sola verificación bcrypt (SupabaseBcryptBackend); rol y perfil vienen en la misma pasada
         try:
-            supabase = get_supabase_client()
-            resp = supabase.table('usuario').select('*').eq('email', email).execute()
-            
-            if not resp or not resp.data or len(resp.data) == 0:
-                messages.error(request, 'Email o contraseña inválidos.')
-                return redirect(reverse('login') + f'?next={next_url}')
-            
-            usuario_row = resp.data[0]
-            nombre = usuario_row.get('nombre', '')
-            password_hash = usuario_row.get('password', '')
-            rol = usuario_row.get('rol', 'cliente')
-            
-            # Validar contraseña con bcrypt
-            if not password_hash:
-                messages.error(request, 'Email o contraseña inválidos.')
-                return redirect(reverse('login') + f'?next={next_url}')
-            
-            try:
-                import bcrypt
-                if not bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8')):
-                    messages.error(request, 'Email o contraseña inválidos.')
-                    return redirect(reverse('login') + f'?next={next_url}')
-            except Exception as e:
-                messages.error(request, 'Error validando contraseña.')
-                return redirect(reverse('login') + f'?next={next_url}')
-            
-            # Contraseña válida: crear/sincronizar Django User
-            try:
-                django_user, created = User.objects.get_or_create(
-                    username=email,
-                    defaults={'email': email, 'first_name': nombre}
-                )
-                django_user.set_password(password)
-                django_user.save()
-            except Exception:
-                pass
-            
-            # Autenticar y establecer sesión de Django
             user = authenticate(request, username=email, password=password)
-            if user is not None:
-                login(request, user)
-                # Guardar rol en sesión
-                request.session['user_rol'] = rol
-                # Persistir id_cliente si aplica
-                if rol == 'cliente':
-                    try:
-                        # Obtener id_usuario desde tabla usuario (ya tenemos usuario_row)
-                        id_usuario = usuario_row.get('id_usuario')
-                        if id_usuario:
-                            c_resp = ClienteDAO().obtener_por_usuario(id_usuario)
-                            if c_resp and c_resp.data:
-                                request.session['id_cliente'] = c_resp.data[0].get('id_cliente')
-                    except Exception:
-                        request.session['id_cliente'] = None
-                # Persistir id_empleado si aplica
-                if rol == 'empleado':
-                    try:
-                        id_usuario = usuario_row.get('id_usuario')
-                        if id_usuario:
-                            from dao.empleadoDAO import EmpleadoDAO
-                            e_resp = EmpleadoDAO().obtener_por_usuario(id_usuario)
-                            if e_resp and getattr(e_resp, 'data', None):
-                                request.session['id_empleado'] = e_resp.data[0].get('id_empleado')
-                    except Exception:
-                        request.session['id_empleado'] = None
-                log_event('login', email=email, rol=rol, id_usuario=usuario_row.get('id_usuario'), success=True)
-                messages.success(request, f'¡Bienvenido {nombre or email}!')
-                return redirect(next_url)
-            else:
-                log_event('login_failed', email=email, reason='authenticate_failed')
-                messages.error(request, 'Error al establecer sesión.')
+            datos = getattr(user, 'login_supabase', None)
+            if user is None or datos is None:
+                log_event('login_failed', email=email, reason='invalid_credentials')
+                messages.error(request, 'Email o contraseña inválidos.')
                 return redirect(reverse('login') + f'?next={next_url}')
-        
+
+            login(request, user)
+            guardar_en_sesion(request.session, datos)
+            usuario = datos['usuario']
+            log_event('login', email=email, rol=datos['rol'], id_usuario=usuario.id_usuario, success=True)
+            messages.success(request, f'¡Bienvenido {usuario.nombre or email}!')
+            return redirect(next_url)
+
+        except HashingSaturado:
+            log_event('login_failed', email=email, reason='hashing_saturado')
+            raise
         except Exception as e:
             log_event('login_failed', email=email, reason=str(e))
             messages.error(request, f'Error: {str(e)}')
@@ -850,15 +823,16 @@ def register_view(request):
             if not resp.get('success'):
                 messages.error(request, resp.get('message') or 'Error al registrar usuario')
                 return redirect('register')
+        except HashingSaturado:
+            raise
         except Exception:
             messages.error(request, 'Error al registrar usuario')
             return redirect('register')
 
-        # Luego, crear/sincronizar Django User para poder iniciar sesión normalmente
+        # Luego, crear el Django User que ancla la sesión (sin hash: la contraseña vive en Supabase)
         try:
             if not User.objects.filter(username=email).exists():
-                user = User.objects.create_user(username=email, email=email, password=password, first_name=name)
-                user.save()
+                User.objects.create_user(username=email, email=email, password=None, first_name=name)
         except Exception:
             pass
 
@@ -908,117 +882,247 @@ def admin_panel(request):
     return render(request, 'supermerengones/admin_panel.html', {'users': users, 'sedes': sedes})
 
 
+class _EcoCSV:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+# Última fila del CSV cuando la exportación se corta a mitad de camino
+FILA_ERROR_CSV = ['#ERROR', 'Exportación interrumpida: el archivo está incompleto']
+
+
+def _csv_streaming(nombre_archivo, encabezado, filas):
+    """StreamingHttpResponse que escribe el CSV a medida que `filas` produce datos.
+
+    La primera fila se lee antes de responder: si falla se devuelve 503 en vez de un CSV vacío.
+    Si falla más adelante (status ya enviado) se agrega FILA_ERROR_CSV al final del archivo.
+    """
+    import csv
+    writer = csv.writer(_EcoCSV())
+    filas = iter(filas)
+    try:
+        primera = next(filas, None)
+    except Exception as e:
+        log_event('export_csv_fallido', archivo=nombre_archivo, success=False, message=str(e))
+        return HttpResponse('No se pudo generar la exportación', status=503)
+
+    def _lineas():
+        yield writer.writerow(encabezado)
+        if primera is None:
+            return
+        yield writer.writerow(primera)
+        try:
+            for fila in filas:
+                yield writer.writerow(fila)
+        except Exception as e:
+            # Con la respuesta ya iniciada no se puede cambiar el status; se marca el archivo como incompleto
+            log_event('export_csv_interrumpido', archivo=nombre_archivo, success=False, message=str(e))
+            yield writer.writerow(FILA_ERROR_CSV)
+
+    response = StreamingHttpResponse(_lineas(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return response
+
+
 @role_required('administrador')
 def export_pedidos_csv(request):
-    """Exporta pedidos a CSV (admin) con filtros opcionales: estado, desde, hasta."""
+    """Exporta pedidos a CSV (admin) con filtros opcionales: estado, desde, hasta.
+
+    Se transmite por páginas (keyset sobre fecha/id_pedido) sin tope de filas.
+    """
     estado = request.GET.get('estado') or None
     desde = request.GET.get('desde') or None
     hasta = request.GET.get('hasta') or None
-    pedidos = []
+    encabezado = ENCABEZADO_PEDIDOS_CSV
     try:
-        if desde and hasta:
-            res = pedido_manager.listarPedidosPorFecha(desde, hasta)
-            pedidos = res.get('data', []) if res.get('success') else []
-        else:
-            res = pedido_manager.listarTodosPedidos(limite=1000)
-            pedidos = res.get('data', []) if res.get('success') else []
-        if estado:
-            pedidos = [p for p in pedidos if (p.estado if hasattr(p, 'estado') else (p.get('estado') if isinstance(p, dict) else None)) == estado]
-    except Exception:
-        pedidos = []
-    # Preparar respuesta CSV
-    import csv
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="pedidos.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['id_pedido', 'id_cliente', 'id_sede', 'fecha', 'estado', 'total', 'metodo_pago', 'estado_pago', 'detalles_count'])
-    for p in pedidos:
-        try:
-            obj = p if isinstance(p, dict) else (p.to_dict() if hasattr(p, 'to_dict') else None)
-            if not obj:
-                continue
-            detalles_count = len(obj.get('detalles', []))
-            writer.writerow([
-                obj.get('id_pedido'),
-                obj.get('id_cliente'),
-                obj.get('id_sede'),
-                obj.get('fecha'),
-                obj.get('estado'),
-                obj.get('total'),
-                obj.get('metodo_pago'),
-                obj.get('estado_pago'),
-                detalles_count,
-            ])
-        except Exception:
-            continue
-    return response
+        for valor in (desde, hasta):
+            if valor:
+                datetime.fromisoformat(valor)
+    except ValueError:
+        return HttpResponse('Parámetros desde/hasta inválidos (formato AAAA-MM-DD)', status=400)
+
+    pedidos = PedidoDAO().iterar_por_fecha(estado=estado, desde=desde, hasta=hasta)
+    filas = ([p.get(col) for col in encabezado] for p in pedidos)
+    return _csv_streaming('pedidos.csv', encabezado, filas)
 
 
 @role_required('administrador')
 def export_productos_csv(request):
-    """Exporta productos activos a CSV (admin)."""
-    productos = []
-    try:
-        resp = producto_dao.listar_activos()
-        productos = resp
-    except Exception:
-        productos = []
-    import csv
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="productos.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['id_producto', 'codigo', 'nombre', 'precio', 'stock', 'activo'])
-    for prod in productos:
-        try:
-            obj = prod if isinstance(prod, dict) else (prod.to_dict() if hasattr(prod, 'to_dict') else None)
-            if not obj:
-                continue
-            writer.writerow([
-                obj.get('id_producto') or obj.get('id'),
-                obj.get('codigo'),
-                obj.get('nombre') or obj.get('name'),
-                obj.get('precio') or obj.get('price'),
-                obj.get('stock'),
-                obj.get('activo'),
-            ])
-        except Exception:
-            continue
-    return response
+    """Exporta productos activos a CSV (admin), transmitido por páginas."""
+    encabezado = ENCABEZADO_PRODUCTOS_CSV
+    filas = ([p.get(col) for col in encabezado] for p in producto_dao.iterar_activos())
+    return _csv_streaming('productos.csv', encabezado, filas)
 
 
 @role_required('administrador')
 def admin_top_productos(request):
-    """Top productos por cantidad vendida y subtotal."""
+    """Top productos por cantidad vendida y subtotal, con filtros de fecha y sede."""
+    desde = (request.GET.get('desde') or '').strip()
+    hasta = (request.GET.get('hasta') or '').strip()
+    sede = (request.GET.get('sede') or '').strip()
     rows = []
     try:
-        supabase = get_supabase_client()
-        # Agregación básica desde detalle_pedido
-        resp = supabase.table('detalle_pedido').select('id_producto,cantidad,subtotal').execute()
-        data = resp.data or []
-        agg = {}
-        for d in data:
-            pid = d.get('id_producto')
-            cant = int(d.get('cantidad') or 0)
-            sub = float(d.get('subtotal') or 0.0)
-            if pid is None:
-                continue
-            if pid not in agg:
-                agg[pid] = {'cantidad': 0, 'subtotal': 0.0}
-            agg[pid]['cantidad'] += cant
-            agg[pid]['subtotal'] += sub
-        # Obtener nombres
-        pids = list(agg.keys())
-        nombres = {}
-        if pids:
-            pr = supabase.table(TABLA_PRODUCTO).select('id_producto,nombre').in_('id_producto', pids).execute()
-            for r in (pr.data or []):
-                nombres[r.get('id_producto')] = r.get('nombre')
-        for pid, st in agg.items():
-            rows.append({'id_producto': pid, 'nombre': nombres.get(pid, f'Producto {pid}'), 'cantidad_total': st['cantidad'], 'subtotal_total': st['subtotal']})
-        rows.sort(key=lambda r: r['cantidad_total'], reverse=True)
+        rows = DetallePedidoDAO().top_productos(
+            desde=desde or None,
+            hasta=hasta or None,
+            limite=50,
+            id_sede=int(sede) if sede.isdigit() else None,
+        )
+    except ValueError:
+        messages.error(request, 'Rango de fechas inválido (use AAAA-MM-DD)')
     except Exception:
         rows = []
-    return render(request, 'supermerengones/admin_top_productos.html', {'rows': rows})
+    sedes_lista = []
+    try:
+        rs = SedeManager().listarSedes(solo_activos=False)
+        if rs.get('success'):
+            sedes_lista = [s.to_dict() if hasattr(s, 'to_dict') else s for s in rs.get('data', [])]
+    except Exception:
+        sedes_lista = []
+    return render(request, 'supermerengones/admin_top_productos.html', {
+        'rows': rows,
+        'sedes': sedes_lista,
+        'filtro_desde': desde,
+        'filtro_hasta': hasta,
+        'filtro_sede': sede,
+    })
+
+
+def _nombres_insumos():
+    """{id_insumo: nombre} de todos los insumos (catálogo cacheado, se invalida al cambiar un insumo)."""
+    def _cargar():
+        from dao.insumoDAO import InsumoDAO
+        return {i.id_insumo: i.nombre for i in InsumoDAO().listar_todos(solo_activos=False)}
+    try:
+        return get_or_cache('insumos_nombres', ttl=write_through_ttl(1800, 300), loader=_cargar)
+    except Exception:
+        return {}
+
+
+def _reporte_costos_con_nombres():
+    """Filas del reporte de costos con el nombre de cada insumo principal (None si falla)."""
+    res = receta_manager.reporteCostos()
+    if not res.get('success'):
+        return None, None
+    nombres = _nombres_insumos()
+    filas = []
+    for fila in res['data']['filas']:
+        principales = [dict(i, nombre=nombres.get(i['id_insumo']) or f"Insumo {i['id_insumo']}")
+                       for i in fila['insumos_principales']]
+        filas.append(dict(fila, insumos_principales=principales))
+    return filas, res['data']['generado']
+
+
+@role_required('administrador')
+def admin_reporte_costos(request):
+    """Costo de receta, precio y margen de todos los productos activos (márgenes más bajos primero)."""
+    filas, generado = _reporte_costos_con_nombres()
+    if filas is None:
+        messages.error(request, 'No se pudo calcular el reporte de costos')
+        filas = []
+    return render(request, 'supermerengones/admin_reporte_costos.html', {
+        'filas': filas,
+        'generado': generado,
+    })
+
+
+@role_required('administrador')
+def export_reporte_costos_csv(request):
+    """Exporta el reporte de costos y márgenes a CSV (admin)."""
+    filas, _ = _reporte_costos_con_nombres()
+    if filas is None:
+        return HttpResponse('No se pudo calcular el reporte de costos', status=503)
+    encabezado = ['id_producto', 'codigo', 'nombre', 'precio', 'costo', 'margen', 'margen_pct', 'completo',
+                  'insumos_principales']
+
+    def _redondear(valor):
+        return round(valor, 2) if valor is not None else ''
+
+    def _filas():
+        for f in filas:
+            principales = '; '.join(f"{i['nombre']} ({_redondear(i['participacion'])}%)"
+                                    for i in f['insumos_principales'])
+            yield [f['id_producto'], f['codigo'], f['nombre'], _redondear(f['precio']), _redondear(f['costo']),
+                   _redondear(f['margen']), _redondear(f['margen_pct']), f['completo'], principales]
+    return _csv_streaming('costos_productos.csv', encabezado, _filas())
+
+
+@role_required('administrador')
+def api_reporte_costos(request):
+    """Reporte de costos y márgenes de productos activos en JSON (admin)."""
+    filas, generado = _reporte_costos_con_nombres()
+    if filas is None:
+        return JsonResponse({'success': False, 'message': 'No se pudo calcular el reporte de costos'}, status=503)
+    return JsonResponse({'success': True, 'data': filas, 'generado': generado})
+
+# ------------------------- TRABAJOS EN SEGUNDO PLANO (ADMIN) -------------------------
+trabajo_manager = TrabajoManager()
+
+
+@role_required('administrador')
+def trabajos_admin(request):
+    """Lista los trabajos en segundo plano y permite encolar, reintentar o cancelar.
+
+    POST con 'tipo' encola un trabajo (filtros opcionales estado/desde/hasta para pedidos;
+    lista_clientes -ids separados por coma- y mensaje para el envío masivo);
+    POST con accion=reintentar|cancelar e 'id' actúa sobre uno existente.
+    """
+    if request.method == 'POST':
+        accion = request.POST.get('accion')
+        id_trabajo = request.POST.get('id') or ''
+        if accion == 'reintentar':
+            res = trabajo_manager.reintentar(id_trabajo)
+        elif accion == 'cancelar':
+            res = trabajo_manager.cancelar(id_trabajo)
+        else:
+            tipo = request.POST.get('tipo') or ''
+            payload = {k: request.POST.get(k) for k in ('estado', 'desde', 'hasta', 'mensaje') if request.POST.get(k)}
+            clientes = (request.POST.get('lista_clientes') or '').replace(',', ' ').split()
+            if not all(c.isdigit() for c in clientes):
+                res = {'success': False, 'message': 'Los clientes deben ser ids numéricos separados por coma'}
+            else:
+                if clientes:
+                    payload['lista_clientes'] = [int(c) for c in clientes]
+                res = trabajo_manager.encolar(tipo, payload, creado_por=request.user.username)
+            log_event('trabajo_encolado', tipo=tipo, success=res.get('success'), message=res.get('message'))
+        (messages.success if res.get('success') else messages.error)(request, res.get('message'))
+        return redirect('trabajos_admin')
+    estado = request.GET.get('estado') or None
+    res = trabajo_manager.listarTrabajos(limite=100, estado=estado)
+    if not res.get('success'):
+        messages.error(request, res.get('message'))
+    return render(request, 'supermerengones/trabajos_admin.html', {
+        'trabajos': res.get('data') or [],
+        'tipos': [(tipo, descripcion) for tipo, (descripcion, _, _) in TIPOS_TRABAJO.items()],
+        'filtro_estado': estado or '',
+    })
+
+
+@role_required('administrador')
+def trabajo_estado(request, id_trabajo):
+    """Estado y progreso de un trabajo en JSON (para consultar el avance desde el panel)."""
+    res = trabajo_manager.obtenerTrabajo(id_trabajo)
+    if not res.get('success'):
+        return JsonResponse({'success': False, 'message': res.get('message')}, status=404)
+    trabajo = dict(res['data'])
+    trabajo.pop('archivo', None)
+    trabajo['descargable'] = bool(res['data'].get('archivo')) and trabajo['estado'] == 'completado'
+    return JsonResponse({'success': True, 'data': trabajo})
+
+
+@role_required('administrador')
+def trabajo_descargar(request, id_trabajo):
+    """Descarga el archivo generado por un trabajo completado."""
+    import os
+    from django.http import FileResponse, Http404
+    res = trabajo_manager.obtenerTrabajo(id_trabajo)
+    trabajo = res.get('data') or {}
+    ruta = trabajo.get('archivo')
+    if trabajo.get('estado') != 'completado' or not ruta or not os.path.isfile(ruta):
+        raise Http404('El trabajo no tiene un archivo para descargar')
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=os.path.basename(ruta))
 
 
 # ------------------------- REGISTRO MULTI-ROL (ADMIN) -------------------------
@@ -1040,6 +1144,8 @@ def registrar_empleado_ui(request):
                     return redirect('admin_panel')
                 else:
                     messages.error(request, resp.get('message'))
+            except HashingSaturado:
+                raise
             except Exception as e:
                 messages.error(request, f'Error: {str(e)}')
         else:
@@ -1064,6 +1170,8 @@ def registrar_administrador_ui(request):
                     return redirect('admin_panel')
                 else:
                     messages.error(request, resp.get('message'))
+            except HashingSaturado:
+                raise
             except Exception as e:
                 messages.error(request, f'Error: {str(e)}')
         else:
@@ -1304,6 +1412,13 @@ def pedido_accion_estado(request, id_pedido, accion):
         'entregar': 'marcarEntregado',
         'cancelar': 'cancelarPedido',
     }
+    # Estado destino cuando el manager no tiene un método específico para la acción
+    estados_map = {
+        'aceptar': 'en_proceso',
+        'preparar': 'en_proceso',
+        'entregar': 'completado',
+        'cancelar': 'cancelado',
+    }
     metodo = acciones_map.get(accion)
     if not metodo:
         messages.error(request, 'Acción no válida')
@@ -1314,7 +1429,11 @@ def pedido_accion_estado(request, id_pedido, accion):
             func = getattr(pedido_manager, metodo)
             resp = func(id_pedido)
         else:
-            resp = {'success': False, 'message': f'Método {metodo} no implementado'}
+            resp = pedido_manager.actualizarEstado(
+                id_pedido, estados_map[accion],
+                id_empleado=request.session.get('id_empleado'),
+                id_usuario=request.session.get('id_usuario'),
+            )
     except Exception as e:
         resp = {'success': False, 'message': str(e)}
 
@@ -1485,7 +1604,7 @@ def compra_registrar(request):
                     return ir_local.get('data') or [] if ir_local.get('success') else []
                 except Exception:
                     return []
-            insumos = get_or_cache('insumos_lista', ttl=300, loader=_load_insumos)
+            insumos = get_or_cache('insumos_lista', ttl=write_through_ttl(1800, 300), loader=_load_insumos)
     except Exception:
         pass
     if request.method == 'POST':
@@ -1629,51 +1748,94 @@ def perfil_editar(request):
 def admin_kpis(request):
     """Dashboard de KPIs administrativos.
 
+    Lee el snapshot materializado de KpiManager (una consulta); si todavía no existe
+    o no está reconciliado, calcula las métricas en vivo.
+
     Métricas incluidas:
     - pedidos_por_estado: conteo agrupado.
-    - top_productos: placeholder (requiere detallePedidoDAO no implementado).
+    - ingresos: total por día y sede (solo con snapshot).
+    - top_productos: productos más vendidos.
     - insumos_criticos: insumos con nivel critico según inventario.
-    - compras_recientes: últimas compras registradas.
+    - compras_recientes: últimas compras registradas (siempre en vivo).
     """
     pedidos_por_estado = {}
     total_pedidos = 0
-    try:
-        res_ped = pedido_manager.listarTodosPedidos(limite=500)
-        if res_ped.get('success'):
-            for p in res_ped.get('data', []):
-                estado = getattr(p, 'estado', None) or (p.to_dict().get('estado') if hasattr(p, 'to_dict') else None) or 'desconocido'
-                pedidos_por_estado[estado] = pedidos_por_estado.get(estado, 0) + 1
-            total_pedidos = sum(pedidos_por_estado.values())
-    except Exception:
-        pedidos_por_estado = {}
-
-    # Top productos: no disponible sin DetallePedidoDAO funcional
+    ingresos = []
     top_productos = []
-    top_productos_msg = 'No disponible: detallePedidoDAO no implementado'
-
+    top_productos_msg = 'Sin ventas registradas'
     insumos_criticos = []
-    try:
-        alertas = inventario_manager.verificarAlertasReposicion(None)
-        if alertas.get('exito'):
-            insumos_criticos = [a for a in alertas.get('alertas', []) if a.get('nivel') == 'critico']
-    except Exception:
-        insumos_criticos = []
+    actualizado = None
 
-    compras_recientes = []
-    try:
-        res_comp = compra_manager.listarCompras(limite=10)
-        if res_comp.get('success'):
-            compras_recientes = res_comp.get('data', [])
-    except Exception:
-        compras_recientes = []
+    def _compras_recientes():
+        try:
+            res_comp = compra_manager.listarCompras(limite=10)
+            return res_comp.get('data', []) if res_comp.get('success') else []
+        except Exception:
+            return []
+
+    def _pedidos_por_estado():
+        conteo = {}
+        try:
+            # Solo se necesitan encabezados para contar por estado
+            res_ped = pedido_manager.listarTodosPedidos(limite=500, cargar_detalles=False)
+            if res_ped.get('success'):
+                for p in res_ped.get('data', []):
+                    estado = getattr(p, 'estado', None) or (p.to_dict().get('estado') if hasattr(p, 'to_dict') else None) or 'desconocido'
+                    conteo[estado] = conteo.get(estado, 0) + 1
+        except Exception:
+            return {}
+        return conteo
+
+    def _top_productos():
+        try:
+            return detalle_pedido_dao.top_productos(limite=10)
+        except Exception:
+            return None
+
+    def _insumos_criticos():
+        try:
+            alertas = inventario_manager.verificarAlertasReposicion(None)
+            if alertas.get('exito'):
+                return [a for a in alertas.get('alertas', []) if a.get('nivel') == 'critico']
+        except Exception:
+            pass
+        return []
+
+    # Snapshot y compras son independientes: se leen a la vez
+    resultados = en_paralelo({'snapshot': kpi_manager.obtenerSnapshot, 'compras': _compras_recientes})
+    snapshot = resultados['snapshot']
+    compras_recientes = resultados['compras']
+    if snapshot.get('success'):
+        datos = snapshot['data']
+        pedidos_por_estado = datos['pedidos_por_estado']
+        total_pedidos = datos['total_pedidos']
+        ingresos = datos['ingresos']
+        top_productos = datos['top_productos']
+        insumos_criticos = datos['insumos_criticos']
+        actualizado = datos['actualizado']
+    else:
+        en_vivo = en_paralelo({
+            'pedidos': _pedidos_por_estado,
+            'top': _top_productos,
+            'criticos': _insumos_criticos,
+        })
+        pedidos_por_estado = en_vivo['pedidos']
+        total_pedidos = sum(pedidos_por_estado.values())
+        if en_vivo['top'] is None:
+            top_productos_msg = 'No disponible'
+        else:
+            top_productos = en_vivo['top']
+        insumos_criticos = en_vivo['criticos']
 
     context = {
         'pedidos_por_estado': pedidos_por_estado,
         'total_pedidos': total_pedidos,
+        'ingresos': ingresos,
         'top_productos': top_productos,
         'top_productos_msg': top_productos_msg,
         'insumos_criticos': insumos_criticos,
         'compras_recientes': compras_recientes,
+        'actualizado': actualizado,
     }
     return render(request, 'supermerengones/admin_kpis.html', context)
 
@@ -1685,9 +1847,9 @@ def auditoria_logs(request):
 
     Requiere configurar la variable de entorno APP_LOG_FILE para habilitar lectura desde archivo.
     Filtros opcionales por query string: event (substring), success (true/false), desde/hasta (YYYY-MM-DD), limit.
+    Las entradas se leen más recientes primero con el índice lateral de utils.log_reader.
     """
-    import os, json
-    from datetime import datetime, date
+    import os
 
     log_file = os.getenv('APP_LOG_FILE')
     if not log_file:
@@ -1726,58 +1888,15 @@ def auditoria_logs(request):
         except Exception:
             pass
 
-    entries = []
-    # Read file and parse JSON lines
-    try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-    except Exception:
-        lines = []
-
-    # Parse and filter
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            obj = json.loads(line)
-        except Exception:
-            continue
-        # Quick normalize
-        ts = obj.get('ts')
-        evt = obj.get('event', '') or ''
-        succ = obj.get('success') if 'success' in obj else None
-        # Filter by event substring
-        if q_event and q_event.lower() not in str(evt).lower():
-            continue
-        # Filter by success
-        if q_success == 'true' and succ is not True:
-            continue
-        if q_success == 'false' and succ is not False:
-            continue
-        # Filter by date range
-        if ts and (dt_desde or dt_hasta):
-            try:
-                # support both with Z and without
-                ts_clean = ts.replace('Z', '')
-                dt_ts = parse_date_iso(ts_clean)
-            except Exception:
-                dt_ts = None
-            if dt_desde and dt_ts and dt_ts < dt_desde:
-                continue
-            if dt_hasta and dt_ts and dt_ts > dt_hasta:
-                continue
-        entries.append(obj)
-
-    # Sort by timestamp desc if available
-    def sort_key(o):
-        t = o.get('ts')
-        try:
-            return parse_date_iso((t or '').replace('Z', '')) or datetime.min
-        except Exception:
-            return datetime.min
-    entries.sort(key=sort_key, reverse=True)
-    entries = entries[:max(1, min(1000, limit))]
+    # Lectura indexada hacia atrás: solo se leen los bloques que pueden coincidir
+    entries = log_reader.consultar(
+        log_file,
+        evento=q_event or None,
+        exito={'true': True, 'false': False}.get(q_success),
+        desde=dt_desde.replace(tzinfo=None).isoformat() if dt_desde else None,
+        hasta=dt_hasta.replace(tzinfo=None).isoformat() if dt_hasta else None,
+        limite=max(1, min(1000, limit)),
+    )
 
     return render(request, 'supermerengones/auditoria_logs.html', {
         'entries': entries,
@@ -1792,6 +1911,32 @@ def auditoria_logs(request):
     })
 
 
+# ------------------------- CACHÉ DE CATÁLOGO (ADMIN) -------------------------
+@role_required('administrador')
+def cache_estadisticas(request):
+    """Estadísticas del caché de catálogo (aciertos, fallos, tiempos de carga) por clave.
+
+    También muestra los contadores del limitador de tasa (permitidas/rechazadas por vista).
+
+    POST con 'key' invalida esa clave; POST con accion=limpiar vacía el caché completo.
+    """
+    if request.method == 'POST':
+        key = request.POST.get('key')
+        if request.POST.get('accion') == 'limpiar':
+            catalog_cache.clear_all()
+            log_event('cache_limpiado', success=True)
+            messages.success(request, 'Caché vaciado')
+        elif key:
+            catalog_cache.invalidate(key)
+            log_event('cache_invalidado', key=key, success=True)
+            messages.success(request, f'Clave {key} invalidada')
+        return redirect('cache_estadisticas')
+    return render(request, 'supermerengones/cache_estadisticas.html', {
+        'stats': catalog_cache.get_stats(),
+        'limites': rate_limit_stats(),
+    })
+
+
 # ------------------------- RECETA PRODUCTO (ADMIN) -------------------------
 @role_required('administrador')
 def producto_receta_editar(request, id_producto):
@@ -1807,59 +1952,16 @@ def producto_receta_editar(request, id_producto):
     except Exception:
         producto = None
 
-    # Receta actual
+    # Receta actual y su costo desde el índice en memoria (sin consultas por insumo)
     receta = []
+    costo_receta = None
+    costo_breakdown = []
     try:
-        receta = producto_insumo_dao.listar_por_producto(id_producto)
+        receta = receta_manager.receta(id_producto)
+        costo_receta, costo_breakdown = receta_manager.desgloseCosto(id_producto)
     except Exception:
         receta = []
 
-    # Helper para calcular costos unitarios de insumos (promedio ponderado últimas compras)
-    def _costos_unitarios(receta_lista, limite=50):
-        costos = {}
-        for linea in receta_lista:
-            iid = getattr(linea, 'id_insumo', None)
-            if iid is None:
-                continue
-            try:
-                detalles = detalle_compra_dao.listar_por_insumo(iid, limite=limite)
-            except Exception:
-                detalles = []
-            total_sub = 0.0
-            total_cant = 0.0
-            for d in detalles:
-                try:
-                    cant = float(d.get('cantidad') or 0)
-                    sub = float(d.get('subtotal') or 0)
-                except Exception:
-                    cant = 0.0
-                    sub = 0.0
-                total_cant += cant
-                total_sub += sub
-            if total_cant > 0:
-                costos[iid] = total_sub / total_cant
-        return costos
-
-    costos_insumos = _costos_unitarios(receta)
-    costo_receta = None
-    costo_breakdown = []
-    if receta:
-        try:
-            costo_receta = producto_insumo_dao.calcular_costo_producto(id_producto, costos_insumos)
-            for linea in receta:
-                iid = linea.id_insumo
-                cant = linea.cantidad_necesaria
-                unit = costos_insumos.get(iid)
-                line_total = unit * cant if (unit is not None and cant is not None) else None
-                costo_breakdown.append({
-                    'id_insumo': iid,
-                    'cantidad': cant,
-                    'costo_unitario': unit,
-                    'costo_linea': line_total,
-                })
-        except Exception:
-            costo_receta = None
-
     # Lista de insumos activos para seleccionar
     insumos = []
     try:
@@ -1884,21 +1986,7 @@ def producto_receta_editar(request, id_producto):
                     continue
         if not nueva_lista:
             messages.error(request, 'Debe especificar al menos un insumo con cantidad')
-            # Recalcular costos con receta original (sin cambios válidos)
-            costos_insumos = _costos_unitarios(receta)
-            costo_receta = producto_insumo_dao.calcular_costo_producto(id_producto, costos_insumos) if receta else None
-            costo_breakdown = []
-            for linea in receta:
-                iid = linea.id_insumo
-                cant = linea.cantidad_necesaria
-                unit = costos_insumos.get(iid)
-                line_total = unit * cant if (unit is not None and cant is not None) else None
-                costo_breakdown.append({
-                    'id_insumo': iid,
-                    'cantidad': cant,
-                    'costo_unitario': unit,
-                    'costo_linea': line_total,
-                })
+            # Se muestra la receta original con el costo ya calculado
             return render(request, 'supermerengones/producto_receta_editar.html', {
                 'producto': producto,
                 'receta': receta,
@@ -1975,14 +2063,11 @@ def password_change(request):
         if nueva != confirmar:
             messages.error(request, 'La confirmación no coincide')
             return render(request, 'supermerengones/password_change.html')
-        user = request.user
-        # Verificar contraseña actual
-        if not user.check_password(actual):
-            messages.error(request, 'La contraseña actual es incorrecta')
+        # La contraseña vive en la tabla usuario (bcrypt); el User de Django no guarda hash
+        resultado = AuthManager().cambiarPassword(request.user.username, actual, nueva)
+        if not resultado.get('success'):
+            messages.error(request, resultado.get('message'))
             return render(request, 'supermerengones/password_change.html')
-        # Establecer nueva contraseña
-        user.set_password(nueva)
-        user.save()
         messages.success(request, 'Contraseña actualizada. Vuelva a iniciar sesión.')
         return redirect('login')
     return render(request, 'supermerengones/password_change.html')
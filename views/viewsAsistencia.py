@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from manager.asistenciaManager import AsistenciaManager
 from manager.authManager import AuthManager
+from utils.paginacion import leer_parametros, CursorInvalido
 import logging
 
 logger = logging.getLogger(__name__)
@@ -95,7 +96,7 @@ def mis_registros(request):
     """
     GET /api/asistencia/mis-registros/
     Obtiene los registros de asistencia del empleado autenticado
-    Query params: limite (default: 50)
+    Query params: page_size (default: 100, máximo 1000; 'limite' se acepta como alias), cursor
     """
     try:
         # Obtener empleado del usuario autenticado
@@ -111,11 +112,16 @@ def mis_registros(request):
         empleado = resp_empleado['data']
         id_empleado = empleado['id_empleado']
         
-        limite = int(request.GET.get('limite', 50))
+        cursor, tamanio = leer_parametros(request.GET)
         
-        resp = asistencia_manager.listarPorEmpleado(id_empleado, limite)
+        resp = asistencia_manager.listarPagina(cursor, tamanio, id_empleado=id_empleado)
         
         return Response(resp, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response({
+            "success": False,
+            "message": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error en mis_registros: {str(e)}")
         return Response({
@@ -129,8 +135,8 @@ def mis_registros(request):
 def listar_asistencias(request):
     """
     GET /api/asistencia/
-    Lista todas las asistencias (solo administradores)
-    Query params: limite (default: 100)
+    Lista todas las asistencias (solo administradores), por páginas
+    Query params: page_size (default: 100, máximo 1000; 'limite' se acepta como alias), cursor
     """
     try:
         # Verificar que es administrador
@@ -143,11 +149,16 @@ def listar_asistencias(request):
                 "message": "Acceso denegado. Solo administradores"
             }, status=status.HTTP_403_FORBIDDEN)
         
-        limite = int(request.GET.get('limite', 100))
+        cursor, tamanio = leer_parametros(request.GET)
         
-        resp = asistencia_manager.listarTodas(limite)
+        resp = asistencia_manager.listarPagina(cursor, tamanio)
         
         return Response(resp, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response({
+            "success": False,
+            "message": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error en listar_asistencias: {str(e)}")
         return Response({
@@ -163,7 +174,7 @@ def asistencias_por_fecha(request, fecha):
     GET /api/asistencia/fecha/{fecha}/
     Lista asistencias de una fecha específica (solo administradores)
     Params: fecha (YYYY-MM-DD)
-    Query params: limite (default: 100)
+    Query params: page_size (default: 100, máximo 1000; 'limite' se acepta como alias), cursor
     """
     try:
         # Verificar que es administrador
@@ -176,11 +187,16 @@ def asistencias_por_fecha(request, fecha):
                 "message": "Acceso denegado. Solo administradores"
             }, status=status.HTTP_403_FORBIDDEN)
         
-        limite = int(request.GET.get('limite', 100))
+        cursor, tamanio = leer_parametros(request.GET)
         
-        resp = asistencia_manager.listarPorFecha(fecha, limite)
+        resp = asistencia_manager.listarPaginaDia(fecha, cursor, tamanio)
         
         return Response(resp, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response({
+            "success": False,
+            "message": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error en asistencias_por_fecha: {str(e)}")
         return Response({
@@ -196,7 +212,7 @@ def asistencias_por_empleado(request, id_empleado):
     GET /api/asistencia/empleado/{id}/
     Lista asistencias de un empleado específico (solo administradores)
     Params: id_empleado
-    Query params: limite (default: 50)
+    Query params: page_size (default: 100, máximo 1000; 'limite' se acepta como alias), cursor
     """
     try:
         # Verificar que es administrador
@@ -209,11 +225,16 @@ def asistencias_por_empleado(request, id_empleado):
                 "message": "Acceso denegado. Solo administradores"
             }, status=status.HTTP_403_FORBIDDEN)
         
-        limite = int(request.GET.get('limite', 50))
+        cursor, tamanio = leer_parametros(request.GET)
         
-        resp = asistencia_manager.listarPorEmpleado(id_empleado, limite)
+        resp = asistencia_manager.listarPagina(cursor, tamanio, id_empleado=id_empleado)
         
         return Response(resp, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response({
+            "success": False,
+            "message": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error en asistencias_por_empleado: {str(e)}")
         return Response({
@@ -441,7 +462,7 @@ def asistencias_por_estado(request, estado):
     GET /api/asistencia/estado/{estado}/
     Lista asistencias por estado (solo administradores)
     Params: estado (pendiente, asistio, falta, tardanza, justificado)
-    Query params: limite (default: 100)
+    Query params: page_size (default: 100, máximo 1000; 'limite' se acepta como alias), cursor
     """
     try:
         # Verificar que es administrador
@@ -454,14 +475,19 @@ def asistencias_por_estado(request, estado):
                 "message": "Acceso denegado. Solo administradores"
             }, status=status.HTTP_403_FORBIDDEN)
         
-        limite = int(request.GET.get('limite', 100))
+        cursor, tamanio = leer_parametros(request.GET)
         
-        resp = asistencia_manager.listarPorEstado(estado, limite)
+        resp = asistencia_manager.listarPagina(cursor, tamanio, estado=estado)
         
         if not resp["success"]:
             return Response(resp, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(resp, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response({
+            "success": False,
+            "message": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error en asistencias_por_estado: {str(e)}")
         return Response({
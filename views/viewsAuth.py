@@ -5,6 +5,7 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from manager.authManager import AuthManager
+from utils.password_hashing import HashingSaturado
 from datetime import datetime
 
 # Instancia del manager
@@ -57,6 +58,9 @@ def login_view(request):
                 'data': None
             }, status=status.HTTP_401_UNAUTHORIZED)
 
+    except HashingSaturado:
+        # Lo responde HashingSaturadoMiddleware (503 + Retry-After)
+        raise
     except Exception as e:
         return Response({
             'success': False,
@@ -105,6 +109,8 @@ def registrar_cliente_view(request):
                 'data': None
             }, status=status.HTTP_400_BAD_REQUEST)
 
+    except HashingSaturado:
+        raise
     except Exception as e:
         return Response({
             'success': False,
@@ -181,6 +187,8 @@ def registrar_empleado_view(request):
                 'data': None
             }, status=status.HTTP_400_BAD_REQUEST)
 
+    except HashingSaturado:
+        raise
     except Exception as e:
         return Response({
             'success': False,
@@ -239,6 +247,8 @@ def registrar_administrador_view(request):
                 'data': None
             }, status=status.HTTP_400_BAD_REQUEST)
 
+    except HashingSaturado:
+        raise
     except Exception as e:
         return Response({
             'success': False,
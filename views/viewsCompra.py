@@ -7,6 +7,7 @@ from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from manager.compraManager import CompraManager
+from utils.paginacion import leer_parametros, CursorInvalido
 import json
 import logging
 
@@ -77,13 +78,14 @@ def listar_compras(request):
     GET /api/compras/?estado=pendiente
     GET /api/compras/?id_proveedor=1
     GET /api/compras/?fecha_desde=2025-01-01&fecha_hasta=2025-01-31
+    GET /api/compras/?page_size=100&cursor=<next_cursor>
     """
     try:
         estado = request.GET.get('estado')
         id_proveedor = request.GET.get('id_proveedor')
         fecha_desde = request.GET.get('fecha_desde')
         fecha_hasta = request.GET.get('fecha_hasta')
-        limite = int(request.GET.get('limite', 100))
+        cursor, tamanio = leer_parametros(request.GET)
         
         # Convertir id_proveedor a int si existe
         if id_proveedor:
@@ -95,16 +97,23 @@ def listar_compras(request):
                     'message': 'id_proveedor debe ser un número'
                 }, status=400)
         
-        resultado = compra_manager.listarCompras(
+        resultado = compra_manager.listarPaginaCompras(
+            cursor,
+            tamanio,
             estado=estado,
             id_proveedor=id_proveedor,
             fecha_desde=fecha_desde,
-            fecha_hasta=fecha_hasta,
-            limite=limite
+            fecha_hasta=fecha_hasta
         )
         
         return JsonResponse(resultado, status=200)
         
+    except CursorInvalido as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e),
+            'data': []
+        }, status=400)
     except Exception as e:
         logger.error(f"Error al listar compras: {str(e)}")
         return JsonResponse({
@@ -234,18 +243,25 @@ def listar_compras_por_proveedor(request, id_proveedor):
     """
     Lista todas las compras de un proveedor específico
     
-    GET /api/compras/proveedor/{id_proveedor}/
+    GET /api/compras/proveedor/{id_proveedor}/?page_size=100&cursor=<next_cursor>
     """
     try:
-        limite = int(request.GET.get('limite', 100))
+        cursor, tamanio = leer_parametros(request.GET)
         
-        resultado = compra_manager.listarCompras(
-            id_proveedor=id_proveedor,
-            limite=limite
+        resultado = compra_manager.listarPaginaCompras(
+            cursor,
+            tamanio,
+            id_proveedor=id_proveedor
         )
         
         return JsonResponse(resultado, status=200)
         
+    except CursorInvalido as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e),
+            'data': []
+        }, status=400)
     except Exception as e:
         logger.error(f"Error al listar compras del proveedor {id_proveedor}: {str(e)}")
         return JsonResponse({
@@ -260,18 +276,25 @@ def obtener_historial_insumo(request, id_insumo):
     """
     Obtiene el historial de compras de un insumo
     
-    GET /api/compras/insumo/{id_insumo}/historial/
+    GET /api/compras/insumo/{id_insumo}/historial/?page_size=50&cursor=<next_cursor>
     """
     try:
-        limite = int(request.GET.get('limite', 50))
+        cursor, tamanio = leer_parametros(request.GET)
         
-        resultado = compra_manager.obtenerHistorialInsumo(
+        resultado = compra_manager.obtenerPaginaHistorialInsumo(
             id_insumo=id_insumo,
-            limite=limite
+            cursor=cursor,
+            tamanio=tamanio
         )
         
         return JsonResponse(resultado, status=200)
         
+    except CursorInvalido as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e),
+            'data': []
+        }, status=400)
     except Exception as e:
         logger.error(f"Error al obtener historial de insumo {id_insumo}: {str(e)}")
         return JsonResponse({
@@ -286,11 +309,11 @@ def listar_compras_por_estado(request):
     """
     Lista compras filtradas por estado
     
-    GET /api/compras/estado/?estado=pendiente
+    GET /api/compras/estado/?estado=pendiente&page_size=100&cursor=<next_cursor>
     """
     try:
         estado = request.GET.get('estado')
-        limite = int(request.GET.get('limite', 100))
+        cursor, tamanio = leer_parametros(request.GET)
         
         if not estado:
             return JsonResponse({
@@ -298,13 +321,20 @@ def listar_compras_por_estado(request):
                 'message': 'El parámetro estado es requerido'
             }, status=400)
         
-        resultado = compra_manager.listarCompras(
-            estado=estado,
-            limite=limite
+        resultado = compra_manager.listarPaginaCompras(
+            cursor,
+            tamanio,
+            estado=estado
         )
         
         return JsonResponse(resultado, status=200)
         
+    except CursorInvalido as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e),
+            'data': []
+        }, status=400)
     except Exception as e:
         logger.error(f"Error al listar compras por estado: {str(e)}")
         return JsonResponse({
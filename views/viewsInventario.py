@@ -6,6 +6,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from manager.inventarioManager import InventarioManager
+from utils.paginacion import leer_parametros, CursorInvalido
 
 
 inventario_manager = InventarioManager()
@@ -307,17 +308,18 @@ def obtener_historial_movimientos(request):
     Query params:
     - id_sede: ID de la sede (opcional)
     - tipo: 'entrada' o 'salida' (opcional)
-    - limite: Número máximo de movimientos (default: 100)
+    - page_size: Movimientos por página (default: 100, máximo 1000; 'limite' se acepta como alias)
+    - cursor: valor de 'next_cursor' de la respuesta anterior
     """
     try:
         id_sede = request.GET.get('id_sede')
         tipo = request.GET.get('tipo')
-        limite = int(request.GET.get('limite', 100))
+        cursor, tamanio = leer_parametros(request.GET)
         
         if id_sede:
             id_sede = int(id_sede)
         
-        resultado = inventario_manager.obtenerHistorialMovimientos(id_sede, tipo, limite)
+        resultado = inventario_manager.obtenerPaginaMovimientos(cursor, tamanio, id_sede=id_sede, tipo=tipo)
         
         movimientos_list = [mov.to_dict() for mov in resultado['movimientos']]
         
@@ -331,9 +333,16 @@ def obtener_historial_movimientos(request):
         return Response({
             'success': resultado['exito'],
             'message': resultado['mensaje'],
-            'data': movimientos_list
+            'data': movimientos_list,
+            'next_cursor': resultado['next_cursor']
         }, status=status.HTTP_200_OK)
     
+    except CursorInvalido as e:
+        return Response({
+            'success': False,
+            'message': str(e),
+            'data': []
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'success': False,
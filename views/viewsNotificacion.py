@@ -7,6 +7,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from manager.notificacionManager import NotificacionManager
+from utils.paginacion import leer_parametros, CursorInvalido
 
 logger = logging.getLogger(__name__)
 notificacion_manager = NotificacionManager()
@@ -54,8 +55,11 @@ def enviar_notificacion_masiva(request):
     POST /api/notificaciones/masiva/
     Body: {
         "clientes": [1, 2, 3, 4],
-        "mensaje": "Tenemos nuevas promociones disponibles"
+        "mensaje": "Tenemos nuevas promociones disponibles",
+        "en_segundo_plano": false
     }
+    Con en_segundo_plano=true el envío se encola para el worker de trabajos y responde 202
+    con el id_envio; el avance se consulta en GET /api/notificaciones/masiva/{id_envio}/
     """
     try:
         if not hasattr(request.user, 'administrador'):
@@ -66,11 +70,14 @@ def enviar_notificacion_masiva(request):
         
         lista_clientes = request.data.get('clientes', [])
         mensaje = request.data.get('mensaje')
+        en_segundo_plano = str(request.data.get('en_segundo_plano', '')).lower() in ('1', 'true')
         
-        result = notificacion_manager.enviarNotificacionMasiva(lista_clientes, mensaje)
+        result = notificacion_manager.enviarNotificacionMasiva(lista_clientes, mensaje,
+                                                               en_segundo_plano=en_segundo_plano,
+                                                               creado_por=request.user.username)
         
         if result['success']:
-            return Response(result, status=status.HTTP_201_CREATED)
+            return Response(result, status=status.HTTP_202_ACCEPTED if en_segundo_plano else status.HTTP_201_CREATED)
         return Response(result, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error al enviar notificaciones masivas: {str(e)}")
@@ -80,14 +87,32 @@ def enviar_notificacion_masiva(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def progreso_notificacion_masiva(request, id_envio):
+    """
+    Avance de un envío masivo en segundo plano (solo administradores)
+    GET /api/notificaciones/masiva/{id_envio}/
+    """
+    if not hasattr(request.user, 'administrador'):
+        return Response(
+            {"success": False, "message": "No tienes permisos para ver envíos masivos"},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    result = notificacion_manager.obtenerProgresoEnvio(id_envio)
+    if result['success']:
+        return Response(result, status=status.HTTP_200_OK)
+    return Response(result, status=status.HTTP_404_NOT_FOUND)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def listar_notificaciones_cliente(request):
     """
     Lista notificaciones del cliente autenticado
-    GET /api/notificaciones/mis-notificaciones/?no_leidas=true&limite=50
+    GET /api/notificaciones/mis-notificaciones/?no_leidas=true&page_size=50&cursor=<next_cursor>
     - Clientes solo ven sus propias notificaciones
-    - Parámetros opcionales: no_leidas (true/false), limite (número)
+    - Parámetros opcionales: no_leidas (true/false), page_size (o limite), cursor
     """
     try:
         # Solo clientes pueden ver sus notificaciones
@@ -99,11 +124,16 @@ def listar_notificaciones_cliente(request):
         
         id_cliente = request.user.cliente.id_cliente
         solo_no_leidas = request.query_params.get('no_leidas', 'false').lower() == 'true'
-        limite = int(request.query_params.get('limite', 50))
+        cursor, tamanio = leer_parametros(request.query_params)
         
-        result = notificacion_manager.listarPorCliente(id_cliente, solo_no_leidas, limite)
+        result = notificacion_manager.listarPaginaPorCliente(id_cliente, solo_no_leidas, cursor, tamanio)
         
         return Response(result, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response(
+            {"success": False, "message": str(e), "data": None},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         logger.error(f"Error al listar notificaciones del cliente: {str(e)}")
         return Response(
@@ -294,7 +324,7 @@ def eliminar_notificacion(request, id_notificacion):
 def listar_todas_notificaciones(request):
     """
     Lista todas las notificaciones (solo administradores)
-    GET /api/notificaciones/?limite=100
+    GET /api/notificaciones/?page_size=100&cursor=<next_cursor>
     """
     try:
         if not hasattr(request.user, 'administrador'):
@@ -303,10 +333,15 @@ def listar_todas_notificaciones(request):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        limite = int(request.query_params.get('limite', 100))
-        result = notificacion_manager.listarTodas(limite)
+        cursor, tamanio = leer_parametros(request.query_params)
+        result = notificacion_manager.listarPagina(cursor, tamanio)
         
         return Response(result, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response(
+            {"success": False, "message": str(e), "data": None},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         logger.error(f"Error al listar todas las notificaciones: {str(e)}")
         return Response(
@@ -5,6 +5,8 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from manager.pedidoManager import PedidoManager
+from utils.paginacion import leer_parametros, CursorInvalido
+from datetime import date
 
 # Instancia del manager
 pedido_manager = PedidoManager()
@@ -13,38 +15,53 @@ pedido_manager = PedidoManager()
 @api_view(['GET'])
 def historial_pedidos_cliente(request, id_cliente):
     """
-    Obtiene el historial de pedidos de un cliente
+    Obtiene el historial de pedidos de un cliente (más recientes primero), por páginas
     
     GET /api/pedidos/cliente/{id_cliente}/historial/
     Query params opcionales:
         - estado: filtrar por estado (pendiente, en_proceso, completado, cancelado)
         - fecha_inicio: filtrar desde fecha (YYYY-MM-DD)
         - fecha_fin: filtrar hasta fecha (YYYY-MM-DD)
+        - id_sede: filtrar por sede
+        - page_size: pedidos por página (default: 100, máximo 1000)
+        - cursor: valor de 'next_cursor' de la respuesta anterior
     """
     try:
         # Obtener filtros de query params
         filtros = {}
-        if request.GET.get('estado'):
-            filtros['estado'] = request.GET.get('estado')
-        if request.GET.get('fecha_inicio'):
-            filtros['fecha_inicio'] = request.GET.get('fecha_inicio')
-        if request.GET.get('fecha_fin'):
-            filtros['fecha_fin'] = request.GET.get('fecha_fin')
-        
-        resultado = pedido_manager.obtenerHistorialCliente(id_cliente, filtros if filtros else None)
+        for campo in ('estado', 'fecha_inicio', 'fecha_fin'):
+            if request.GET.get(campo):
+                filtros[campo] = request.GET.get(campo)
+        if request.GET.get('id_sede'):
+            filtros['id_sede'] = int(request.GET.get('id_sede'))
+        for campo in ('fecha_inicio', 'fecha_fin'):
+            if campo in filtros:
+                date.fromisoformat(filtros[campo])
+        cursor, tamanio = leer_parametros(request.GET)
+    except (ValueError, CursorInvalido) as e:
+        return Response({
+            'success': False,
+            'message': f'Parámetros inválidos: {str(e)}',
+            'data': []
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        resultado = pedido_manager.obtenerHistorialCliente(id_cliente, filtros, cursor=cursor, tamanio=tamanio)
         
         if resultado['success']:
             pedidos_dict = [p.to_dict() for p in resultado['data']]
             return Response({
                 'success': True,
                 'message': resultado['message'],
-                'data': pedidos_dict
+                'data': pedidos_dict,
+                'next_cursor': resultado['next_cursor']
             }, status=status.HTTP_200_OK)
         else:
             return Response({
                 'success': False,
                 'message': resultado['message'],
-                'data': []
+                'data': [],
+                'next_cursor': None
             }, status=status.HTTP_200_OK)
             
     except Exception as e:
@@ -169,27 +186,36 @@ def listar_todos_pedidos(request):
     
     GET /api/pedidos/
     Query params opcionales:
-        - limite: número máximo de pedidos a retornar (default: 100)
+        - page_size: pedidos por página (default: 100, máximo 1000; 'limite' se acepta como alias)
+        - cursor: valor de 'next_cursor' de la respuesta anterior
     """
     try:
-        limite = int(request.GET.get('limite', 100))
+        cursor, tamanio = leer_parametros(request.GET)
         
-        resultado = pedido_manager.listarTodosPedidos(limite)
+        resultado = pedido_manager.listarPaginaPedidos(cursor, tamanio)
         
         if resultado['success']:
             pedidos_dict = [p.to_dict() for p in resultado['data']]
             return Response({
                 'success': True,
                 'message': resultado['message'],
-                'data': pedidos_dict
+                'data': pedidos_dict,
+                'next_cursor': resultado['next_cursor']
             }, status=status.HTTP_200_OK)
         else:
             return Response({
                 'success': False,
                 'message': resultado['message'],
-                'data': []
+                'data': [],
+                'next_cursor': None
             }, status=status.HTTP_200_OK)
             
+    except CursorInvalido as e:
+        return Response({
+            'success': False,
+            'message': str(e),
+            'data': []
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'success': False,
@@ -208,7 +234,8 @@ def actualizar_estado_pedido(request, id_pedido):
     Body JSON:
     {
         "estado": "en_proceso",  // pendiente, en_proceso, completado, cancelado
-        "id_empleado": 1         // (opcional) ID del empleado que actualiza
+        "id_empleado": 1         // ID del empleado que actualiza (requerido para "completado"
+                                 // si la sesión no tiene usuario)
     }
     
     Transiciones permitidas:
@@ -229,7 +256,9 @@ def actualizar_estado_pedido(request, id_pedido):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Actualizar el estado
-        resultado = pedido_manager.actualizarEstado(id_pedido, nuevo_estado, id_empleado)
+        resultado = pedido_manager.actualizarEstado(
+            id_pedido, nuevo_estado, id_empleado, id_usuario=request.session.get('id_usuario')
+        )
         
         if resultado['success']:
             return Response({
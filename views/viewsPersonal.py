@@ -6,6 +6,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from manager.personalManager import PersonalManager
 from manager.authManager import AuthManager
+from utils.paginacion import leer_parametros, CursorInvalido
 
 personal_manager = PersonalManager()
 auth_manager = AuthManager()
@@ -29,7 +30,8 @@ def listar_empleados(request):
     
     GET /api/empleados/
     Query params:
-        - limite: número máximo de resultados
+        - page_size: empleados por página (default 100, máximo 1000; 'limite' se acepta como alias)
+        - cursor: next_cursor de la página anterior
         - activos: true/false (solo empleados activos)
     """
     try:
@@ -42,29 +44,17 @@ def listar_empleados(request):
                 'data': None
             }, status=status.HTTP_403_FORBIDDEN)
         
-        limite = request.query_params.get('limite')
+        cursor, tamanio = leer_parametros(request.query_params)
         solo_activos = request.query_params.get('activos', '').lower() == 'true'
         
-        if limite:
-            try:
-                limite = int(limite)
-            except ValueError:
-                return Response({
-                    'success': False,
-                    'message': 'El parámetro limite debe ser un número',
-                    'data': None
-                }, status=status.HTTP_400_BAD_REQUEST)
-        
-        if solo_activos:
-            resultado = personal_manager.listarActivos(limite=limite)
-        else:
-            resultado = personal_manager.listarTodos(limite=limite)
+        resultado = personal_manager.listarPagina(cursor, tamanio, solo_activos=solo_activos)
         
         if resultado['success']:
             return Response({
                 'success': True,
                 'message': resultado['message'],
-                'data': resultado['data']
+                'data': resultado['data'],
+                'next_cursor': resultado['next_cursor']
             }, status=status.HTTP_200_OK)
         else:
             return Response({
@@ -73,6 +63,12 @@ def listar_empleados(request):
                 'data': None
             }, status=status.HTTP_400_BAD_REQUEST)
     
+    except CursorInvalido as e:
+        return Response({
+            'success': False,
+            'message': str(e),
+            'data': None
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'success': False,
@@ -88,7 +84,8 @@ def listar_empleados_por_sede(request, id_sede):
     
     GET /api/empleados/sede/{id_sede}/
     Query params:
-        - limite: número máximo de resultados
+        - page_size: empleados por página (default 100, máximo 1000; 'limite' se acepta como alias)
+        - cursor: next_cursor de la página anterior
     """
     try:
         # Verificar autenticación admin
@@ -100,24 +97,16 @@ def listar_empleados_por_sede(request, id_sede):
                 'data': None
             }, status=status.HTTP_403_FORBIDDEN)
         
-        limite = request.query_params.get('limite')
-        if limite:
-            try:
-                limite = int(limite)
-            except ValueError:
-                return Response({
-                    'success': False,
-                    'message': 'El parámetro limite debe ser un número',
-                    'data': None
-                }, status=status.HTTP_400_BAD_REQUEST)
+        cursor, tamanio = leer_parametros(request.query_params)
         
-        resultado = personal_manager.listarPorSede(id_sede, limite=limite)
+        resultado = personal_manager.listarPagina(cursor, tamanio, id_sede=id_sede)
         
         if resultado['success']:
             return Response({
                 'success': True,
                 'message': resultado['message'],
-                'data': resultado['data']
+                'data': resultado['data'],
+                'next_cursor': resultado['next_cursor']
             }, status=status.HTTP_200_OK)
         else:
             return Response({
@@ -126,6 +115,12 @@ def listar_empleados_por_sede(request, id_sede):
                 'data': None
             }, status=status.HTTP_404_NOT_FOUND if 'no encontrada' in resultado['message'] else status.HTTP_400_BAD_REQUEST)
     
+    except CursorInvalido as e:
+        return Response({
+            'success': False,
+            'message': str(e),
+            'data': None
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'success': False,
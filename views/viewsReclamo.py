@@ -5,6 +5,7 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from manager.reclamoManager import ReclamoManager
+from utils.paginacion import leer_parametros, CursorInvalido
 from datetime import datetime
 
 manager = ReclamoManager()
@@ -104,23 +105,26 @@ def listar_reclamos_por_estado(request):
 def listar_todos_reclamos(request):
     """
     GET /api/reclamos/
-    Lista todos los reclamos
+    Lista todos los reclamos (más recientes primero), por páginas
     Query params:
-        - limite: número máximo de resultados (default: 100)
+        - page_size: resultados por página (default: 100, máximo 1000; 'limite' se acepta como alias)
+        - cursor: valor de 'next_cursor' de la respuesta anterior
     """
-    limite = request.GET.get('limite', 100)
-    
     try:
-        limite = int(limite)
-    except ValueError:
-        limite = 100
+        cursor, tamanio = leer_parametros(request.GET)
+    except CursorInvalido as e:
+        return Response({
+            'message': str(e),
+            'data': []
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    resultado = manager.listarTodosReclamos(limite)
+    resultado = manager.listarPaginaReclamos(cursor, tamanio)
     
     if resultado['success']:
         return Response({
             'message': resultado['message'],
-            'data': [r.to_dict() for r in resultado['data']]
+            'data': [r.to_dict() for r in resultado['data']],
+            'next_cursor': resultado['next_cursor']
         }, status=status.HTTP_200_OK)
     else:
         return Response({
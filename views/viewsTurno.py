@@ -7,6 +7,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from manager.turnoManager import TurnoManager
+from utils.paginacion import leer_parametros, CursorInvalido
 
 logger = logging.getLogger(__name__)
 turno_manager = TurnoManager()
@@ -55,8 +56,8 @@ def crear_turno(request):
 @permission_classes([IsAuthenticated])
 def listar_turnos(request):
     """
-    Lista todos los turnos (solo administradores)
-    GET /api/turnos/?limite=100
+    Lista todos los turnos (solo administradores), por páginas
+    GET /api/turnos/?page_size=100&cursor=<next_cursor>
     """
     try:
         # Solo administradores pueden ver todos los turnos
@@ -66,10 +67,15 @@ def listar_turnos(request):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        limite = int(request.query_params.get('limite', 100))
-        result = turno_manager.listarTodos(limite)
+        cursor, tamanio = leer_parametros(request.query_params)
+        result = turno_manager.listarPagina(cursor, tamanio)
         
         return Response(result, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response(
+            {"success": False, "message": str(e), "data": None},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         logger.error(f"Error al listar turnos: {str(e)}")
         return Response(
@@ -83,7 +89,7 @@ def listar_turnos(request):
 def listar_turnos_empleado(request, id_empleado):
     """
     Lista turnos de un empleado específico
-    GET /api/turnos/empleado/{id_empleado}/?limite=50
+    GET /api/turnos/empleado/{id_empleado}/?page_size=50&cursor=<next_cursor>
     - Empleados solo pueden ver sus propios turnos
     - Administradores pueden ver turnos de cualquier empleado
     """
@@ -101,10 +107,15 @@ def listar_turnos_empleado(request, id_empleado):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        limite = int(request.query_params.get('limite', 50))
-        result = turno_manager.listarPorEmpleado(id_empleado, limite)
+        cursor, tamanio = leer_parametros(request.query_params)
+        result = turno_manager.listarPagina(cursor, tamanio, id_empleado=id_empleado)
         
         return Response(result, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response(
+            {"success": False, "message": str(e), "data": None},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         logger.error(f"Error al listar turnos del empleado: {str(e)}")
         return Response(
@@ -118,7 +129,7 @@ def listar_turnos_empleado(request, id_empleado):
 def listar_turnos_fecha(request, fecha):
     """
     Lista todos los turnos en una fecha específica (solo administradores)
-    GET /api/turnos/fecha/{fecha}/?limite=100
+    GET /api/turnos/fecha/{fecha}/?page_size=100&cursor=<next_cursor>
     fecha formato: YYYY-MM-DD
     """
     try:
@@ -129,10 +140,15 @@ def listar_turnos_fecha(request, fecha):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        limite = int(request.query_params.get('limite', 100))
-        result = turno_manager.listarPorFecha(fecha, limite)
+        cursor, tamanio = leer_parametros(request.query_params)
+        result = turno_manager.listarPaginaDia(fecha, cursor, tamanio)
         
         return Response(result, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response(
+            {"success": False, "message": str(e), "data": None},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         logger.error(f"Error al listar turnos por fecha: {str(e)}")
         return Response(
@@ -146,7 +162,7 @@ def listar_turnos_fecha(request, fecha):
 def listar_turnos_sede_fecha(request, id_sede, fecha):
     """
     Lista turnos de una sede en una fecha específica (solo administradores)
-    GET /api/turnos/sede/{id_sede}/fecha/{fecha}/?limite=100
+    GET /api/turnos/sede/{id_sede}/fecha/{fecha}/?page_size=100&cursor=<next_cursor>
     """
     try:
         # Solo administradores pueden ver turnos por sede y fecha
@@ -156,10 +172,15 @@ def listar_turnos_sede_fecha(request, id_sede, fecha):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        limite = int(request.query_params.get('limite', 100))
-        result = turno_manager.listarPorSedeFecha(id_sede, fecha, limite)
+        cursor, tamanio = leer_parametros(request.query_params)
+        result = turno_manager.listarPaginaDia(fecha, cursor, tamanio, id_sede=id_sede)
         
         return Response(result, status=status.HTTP_200_OK)
+    except CursorInvalido as e:
+        return Response(
+            {"success": False, "message": str(e), "data": None},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         logger.error(f"Error al listar turnos por sede y fecha: {str(e)}")
         return Response(